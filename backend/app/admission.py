@@ -0,0 +1,365 @@
+"""
+Admission control: bounded concurrency per route class, with fast load shedding.
+
+Without it, a burst piles every request onto the connection pool, where
+each waits up to DB_POOL_TIMEOUT seconds; latency then degrades for
+everyone instead of some requests failing fast. The AdmissionMiddleware
+sorts requests into classes:
+- write: POST, PUT and DELETE that change data (including admin rebuilds)
+- read: GET requests, and the compute-only POST /mortgages/explain and what-if
+- export: GET /mortgages/export, which holds a connection for the whole stream
+Health checks, /metrics, the change feed stream and the docs are never
+limited.
+
+Each class admits up to its limit of requests at once. Further requests
+wait in a FIFO queue of at most ADMISSION_QUEUE_SIZE for up to
+ADMISSION_QUEUE_TIMEOUT seconds. When the queue is full, or the wait runs
+out, the request is answered at once with 503 and a Retry-After header
+estimated from the class's recent latency.
+
+The limits adapt to the database's latency. Every SQL statement's
+duration feeds a short-term moving average, compared against a baseline
+that follows the lowest recent latency and drifts up only slowly. When
+the recent latency exceeds the baseline by more than
+ADMISSION_LATENCY_TOLERANCE times, each class's limit is cut by a
+tenth, down to one, if the class used its whole limit since the last
+adjustment. While latency is normal and a class is using its whole
+limit, the limit grows by one per adjustment, back up to the
+configured maximum (additive increase, multiplicative decrease).
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from sqlalchemy import event
+
+from . import metrics
+from .database import DB_MAX_OVERFLOW, DB_POOL_SIZE, async_engine
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Limit concurrent requests per route class and shed the excess with 503
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Maximum concurrent requests per class; defaults follow the pool size
+ADMISSION_READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", str(max(1, (DB_POOL_SIZE + DB_MAX_OVERFLOW) * 2 // 3))))
+ADMISSION_EXPORT_LIMIT = int(os.getenv("ADMISSION_EXPORT_LIMIT", "2"))
+
+# Requests per class that may wait for a slot, and for how long
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "20"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "0.5"))
+
+# How many times its baseline recent database latency may be before limits are cut
+ADMISSION_LATENCY_TOLERANCE = float(os.getenv("ADMISSION_LATENCY_TOLERANCE", "3"))
+
+# Seconds between limit adjustments
+ADJUST_INTERVAL = 0.5
+
+# Weights of the newest sample in the recent latency and of the baseline's upward drift
+RECENT_WEIGHT = 0.1
+BASELINE_DRIFT = 0.005
+
+# Multiplier applied to limits while the database is slow
+DECREASE_FACTOR = 0.9
+
+MAX_RETRY_AFTER = 30
+
+# Paths never limited: probes, monitoring, the long-lived change stream and docs
+EXEMPT_PATHS = frozenset({
+    "/health", "/metrics", "/mortgages/changes", "/admin/profile", "/docs", "/redoc", "/openapi.json",
+})
+
+# POST routes that only compute, and so count as reads
+READ_ONLY_POSTS = frozenset({"/mortgages/explain", "/mortgages/what-if"})
+
+READ, WRITE, EXPORT = "read", "write", "export"
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """
+    The admission class of a request.
+
+    Args:
+        method (str): HTTP method
+        path (str): Request path
+
+    Returns:
+        Optional[str]: READ, WRITE or EXPORT, or None for requests that are never limited
+    """
+    if method == "OPTIONS" or path in EXEMPT_PATHS:
+        return None
+    if path == "/mortgages/export":
+        return EXPORT
+    if method in ("GET", "HEAD") or path in READ_ONLY_POSTS:
+        return READ
+    return WRITE
+
+
+class LatencyTracker:
+    """Recent SQL statement latency and its slowly drifting baseline."""
+
+    def __init__(self):
+        self.recent: Optional[float] = None
+        self.baseline: Optional[float] = None
+
+    def observe(self, seconds: float) -> None:
+        """Record one statement's duration."""
+        if self.recent is None:
+            self.recent = self.baseline = seconds
+            return
+        self.recent += (seconds - self.recent) * RECENT_WEIGHT
+        self.baseline = min(self.baseline + (self.recent - self.baseline) * BASELINE_DRIFT, self.recent)
+
+    def degraded(self, tolerance: float = ADMISSION_LATENCY_TOLERANCE) -> bool:
+        """Whether recent latency exceeds the baseline by more than `tolerance` times."""
+        return self.recent is not None and self.recent > self.baseline * tolerance
+
+    def reset(self) -> None:
+        self.recent = self.baseline = None
+
+
+class Limiter:
+    """
+    Concurrency limit and wait queue of one route class.
+
+    Args:
+        name (str): The route class
+        max_limit (int): Most requests admitted at once
+        queue_size (int): Most requests waiting for a slot
+        queue_timeout (float): Seconds a request may wait
+    """
+
+    def __init__(self, name: str, max_limit: int, queue_size: int = ADMISSION_QUEUE_SIZE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.name = name
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of the seconds admitted requests take, for Retry-After
+        self.service_time = 0.0
+        self._saturated = False
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """
+        Take a slot, waiting in the queue if needed.
+
+        Returns:
+            bool: Whether the request was admitted; False means shed it
+        """
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self._saturated |= self.in_flight >= self.limit
+            metrics.admission_decisions.inc(self.name, "admitted")
+            return True
+        self._saturated = True
+        if len(self._waiters) >= self.queue_size:
+            metrics.admission_decisions.inc(self.name, "queue_full")
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # The client went away while waiting; hand on a slot it was just given
+            if waiter.done():
+                self.release(None)
+            else:
+                self._waiters.remove(waiter)
+            raise
+        metrics.admission_queue_wait.observe(time.perf_counter() - started, self.name)
+        if waiter.done():
+            metrics.admission_decisions.inc(self.name, "queued")
+            return True
+        self._waiters.remove(waiter)
+        metrics.admission_decisions.inc(self.name, "timed_out")
+        return False
+
+    def release(self, seconds: Optional[float]) -> None:
+        """
+        Free a slot and pass it to the longest-waiting request.
+
+        Args:
+            seconds (Optional[float]): How long the request held the slot, if it completed
+        """
+        self.in_flight -= 1
+        if seconds is not None:
+            self.service_time += (seconds - self.service_time) * RECENT_WEIGHT
+        self._wake()
+
+    def adjust(self, degraded: bool) -> None:
+        """
+        Cut the limit while the database is slow, or raise it back while it is not.
+
+        Only a class that used its whole limit since the last adjustment
+        changes: one with spare slots is not adding to the database's load,
+        and has no use for more.
+
+        Args:
+            degraded (bool): Whether database latency is above tolerance
+        """
+        if self._saturated and degraded:
+            self.limit = max(1, math.floor(self.limit * DECREASE_FACTOR))
+        elif self._saturated and self.limit < self.max_limit:
+            self.limit += 1
+            self._wake()
+        self._saturated = self.in_flight >= self.limit or bool(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds a shed client should wait: the time to drain the queue at the current limit."""
+        estimate = self.service_time * (len(self._waiters) + 1) / max(1, self.limit)
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(estimate)))
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "service_time_ms": round(self.service_time * 1000, 3),
+        }
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+
+class AdmissionController:
+    """The route class limiters and the database latency they adapt to."""
+
+    def __init__(self, enabled: bool = ADMISSION_CONTROL_ENABLED):
+        self.enabled = enabled
+        self.latency = LatencyTracker()
+        self.limiters: Dict[str, Limiter] = {
+            READ: Limiter(READ, ADMISSION_READ_LIMIT),
+            WRITE: Limiter(WRITE, ADMISSION_WRITE_LIMIT),
+            EXPORT: Limiter(EXPORT, ADMISSION_EXPORT_LIMIT),
+        }
+        self._adjusted_at = 0.0
+
+    def watch(self, engine) -> None:
+        """
+        Feed the duration of every statement on a (sync) engine into the latency tracker.
+
+        Args:
+            engine: SQLAlchemy Engine; for an AsyncEngine pass its `sync_engine`
+        """
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("admission_started", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            self.latency.observe(time.perf_counter() - conn.info["admission_started"].pop())
+
+        @event.listens_for(engine, "handle_error")
+        def _handle_error(exception_context):
+            connection = exception_context.connection
+            if connection is not None and connection.info.get("admission_started"):
+                connection.info["admission_started"].pop()
+
+    def maybe_adjust(self) -> None:
+        """Adjust every limit once per ADJUST_INTERVAL."""
+        now = time.monotonic()
+        if now - self._adjusted_at < ADJUST_INTERVAL:
+            return
+        self._adjusted_at = now
+        degraded = self.latency.degraded()
+        for limiter in self.limiters.values():
+            before = limiter.limit
+            limiter.adjust(degraded)
+            if limiter.limit < before:
+                logger.warning(
+                    f"Database latency {self.latency.recent * 1000:.1f} ms is above "
+                    f"{ADMISSION_LATENCY_TOLERANCE}x its baseline; {limiter.name} limit cut to {limiter.limit}"
+                )
+
+    def snapshot(self) -> dict:
+        """
+        Describe admission control for monitoring.
+
+        Returns:
+            dict: Whether it is enabled, database latency and its baseline, and each class's limiter
+        """
+        return {
+            "enabled": self.enabled,
+            "db_latency_ms": round(self.latency.recent * 1000, 3) if self.latency.recent is not None else None,
+            "db_baseline_ms": round(self.latency.baseline * 1000, 3) if self.latency.baseline is not None else None,
+            "degraded": self.latency.degraded(),
+            "classes": {name: limiter.snapshot() for name, limiter in self.limiters.items()},
+        }
+
+
+admission = AdmissionController()
+admission.watch(async_engine.sync_engine)
+for _name, _limiter in admission.limiters.items():
+    metrics.admission_limit.set_function(lambda limiter=_limiter: limiter.limit, _name, "limit")
+    metrics.admission_limit.set_function(lambda limiter=_limiter: limiter.in_flight, _name, "in_flight")
+    metrics.admission_limit.set_function(lambda limiter=_limiter: limiter.queued, _name, "queued")
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware admitting each request through its route class's limiter.
+
+    Shed requests get 503 with Retry-After before reaching the app, so they
+    cost no database work.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.controller.enabled:
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+        self.controller.maybe_adjust()
+        limiter = self.controller.limiters[name]
+        if not await limiter.acquire():
+            await self._shed(send, limiter)
+            return
+        started = time.perf_counter()
+        completed = False
+        try:
+            await self.app(scope, receive, send)
+            completed = True
+        finally:
+            limiter.release(time.perf_counter() - started if completed else None)
+
+    @staticmethod
+    async def _shed(send, limiter: Limiter) -> None:
+        body = dumps({"detail": f"Server is busy; retry {limiter.name} requests later"})
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(limiter.retry_after()).encode()),
+                (b"cache-control", b"no-store"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
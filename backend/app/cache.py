@@ -0,0 +1,271 @@
+"""
+Read-through response cache for mortgage listings.
+
+Cached entries are pre-serialized JSON bodies (plus the headers that go
+with them) keyed by the page/filter parameters and the current cache
+generation. Every committed write bumps the generation, so entries from
+before the write can never be served again and simply age out; there is
+no key scanning or pattern deletion. The generation also makes the ETag:
+a client revalidating with If-None-Match gets a 304 from one generation
+read, without touching the database.
+
+Backends:
+- MemoryCacheBackend: per-process TTL/LRU, the default (`memory://`)
+- RedisCacheBackend: shared by all workers (`redis://...`), needs the
+  optional `redis` package; any client with async get/set/incr, such as a
+  local in-memory stand-in, can be plugged in instead
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from . import changes
+
+logger = logging.getLogger(__name__)
+
+# "memory://" (default), "redis://host:port/db", or "none" to disable
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "memory://")
+
+# Seconds an entry may be served; bounds staleness from writes made outside the API
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+
+# Maximum entries of the in-process backend
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+
+GENERATION_KEY = "mortgages:generation"
+
+
+class MemoryCacheBackend:
+    """In-process TTL/LRU backend. Entries are private to the worker process."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Backend shared by every worker through an external key-value store.
+
+    Args:
+        client: Object with async `get`, `set(key, value, ex=seconds)` and
+            `incr`, e.g. a `redis.asyncio.Redis` or a local stand-in
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCacheBackend":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_URL=redis://... requires the redis package")
+        return cls(redis.Redis.from_url(url))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(key, value, ex=max(1, int(ttl)))
+
+    async def get_counter(self, key: str) -> int:
+        value = await self.client.get(key)
+        return int(value) if value is not None else 0
+
+    async def incr(self, key: str) -> int:
+        return int(await self.client.incr(key))
+
+
+def backend_from_url(url: str):
+    """
+    Build the cache backend named by a RESPONSE_CACHE_URL value.
+
+    Args:
+        url (str): "memory://", "redis://..." or "none"
+
+    Returns:
+        The backend, or None when caching is disabled
+    """
+    if not url or url == "none":
+        return None
+    if url.startswith("memory://"):
+        return MemoryCacheBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend.from_url(url)
+    raise ValueError(f"Unsupported RESPONSE_CACHE_URL: {url}")
+
+
+def params_digest(params: dict) -> str:
+    """Hash request parameters into a stable key component, ignoring unset values."""
+    canonical = json.dumps({k: v for k, v in params.items() if v is not None}, sort_keys=True, default=str)
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an entity tag (weak comparison).
+
+    Args:
+        if_none_match (Optional[str]): The request header, possibly a comma-separated list or "*"
+        etag (str): The current entity tag
+
+    Returns:
+        bool: True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+class ResponseCache:
+    """
+    Generation-versioned cache of serialized responses.
+
+    Backend failures (e.g. an unreachable Redis) are logged and treated as
+    misses, so the API keeps answering from the database.
+
+    Args:
+        backend: A cache backend, or None to disable caching
+        ttl (float): Seconds entries may be served
+    """
+
+    def __init__(self, backend, ttl: float = RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        # Latest generation this process has seen, and when it first saw it
+        self._latest_generation: Optional[int] = None
+        self._latest_seen_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def generation(self) -> Optional[int]:
+        """
+        Read the current generation; every committed write increments it.
+
+        Returns:
+            Optional[int]: The generation, or None if caching is disabled or the backend failed
+        """
+        if self.backend is None:
+            return None
+        try:
+            return await self.backend.get_counter(GENERATION_KEY)
+        except Exception as e:
+            logger.error(f"Response cache generation read failed: {str(e)}")
+            return None
+
+    async def bump(self) -> None:
+        """Invalidate every cached response by moving to the next generation."""
+        if self.backend is None:
+            return
+        try:
+            self._observe(await self.backend.incr(GENERATION_KEY))
+        except Exception as e:
+            logger.error(f"Response cache invalidation failed, entries expire within {self.ttl}s: {str(e)}")
+
+    def _observe(self, generation: int) -> float:
+        now = time.monotonic()
+        if generation != self._latest_generation:
+            self._latest_generation = generation
+            self._latest_seen_at = now
+        return now - self._latest_seen_at
+
+    def settled(self, generation: int, seconds: float) -> bool:
+        """
+        Check whether a generation has been current for at least `seconds`.
+
+        Measured from when this process first saw it, which is never
+        earlier than the write that started it. Pages read from a replica
+        are only cached once their generation has settled, so a replica
+        that has not caught up with the write cannot pin a stale page.
+
+        Args:
+            generation (int): A generation returned by generation()
+            seconds (float): The replica's maximum lag
+
+        Returns:
+            bool: True if the generation is at least `seconds` old
+        """
+        return self._observe(generation) >= seconds
+
+    @staticmethod
+    def etag(generation: int, digest: str) -> str:
+        """Entity tag of the response for `digest` at `generation`."""
+        return f'"{generation}-{digest[:20]}"'
+
+    async def get(self, namespace: str, generation: int, digest: str) -> Optional[Tuple[bytes, dict]]:
+        """
+        Look up a cached response.
+
+        Returns:
+            Optional[Tuple[bytes, dict]]: The body and its extra headers, or None on a miss
+        """
+        try:
+            value = await self.backend.get(f"{namespace}:{generation}:{digest}")
+        except Exception as e:
+            logger.error(f"Response cache read failed: {str(e)}")
+            return None
+        if value is None:
+            return None
+        headers, _, body = value.partition(b"\n")
+        return body, json.loads(headers)
+
+    async def set(self, namespace: str, generation: int, digest: str, body: bytes, headers: dict) -> None:
+        """Store a serialized response and its extra headers under its generation."""
+        try:
+            await self.backend.set(
+                f"{namespace}:{generation}:{digest}",
+                json.dumps(headers).encode() + b"\n" + body,
+                self.ttl
+            )
+        except Exception as e:
+            logger.error(f"Response cache write failed: {str(e)}")
+
+
+response_cache = ResponseCache(backend_from_url(RESPONSE_CACHE_URL))
+
+
+@changes.subscribe
+async def _invalidate_on_change(change: changes.MortgageChange) -> None:
+    await response_cache.bump()
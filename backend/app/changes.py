@@ -0,0 +1,74 @@
+"""
+In-process notifications of committed mortgage writes.
+
+Write endpoints publish a MortgageChange once their transaction has
+committed; caches and other derived views subscribe to stay in step
+without each endpoint having to know about them.
+"""
+import logging
+from typing import Awaitable, Callable, List, NamedTuple, Tuple
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+# Moved to the archive table: gone from the live set, still readable by id
+ARCHIVED = "archived"
+
+
+class MortgageChange(NamedTuple):
+    """
+    A committed change to one or more mortgages.
+
+    Attributes:
+        kind (str): CREATED, UPDATED, DELETED or ARCHIVED
+        ids (Tuple[int, ...]): Ids of the affected mortgages
+    """
+    kind: str
+    ids: Tuple[int, ...]
+
+
+Listener = Callable[[MortgageChange], Awaitable[None]]
+
+_listeners: List[Listener] = []
+
+
+def subscribe(listener: Listener) -> Listener:
+    """
+    Register an async callable to be awaited with every published change.
+
+    Usable as a decorator.
+
+    Args:
+        listener (Listener): Coroutine function taking a MortgageChange
+
+    Returns:
+        Listener: The listener, unchanged
+    """
+    _listeners.append(listener)
+    return listener
+
+
+def unsubscribe(listener: Listener) -> None:
+    """Stop notifying a previously subscribed listener."""
+    _listeners.remove(listener)
+
+
+async def publish(kind: str, ids) -> None:
+    """
+    Notify every listener of a committed change.
+
+    A failing listener is logged and does not affect the others or the
+    request that made the change, which has already committed.
+
+    Args:
+        kind (str): CREATED, UPDATED, DELETED or ARCHIVED
+        ids: Ids of the affected mortgages
+    """
+    change = MortgageChange(kind, tuple(ids))
+    for listener in list(_listeners):
+        try:
+            await listener(change)
+        except Exception as e:
+            logger.error(f"Mortgage change listener {getattr(listener, '__name__', listener)} failed: {str(e)}")
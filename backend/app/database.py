@@ -1,9 +1,17 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from fastapi import Request
+from typing import Optional
+import math
 import os
 import logging
+import time
+
+from .metrics import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, instrument_engine
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -18,45 +26,256 @@ DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_NAME = os.getenv("DB_NAME", "mortgage_db")
 DB_PORT = os.getenv("DB_PORT", "3306")
 
-# Construct database URL
-SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Construct database URL (DATABASE_URL overrides it, e.g. with a local SQLite stand-in)
+SQLALCHEMY_DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+
+# Async drivers used by the API for each supported backend
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    """
+    Swap the driver of a synchronous database URL for its async counterpart.
+
+    Args:
+        url (str): SQLAlchemy URL using a sync driver, e.g. mysql+pymysql://...
+
+    Returns:
+        str: The same URL using the async driver, e.g. mysql+aiomysql://...
+    """
+    parsed = make_url(url)
+    async_driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if async_driver is None:
+        raise ValueError(f"No async driver configured for {parsed.drivername}")
+    return parsed.set(drivername=async_driver).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(SQLALCHEMY_DATABASE_URL))
+
+# Optional read replica: GET endpoints read from it, writes always go to the primary
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+ASYNC_DATABASE_REPLICA_URL = os.getenv(
+    "ASYNC_DATABASE_REPLICA_URL",
+    to_async_url(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
+)
+
+# Seconds the replica may trail the primary; a client reads from the
+# primary for this long after its own write (read-your-writes)
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+READ_PRIMARY_COOKIE = "mortgage_read_primary_until"
+
+# Connection pool sizing, per engine and per worker process: size it so
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) stays below the server's max_connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Recycle connections after 30 minutes
+# Test pooled connections with a lightweight ping on checkout, so connections
+# dropped by the server (restarts, wait_timeout) are replaced instead of failing a request
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+connect_args = {}
+pool_options = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+# Pool classes recording checkout waits and timeouts for /metrics
+pool_options["poolclass"] = InstrumentedQueuePool
+
+def async_pool_options(url: str) -> dict:
+    """
+    Pool options of an async engine for a database URL.
+
+    Args:
+        url (str): The async database URL
+
+    Returns:
+        dict: Keyword arguments for create_async_engine
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        # aiosqlite runs each connection on its own thread; keep its default
+        # NullPool so no idle connection (and thread) outlives its session
+        return {}
+    return {**pool_options, "poolclass": InstrumentedAsyncAdaptedQueuePool}
+
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    # Sessions are created and used on different FastAPI worker threads
+    connect_args["check_same_thread"] = False
 
 # Create database engine with connection pooling
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_recycle=1800,  # Recycle connections after 30 minutes
-    echo=False  # Set to True for SQL query logging
+    connect_args=connect_args,
+    echo=False,  # Set to True for SQL query logging
+    **pool_options
+)
+
+# Async engine used by the API so queries never block the event loop
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,  # Set to True for SQL query logging
+    **async_pool_options(ASYNC_DATABASE_URL)
+)
+
+# Query timings and pool saturation for /metrics
+instrument_engine(engine, "sync", max_overflow=pool_options["max_overflow"])
+instrument_engine(
+    async_engine.sync_engine,
+    "async",
+    max_overflow=async_pool_options(ASYNC_DATABASE_URL).get("max_overflow")
 )
 
-# Create session factory
+# Async engine of the read replica, or None when reads go to the primary
+replica_async_engine: Optional[AsyncEngine] = None
+
+def configure_replica(url: Optional[str]) -> Optional[AsyncEngine]:
+    """
+    Point read-only endpoints at a replica, or back at the primary with None.
+
+    The previous replica engine, if any, is left for the caller to dispose.
+
+    Args:
+        url (Optional[str]): Async URL of the replica
+
+    Returns:
+        Optional[AsyncEngine]: The new replica engine
+    """
+    global replica_async_engine
+    if url is None:
+        replica_async_engine = None
+        return None
+    options = async_pool_options(url)
+    replica_async_engine = create_async_engine(url, echo=False, **options)
+    instrument_engine(replica_async_engine.sync_engine, "replica", max_overflow=options.get("max_overflow"))
+    return replica_async_engine
+
+configure_replica(ASYNC_DATABASE_REPLICA_URL)
+
+# Create session factories (the sync one serves scripts, jobs and tests, which
+# cannot share the API's event loop)
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine
 )
 
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False  # Expired attributes would need an implicit (blocking) reload
+)
+
 # Create base class for models
 Base = declarative_base()
 
-def get_db():
+async def get_db():
     """
-    Database session dependency for FastAPI endpoints.
-    
+    Async database session dependency for FastAPI endpoints.
+
+    Helpers written against a synchronous Session can be reused through
+    `await db.run_sync(helper, *args)`.
+
     Yields:
-        Session: Database session
-        
+        AsyncSession: Database session
+
     Note:
         The session is automatically closed after the request is complete.
     """
-    db = SessionLocal()
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error(f"Database session error: {str(e)}")
+            await db.rollback()
+            raise
+
+def reads_from_primary(request: Request) -> bool:
+    """
+    Check whether a client wrote recently enough that its reads must see the primary.
+
+    Args:
+        request (Request): The incoming request
+
+    Returns:
+        bool: True while the client's read-your-writes cookie is current
+    """
     try:
-        yield db
-    except Exception as e:
-        logger.error(f"Database session error: {str(e)}")
-        db.rollback()
-        raise
-    finally:
-        db.close() 
\ No newline at end of file
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def read_engine(request: Request) -> AsyncEngine:
+    """
+    Pick the engine serving a read-only request.
+
+    Args:
+        request (Request): The incoming request
+
+    Returns:
+        AsyncEngine: The replica, unless none is configured or the client wrote recently
+    """
+    if replica_async_engine is None or reads_from_primary(request):
+        return async_engine
+    return replica_async_engine
+
+def is_replica_session(db: AsyncSession) -> bool:
+    """Check whether a session reads from the replica (and so may trail recent writes)."""
+    return replica_async_engine is not None and db.bind is replica_async_engine
+
+async def get_read_db(request: Request):
+    """
+    Async database session dependency for read-only endpoints.
+
+    Reads go to the replica when one is configured, except for clients
+    holding the read-your-writes cookie set on their last write, whose
+    reads stay on the primary until the replica has caught up.
+
+    Yields:
+        AsyncSession: Database session on the replica or the primary
+    """
+    async with AsyncSessionLocal(bind=read_engine(request)) as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error(f"Database session error: {str(e)}")
+            await db.rollback()
+            raise
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware giving clients that write read-your-writes consistency.
+
+    Successful non-GET responses carry a cookie holding the time until
+    which the client's reads are served by the primary; it expires after
+    REPLICA_MAX_LAG_SECONDS. Nothing is set while no replica is configured.
+    """
+
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in self.SAFE_METHODS or replica_async_engine is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + REPLICA_MAX_LAG_SECONDS
+                cookie = (
+                    f"{READ_PRIMARY_COOKIE}={until:.3f}; Max-Age={math.ceil(REPLICA_MAX_LAG_SECONDS)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,194 @@
+"""
+Streaming export of the mortgage book as NDJSON, CSV or Parquet.
+
+Rows are read with a server-side cursor in batches of EXPORT_BATCH_SIZE
+and encoded straight from column tuples, so no ORM objects are built and
+memory stays bounded by one batch whatever the table size.
+"""
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, List, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .filters import MortgageFilters
+from .models import Mortgage
+from .serialization import dumps
+
+EXPORT_BATCH_SIZE = 5000
+
+EXPORT_COLUMNS = (
+    Mortgage.id,
+    Mortgage.applicant_name,
+    Mortgage.income,
+    Mortgage.credit_score,
+    Mortgage.loan_amount,
+    Mortgage.property_value,
+    Mortgage.debt_amount,
+    Mortgage.loan_type,
+    Mortgage.property_type,
+    Mortgage.credit_rating,
+    Mortgage.rulebook_version,
+    Mortgage.created_at,
+    Mortgage.updated_at,
+)
+EXPORT_FIELD_NAMES = [column.key for column in EXPORT_COLUMNS]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    """Check whether the optional pyarrow dependency needed for Parquet is installed."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def stream_rows(engine: AsyncEngine, filters: MortgageFilters, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[List[Sequence]]:
+    """
+    Stream filtered mortgage rows as batches of plain column tuples.
+
+    Uses its own connection so the cursor stays open for the lifetime of
+    the streaming response rather than of the request's session.
+
+    Args:
+        engine (AsyncEngine): Engine to read from
+        filters (MortgageFilters): Filters shared with the listing endpoint
+        batch_size (int): Rows fetched from the server-side cursor at a time
+
+    Yields:
+        List[Sequence]: The next batch of rows, in EXPORT_COLUMNS order
+    """
+    statement = (
+        filters.apply(select(*EXPORT_COLUMNS))
+        .order_by(Mortgage.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    async with engine.connect() as connection:
+        result = await connection.stream(statement)
+        async for partition in result.partitions():
+            yield partition
+
+
+async def encode_ndjson(batches: AsyncIterator[List[Sequence]]) -> AsyncIterator[bytes]:
+    """
+    Encode row batches as newline-delimited JSON objects.
+
+    Args:
+        batches (AsyncIterator[List[Sequence]]): Batches from stream_rows
+
+    Yields:
+        bytes: One encoded chunk per batch
+    """
+    async for batch in batches:
+        yield b"".join(dumps(dict(zip(EXPORT_FIELD_NAMES, row))) + b"\n" for row in batch)
+
+
+async def encode_csv(batches: AsyncIterator[List[Sequence]]) -> AsyncIterator[bytes]:
+    """
+    Encode row batches as CSV with a header line.
+
+    Args:
+        batches (AsyncIterator[List[Sequence]]): Batches from stream_rows
+
+    Yields:
+        bytes: The header, then one encoded chunk per batch
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELD_NAMES)
+    async for batch in batches:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in batch
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose contents can be taken out as they are produced."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def encode_parquet(batches: AsyncIterator[List[Sequence]]) -> AsyncIterator[bytes]:
+    """
+    Encode row batches as a Parquet file, one row group per batch.
+
+    Requires the optional pyarrow dependency.
+
+    Args:
+        batches (AsyncIterator[List[Sequence]]): Batches from stream_rows
+
+    Yields:
+        bytes: Encoded row groups as they are written, then the footer
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("applicant_name", pa.string()),
+        ("income", pa.float64()),
+        ("credit_score", pa.int32()),
+        ("loan_amount", pa.float64()),
+        ("property_value", pa.float64()),
+        ("debt_amount", pa.float64()),
+        ("loan_type", pa.dictionary(pa.int8(), pa.string())),
+        ("property_type", pa.dictionary(pa.int8(), pa.string())),
+        ("credit_rating", pa.dictionary(pa.int8(), pa.string())),
+        ("rulebook_version", pa.dictionary(pa.int16(), pa.string())),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+    ])
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async for batch in batches:
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+    "parquet": encode_parquet,
+}
@@ -0,0 +1,394 @@
+"""
+Change feed of committed mortgage writes, streamed to clients as Server-Sent Events.
+
+Every write records one event per affected mortgage in the
+`mortgage_changes` table, in the same transaction as the write (a
+transactional outbox), so the table's autoincrement `seq` orders the
+writes of all workers and jobs. Each worker runs one poller that reads
+the events after the last one it has sent, joins the current row, encodes
+every event once as an SSE message and hands the same bytes to all of its
+subscribers: the database sees one primary-key range query per poll
+however many clients are connected. The worker's own writes wake the
+poller through app.changes, so their events go out at once; other
+workers' within FEED_POLL_INTERVAL seconds.
+
+Clients resume with the standard Last-Event-ID header (EventSource sends
+it when it reconnects) or `?since=`. Recent events are replayed from
+memory, older ones from the table; a client further behind than the
+table retains gets a `reset` event and should reload its list. A client
+that stops reading is disconnected once FEED_SUBSCRIBER_QUEUE batches
+are waiting for it, and catches up the same way after reconnecting.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+
+from . import changes, metrics
+from .models import Mortgage, MortgageChangeEvent
+from .serialization import MORTGAGE_COLUMNS, MORTGAGE_FIELD_NAMES, dumps
+
+logger = logging.getLogger(__name__)
+
+# Record change events with every write and serve GET /mortgages/changes
+CHANGE_FEED_ENABLED = os.getenv("CHANGE_FEED_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Seconds between polls for events written by other workers and jobs
+FEED_POLL_INTERVAL = float(os.getenv("FEED_POLL_INTERVAL", "1"))
+
+# Recent events each worker keeps encoded in memory for resuming clients
+FEED_BUFFER_SIZE = int(os.getenv("FEED_BUFFER_SIZE", "10000"))
+
+# Events kept in the mortgage_changes table; older ones are pruned
+FEED_RETENTION_EVENTS = int(os.getenv("FEED_RETENTION_EVENTS", "1000000"))
+
+# Undelivered batches after which a slow subscriber is disconnected
+FEED_SUBSCRIBER_QUEUE = int(os.getenv("FEED_SUBSCRIBER_QUEUE", "1000"))
+
+# Seconds between keep-alive comments on an idle stream
+FEED_HEARTBEAT_INTERVAL = 15.0
+
+# Seconds to wait for a missing seq to commit before treating it as rolled back
+FEED_GAP_TIMEOUT = 5.0
+
+# Seconds between prunes of the mortgage_changes table
+FEED_PRUNE_INTERVAL = 60.0
+
+# Milliseconds an EventSource waits before reconnecting
+FEED_RETRY_MS = 1000
+
+FEED_BATCH_SIZE = 1000
+
+FEED_COLUMNS = (MortgageChangeEvent.seq, MortgageChangeEvent.kind, MortgageChangeEvent.mortgage_id)
+
+RESET_MESSAGE = b"event: reset\ndata: {}\n\n"
+HEARTBEAT_MESSAGE = b": keep-alive\n\n"
+
+Message = Tuple[int, bytes]
+
+
+def _event_rows(kind: str, ids: Iterable[int]) -> List[dict]:
+    return [{"kind": kind, "mortgage_id": mortgage_id} for mortgage_id in ids]
+
+
+def record_changes(db: Session, kind: str, ids: Iterable[int]) -> None:
+    """
+    Append change events for a write inside the caller's transaction.
+
+    Args:
+        db (Session): Database session
+        kind (str): changes.CREATED, UPDATED, DELETED or ARCHIVED
+        ids (Iterable[int]): Ids of the affected mortgages
+    """
+    rows = _event_rows(kind, ids)
+    if CHANGE_FEED_ENABLED and rows:
+        db.execute(insert(MortgageChangeEvent), rows)
+
+
+async def record_changes_async(db: AsyncSession, kind: str, ids: Iterable[int]) -> None:
+    """
+    Async counterpart of record_changes for the API's sessions.
+
+    Args:
+        db (AsyncSession): Database session
+        kind (str): changes.CREATED, UPDATED, DELETED or ARCHIVED
+        ids (Iterable[int]): Ids of the affected mortgages
+    """
+    rows = _event_rows(kind, ids)
+    if CHANGE_FEED_ENABLED and rows:
+        await db.execute(insert(MortgageChangeEvent), rows)
+
+
+def encode_event(row) -> Message:
+    """
+    Encode one joined event row as an SSE message.
+
+    The data is the event's seq, kind and mortgage id plus, for creates and
+    updates, the mortgage as GET /mortgages lists it (null if it has been
+    deleted or archived since).
+
+    Args:
+        row: Row of FEED_COLUMNS followed by MORTGAGE_COLUMNS
+
+    Returns:
+        Message: The seq and the encoded message
+    """
+    seq, kind, mortgage_id = row[:3]
+    mortgage = None
+    if kind != changes.DELETED and row[3] is not None:
+        mortgage = dict(zip(MORTGAGE_FIELD_NAMES, row[3:]))
+    data = dumps({"seq": seq, "kind": kind, "id": mortgage_id, "mortgage": mortgage})
+    return seq, b"id: %d\nevent: change\ndata: %s\n\n" % (seq, data)
+
+
+class _Subscriber:
+    """Queue of message batches for one connected client."""
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.dropped = False
+
+
+class ChangeFeed:
+    """
+    This worker's poller and fan-out of the mortgage change feed.
+
+    Args:
+        poll_interval (float): Seconds between polls
+        buffer_size (int): Encoded events kept in memory for resuming clients
+        queue_size (int): Undelivered batches after which a subscriber is dropped
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = FEED_POLL_INTERVAL,
+        buffer_size: int = FEED_BUFFER_SIZE,
+        queue_size: int = FEED_SUBSCRIBER_QUEUE
+    ):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.engine: Optional[AsyncEngine] = None
+        # Seq of the newest event sent to subscribers (None: none seen yet)
+        self.last_seq: Optional[int] = None
+        self._buffer: Deque[Message] = deque(maxlen=buffer_size)
+        self._subscribers: Set[_Subscriber] = set()
+        self._consumers: List[Callable[[List[Sequence]], None]] = []
+        self._wake = asyncio.Event()
+        self._poll_lock = asyncio.Lock()
+        self._gap_seen_at: Optional[float] = None
+        self._pruned_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def start(self, engine: AsyncEngine) -> None:
+        """
+        Start polling from the newest recorded event.
+
+        Args:
+            engine (AsyncEngine): Engine of the primary database
+        """
+        self.engine = engine
+        # Events and locks are bound to the loop they are first used on
+        self._wake = asyncio.Event()
+        self._poll_lock = asyncio.Lock()
+        async with engine.connect() as connection:
+            self.last_seq = await connection.scalar(select(func.max(MortgageChangeEvent.seq)))
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop polling and end every open stream."""
+        if self._task is not None:
+            # Cancel between polls: a query cancelled midway can leave its connection open
+            async with self._poll_lock:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for subscriber in list(self._subscribers):
+            self._drop(subscriber)
+        self._buffer.clear()
+        self.engine = None
+        self.last_seq = None
+
+    def consume(self, consumer: Callable[[List[Sequence]], None]) -> None:
+        """
+        Also hand every polled batch to an in-process consumer, before the subscribers.
+
+        The consumer gets the joined rows (FEED_COLUMNS followed by
+        MORTGAGE_COLUMNS, which are None when the mortgage has been
+        deleted since) in seq order, and must not block.
+
+        Args:
+            consumer (Callable[[List[Sequence]], None]): Called with each batch of rows
+        """
+        self._consumers.append(consumer)
+
+    def notify(self) -> None:
+        """Wake the poller: this worker has just committed a write."""
+        self._wake.set()
+
+    async def poll(self) -> int:
+        """
+        Send the events committed since the last poll to every subscriber.
+
+        Returns:
+            int: Events sent
+        """
+        sent = 0
+        async with self._poll_lock:
+            while True:
+                async with self.engine.connect() as connection:
+                    rows = (await connection.execute(
+                        self._events_after(self.last_seq).limit(FEED_BATCH_SIZE)
+                    )).all()
+                rows = self._contiguous(rows)
+                if rows:
+                    for consumer in self._consumers:
+                        try:
+                            consumer(rows)
+                        except Exception as e:
+                            logger.error(f"Change feed consumer failed: {str(e)}")
+                    self.publish([encode_event(row) for row in rows])
+                    sent += len(rows)
+                if len(rows) < FEED_BATCH_SIZE:
+                    return sent
+
+    def publish(self, batch: List[Message]) -> None:
+        """
+        Hand a batch of encoded events, in seq order, to every subscriber.
+
+        Args:
+            batch (List[Message]): Events newer than last_seq
+        """
+        self._buffer.extend(batch)
+        self.last_seq = batch[-1][0]
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(batch)
+            except asyncio.QueueFull:
+                logger.warning("Disconnecting a change feed subscriber that stopped reading")
+                self._drop(subscriber)
+        metrics.feed_events.inc(amount=len(batch))
+        metrics.feed_deliveries.inc(amount=len(batch) * len(self._subscribers))
+
+    async def stream(self, since: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Yield the SSE stream of one client: missed events after `since`, then live ones.
+
+        Args:
+            since (Optional[int]): Seq of the last event the client has; None for live events only
+
+        Yields:
+            bytes: SSE messages and keep-alive comments
+        """
+        # Subscribe before replaying, so nothing sent in between is missed; seqs dedupe the overlap
+        subscriber = _Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        try:
+            yield b"retry: %d\n\n" % FEED_RETRY_MS
+            last = since
+            if since is not None and self.last_seq is not None and since < self.last_seq:
+                replayed = await self._replay(since, self.last_seq)
+                if replayed is None:
+                    yield RESET_MESSAGE
+                    last = self.last_seq
+                else:
+                    for seq, message in replayed:
+                        yield message
+                        last = seq
+            while True:
+                try:
+                    batch = await asyncio.wait_for(subscriber.queue.get(), FEED_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT_MESSAGE
+                    continue
+                if batch is None:
+                    return
+                for seq, message in batch:
+                    if last is None or seq > last:
+                        yield message
+                        last = seq
+        finally:
+            self._subscribers.discard(subscriber)
+
+    async def _replay(self, since: int, upto: int) -> Optional[List[Message]]:
+        """Events after `since` up to `upto`, or None if some have been pruned."""
+        if self._buffer and since >= self._buffer[0][0] - 1:
+            return [message for message in self._buffer if since < message[0] <= upto]
+        async with self.engine.connect() as connection:
+            oldest = await connection.scalar(select(func.min(MortgageChangeEvent.seq)))
+            if oldest is None or oldest > since + 1:
+                return None
+            rows = (await connection.execute(
+                self._events_after(since).where(MortgageChangeEvent.seq <= upto)
+            )).all()
+        return [encode_event(row) for row in rows]
+
+    def _events_after(self, seq: Optional[int]):
+        statement = (
+            select(*FEED_COLUMNS, *MORTGAGE_COLUMNS)
+            .select_from(MortgageChangeEvent)
+            .outerjoin(Mortgage, Mortgage.id == MortgageChangeEvent.mortgage_id)
+            .order_by(MortgageChangeEvent.seq)
+        )
+        if seq is not None:
+            statement = statement.where(MortgageChangeEvent.seq > seq)
+        return statement
+
+    def _contiguous(self, batch: List[Sequence]) -> List[Sequence]:
+        """
+        Cut a batch at the first missing seq, unless it has been missing for FEED_GAP_TIMEOUT.
+
+        Seqs are assigned at insert but become visible at commit, so a gap
+        is usually a transaction that has not committed yet; waiting for it
+        keeps events in seq order. Gaps left by rolled-back transactions
+        never fill, and are skipped once they are old enough.
+        """
+        expected = None if self.last_seq is None else self.last_seq + 1
+        for index, row in enumerate(batch):
+            seq = row[0]
+            if expected is not None and seq != expected:
+                now = time.monotonic()
+                if self._gap_seen_at is None:
+                    self._gap_seen_at = now
+                if now - self._gap_seen_at < FEED_GAP_TIMEOUT:
+                    return batch[:index]
+            self._gap_seen_at = None
+            expected = seq + 1
+        return batch
+
+    def _drop(self, subscriber: _Subscriber) -> None:
+        """Disconnect a subscriber: discard its backlog and end its stream."""
+        self._subscribers.discard(subscriber)
+        subscriber.dropped = True
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    async def _prune(self) -> None:
+        if self.last_seq is None:
+            return
+        async with self.engine.begin() as connection:
+            await connection.execute(
+                delete(MortgageChangeEvent).where(MortgageChangeEvent.seq <= self.last_seq - FEED_RETENTION_EVENTS)
+            )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.poll()
+                if time.monotonic() - self._pruned_at >= FEED_PRUNE_INTERVAL:
+                    self._pruned_at = time.monotonic()
+                    async with self._poll_lock:
+                        await self._prune()
+            except Exception as e:
+                logger.error(f"Failed to poll the mortgage change feed: {str(e)}")
+
+
+change_feed = ChangeFeed()
+metrics.feed_subscribers.set_function(lambda: change_feed.subscriber_count)
+
+
+@changes.subscribe
+async def _wake_feed(change: changes.MortgageChange) -> None:
+    change_feed.notify()
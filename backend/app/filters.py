@@ -0,0 +1,111 @@
+"""
+Server-side filters shared by the mortgage listing and bulk write endpoints.
+"""
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from fastapi import Query
+
+from .models import Mortgage
+from .schemas import MortgageSegment
+
+# MortgageSegment fields that mean the same as the listing query parameters
+LISTING_FILTER_FIELDS = (
+    "credit_rating", "loan_type", "property_type",
+    "min_credit_score", "max_credit_score", "min_ltv", "max_ltv",
+)
+
+
+class MortgageFilters:
+    """
+    Query-parameter dependency describing a filtered subset of mortgages.
+
+    Equality filters map onto the leading columns of the composite indexes
+    declared on Mortgage. LTV is not stored, so the LTV range is evaluated
+    as `loan_amount <op> ratio * property_value` on the rows the index
+    range yields.
+    """
+
+    def __init__(
+        self,
+        credit_rating: Optional[str] = Query(None, pattern="^(AAA|BBB|C)$", description="Only this credit rating"),
+        loan_type: Optional[str] = Query(None, pattern="^(fixed|adjustable)$", description="Only this loan type"),
+        property_type: Optional[str] = Query(None, pattern="^(single_family|condo)$", description="Only this property type"),
+        min_credit_score: Optional[int] = Query(None, ge=300, le=850, description="Minimum credit score (inclusive)"),
+        max_credit_score: Optional[int] = Query(None, ge=300, le=850, description="Maximum credit score (inclusive)"),
+        min_ltv: Optional[float] = Query(None, ge=0, description="Minimum loan-to-value ratio (inclusive)"),
+        max_ltv: Optional[float] = Query(None, ge=0, description="Maximum loan-to-value ratio (inclusive)"),
+    ):
+        self.credit_rating = credit_rating
+        self.loan_type = loan_type
+        self.property_type = property_type
+        self.min_credit_score = min_credit_score
+        self.max_credit_score = max_credit_score
+        self.min_ltv = min_ltv
+        self.max_ltv = max_ltv
+
+    def clauses(self) -> List:
+        """
+        Build the SQL criteria for the filters that were supplied.
+
+        Returns:
+            List: SQLAlchemy boolean clauses to AND together
+        """
+        clauses = []
+        if self.credit_rating is not None:
+            clauses.append(Mortgage.credit_rating == self.credit_rating)
+        if self.loan_type is not None:
+            clauses.append(Mortgage.loan_type == self.loan_type)
+        if self.property_type is not None:
+            clauses.append(Mortgage.property_type == self.property_type)
+        if self.min_credit_score is not None:
+            clauses.append(Mortgage.credit_score >= self.min_credit_score)
+        if self.max_credit_score is not None:
+            clauses.append(Mortgage.credit_score <= self.max_credit_score)
+        if self.min_ltv is not None:
+            clauses.append(Mortgage.loan_amount >= self.min_ltv * Mortgage.property_value)
+        if self.max_ltv is not None:
+            clauses.append(Mortgage.loan_amount <= self.max_ltv * Mortgage.property_value)
+        return clauses
+
+    def apply(self, query):
+        """
+        Restrict a query or select() statement to the filtered subset.
+
+        Args:
+            query: A SQLAlchemy Query or Select over Mortgage
+
+        Returns:
+            The restricted query
+        """
+        clauses = self.clauses()
+        return query.filter(*clauses) if clauses else query
+
+
+def segment_clauses(segment: MortgageSegment) -> List:
+    """
+    Build the SQL criteria of a bulk write's filter.
+
+    Args:
+        segment (MortgageSegment): The filter of the bulk update or delete
+
+    Returns:
+        List: SQLAlchemy boolean clauses to AND together (empty when no criterion is set)
+    """
+    clauses = MortgageFilters(**{field: getattr(segment, field) for field in LISTING_FILTER_FIELDS}).clauses()
+    if segment.applicant_name_prefix is not None:
+        clauses.append(Mortgage.applicant_name.startswith(segment.applicant_name_prefix, autoescape=True))
+    if segment.created_after is not None:
+        clauses.append(Mortgage.created_at >= _stored_time(segment.created_after))
+    if segment.created_before is not None:
+        clauses.append(Mortgage.created_at < _stored_time(segment.created_before))
+    if segment.rulebook_version is not None:
+        clauses.append(Mortgage.rulebook_version == segment.rulebook_version)
+    return clauses
+
+
+def _stored_time(value: datetime) -> datetime:
+    """Convert a timestamp to naive UTC, as the database stores them."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
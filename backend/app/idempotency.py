@@ -0,0 +1,220 @@
+"""
+Idempotency-Key support for mortgage submission.
+
+A client that retries POST /mortgages with the same Idempotency-Key gets
+the response of the first successful attempt back instead of a duplicate
+row. Three layers answer a retry, cheapest first:
+
+1. An in-process LRU of stored responses, so a retry storm against one
+   worker costs a dictionary lookup.
+2. In-flight collapsing: a retry arriving while the first attempt is
+   still running waits for it instead of scoring and inserting again.
+3. The idempotency_keys table, written in the same transaction as the
+   mortgage. Its primary key makes concurrent attempts on different
+   workers race on one INSERT; the loser rolls back (taking its mortgage
+   row with it) and replays the winner's stored response.
+
+Stored responses are immutable, so the in-process copy never goes stale.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import metrics
+from .models import IdempotencyKey
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENT_REPLAY_HEADER = "Idempotent-Replayed"
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+# Stored responses kept in process memory, and for how many seconds
+IDEMPOTENCY_CACHE_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_CACHE_MAX_ENTRIES", "10000"))
+IDEMPOTENCY_CACHE_TTL = float(os.getenv("IDEMPOTENCY_CACHE_TTL", "3600"))
+
+
+class StoredResponse(NamedTuple):
+    """
+    The response recorded for an idempotency key.
+
+    Attributes:
+        request_hash (str): Fingerprint of the request that produced it
+        status_code (int): HTTP status code
+        body (bytes): JSON body
+    """
+    request_hash: str
+    status_code: int
+    body: bytes
+
+
+class IdempotencyKeyReused(Exception):
+    """Raised when a key is replayed with a different request body."""
+
+
+def request_fingerprint(payload: dict) -> str:
+    """
+    Hash a request body canonically, so equal payloads match whatever their key order.
+
+    Args:
+        payload (dict): The validated request body
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    return hashlib.sha256(dumps(dict(sorted(payload.items())))).hexdigest()
+
+
+async def load_stored_response(db: AsyncSession, key: str) -> Optional[StoredResponse]:
+    """
+    Read the stored response for a key from the idempotency_keys table.
+
+    Args:
+        db (AsyncSession): Database session
+        key (str): The idempotency key
+
+    Returns:
+        Optional[StoredResponse]: The stored response, or None if the key is unused
+    """
+    row = (await db.execute(
+        select(IdempotencyKey.request_hash, IdempotencyKey.status_code, IdempotencyKey.response_body)
+        .where(IdempotencyKey.key == key)
+    )).one_or_none()
+    if row is None:
+        return None
+    return StoredResponse(row.request_hash, row.status_code, row.response_body.encode())
+
+
+def add_stored_response(db: AsyncSession, key: str, stored: StoredResponse, mortgage_id: Optional[int] = None) -> None:
+    """
+    Add the row recording a response to the session; the caller commits.
+
+    Args:
+        db (AsyncSession): Database session holding the write the response describes
+        key (str): The idempotency key
+        stored (StoredResponse): The response to record
+        mortgage_id (Optional[int]): Id of the mortgage the request created
+    """
+    db.add(IdempotencyKey(
+        key=key,
+        request_hash=stored.request_hash,
+        status_code=stored.status_code,
+        response_body=stored.body.decode(),
+        mortgage_id=mortgage_id
+    ))
+
+
+class IdempotentRequests:
+    """Per-process fast path and in-flight registry in front of the idempotency_keys table."""
+
+    def __init__(self, max_entries: int = IDEMPOTENCY_CACHE_MAX_ENTRIES, ttl: float = IDEMPOTENCY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._responses: "OrderedDict[str, Tuple[float, StoredResponse]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def _remembered(self, key: str) -> Optional[StoredResponse]:
+        entry = self._responses.get(key)
+        if entry is None:
+            return None
+        expires_at, stored = entry
+        if expires_at <= time.monotonic():
+            del self._responses[key]
+            return None
+        self._responses.move_to_end(key)
+        return stored
+
+    def _remember(self, key: str, stored: StoredResponse) -> None:
+        self._responses[key] = (time.monotonic() + self.ttl, stored)
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.max_entries:
+            self._responses.popitem(last=False)
+
+    def clear(self) -> None:
+        """Forget every remembered response, e.g. after the table was emptied directly."""
+        self._responses.clear()
+
+    async def execute(
+        self,
+        db: AsyncSession,
+        key: str,
+        request_hash: str,
+        handler: Callable[[], Awaitable[StoredResponse]]
+    ) -> Tuple[StoredResponse, bool]:
+        """
+        Run a request at most once per key and return its (possibly stored) response.
+
+        `handler` performs the write, records its response with
+        add_stored_response and commits, all in `db`'s transaction. It
+        only runs when no response is remembered, in flight or stored for
+        the key.
+
+        Args:
+            db (AsyncSession): Database session of the request
+            key (str): The idempotency key
+            request_hash (str): Fingerprint of the request body
+            handler (Callable[[], Awaitable[StoredResponse]]): Performs the request
+
+        Returns:
+            Tuple[StoredResponse, bool]: The response and whether it was replayed
+
+        Raises:
+            IdempotencyKeyReused: If the key's response was recorded for a different body
+        """
+        while True:
+            stored = self._remembered(key)
+            if stored is not None:
+                metrics.idempotency_lookups.inc("memory_hit")
+                return self._checked(stored, request_hash), True
+            pending = self._in_flight.get(key)
+            if pending is None:
+                break
+            # Another request with this key is running in this process; wait
+            # for it rather than repeating its work, then look again (it may
+            # have failed, in which case this request takes over)
+            metrics.idempotency_lookups.inc("collapsed")
+            await asyncio.shield(pending)
+
+        pending = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = pending
+        try:
+            stored = await load_stored_response(db, key)
+            replayed = stored is not None
+            if replayed:
+                metrics.idempotency_lookups.inc("db_hit")
+            else:
+                metrics.idempotency_lookups.inc("miss")
+                try:
+                    stored = await handler()
+                except IntegrityError:
+                    # Another worker committed the key first; our write was rolled back with it
+                    await db.rollback()
+                    stored = await load_stored_response(db, key)
+                    if stored is None:
+                        raise
+                    logger.info(f"Idempotency key {key!r} was claimed concurrently; replaying")
+                    metrics.idempotency_lookups.inc("db_hit")
+                    replayed = True
+            self._remember(key, stored)
+            return self._checked(stored, request_hash), replayed
+        finally:
+            del self._in_flight[key]
+            pending.set_result(None)
+
+    @staticmethod
+    def _checked(stored: StoredResponse, request_hash: str) -> StoredResponse:
+        if stored.request_hash != request_hash:
+            raise IdempotencyKeyReused()
+        return stored
+
+
+idempotent_requests = IdempotentRequests()
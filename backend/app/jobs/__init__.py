@@ -0,0 +1,3 @@
+"""
+Background and command-line jobs for the mortgage system.
+"""
@@ -0,0 +1,239 @@
+"""
+Move settled mortgages out of the live table into `mortgages_archive`.
+
+An application that has been neither created nor changed for
+ARCHIVE_AFTER_DAYS days is settled: it is moved to the archive table, where
+GET /mortgages/{id} still finds it but listing, search, the live indexes
+and backups of `mortgages` no longer carry it. Archived applications are
+read-only and leave the credit score average and the portfolio rollup.
+
+Rows are moved in id order, --batch-size at a time. Each batch is one
+short transaction that copies the rows into the archive, deletes them from
+`mortgages`, takes them out of the stats shards and the rollup and records
+an `archived` change feed event per row, so API workers drop them from
+their snapshot and name index and clients from their lists. The last id
+moved is recorded in a checkpoint file after every batch: an interrupted
+run resumes after it with the same cutoff, and the file is removed once
+the run completes. --max-batches bounds one run, e.g. to spread a first
+archiving of a large book over several maintenance windows.
+
+Usage:
+    python -m app.jobs.archive --after-days 365 --batch-size 5000
+    python -m app.jobs.archive --dry-run
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, delete, func, insert, or_, select
+
+from .. import changes
+from ..cache import response_cache
+from ..database import SessionLocal
+from ..feed import record_changes
+from ..models import Mortgage, MortgageArchive
+from ..rollup import RollupDeltas, apply_rollup_deltas
+from ..serialization import MORTGAGE_COLUMNS
+from ..stats import apply_credit_score_delta
+from .rescore import CheckpointMismatchError, UPDATE_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Days without a change after which an application is archived
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_CHECKPOINT_PATH = Path("archive-checkpoint.json")
+
+
+def settled(cutoff: datetime):
+    """
+    SQL condition selecting mortgages neither created nor updated since `cutoff`.
+
+    Args:
+        cutoff (datetime): Naive UTC timestamp, as the database stores them
+    """
+    return and_(
+        Mortgage.created_at < cutoff,
+        or_(Mortgage.updated_at.is_(None), Mortgage.updated_at < cutoff),
+    )
+
+
+def archive_batch(after_id: int, cutoff: datetime, batch_size: int) -> Tuple[int, Optional[int]]:
+    """
+    Move the next settled mortgages after `after_id` to the archive in one transaction.
+
+    The rows are locked while they are moved (SELECT ... FOR UPDATE where
+    supported), so a concurrent API update either commits first, and the
+    row is no longer settled, or finds the row archived.
+
+    Args:
+        after_id (int): Largest id already handled
+        cutoff (datetime): Rows unchanged since before this are moved
+        batch_size (int): Most rows to move
+
+    Returns:
+        Tuple[int, Optional[int]]: Rows moved, and the last id moved (None when nothing was left)
+    """
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(*MORTGAGE_COLUMNS)
+            .where(Mortgage.id > after_id, settled(cutoff))
+            .order_by(Mortgage.id)
+            .limit(batch_size)
+            .with_for_update()
+        ).all()
+        if not rows:
+            return 0, None
+        records = [row._asdict() for row in rows]
+        ids = [record["id"] for record in records]
+        db.execute(insert(MortgageArchive), records)
+        for offset in range(0, len(ids), UPDATE_BATCH_SIZE):
+            db.execute(
+                delete(Mortgage.__table__)
+                .where(Mortgage.__table__.c.id.in_(ids[offset:offset + UPDATE_BATCH_SIZE]))
+            )
+        rollup = RollupDeltas()
+        for record in records:
+            rollup.remove(record)
+        apply_rollup_deltas(db, rollup)
+        apply_credit_score_delta(db, -len(records), -sum(record["credit_score"] for record in records))
+        record_changes(db, changes.ARCHIVED, ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return len(ids), ids[-1]
+
+
+def count_settled(cutoff: datetime) -> int:
+    """Count the mortgages a run with `cutoff` would archive."""
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count()).select_from(Mortgage).where(settled(cutoff)))
+    finally:
+        db.close()
+
+
+def run_archive(
+    after_days: float = ARCHIVE_AFTER_DAYS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    checkpoint_path: Path = DEFAULT_CHECKPOINT_PATH,
+    restart: bool = False,
+    max_batches: Optional[int] = None,
+    now: Optional[datetime] = None
+) -> dict:
+    """
+    Archive every mortgage unchanged for `after_days` days.
+
+    Resuming reuses the cutoff recorded in the checkpoint, so rows that
+    became settled while the run was interrupted wait for the next run.
+
+    Args:
+        after_days (float): Days without a change after which a mortgage is archived
+        batch_size (int): Rows per transaction
+        checkpoint_path (Path): Checkpoint file used to resume an interrupted run
+        restart (bool): Discard an existing checkpoint instead of resuming
+        max_batches (Optional[int]): Stop after this many batches, keeping the checkpoint
+        now (Optional[datetime]): Time the cutoff is computed from (default: now)
+
+    Returns:
+        dict: The cutoff, rows and batches moved, throughput and whether the run completed
+
+    Raises:
+        CheckpointMismatchError: If an existing checkpoint belongs to a different run
+    """
+    checkpoint_path = Path(checkpoint_path)
+    if restart and checkpoint_path.exists():
+        checkpoint_path.unlink()
+    after_id = 0
+    if checkpoint_path.exists():
+        checkpoint = json.loads(checkpoint_path.read_text())
+        if checkpoint["run"]["after_days"] != after_days or checkpoint["run"]["batch_size"] != batch_size:
+            raise CheckpointMismatchError(
+                f"Checkpoint {checkpoint_path} belongs to a different run ({checkpoint['run']}); "
+                f"use --restart to discard it"
+            )
+        run = checkpoint["run"]
+        after_id = checkpoint["last_id"]
+    else:
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        run = {
+            "after_days": after_days,
+            "batch_size": batch_size,
+            "cutoff": (now - timedelta(days=after_days)).isoformat(),
+        }
+    cutoff = datetime.fromisoformat(run["cutoff"])
+    logger.info(f"Archiving mortgages unchanged since {run['cutoff']}, after id {after_id}")
+
+    started = time.perf_counter()
+    rows = batches = 0
+    complete = False
+    while max_batches is None or batches < max_batches:
+        moved, last_id = archive_batch(after_id, cutoff, batch_size)
+        if last_id is None:
+            complete = True
+            break
+        rows += moved
+        batches += 1
+        after_id = last_id
+        temporary = checkpoint_path.with_name(checkpoint_path.name + ".tmp")
+        temporary.write_text(json.dumps({"run": run, "last_id": after_id}))
+        os.replace(temporary, checkpoint_path)
+    elapsed = time.perf_counter() - started
+    if complete and checkpoint_path.exists():
+        checkpoint_path.unlink()
+
+    logger.info(f"Archived {rows} mortgages in {batches} batches in {elapsed:.1f}s")
+    return {
+        **run,
+        "rows": rows,
+        "batches": batches,
+        "last_id": after_id,
+        "complete": complete,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--after-days", type=float, default=ARCHIVE_AFTER_DAYS,
+                        help="days without a change after which a mortgage is archived")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per transaction")
+    parser.add_argument("--max-batches", type=int, default=None, help="stop after this many batches")
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT_PATH, help="checkpoint file")
+    parser.add_argument("--restart", action="store_true", help="discard an existing checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="only count the mortgages that would be archived")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.dry_run:
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=args.after_days)
+        print(f"{count_settled(cutoff):,} mortgages unchanged since {cutoff.isoformat()} would be archived")
+        return
+    try:
+        summary = run_archive(args.after_days, args.batch_size, args.checkpoint, args.restart, args.max_batches)
+    except CheckpointMismatchError as e:
+        parser.exit(2, f"{e}\n")
+    if summary["rows"]:
+        # Only reaches API workers through a shared (Redis) response cache; an
+        # in-process cache drops the archived rows within RESPONSE_CACHE_TTL
+        asyncio.run(response_cache.bump())
+    print(f"cutoff: {summary['cutoff']}  rows: {summary['rows']:,}  batches: {summary['batches']}  "
+          f"elapsed: {summary['seconds']:.2f}s  throughput: {summary['rows_per_second']:,.0f} rows/s")
+    if not summary["complete"]:
+        print(f"stopped after id {summary['last_id']}; run again to resume")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Rescore the whole mortgage book after a rulebook or average credit score change.
+
+The mortgages id range is split into chunks that are rescored in parallel
+worker processes with the vectorized rating engine. Each chunk is read and
+written in its own short transaction, with only the changed ratings
+written back, batched by resulting rating into UPDATE ... WHERE id IN (...)
+statements, together with the portfolio rollup moves of the rows whose
+rating changed. Finished chunks are recorded in a checkpoint file, so an
+interrupted run resumes where it stopped; the file is removed once the run
+completes.
+
+Usage:
+    python -m app.jobs.rescore --workers 4 --chunk-size 10000
+    python -m app.jobs.rescore --checkpoint /var/tmp/rescore.json --restart
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select, update
+
+from .. import changes
+from ..cache import response_cache
+from ..database import SessionLocal
+from ..feed import record_changes
+from ..models import Mortgage
+from ..rollup import RollupDeltas, apply_rollup_deltas
+from ..stats import average_credit_score, read_credit_score_stats
+from ..utils.credit_rating import RATING_COLUMNS, calculate_credit_ratings
+from ..utils.rulebook import CompiledRulebook, rulebook_loader
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 10000
+DEFAULT_CHECKPOINT_PATH = Path("rescore-checkpoint.json")
+
+# Ids per UPDATE ... WHERE id IN (...), kept under the bound-parameter limits of older SQLite builds
+UPDATE_BATCH_SIZE = 900
+
+# Rulebook compiled once per worker process by _init_worker
+_worker_rulebook: Optional[CompiledRulebook] = None
+
+
+class CheckpointMismatchError(RuntimeError):
+    """Raised when a checkpoint belongs to a run with different parameters."""
+
+
+def _init_worker(rulebook_spec: dict) -> None:
+    global _worker_rulebook
+    _worker_rulebook = CompiledRulebook.from_dict(rulebook_spec)
+
+
+def rescore_chunk(start_id: int, end_id: int, avg_credit_score: float) -> dict:
+    """
+    Rescore the mortgages with start_id <= id < end_id in one transaction.
+
+    The rows are locked while they are rescored (SELECT ... FOR UPDATE
+    where supported), so a concurrent API update cannot be overwritten with
+    a rating computed from stale values.
+
+    Args:
+        start_id (int): First id of the chunk (inclusive)
+        end_id (int): End of the chunk (exclusive)
+        avg_credit_score (float): Average credit score used for the whole run
+
+    Returns:
+        dict: Chunk bounds, rows read, ratings changed, seconds taken and worker pid
+    """
+    started = time.perf_counter()
+    rulebook = _worker_rulebook or rulebook_loader.current()
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(Mortgage.id, Mortgage.credit_rating, Mortgage.rulebook_version,
+                   *(getattr(Mortgage, column) for column in RATING_COLUMNS))
+            .where(Mortgage.id >= start_id, Mortgage.id < end_id)
+            .with_for_update()
+        ).all()
+        changed = 0
+        if rows:
+            columns = list(zip(*rows))[3:]
+            ratings = calculate_credit_ratings(
+                dict(zip(RATING_COLUMNS, (np.asarray(column) for column in columns))),
+                avg_credit_score,
+                rulebook
+            )
+            ids_by_rating = defaultdict(list)
+            rollup = RollupDeltas()
+            for row, rating in zip(rows, ratings.tolist()):
+                if rating != row.credit_rating or row.rulebook_version != rulebook.version:
+                    ids_by_rating[rating].append(row.id)
+                if rating != row.credit_rating:
+                    rollup.remove(row._asdict())
+                    rollup.add({**row._asdict(), "credit_rating": rating})
+            apply_rollup_deltas(db, rollup)
+            for rating, rating_ids in ids_by_rating.items():
+                for offset in range(0, len(rating_ids), UPDATE_BATCH_SIZE):
+                    db.execute(
+                        update(Mortgage.__table__)
+                        .where(Mortgage.__table__.c.id.in_(rating_ids[offset:offset + UPDATE_BATCH_SIZE]))
+                        .values(credit_rating=rating, rulebook_version=rulebook.version)
+                    )
+                record_changes(db, changes.UPDATED, rating_ids)
+                changed += len(rating_ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return {
+        "start_id": start_id,
+        "end_id": end_id,
+        "rows": len(rows),
+        "changed": changed,
+        "seconds": time.perf_counter() - started,
+        "pid": os.getpid(),
+    }
+
+
+def plan_chunks(min_id: int, max_id: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """
+    Split the id range [min_id, max_id] into half-open chunks of chunk_size ids.
+
+    Args:
+        min_id (int): Smallest stored id
+        max_id (int): Largest stored id
+        chunk_size (int): Ids per chunk
+
+    Returns:
+        List[Tuple[int, int]]: (start_id, end_id) pairs, end exclusive
+    """
+    return [(start, min(start + chunk_size, max_id + 1)) for start in range(min_id, max_id + 1, chunk_size)]
+
+
+def load_checkpoint(path: Path, run: dict) -> set:
+    """
+    Read the chunks already finished by an earlier, interrupted run.
+
+    Args:
+        path (Path): Checkpoint file
+        run (dict): Parameters of the current run
+
+    Returns:
+        set: Start ids of the finished chunks (empty without a checkpoint)
+
+    Raises:
+        CheckpointMismatchError: If the checkpoint was written for different parameters
+    """
+    if not path.exists():
+        return set()
+    checkpoint = json.loads(path.read_text())
+    if checkpoint["run"] != run:
+        raise CheckpointMismatchError(
+            f"Checkpoint {path} belongs to a different run ({checkpoint['run']}); "
+            f"use --restart to discard it"
+        )
+    return set(checkpoint["done"])
+
+
+def save_checkpoint(path: Path, run: dict, done: set) -> None:
+    """Atomically record the finished chunks of the current run."""
+    temporary = path.with_name(path.name + ".tmp")
+    temporary.write_text(json.dumps({"run": run, "done": sorted(done)}))
+    os.replace(temporary, path)
+
+
+def run_rescore(
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    checkpoint_path: Path = DEFAULT_CHECKPOINT_PATH,
+    restart: bool = False,
+    avg_credit_score: Optional[float] = None
+) -> dict:
+    """
+    Rescore every stored mortgage with the active rulebook.
+
+    Resuming reuses the average credit score recorded in the checkpoint, so
+    every chunk of a run is scored against the same average.
+
+    Args:
+        workers (Optional[int]): Worker processes (default: CPU count)
+        chunk_size (int): Ids per chunk
+        checkpoint_path (Path): Checkpoint file used to resume an interrupted run
+        restart (bool): Discard an existing checkpoint instead of resuming
+        avg_credit_score (Optional[float]): Average to score against (default: the running aggregate)
+
+    Returns:
+        dict: Totals and per-worker throughput of the run
+
+    Raises:
+        CheckpointMismatchError: If an existing checkpoint belongs to a different run
+    """
+    checkpoint_path = Path(checkpoint_path)
+    if restart and checkpoint_path.exists():
+        checkpoint_path.unlink()
+    rulebook = rulebook_loader.current()
+
+    db = SessionLocal()
+    try:
+        min_id, max_id = db.execute(select(func.min(Mortgage.id), func.max(Mortgage.id))).one()
+        if avg_credit_score is None and checkpoint_path.exists():
+            avg_credit_score = json.loads(checkpoint_path.read_text())["run"]["avg_credit_score"]
+        if avg_credit_score is None:
+            avg_credit_score = average_credit_score(*read_credit_score_stats(db))
+    finally:
+        db.close()
+
+    run = {
+        "rulebook_version": rulebook.version,
+        "avg_credit_score": avg_credit_score,
+        "chunk_size": chunk_size,
+    }
+    done = load_checkpoint(checkpoint_path, run)
+    chunks = [] if min_id is None else [
+        chunk for chunk in plan_chunks(min_id, max_id, chunk_size) if chunk[0] not in done
+    ]
+    logger.info(
+        f"Rescoring {len(chunks)} chunks of {chunk_size} ids with rulebook {rulebook.version} "
+        f"and average credit score {avg_credit_score:.1f} ({len(done)} chunks already done)"
+    )
+
+    started = time.perf_counter()
+    per_worker = defaultdict(lambda: {"chunks": 0, "rows": 0, "changed": 0, "seconds": 0.0})
+    if chunks:
+        # Fresh interpreters: no engine, pool or thread state is inherited from the parent
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(rulebook.to_dict(),)
+        ) as executor:
+            futures = [executor.submit(rescore_chunk, start, end, avg_credit_score) for start, end in chunks]
+            for future in as_completed(futures):
+                result = future.result()
+                worker = per_worker[result["pid"]]
+                worker["chunks"] += 1
+                worker["rows"] += result["rows"]
+                worker["changed"] += result["changed"]
+                worker["seconds"] += result["seconds"]
+                done.add(result["start_id"])
+                save_checkpoint(checkpoint_path, run, done)
+    elapsed = time.perf_counter() - started
+    if checkpoint_path.exists():
+        checkpoint_path.unlink()
+
+    workers_summary = [
+        {"pid": pid, **totals, "rows_per_second": totals["rows"] / totals["seconds"] if totals["seconds"] else 0.0}
+        for pid, totals in sorted(per_worker.items())
+    ]
+    rows = sum(worker["rows"] for worker in workers_summary)
+    summary = {
+        **run,
+        "chunks": len(chunks),
+        "rows": rows,
+        "changed": sum(worker["changed"] for worker in workers_summary),
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else 0.0,
+        "workers": workers_summary,
+    }
+    logger.info(f"Rescored {rows} mortgages in {elapsed:.1f}s, {summary['changed']} ratings changed")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="ids per chunk")
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT_PATH, help="checkpoint file")
+    parser.add_argument("--restart", action="store_true", help="discard an existing checkpoint")
+    parser.add_argument("--avg-credit-score", type=float, default=None,
+                        help="average credit score to score against (default: the running aggregate)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        summary = run_rescore(args.workers, args.chunk_size, args.checkpoint, args.restart, args.avg_credit_score)
+    except CheckpointMismatchError as e:
+        parser.exit(2, f"{e}\n")
+    if summary["changed"]:
+        # Only reaches API workers through a shared (Redis) response cache; an
+        # in-process cache picks the new ratings up within RESPONSE_CACHE_TTL
+        asyncio.run(response_cache.bump())
+    print(f"rulebook: {summary['rulebook_version']}  avg credit score: {summary['avg_credit_score']:.1f}")
+    print(f"rows: {summary['rows']:,}  changed: {summary['changed']:,}  chunks: {summary['chunks']}  "
+          f"elapsed: {summary['seconds']:.2f}s  throughput: {summary['rows_per_second']:,.0f} rows/s")
+    print(f"{'worker pid':>10} {'chunks':>8} {'rows':>10} {'changed':>10} {'busy s':>8} {'rows/s':>12}")
+    for worker in summary["workers"]:
+        print(f"{worker['pid']:>10} {worker['chunks']:>8} {worker['rows']:>10,} {worker['changed']:>10,} "
+              f"{worker['seconds']:>8.2f} {worker['rows_per_second']:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,98 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response, status
+from sqlalchemy import and_, delete, or_, select, text
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from contextlib import asynccontextmanager
+import asyncio
 import logging
 from pathlib import Path
 import sys
+import time
 
 # Add the project root to Python path
 project_root = Path(__file__).parent.parent.parent
 sys.path.append(str(project_root))
 
-from .models import Mortgage, Base
-from .database import engine, get_db
-from .utils.credit_rating import calculate_credit_rating
+from .models import Mortgage, MortgageArchive
+from .database import (
+    REPLICA_MAX_LAG_SECONDS,
+    ReadYourWritesMiddleware,
+    async_engine,
+    get_db,
+    get_read_db,
+    is_replica_session,
+    read_engine,
+    reads_from_primary,
+)
+from . import database
+from .utils.rating_cache import rating_cache
+from .utils.rulebook import RulebookError, rulebook_loader
+from .utils import bulk
+from .utils.explain import explain_rating, what_if_grid
+from .utils.pagination import decode_cursor, encode_cursor
+from .filters import MortgageFilters, segment_clauses
+from .schema import prepare_database_async
+from .write_behind import WRITE_BEHIND_ENABLED, write_behind
+from .serialization import (
+    ARCHIVED_MORTGAGE_COLUMNS,
+    MORTGAGE_COLUMNS,
+    MORTGAGE_FIELD_NAMES,
+    dumps,
+    encode_mortgage_rows,
+)
+from .segments import count_segment, delete_segment, update_segment
+from .snapshot import SNAPSHOT_ENABLED, mortgage_snapshot
+from .feed import CHANGE_FEED_ENABLED, change_feed, record_changes_async
+from .search import SEARCH_INDEX_ENABLED, name_search
+from .admission import AdmissionMiddleware, admission
+from .cache import etag_matches, params_digest, response_cache
+from .idempotency import (
+    IDEMPOTENCY_KEY_HEADER,
+    IDEMPOTENT_REPLAY_HEADER,
+    MAX_IDEMPOTENCY_KEY_LENGTH,
+    IdempotencyKeyReused,
+    StoredResponse,
+    add_stored_response,
+    idempotent_requests,
+    request_fingerprint,
+)
+from . import changes
+from . import export
+from . import metrics
+from .profiler import (
+    DEFAULT_SAMPLE_INTERVAL,
+    MAX_PROFILE_SECONDS,
+    PROFILER_ENABLED,
+    ProfilerBusyError,
+    profile_event_loop,
+)
+from .rollup import (
+    GROUP_DIMENSIONS,
+    RollupDeltas,
+    apply_rollup_deltas_async,
+    read_portfolio_stats_async,
+    rebuild_rollup,
+    verify_rollup,
+)
+from .stats import (
+    apply_credit_score_delta_async,
+    credit_score_stats,
+    rebuild_credit_score_stats,
+)
 from . import schemas
 
 # Constants
 DEFAULT_PAGE_SIZE = 100
 MAX_PAGE_SIZE = 1000
+BULK_CHUNK_SIZE = 500
+MAX_BULK_ROWS = 50000
 ALLOWED_ORIGINS = ["http://localhost:3000"]
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MORTGAGE_LIST_CACHE_NAMESPACE = "mortgages:list"
+HEALTH_CHECK_TIMEOUT = 2.0
 
 # Configure logging
 logging.basicConfig(
@@ -27,20 +101,51 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create tables if they don't exist
-try:
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created successfully")
-except Exception as e:
-    logger.error(f"Failed to create database tables: {str(e)}")
-    raise
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan hook.
+    
+    Compiles the credit rating rulebook at startup, so a broken rulebook
+    stops the worker from starting, and makes the first database
+    connection: seeding derived tables and, with DB_AUTO_CREATE, creating
+    missing ones (the schema is otherwise managed by Alembic migrations).
+    Importing the app does no database work. With SNAPSHOT_ENABLED it then
+    starts loading the in-memory snapshot in the background, with
+    CHANGE_FEED_ENABLED starts the change feed poller, and with
+    SEARCH_INDEX_ENABLED starts loading the name search index. On shutdown
+    it ends open change feed streams, writes any rows still in the
+    write-behind queue, then disposes the async engine so pooled
+    connections (and, for aiosqlite, their worker threads) are closed
+    before the process exits.
+    """
+    rulebook_loader.current()
+    await prepare_database_async(async_engine)
+    logger.info("Database ready")
+    if SNAPSHOT_ENABLED:
+        await mortgage_snapshot.start(async_engine)
+    if CHANGE_FEED_ENABLED:
+        await change_feed.start(async_engine)
+    if SEARCH_INDEX_ENABLED:
+        await name_search.start(async_engine)
+    yield
+    await name_search.close()
+    await change_feed.close()
+    await mortgage_snapshot.close()
+    await write_behind.close()
+    await async_engine.dispose()
+    logger.info("Database connections closed")
 
 app = FastAPI(
+    lifespan=lifespan,
     title="Mortgage Application API",
     description="API for managing mortgage applications with credit rating calculations",
     version="1.0.0"
 )
 
+# Sheds load past each route class's concurrency limit; inside CORS so 503s carry its headers
+app.add_middleware(AdmissionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -48,10 +153,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", IDEMPOTENT_REPLAY_HEADER, "Retry-After"],
 )
 
-@app.post("/mortgages", response_model=schemas.Mortgage, status_code=status.HTTP_201_CREATED, tags=["mortgages"])
-async def create_mortgage(mortgage: schemas.MortgageCreate, db: Session = Depends(get_db)):
+# Keeps a client's reads on the primary right after its own writes (only with a replica)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Outermost, so request latency covers every other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
+@app.post(
+    "/mortgages",
+    response_model=schemas.Mortgage,
+    status_code=status.HTTP_201_CREATED,
+    tags=["mortgages"],
+    responses={status.HTTP_202_ACCEPTED: {"description": "Queued for a write-behind batch; no id assigned yet"}},
+)
+async def create_mortgage(
+    mortgage: schemas.MortgageCreate,
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias=IDEMPOTENCY_KEY_HEADER,
+        min_length=1,
+        max_length=MAX_IDEMPOTENCY_KEY_LENGTH,
+        description="Client-chosen key; retries with the same key and body return the first response"
+    ),
+    db: AsyncSession = Depends(get_db)
+):
     """
     Create a new mortgage application.
     
@@ -61,147 +189,1224 @@ async def create_mortgage(mortgage: schemas.MortgageCreate, db: Session = Depend
     - Credit Score
     - Loan Type
     - Property Type
+    - Average credit score across all stored applications
+    
+    With an Idempotency-Key header the application is created at most once
+    per key: retries, including concurrent ones, get the stored response of
+    the first attempt (marked with `Idempotent-Replayed: true`) without
+    touching the mortgages table.
+    
+    With WRITE_BEHIND_ENABLED, requests without a key are written in group
+    commits by the write-behind queue. Under "enqueue" durability they are
+    answered with 202 Accepted (the scored application, no id) as soon as
+    they are queued.
     
     Args:
         mortgage (MortgageCreate): The mortgage application data
-        db (Session): Database session
+        idempotency_key (Optional[str]): The Idempotency-Key header
+        db (AsyncSession): Database session
         
     Returns:
         Mortgage: The created mortgage application with credit rating
         
     Raises:
-        HTTPException: If there's an error creating the mortgage
+        HTTPException: 422 if the key was used with a different body, or if
+            there's an error creating the mortgage
     """
+    metrics.stage_since_request("create_mortgage", "parse_validate")
     try:
-        credit_rating = calculate_credit_rating(mortgage)
-        db_mortgage = Mortgage(
-            **mortgage.model_dump(),
-            credit_rating=credit_rating
+        if idempotency_key is None and WRITE_BEHIND_ENABLED:
+            row = await _scored_row(db, mortgage)
+            with metrics.stage("create_mortgage", "write_behind"):
+                created = await write_behind.submit(row)
+            if created is None:
+                return Response(
+                    content=dumps({**row, "status": "queued"}),
+                    status_code=status.HTTP_202_ACCEPTED,
+                    media_type="application/json"
+                )
+            mortgage_id, created_at = created
+            return schemas.Mortgage(id=mortgage_id, created_at=created_at, **row)
+        if idempotency_key is None:
+            db_mortgage = await _insert_mortgage(db, mortgage)
+            with metrics.stage("create_mortgage", "db_commit"):
+                await db.commit()
+            await _created(db_mortgage, mortgage)
+            with metrics.stage("create_mortgage", "db_refresh"):
+                await db.refresh(db_mortgage)
+            return db_mortgage
+
+        request_hash = request_fingerprint(mortgage.model_dump())
+
+        async def create_once() -> StoredResponse:
+            db_mortgage = await _insert_mortgage(db, mortgage)
+            # Read server defaults before commit: the stored response commits with the row
+            with metrics.stage("create_mortgage", "db_refresh"):
+                await db.refresh(db_mortgage)
+            stored = StoredResponse(
+                request_hash,
+                status.HTTP_201_CREATED,
+                dumps(schemas.Mortgage.model_validate(db_mortgage).model_dump())
+            )
+            add_stored_response(db, idempotency_key, stored, db_mortgage.id)
+            with metrics.stage("create_mortgage", "db_commit"):
+                await db.commit()
+            await _created(db_mortgage, mortgage)
+            return stored
+
+        stored, replayed = await idempotent_requests.execute(db, idempotency_key, request_hash, create_once)
+    except IdempotencyKeyReused:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{IDEMPOTENCY_KEY_HEADER} was already used with a different request body"
         )
-        db.add(db_mortgage)
-        db.commit()
-        db.refresh(db_mortgage)
-        logger.info(f"Created new mortgage application for {db_mortgage.applicant_name}")
-        return db_mortgage
     except Exception as e:
         logger.error(f"Failed to create mortgage: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create mortgage application"
         )
+    if replayed:
+        logger.info(f"Replayed stored response for idempotency key {idempotency_key!r}")
+    return Response(
+        content=stored.body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers={IDEMPOTENT_REPLAY_HEADER: "true"} if replayed else None
+    )
+
+async def _scored_row(db: AsyncSession, mortgage: schemas.MortgageCreate) -> dict:
+    """
+    Score a mortgage application against the active rulebook.
+    
+    Args:
+        db (AsyncSession): Database session, used if the average credit score must be reloaded
+        mortgage (MortgageCreate): The mortgage application data
+        
+    Returns:
+        dict: Column values of the new mortgage, including its credit rating
+    """
+    rulebook = rulebook_loader.current()
+    with metrics.stage("create_mortgage", "avg_credit_score"):
+        avg_credit_score = await credit_score_stats.average_async(db)
+    with metrics.stage("create_mortgage", "score"):
+        credit_rating = rating_cache.rating(mortgage, avg_credit_score, rulebook)
+    return {**mortgage.model_dump(), "credit_rating": credit_rating, "rulebook_version": rulebook.version}
+
+async def _insert_mortgage(db: AsyncSession, mortgage: schemas.MortgageCreate) -> Mortgage:
+    """
+    Score a mortgage application and flush it with its aggregate deltas; the caller commits.
+    
+    Args:
+        db (AsyncSession): Database session
+        mortgage (MortgageCreate): The mortgage application data
+        
+    Returns:
+        Mortgage: The flushed mortgage, with its id assigned
+    """
+    db_mortgage = Mortgage(**await _scored_row(db, mortgage))
+    db.add(db_mortgage)
+    rollup = RollupDeltas()
+    rollup.add(db_mortgage)
+    with metrics.stage("create_mortgage", "db_flush"):
+        await db.flush()
+        await apply_credit_score_delta_async(db, 1, mortgage.credit_score)
+        await apply_rollup_deltas_async(db, rollup)
+        await record_changes_async(db, changes.CREATED, [db_mortgage.id])
+    return db_mortgage
+
+async def _created(db_mortgage: Mortgage, mortgage: schemas.MortgageCreate) -> None:
+    """Update in-process aggregates and notify listeners once a new mortgage has committed."""
+    credit_score_stats.apply(1, mortgage.credit_score)
+    await changes.publish(changes.CREATED, [db_mortgage.id])
+    logger.info(f"Created new mortgage application for {db_mortgage.applicant_name}")
+
+@app.post(
+    "/mortgages/bulk",
+    response_model=schemas.BulkMortgageResponse,
+    tags=["mortgages"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": schemas.MortgageCreate.model_json_schema()}
+                },
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def create_mortgages_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Create many mortgage applications in one request.
+    
+    The body is either a JSON array of mortgage applications or, with
+    Content-Type application/x-ndjson, one application per line (streamed,
+    so large feeds are never held in memory as a whole). Rows are processed
+    in chunks of BULK_CHUNK_SIZE: each chunk is validated, scored in one
+    vectorized pass, written with multi-row inserts and committed in its
+    own transaction. Invalid rows, and rows of a chunk whose insert fails,
+    are reported individually without aborting the rest of the batch.
+    An NDJSON stream longer than MAX_BULK_ROWS is not read past the limit;
+    the response is then marked as truncated.
+    
+    Args:
+        request (Request): The incoming request carrying the batch
+        db (AsyncSession): Database session
+        
+    Returns:
+        BulkMortgageResponse: Per-row ids, credit ratings and errors
+        
+    Raises:
+        HTTPException: If the body is malformed or exceeds MAX_BULK_ROWS
+    """
+    if bulk.is_ndjson(request.headers.get("content-type", "")):
+        items = bulk.iter_ndjson(request.stream())
+    else:
+        try:
+            payload = await request.json()
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Request body must be a JSON array or NDJSON"
+            )
+        if not isinstance(payload, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Request body must be a JSON array of mortgage applications"
+            )
+        if len(payload) > MAX_BULK_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Bulk requests are limited to {MAX_BULK_ROWS} rows"
+            )
+        items = _iter_items(payload)
+
+    results = []
+    chunk = []
+    index = 0
+    truncated = False
+    async for item, parse_error in items:
+        if index >= MAX_BULK_ROWS:
+            truncated = True
+            break
+        chunk.append((index, item, parse_error))
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            results.extend(await _store_bulk_chunk(db, chunk))
+            chunk = []
+        index += 1
+    if chunk:
+        results.extend(await _store_bulk_chunk(db, chunk))
+
+    results.sort(key=lambda result: result.index)
+    created = sum(1 for result in results if result.error is None)
+    logger.info(f"Bulk created {created} mortgage applications ({len(results) - created} rejected)")
+    if truncated:
+        logger.warning(f"Bulk NDJSON stream truncated after {MAX_BULK_ROWS} rows")
+    return schemas.BulkMortgageResponse(
+        created=created,
+        failed=len(results) - created,
+        truncated=truncated,
+        results=results
+    )
+
+async def _iter_items(payload: list):
+    """Adapt a parsed JSON array to the (item, parse error) stream used for NDJSON."""
+    for item in payload:
+        yield item, None
+
+async def _store_bulk_chunk(db: AsyncSession, chunk: list) -> List[schemas.BulkMortgageResult]:
+    """Validate, score and insert one chunk of a bulk submission in its own transaction."""
+    with metrics.stage("create_mortgages_bulk", "validate"):
+        valid, results = bulk.validate_chunk(chunk)
+    if not valid:
+        return results
+    mortgages = [mortgage for _, mortgage in valid]
+    credit_score_total = sum(mortgage.credit_score for mortgage in mortgages)
+    try:
+        rulebook = rulebook_loader.current()
+        with metrics.stage("create_mortgages_bulk", "avg_credit_score"):
+            avg_credit_score = await credit_score_stats.average_async(db)
+        with metrics.stage("create_mortgages_bulk", "score"):
+            ratings = bulk.score_chunk(mortgages, avg_credit_score, rulebook)
+        rows = [
+            {**mortgage.model_dump(), "credit_rating": rating, "rulebook_version": rulebook.version}
+            for mortgage, rating in zip(mortgages, ratings)
+        ]
+        rollup = RollupDeltas()
+        for row in rows:
+            rollup.add(row)
+        with metrics.stage("create_mortgages_bulk", "db_insert"):
+            ids = await bulk.insert_mortgages(db, rows)
+            await apply_credit_score_delta_async(db, len(rows), credit_score_total)
+            await apply_rollup_deltas_async(db, rollup)
+            await record_changes_async(db, changes.CREATED, ids)
+        with metrics.stage("create_mortgages_bulk", "db_commit"):
+            await db.commit()
+        credit_score_stats.apply(len(rows), credit_score_total)
+        await changes.publish(changes.CREATED, ids)
+    except Exception as e:
+        logger.error(f"Failed to store bulk chunk of {len(valid)} mortgages: {str(e)}")
+        await db.rollback()
+        results.extend(
+            schemas.BulkMortgageResult(index=index, error="Failed to store mortgage application")
+            for index, _ in valid
+        )
+        return results
+    results.extend(
+        schemas.BulkMortgageResult(index=index, id=mortgage_id, credit_rating=rating)
+        for (index, _), mortgage_id, rating in zip(valid, ids, ratings)
+    )
+    return results
+
+@app.post("/mortgages/bulk-update", response_model=schemas.BulkFilterResult, tags=["mortgages"])
+async def update_mortgages_by_filter(request: schemas.BulkUpdateRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Write the same values to every live mortgage matching a filter, and rescore them.
+    
+    The segment is updated in batches of BULK_FILTER_BATCH_SIZE rows, each
+    its own transaction, with set-based UPDATEs and vectorized rescoring;
+    see app.segments. A batch that fails leaves the batches before it
+    committed, so the request can simply be repeated.
+    
+    Args:
+        request (BulkUpdateRequest): The filter, the values to write and whether to only count
+        db (AsyncSession): Database session
+        
+    Returns:
+        BulkFilterResult: Mortgages matched and updated, and batches committed
+        
+    Raises:
+        HTTPException: If the filter is empty (400) or error updating
+    """
+    clauses = _segment_clauses(request.filter)
+    values = request.set.model_dump(exclude_none=True)
+    try:
+        if request.dry_run:
+            with metrics.stage("update_mortgages_by_filter", "count"):
+                matched = await count_segment(db, clauses)
+            return schemas.BulkFilterResult(matched=matched, affected=0, batches=0, dry_run=True)
+        with metrics.stage("update_mortgages_by_filter", "update"):
+            result = await update_segment(db, clauses, values)
+    except Exception as e:
+        logger.error(f"Failed to update mortgages by filter: {str(e)}")
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to update mortgage applications"
+        )
+    logger.info(f"Updated {result['affected']} of {result['matched']} mortgages matching a filter "
+                f"in {result['batches']} batches")
+    return schemas.BulkFilterResult(**result, dry_run=False)
+
+@app.post("/mortgages/bulk-delete", response_model=schemas.BulkFilterResult, tags=["mortgages"])
+async def delete_mortgages_by_filter(request: schemas.BulkDeleteRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Delete every live mortgage matching a filter.
+    
+    The segment is deleted in batches of BULK_FILTER_BATCH_SIZE rows, each
+    its own transaction with a single set-based DELETE; see app.segments.
+    Archived applications are not affected.
+    
+    Args:
+        request (BulkDeleteRequest): The filter and whether to only count
+        db (AsyncSession): Database session
+        
+    Returns:
+        BulkFilterResult: Mortgages matched and deleted, and batches committed
+        
+    Raises:
+        HTTPException: If the filter is empty (400) or error deleting
+    """
+    clauses = _segment_clauses(request.filter)
+    try:
+        if request.dry_run:
+            with metrics.stage("delete_mortgages_by_filter", "count"):
+                matched = await count_segment(db, clauses)
+            return schemas.BulkFilterResult(matched=matched, affected=0, batches=0, dry_run=True)
+        with metrics.stage("delete_mortgages_by_filter", "delete"):
+            result = await delete_segment(db, clauses)
+    except Exception as e:
+        logger.error(f"Failed to delete mortgages by filter: {str(e)}")
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to delete mortgage applications"
+        )
+    logger.info(f"Deleted {result['affected']} mortgages matching a filter in {result['batches']} batches")
+    return schemas.BulkFilterResult(**result, dry_run=False)
+
+def _segment_clauses(segment: schemas.MortgageSegment) -> list:
+    """SQL criteria of a bulk write's filter, refusing an empty filter that would match the whole book."""
+    clauses = segment_clauses(segment)
+    if not clauses:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The filter must set at least one criterion"
+        )
+    return clauses
 
 @app.get("/mortgages", response_model=List[schemas.Mortgage], tags=["mortgages"])
 async def get_mortgages(
-    skip: int = 0,
-    limit: int = DEFAULT_PAGE_SIZE,
-    db: Session = Depends(get_db)
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1),
+    cursor: Optional[str] = None,
+    filters: MortgageFilters = Depends(),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Get all mortgage applications with pagination.
+    Get mortgage applications ordered by (created_at, id), with keyset pagination.
+    
+    Pass the X-Next-Cursor header of a response as `cursor` to fetch the
+    next page; the header is omitted on the last page. Cursor pages cost
+    the same at any depth and stay stable under concurrent inserts.
+    `skip` is still honoured for offset pagination but degrades with depth.
+    
+    Rows are selected as plain column tuples and encoded straight to JSON,
+    without ORM objects or output re-validation. Pages are served from the
+    response cache until the next committed write, and carry an ETag: a
+    request whose If-None-Match still matches gets 304 Not Modified
+    without touching the database.
+    
+    Reads go to the read replica when one is configured (see get_read_db).
+    Pages read from it are only cached once the current generation is
+    older than REPLICA_MAX_LAG_SECONDS.
+    
+    With SNAPSHOT_ENABLED, pages are computed from this worker's in-memory
+    snapshot instead, once it has loaded, bypassing the response cache;
+    their ETags come from the snapshot version.
     
     Args:
-        skip (int): Number of records to skip
+        request (Request): The incoming request, for If-None-Match
+        skip (int): Number of records to skip (ignored when `cursor` is given)
         limit (int): Maximum number of records to return
-        db (Session): Database session
+        cursor (Optional[str]): Opaque cursor from a previous page
+        filters (MortgageFilters): Credit rating, type and credit-score/LTV range filters
+        db (AsyncSession): Database session
         
     Returns:
         List[Mortgage]: List of mortgage applications
         
     Raises:
-        HTTPException: If there's an error fetching mortgages
+        HTTPException: If the cursor is invalid or there's an error fetching mortgages
     """
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid pagination cursor"
+            )
+        skip = 0
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    digest = params_digest({"skip": skip, "limit": limit, "cursor": cursor, **vars(filters)})
+    if mortgage_snapshot.serving and not reads_from_primary(request):
+        return _snapshot_page(request, digest, filters, after, skip, limit)
+    generation = await response_cache.generation()
+    cache_headers = {}
+    if generation is not None:
+        etag = response_cache.etag(generation, digest)
+        cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            metrics.response_cache_lookups.inc("get_mortgages", "not_modified")
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+        cached = await response_cache.get(MORTGAGE_LIST_CACHE_NAMESPACE, generation, digest)
+        if cached is not None:
+            metrics.response_cache_lookups.inc("get_mortgages", "hit")
+            body, headers = cached
+            return Response(body, media_type="application/json", headers={**headers, **cache_headers})
+        metrics.response_cache_lookups.inc("get_mortgages", "miss")
+
     try:
-        if limit > MAX_PAGE_SIZE:
-            limit = MAX_PAGE_SIZE
-        mortgages = db.query(Mortgage).offset(skip).limit(limit).all()
-        return mortgages
+        query = filters.apply(select(*MORTGAGE_COLUMNS)).order_by(Mortgage.created_at, Mortgage.id)
+        if after is not None:
+            created_at, mortgage_id = after
+            # (created_at, id) > cursor, spelled so MySQL and SQLite both range-scan the
+            # (created_at, id) index from the cursor (neither does so for a bare OR)
+            query = query.filter(
+                Mortgage.created_at >= created_at,
+                or_(
+                    Mortgage.created_at > created_at,
+                    and_(Mortgage.created_at == created_at, Mortgage.id > mortgage_id)
+                )
+            )
+        elif skip:
+            query = query.offset(skip)
+        # Fetch one extra row to learn whether another page follows
+        with metrics.stage("get_mortgages", "db_query"):
+            rows = (await db.execute(query.limit(limit + 1))).all()
+        headers = {}
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].created_at, rows[-1].id)
+        with metrics.stage("get_mortgages", "serialize"):
+            body = encode_mortgage_rows(rows)
     except Exception as e:
         logger.error(f"Failed to fetch mortgages: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to fetch mortgage applications"
         )
+    if generation is not None and (
+        not is_replica_session(db) or response_cache.settled(generation, REPLICA_MAX_LAG_SECONDS)
+    ):
+        # Stored under the generation read before the query: if a write committed
+        # meanwhile, this entry belongs to a generation that is already retired
+        await response_cache.set(MORTGAGE_LIST_CACHE_NAMESPACE, generation, digest, body, headers)
+    return Response(body, media_type="application/json", headers={**headers, **cache_headers})
+
+def _snapshot_page(request: Request, digest: str, filters: MortgageFilters, after, skip: int, limit: int) -> Response:
+    """Answer a GET /mortgages page from the in-memory snapshot."""
+    cache_headers = {"ETag": mortgage_snapshot.etag(digest), "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cache_headers["ETag"]):
+        metrics.snapshot_lookups.inc("get_mortgages", "not_modified")
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+    metrics.snapshot_lookups.inc("get_mortgages", "hit")
+    with metrics.stage("get_mortgages", "snapshot_read"):
+        rows, more = mortgage_snapshot.page(filters, after, skip, limit)
+    headers = {}
+    if more:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    with metrics.stage("get_mortgages", "serialize"):
+        body = dumps(rows)
+    return Response(body, media_type="application/json", headers={**headers, **cache_headers})
+
+@app.get("/mortgages/stats", response_model=schemas.PortfolioStats, tags=["mortgages"])
+async def get_portfolio_stats(
+    group_by: List[Literal[GROUP_DIMENSIONS]] = Query(["credit_rating"], description="Dimensions to group by"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get portfolio risk aggregates: counts, exposure and average LTV/DTI/credit score.
+    
+    Aggregates are read from the incrementally maintained portfolio rollup
+    rather than scanning the mortgages table, so the cost does not grow
+    with the book. Repeat `group_by` to split by several of credit_rating,
+    loan_type, property_type and score_band.
+    
+    Args:
+        group_by (List[str]): Dimensions to group by
+        db (AsyncSession): Database session
+        
+    Returns:
+        PortfolioStats: Book totals and per-group aggregates
+        
+    Raises:
+        HTTPException: If there's an error reading the rollup
+    """
+    group_by = list(dict.fromkeys(group_by))
+    try:
+        with metrics.stage("get_portfolio_stats", "db_query"):
+            totals = await read_portfolio_stats_async(db, [])
+            groups = await read_portfolio_stats_async(db, group_by)
+        return schemas.PortfolioStats(group_by=group_by, total=totals[0] if totals else None, groups=groups)
+    except Exception as e:
+        logger.error(f"Failed to read portfolio stats: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to read portfolio stats"
+        )
+
+@app.post("/mortgages/explain", response_model=schemas.RatingExplanation, tags=["ratings"])
+async def explain_mortgage_rating(
+    mortgage: schemas.MortgageCreate,
+    target_rating: Optional[str] = Query(None, pattern="^(AAA|BBB|C)$", description="Rating to solve upgrades for"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Explain the credit rating an application would get, and what would change it.
+    
+    Returns the points of every rulebook factor and, per field, the
+    smallest change that reaches `target_rating` (the next better rating
+    by default) or that drops the application to a worse rating.
+    
+    Args:
+        mortgage (MortgageCreate): The mortgage application data
+        target_rating (Optional[str]): Rating to solve upgrades for
+        db (AsyncSession): Database session
+        
+    Returns:
+        RatingExplanation: Factor contributions and minimal rating changes
+        
+    Raises:
+        HTTPException: If there's an error explaining the rating
+    """
+    try:
+        avg_credit_score = await credit_score_stats.average_async(db)
+        return explain_rating(mortgage, avg_credit_score, rulebook_loader.current(), target_rating)
+    except Exception as e:
+        logger.error(f"Failed to explain credit rating: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to explain credit rating"
+        )
+
+@app.post("/mortgages/what-if", response_model=schemas.WhatIfResponse, tags=["ratings"])
+async def simulate_what_if(request: schemas.WhatIfRequest, db: AsyncSession = Depends(get_read_db)):
+    """
+    Rate every combination of perturbed field values for one applicant.
+    
+    The whole grid is evaluated in one vectorized pass, so thousands of
+    scenarios take a few milliseconds, fast enough to drive sliders.
+    
+    Args:
+        request (WhatIfRequest): The applicant and the values to try per field
+        db (AsyncSession): Database session
+        
+    Returns:
+        WhatIfResponse: Varied values, risk score and rating per scenario
+        
+    Raises:
+        HTTPException: If a field or value is invalid or the grid exceeds MAX_WHAT_IF_SCENARIOS
+    """
+    vary = {
+        field: values.model_dump() if isinstance(values, schemas.WhatIfRange) else values
+        for field, values in request.vary.items()
+    }
+    avg_credit_score = await credit_score_stats.average_async(db)
+    try:
+        with metrics.stage("simulate_what_if", "score"):
+            result = what_if_grid(request.mortgage, vary, avg_credit_score, rulebook_loader.current())
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # Trusted NumPy output: skip response model validation of every scenario
+    return Response(dumps(result), media_type="application/json")
+
+@app.get("/mortgages/export", tags=["mortgages"])
+async def export_mortgages(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$", description="Output format"),
+    filters: MortgageFilters = Depends()
+):
+    """
+    Stream the mortgage book as NDJSON, CSV or Parquet.
+    
+    Rows are read with a server-side cursor and encoded straight from
+    column tuples, so memory stays flat regardless of table size. Accepts
+    the same filters as GET /mortgages; rows are ordered by id. Read from
+    the replica when one is configured.
+    
+    Args:
+        request (Request): The incoming request, for replica routing
+        format (str): One of ndjson, csv or parquet
+        filters (MortgageFilters): Credit rating, type and credit-score/LTV range filters
+        
+    Returns:
+        StreamingResponse: The exported rows
+        
+    Raises:
+        HTTPException: If Parquet is requested but pyarrow is not installed
+    """
+    if format == "parquet" and not export.parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export requires the pyarrow package"
+        )
+    body = export.ENCODERS[format](export.stream_rows(read_engine(request), filters))
+    logger.info(f"Started {format} export of mortgage applications")
+    return StreamingResponse(
+        body,
+        media_type=export.EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="mortgages.{format}"'}
+    )
+
+@app.get("/mortgages/search", response_model=List[schemas.Mortgage], tags=["mortgages"])
+async def search_mortgages(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100, description="Applicant name, or the start of its words"),
+    mode: Literal["prefix", "fuzzy"] = Query("prefix", description="Match word prefixes, or tolerate typos"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Search mortgage applications by applicant name.
+    
+    With SEARCH_INDEX_ENABLED the worker's trigram index answers: `prefix`
+    finds names with a word starting with every word of `q` ("jo smi"
+    finds "John Smith"), lowest id first, and `fuzzy` ranks names by the
+    share of `q`'s trigrams they contain, so misspellings still match.
+    Until the index has loaded, or without it, the database answers
+    instead: `prefix` matches the start of the whole name and `fuzzy`
+    falls back to a substring match, both case-insensitive where the
+    collation is.
+    
+    Args:
+        request (Request): The incoming request, for replica routing
+        q (str): Text to search for
+        mode (str): "prefix" or "fuzzy"
+        limit (int): Maximum number of results
+        db (AsyncSession): Database session
+        
+    Returns:
+        List[Mortgage]: The matching mortgage applications, best match first
+        
+    Raises:
+        HTTPException: If there's an error searching
+    """
+    try:
+        if name_search.serving:
+            metrics.searches.inc(mode, "index")
+            with metrics.stage("search_mortgages", "index_search"):
+                if mode == "prefix":
+                    ids = name_search.prefix(q, limit)
+                else:
+                    ids = [mortgage_id for mortgage_id, _ in name_search.fuzzy(q, limit)]
+            if not ids:
+                return Response(b"[]", media_type="application/json")
+            with metrics.stage("search_mortgages", "db_query"):
+                rows = (await db.execute(select(*MORTGAGE_COLUMNS).where(Mortgage.id.in_(ids)))).all()
+            rank = {mortgage_id: position for position, mortgage_id in enumerate(ids)}
+            rows.sort(key=lambda row: rank[row.id])
+        else:
+            metrics.searches.inc(mode, "database")
+            if mode == "prefix":
+                condition = Mortgage.applicant_name.startswith(q, autoescape=True)
+            else:
+                condition = Mortgage.applicant_name.contains(q, autoescape=True)
+            with metrics.stage("search_mortgages", "db_query"):
+                rows = (await db.execute(
+                    select(*MORTGAGE_COLUMNS).where(condition).order_by(Mortgage.id).limit(limit)
+                )).all()
+        return Response(encode_mortgage_rows(rows), media_type="application/json")
+    except Exception as e:
+        logger.error(f"Failed to search mortgage applications: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to search mortgage applications"
+        )
+
+@app.get(
+    "/mortgages/changes",
+    tags=["mortgages"],
+    response_class=StreamingResponse,
+    responses={status.HTTP_200_OK: {"content": {"text/event-stream": {}}}},
+)
+async def stream_mortgage_changes(
+    since: Optional[int] = Query(None, ge=0, description="Seq of the last event already applied"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Stream committed mortgage creates, updates and deletes as Server-Sent Events.
+    
+    Each `change` event carries its seq as the SSE id and, as data, the
+    seq, kind, mortgage id and (for creates and updates) the mortgage as
+    GET /mortgages lists it. Clients apply the events to the list they
+    already hold instead of refetching it. To resume, pass the last seq
+    applied as `since`, or let EventSource send it as Last-Event-ID on
+    reconnect; a `reset` event means events were missed and the list must
+    be reloaded.
+    
+    Args:
+        since (Optional[int]): Seq to resume after; omit for live events only
+        last_event_id (Optional[str]): The Last-Event-ID header; takes precedence over `since`
+        
+    Returns:
+        StreamingResponse: The text/event-stream
+        
+    Raises:
+        HTTPException: If the feed is disabled or Last-Event-ID is not a seq
+    """
+    if not change_feed.running:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Change feed is disabled; set CHANGE_FEED_ENABLED=true to enable it"
+        )
+    if last_event_id:
+        try:
+            since = int(last_event_id)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Last-Event-ID must be a change feed seq"
+            )
+    return StreamingResponse(
+        change_feed.stream(since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/mortgages/{mortgage_id}", response_model=schemas.Mortgage, tags=["mortgages"])
+async def get_mortgage(mortgage_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
+    """
+    Get one mortgage application by ID.
+    
+    Served from the in-memory snapshot when SNAPSHOT_ENABLED and it holds
+    the row; otherwise, e.g. for a row created by another worker since the
+    last sync, read from the database. Applications the archive job has
+    moved out of the live table are read from the archive.
+    
+    Args:
+        mortgage_id (int): ID of the mortgage
+        request (Request): The incoming request, for replica routing
+        db (AsyncSession): Database session
+        
+    Returns:
+        Mortgage: The mortgage application
+        
+    Raises:
+        HTTPException: If mortgage not found or error fetching it
+    """
+    if mortgage_snapshot.serving and not reads_from_primary(request):
+        row = mortgage_snapshot.get(mortgage_id)
+        if row is not None:
+            metrics.snapshot_lookups.inc("get_mortgage", "hit")
+            return Response(dumps(row), media_type="application/json")
+        metrics.snapshot_lookups.inc("get_mortgage", "miss")
+    try:
+        with metrics.stage("get_mortgage", "db_query"):
+            row = (await db.execute(select(*MORTGAGE_COLUMNS).where(Mortgage.id == mortgage_id))).first()
+        if row is None:
+            with metrics.stage("get_mortgage", "archive_query"):
+                row = (await db.execute(
+                    select(*ARCHIVED_MORTGAGE_COLUMNS).where(MortgageArchive.id == mortgage_id)
+                )).first()
+    except Exception as e:
+        logger.error(f"Failed to fetch mortgage {mortgage_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch mortgage application"
+        )
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Mortgage not found"
+        )
+    return Response(dumps(dict(zip(MORTGAGE_FIELD_NAMES, row))), media_type="application/json")
+
+@app.get("/mortgages/{mortgage_id}/explain", response_model=schemas.RatingExplanation, tags=["ratings"])
+async def explain_stored_rating(
+    mortgage_id: int,
+    target_rating: Optional[str] = Query(None, pattern="^(AAA|BBB|C)$", description="Rating to solve upgrades for"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Explain the credit rating of a stored application under the active rulebook.
+    
+    The explanation uses the current average credit score and rulebook, so
+    it can differ from the stored rating until the book is rescored.
+    Archived applications are explained too.
+    
+    Args:
+        mortgage_id (int): ID of the mortgage to explain
+        target_rating (Optional[str]): Rating to solve upgrades for
+        db (AsyncSession): Database session
+        
+    Returns:
+        RatingExplanation: Factor contributions and minimal rating changes
+        
+    Raises:
+        HTTPException: If mortgage not found or error explaining
+    """
+    db_mortgage = await db.get(Mortgage, mortgage_id) or await db.get(MortgageArchive, mortgage_id)
+    if db_mortgage is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Mortgage not found"
+        )
+    mortgage = schemas.MortgageCreate(**{field: getattr(db_mortgage, field) for field in schemas.MortgageCreate.model_fields})
+    return await explain_mortgage_rating(mortgage, target_rating, db)
 
 @app.delete("/mortgages/{mortgage_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["mortgages"])
-async def delete_mortgage(mortgage_id: int, db: Session = Depends(get_db)):
+async def delete_mortgage(mortgage_id: int, db: AsyncSession = Depends(get_db)):
     """
     Delete a mortgage application by ID.
     
+    An archived application is deleted from the archive; it no longer
+    counts towards the credit score average or portfolio rollup.
+    
     Args:
         mortgage_id (int): ID of the mortgage to delete
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Raises:
         HTTPException: If mortgage not found or error deleting
     """
     try:
-        mortgage = db.query(Mortgage).filter(Mortgage.id == mortgage_id).first()
+        mortgage = await db.get(Mortgage, mortgage_id)
         if mortgage is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Mortgage not found"
-            )
-        db.delete(mortgage)
-        db.commit()
+            await _delete_archived(db, mortgage_id)
+            return
+        credit_score = mortgage.credit_score
+        rollup = RollupDeltas()
+        rollup.remove(mortgage)
+        with metrics.stage("delete_mortgage", "db_flush"):
+            await db.delete(mortgage)
+            await db.flush()
+            await apply_credit_score_delta_async(db, -1, -credit_score)
+            await apply_rollup_deltas_async(db, rollup)
+            await record_changes_async(db, changes.DELETED, [mortgage_id])
+        with metrics.stage("delete_mortgage", "db_commit"):
+            await db.commit()
+        credit_score_stats.apply(-1, -credit_score)
+        await changes.publish(changes.DELETED, [mortgage_id])
         logger.info(f"Deleted mortgage application {mortgage_id}")
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Failed to delete mortgage {mortgage_id}: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete mortgage application"
         )
 
+async def _delete_archived(db: AsyncSession, mortgage_id: int) -> None:
+    """Delete an archived application, raising 404 if there is none."""
+    with metrics.stage("delete_mortgage", "db_flush"):
+        deleted = (await db.execute(delete(MortgageArchive).where(MortgageArchive.id == mortgage_id))).rowcount
+        if not deleted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Mortgage not found"
+            )
+        await record_changes_async(db, changes.DELETED, [mortgage_id])
+    with metrics.stage("delete_mortgage", "db_commit"):
+        await db.commit()
+    await changes.publish(changes.DELETED, [mortgage_id])
+    logger.info(f"Deleted archived mortgage application {mortgage_id}")
+
 @app.put("/mortgages/{mortgage_id}", response_model=schemas.Mortgage, tags=["mortgages"])
 async def update_mortgage(
     mortgage_id: int,
     mortgage_update: schemas.MortgageCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update a mortgage application by ID.
     
-    The credit rating is automatically recalculated based on the updated values.
+    The credit rating is automatically recalculated based on the updated
+    values, through the rating cache. Only columns whose value actually
+    changes are written; a request that changes nothing issues no UPDATE.
     
     Args:
         mortgage_id (int): ID of the mortgage to update
         mortgage_update (MortgageCreate): Updated mortgage data
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         Mortgage: The updated mortgage application
         
     Raises:
-        HTTPException: If mortgage not found or error updating
+        HTTPException: If mortgage not found, archived (409) or error updating
     """
+    metrics.stage_since_request("update_mortgage", "parse_validate")
     try:
-        db_mortgage = db.query(Mortgage).filter(Mortgage.id == mortgage_id).first()
+        with metrics.stage("update_mortgage", "db_get"):
+            db_mortgage = await db.get(Mortgage, mortgage_id)
         if db_mortgage is None:
+            if await db.get(MortgageArchive, mortgage_id) is not None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Mortgage application is archived and can no longer be changed"
+                )
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Mortgage not found"
             )
         
-        credit_rating = calculate_credit_rating(mortgage_update)
+        rulebook = rulebook_loader.current()
+        with metrics.stage("update_mortgage", "avg_credit_score"):
+            avg_credit_score = await credit_score_stats.average_async(db)
+        with metrics.stage("update_mortgage", "score"):
+            credit_rating = rating_cache.rating(mortgage_update, avg_credit_score, rulebook)
+        values = {
+            **mortgage_update.model_dump(),
+            "credit_rating": credit_rating,
+            "rulebook_version": rulebook.version,
+        }
+        changed = {key: value for key, value in values.items() if getattr(db_mortgage, key) != value}
+        if not changed:
+            logger.info(f"Mortgage application {mortgage_id} unchanged, nothing to update")
+            return db_mortgage
         
-        for key, value in mortgage_update.model_dump().items():
+        score_delta = mortgage_update.credit_score - db_mortgage.credit_score
+        rollup = RollupDeltas()
+        rollup.remove(db_mortgage)
+        for key, value in changed.items():
             setattr(db_mortgage, key, value)
+        rollup.add(db_mortgage)
         
-        db_mortgage.credit_rating = credit_rating
-        
-        db.commit()
-        db.refresh(db_mortgage)
+        with metrics.stage("update_mortgage", "db_flush"):
+            await db.flush()
+            await apply_credit_score_delta_async(db, 0, score_delta)
+            await apply_rollup_deltas_async(db, rollup)
+            await record_changes_async(db, changes.UPDATED, [mortgage_id])
+        with metrics.stage("update_mortgage", "db_commit"):
+            await db.commit()
+        credit_score_stats.apply(0, score_delta)
+        await changes.publish(changes.UPDATED, [mortgage_id])
+        with metrics.stage("update_mortgage", "db_refresh"):
+            await db.refresh(db_mortgage)
         logger.info(f"Updated mortgage application {mortgage_id}")
         return db_mortgage
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Failed to update mortgage {mortgage_id}: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update mortgage application"
-        ) 
\ No newline at end of file
+        ) 
+
+@app.get("/admin/credit-score-stats", tags=["admin"])
+async def get_credit_score_stats():
+    """
+    Get the cached running credit score aggregate used for the average adjustment.
+    
+    Returns:
+        dict: Mortgage count, credit score total, average and cache age
+    """
+    return credit_score_stats.snapshot()
+
+@app.post("/admin/credit-score-stats/rebuild", tags=["admin"])
+async def rebuild_credit_score_stats_endpoint(db: AsyncSession = Depends(get_db)):
+    """
+    Rebuild the running credit score aggregate from a full scan of the mortgages table.
+    
+    Args:
+        db (AsyncSession): Database session
+        
+    Returns:
+        dict: The rebuilt aggregate
+        
+    Raises:
+        HTTPException: If the rebuild fails
+    """
+    try:
+        mortgage_count, credit_score_total = await db.run_sync(rebuild_credit_score_stats)
+        await db.commit()
+        credit_score_stats.set(mortgage_count, credit_score_total)
+        return credit_score_stats.snapshot()
+    except Exception as e:
+        logger.error(f"Failed to rebuild credit score stats: {str(e)}")
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to rebuild credit score stats"
+        )
+
+@app.get("/admin/portfolio-rollup/verify", tags=["admin"])
+async def verify_portfolio_rollup(db: AsyncSession = Depends(get_db)):
+    """
+    Check the portfolio rollup against a full GROUP BY recompute of the mortgages table.
+    
+    Args:
+        db (AsyncSession): Database session
+        
+    Returns:
+        dict: Whether they agree, the groups checked and any mismatching groups
+        
+    Raises:
+        HTTPException: If the check fails to run
+    """
+    try:
+        return await db.run_sync(verify_rollup)
+    except Exception as e:
+        logger.error(f"Failed to verify portfolio rollup: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to verify portfolio rollup"
+        )
+
+@app.post("/admin/portfolio-rollup/rebuild", tags=["admin"])
+async def rebuild_portfolio_rollup(db: AsyncSession = Depends(get_db)):
+    """
+    Rebuild the portfolio rollup from a full scan of the mortgages table.
+    
+    Args:
+        db (AsyncSession): Database session
+        
+    Returns:
+        dict: The number of groups written
+        
+    Raises:
+        HTTPException: If the rebuild fails
+    """
+    try:
+        groups = await db.run_sync(rebuild_rollup)
+        await db.commit()
+        return {"groups": groups}
+    except Exception as e:
+        logger.error(f"Failed to rebuild portfolio rollup: {str(e)}")
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to rebuild portfolio rollup"
+        )
+
+@app.get("/admin/rulebook", tags=["admin"])
+async def get_rulebook():
+    """
+    Get the active credit rating rulebook of this worker.
+    
+    Returns:
+        dict: Rulebook version, source file, load time and rules
+    """
+    return rulebook_loader.snapshot()
+
+@app.post("/admin/rulebook/reload", tags=["admin"])
+async def reload_rulebook():
+    """
+    Reload the credit rating rulebook from its file in this worker.
+    
+    Other workers pick the change up on their own within
+    RULEBOOK_CHECK_INTERVAL seconds of the file being modified.
+    
+    Returns:
+        dict: The newly active rulebook
+        
+    Raises:
+        HTTPException: If the rulebook file is invalid; the previous rulebook stays active
+    """
+    try:
+        rulebook_loader.reload()
+    except RulebookError as e:
+        logger.error(f"Failed to reload rulebook: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return rulebook_loader.snapshot()
+
+@app.get("/admin/snapshot", tags=["admin"])
+async def get_snapshot():
+    """
+    Get the state of this worker's in-memory mortgage snapshot.
+    
+    Returns:
+        dict: Readiness, rows, dead slots, bytes, version and time since the last sync
+    """
+    return mortgage_snapshot.snapshot()
+
+@app.get("/admin/search-index", tags=["admin"])
+async def get_search_index():
+    """
+    Get the state of this worker's applicant name search index.
+    
+    Returns:
+        dict: Readiness, names, dead slots, trigrams, bytes and time since the last load
+    """
+    return name_search.snapshot()
+
+@app.get("/admin/admission", tags=["admin"])
+async def get_admission():
+    """
+    Get this worker's admission control state.
+    
+    Returns:
+        dict: Database latency against its baseline, and each route class's limit, in-flight and queued requests
+    """
+    return admission.snapshot()
+
+@app.get("/admin/rating-cache", tags=["admin"])
+async def get_rating_cache():
+    """
+    Get the size and hit rate of this worker's credit rating cache.
+    
+    Returns:
+        dict: Entry count, capacity, hits, misses, evictions and hit rate
+    """
+    return rating_cache.snapshot()
+
+@app.get("/metrics", tags=["monitoring"])
+async def get_metrics():
+    """
+    Expose request, handler-stage, query and connection-pool metrics of this worker.
+    
+    Returns:
+        PlainTextResponse: Metrics in the Prometheus text exposition format
+    """
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/health", tags=["monitoring"])
+async def health(response: Response):
+    """
+    Probe the primary database and, if configured, the read replica.
+    
+    Each database is checked with `SELECT 1` on a pooled connection, which
+    also exercises the pool's pre-ping, within HEALTH_CHECK_TIMEOUT seconds.
+    
+    Args:
+        response (Response): The outgoing response, for its status code
+        
+    Returns:
+        dict: Overall "ok", "degraded" (replica unreachable) or
+        "unavailable" (primary unreachable, answered with 503), and
+        per-database status, latency and pool usage
+    """
+    databases = {"primary": await _probe_database(async_engine)}
+    if database.replica_async_engine is not None:
+        databases["replica"] = await _probe_database(database.replica_async_engine)
+    if databases["primary"]["status"] != "ok":
+        overall = "unavailable"
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    elif any(check["status"] != "ok" for check in databases.values()):
+        overall = "degraded"
+    else:
+        overall = "ok"
+    return {"status": overall, "databases": databases}
+
+async def _probe_database(target) -> dict:
+    """Run SELECT 1 against an async engine and describe the outcome and its pool."""
+    async def select_one():
+        async with target.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    pool = target.pool
+    check = {}
+    if isinstance(pool, QueuePool):
+        check["pool"] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+        }
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(select_one(), HEALTH_CHECK_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Database health check failed: {str(e)}")
+        return {"status": "unavailable", "error": str(e) or type(e).__name__, **check}
+    return {"status": "ok", "latency_ms": round((time.perf_counter() - started) * 1000, 2), **check}
+
+@app.post("/admin/profile", tags=["admin"])
+async def profile(
+    seconds: float = Query(5.0, gt=0, le=MAX_PROFILE_SECONDS),
+    interval: float = Query(DEFAULT_SAMPLE_INTERVAL, ge=0.001, le=1.0)
+):
+    """
+    Sample this worker's event loop for a while and return folded stacks.
+    
+    Only available when the PROFILER_ENABLED environment variable is set.
+    
+    Args:
+        seconds (float): How long to sample
+        interval (float): Seconds between samples
+        
+    Returns:
+        PlainTextResponse: One "stack count" line per distinct stack
+        
+    Raises:
+        HTTPException: If the profiler is disabled or already running
+    """
+    if not PROFILER_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiler is disabled; set PROFILER_ENABLED=true to enable it"
+        )
+    try:
+        folded = await profile_event_loop(seconds, interval)
+    except ProfilerBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    logger.info(f"Profiled event loop for {seconds}s")
+    return PlainTextResponse(folded)
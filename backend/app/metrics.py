@@ -0,0 +1,405 @@
+"""
+In-process metrics for the mortgage API, exposed in the Prometheus text format.
+
+Three kinds of instruments are provided:
+
+- per-request latency, recorded by MetricsMiddleware for every endpoint
+- per-stage latency inside handlers (validation, scoring, flush, commit,
+  refresh, ...), recorded with `stage()` and `stage_since_request()`
+- database metrics from SQLAlchemy cursor events and from the instrumented
+  connection pools: query counts and durations, checkout waits and timeouts,
+  and pool saturation gauges
+
+Recording an observation is a bisect over the bucket bounds plus a few
+additions under a lock, so instrumentation stays on in production. Every
+worker process keeps its own registry; scrape each worker separately.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow exports
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# perf_counter() at which the current request entered the middleware
+_request_started: ContextVar[Optional[float]] = ContextVar("request_started", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Tuple[str, ...], labels: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [
+                f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+                for labels, value in sorted(self._values.items())
+            ]
+
+
+class Gauge:
+    """Gauge whose labelled values are read from callbacks at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._callbacks: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set_function(self, function: Callable[[], float], *labels: str) -> None:
+        self._callbacks[labels] = function
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {float(function())}"
+            for labels, function in sorted(self._callbacks.items())
+        ]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # Per label set: [count per bucket (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return sum(series[0]) if series else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            series_items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in series_items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Ordered collection of instruments rendered together."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render every instrument in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_request_duration = REGISTRY.register(Histogram(
+    "mortgage_api_request_duration_seconds",
+    "Time from request arrival to the end of the response body, per endpoint",
+    ("method", "handler", "status"),
+))
+stage_duration = REGISTRY.register(Histogram(
+    "mortgage_api_stage_duration_seconds",
+    "Time spent in each stage of a request handler",
+    ("handler", "stage"),
+))
+db_query_duration = REGISTRY.register(Histogram(
+    "mortgage_db_query_duration_seconds",
+    "Duration of SQL statements, by engine and statement type",
+    ("engine", "statement"),
+))
+db_pool_checkout_wait = REGISTRY.register(Histogram(
+    "mortgage_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    ("engine",),
+))
+db_pool_checkout_timeouts = REGISTRY.register(Counter(
+    "mortgage_db_pool_checkout_timeouts_total",
+    "Connection checkouts that gave up after the pool timeout",
+    ("engine",),
+))
+response_cache_lookups = REGISTRY.register(Counter(
+    "mortgage_api_response_cache_total",
+    "Response cache lookups by result: hit, miss or not_modified",
+    ("handler", "result"),
+))
+idempotency_lookups = REGISTRY.register(Counter(
+    "mortgage_api_idempotency_total",
+    "Idempotency-Key lookups by result: memory_hit, collapsed, db_hit or miss",
+    ("result",),
+))
+write_behind_batch_size = REGISTRY.register(Histogram(
+    "mortgage_write_behind_batch_rows",
+    "Rows written per write-behind group commit",
+    (),
+    (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+))
+snapshot_lookups = REGISTRY.register(Counter(
+    "mortgage_api_snapshot_total",
+    "Reads answered from the in-memory snapshot by result: hit, miss (fell back to the database) or not_modified",
+    ("handler", "result"),
+))
+snapshot_size = REGISTRY.register(Gauge(
+    "mortgage_snapshot_size",
+    "In-memory mortgage snapshot: rows held and bytes allocated",
+    ("measure",),
+))
+feed_events = REGISTRY.register(Counter(
+    "mortgage_feed_events_total",
+    "Change feed events sent by this worker's poller",
+))
+feed_deliveries = REGISTRY.register(Counter(
+    "mortgage_feed_deliveries_total",
+    "Change feed events handed to subscribers (events x subscribers)",
+))
+feed_subscribers = REGISTRY.register(Gauge(
+    "mortgage_feed_subscribers",
+    "Clients connected to this worker's change feed",
+))
+searches = REGISTRY.register(Counter(
+    "mortgage_api_search_total",
+    "Name searches by mode (prefix or fuzzy) and source (index or database)",
+    ("mode", "source"),
+))
+search_index_size = REGISTRY.register(Gauge(
+    "mortgage_search_index_size",
+    "In-memory name search index: names held and bytes allocated",
+    ("measure",),
+))
+admission_decisions = REGISTRY.register(Counter(
+    "mortgage_api_admission_total",
+    "Admission decisions by route class and outcome: admitted, queued, queue_full or timed_out",
+    ("route_class", "outcome"),
+))
+admission_queue_wait = REGISTRY.register(Histogram(
+    "mortgage_api_admission_queue_wait_seconds",
+    "Time requests waited in the admission queue, whether or not they were then admitted",
+    ("route_class",),
+))
+admission_limit = REGISTRY.register(Gauge(
+    "mortgage_api_admission",
+    "Admission control per route class: current limit, requests in flight and requests queued",
+    ("route_class", "measure"),
+))
+db_pool_connections = REGISTRY.register(Gauge(
+    "mortgage_db_pool_connections",
+    "Pool connections by state: checked_out, idle, overflow and capacity (pool_size + max_overflow)",
+    ("engine", "state"),
+))
+
+
+def render() -> str:
+    """Render the default registry in the Prometheus text exposition format."""
+    return REGISTRY.render()
+
+
+class stage:
+    """
+    Context manager timing a block of a request handler as one stage.
+
+    A plain class rather than @contextmanager: it avoids a generator per
+    use, which matters with several stages on every request.
+
+    Args:
+        handler (str): Endpoint function name
+        name (str): Stage name, e.g. "score" or "db_commit"
+    """
+
+    __slots__ = ("handler", "name", "started")
+
+    def __init__(self, handler: str, name: str):
+        self.handler = handler
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        stage_duration.observe(time.perf_counter() - self.started, self.handler, self.name)
+        return False
+
+
+def stage_since_request(handler: str, name: str) -> None:
+    """
+    Record the time since the request arrived as one stage.
+
+    Called first thing in a handler, this measures body parsing, pydantic
+    validation and dependency resolution together.
+
+    Args:
+        handler (str): Endpoint function name
+        name (str): Stage name, e.g. "parse_validate"
+    """
+    started = _request_started.get()
+    if started is not None:
+        stage_duration.observe(time.perf_counter() - started, handler, name)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency of every HTTP request.
+
+    Written against the raw ASGI interface rather than BaseHTTPMiddleware so
+    it adds no extra task or response buffering per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        token = _request_started.set(started)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_started.reset(token)
+            endpoint = scope.get("endpoint")
+            handler = getattr(endpoint, "__name__", "unmatched")
+            http_request_duration.observe(time.perf_counter() - started, scope["method"], handler, str(status_code))
+
+
+class _TimedCheckout:
+    """Pool mixin timing how long each checkout waits for a connection."""
+
+    metrics_label = "default"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            db_pool_checkout_timeouts.inc(self.metrics_label)
+            raise
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - started, self.metrics_label)
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    """QueuePool recording checkout waits and timeouts."""
+
+
+class InstrumentedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool recording checkout waits and timeouts."""
+
+
+def _statement_type(statement: str) -> str:
+    head = statement.lstrip()[:7].upper()
+    for keyword in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+        if head.startswith(keyword):
+            return keyword.lower()
+    return "other"
+
+
+def instrument_engine(engine, label: str, max_overflow: Optional[int] = None) -> None:
+    """
+    Attach query timing events and pool gauges to a (sync) SQLAlchemy Engine.
+
+    For an AsyncEngine pass its `sync_engine`.
+
+    Args:
+        engine: The Engine to instrument
+        label (str): Value of the `engine` label, e.g. "sync" or "async"
+        max_overflow (Optional[int]): The pool's max_overflow, to report its capacity
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        db_query_duration.observe(time.perf_counter() - started, label, _statement_type(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+    pool = engine.pool
+    if isinstance(pool, _TimedCheckout):
+        pool.metrics_label = label
+    if isinstance(pool, QueuePool):
+        db_pool_connections.set_function(pool.checkedout, label, "checked_out")
+        db_pool_connections.set_function(pool.checkedin, label, "idle")
+        db_pool_connections.set_function(lambda: max(pool.overflow(), 0), label, "overflow")
+        if max_overflow is not None:
+            db_pool_connections.set_function(lambda: pool.size() + max_overflow, label, "capacity")
@@ -1,7 +1,17 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, CheckConstraint
+from sqlalchemy import BigInteger, Column, Double, Integer, String, Text, Float, DateTime, CheckConstraint, Index
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from .database import Base
 
+# SQLite stores CURRENT_TIMESTAMP without fractional seconds; bind timestamps
+# the same way so (created_at, id) keyset comparisons behave as on MySQL.
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite"
+)
+
 class Mortgage(Base):
     """
     SQLAlchemy model for mortgage applications.
@@ -17,6 +27,7 @@ class Mortgage(Base):
         loan_type (str): Type of loan (fixed/adjustable)
         property_type (str): Type of property (single_family/condo)
         credit_rating (str): Calculated credit rating (AAA/BBB/C)
+        rulebook_version (str): Version of the rating rulebook that produced credit_rating
         created_at (datetime): Creation timestamp
         updated_at (datetime): Last update timestamp
     """
@@ -32,10 +43,11 @@ class Mortgage(Base):
     loan_type = Column(String(20), nullable=False)
     property_type = Column(String(20), nullable=False)
     credit_rating = Column(String(10), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    rulebook_version = Column(String(64), nullable=True)
+    created_at = Column(Timestamp, server_default=func.now())
+    updated_at = Column(Timestamp, onupdate=func.now())
 
-    # Add constraints
+    # Add constraints and the composite indexes behind keyset pagination and filtered listing
     __table_args__ = (
         CheckConstraint('income > 0', name='check_income_positive'),
         CheckConstraint('credit_score >= 300 AND credit_score <= 850', name='check_credit_score_range'),
@@ -45,4 +57,166 @@ class Mortgage(Base):
         CheckConstraint("loan_type IN ('fixed', 'adjustable')", name='check_loan_type'),
         CheckConstraint("property_type IN ('single_family', 'condo')", name='check_property_type'),
         CheckConstraint("credit_rating IN ('AAA', 'BBB', 'C')", name='check_credit_rating'),
-    ) 
\ No newline at end of file
+        Index('ix_mortgages_created_at_id', 'created_at', 'id'),
+        Index('ix_mortgages_credit_rating_created_at_id', 'credit_rating', 'created_at', 'id'),
+        Index('ix_mortgages_loan_property_type_created_at_id', 'loan_type', 'property_type', 'created_at', 'id'),
+        Index('ix_mortgages_credit_score_created_at_id', 'credit_score', 'created_at', 'id'),
+        # Delta sync of the in-memory snapshot reads rows updated since its last sync
+        Index('ix_mortgages_updated_at', 'updated_at'),
+        # Name lookups and the database fallback of GET /mortgages/search
+        Index('ix_mortgages_applicant_name', 'applicant_name'),
+    ) 
+
+class MortgageArchive(Base):
+    """
+    SQLAlchemy model for a settled mortgage application moved out of the live table.
+
+    The archive job (app.jobs.archive) moves applications nobody has
+    changed for ARCHIVE_AFTER_DAYS here in batches, so listing, indexes and
+    backups of `mortgages` only cover the working set. Rows keep their id
+    and every column of Mortgage, so GET /mortgages/{id} falls through to
+    this table unchanged. Archived applications are read-only and no
+    longer count towards the credit score average or portfolio rollup. On
+    MySQL the table uses compressed InnoDB pages.
+
+    Attributes:
+        id (int): Primary key, the id the application had in `mortgages`
+        archived_at (datetime): When the row was moved
+        (remaining attributes as on Mortgage)
+    """
+    __tablename__ = "mortgages_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    applicant_name = Column(String(100), nullable=False)
+    income = Column(Float, nullable=False)
+    credit_score = Column(Integer, nullable=False)
+    loan_amount = Column(Float, nullable=False)
+    property_value = Column(Float, nullable=False)
+    debt_amount = Column(Float, nullable=False)
+    loan_type = Column(String(20), nullable=False)
+    property_type = Column(String(20), nullable=False)
+    credit_rating = Column(String(10), nullable=False)
+    rulebook_version = Column(String(64), nullable=True)
+    created_at = Column(Timestamp)
+    updated_at = Column(Timestamp)
+    archived_at = Column(Timestamp, server_default=func.now())
+
+    __table_args__ = (
+        # Range scans by age, e.g. to export or purge a year of the archive
+        Index('ix_mortgages_archive_created_at_id', 'created_at', 'id'),
+        {"mysql_row_format": "COMPRESSED"},
+    )
+
+class MortgageStats(Base):
+    """
+    SQLAlchemy model for one shard of the running credit score aggregate.
+    
+    The aggregate is spread over a fixed number of rows (see app.stats):
+    every write increments one shard and reads sum them, so the average
+    credit score never needs an AVG() scan of the mortgages table and
+    concurrent writers do not serialize on a single row lock.
+    
+    Attributes:
+        id (int): Shard number (1..STATS_SHARDS)
+        mortgage_count (int): Mortgages counted in this shard
+        credit_score_total (int): Sum of their credit scores
+        updated_at (datetime): Last update timestamp
+    """
+    __tablename__ = "mortgage_stats"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    mortgage_count = Column(Integer, nullable=False, default=0)
+    credit_score_total = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now())
+
+class MortgageRollup(Base):
+    """
+    SQLAlchemy model for one shard of one group of the portfolio rollup.
+    
+    Groups are keyed by credit rating, loan type, property type and credit
+    score band. Writes add their contribution to one shard of each affected
+    group in the same transaction as the mortgage change (see app.rollup),
+    so portfolio aggregates are read from at most a few hundred rows
+    whatever the size of the book.
+    
+    Attributes:
+        credit_rating (str): Credit rating of the group (AAA/BBB/C)
+        loan_type (str): Loan type of the group
+        property_type (str): Property type of the group
+        score_band (str): Credit score band of the group, e.g. "670-739"
+        shard (int): Shard number (1..ROLLUP_SHARDS)
+        mortgage_count (int): Mortgages in this shard of the group
+        loan_amount_total (float): Sum of their loan amounts
+        property_value_total (float): Sum of their property values
+        income_total (float): Sum of their incomes
+        debt_amount_total (float): Sum of their debt amounts
+        credit_score_total (int): Sum of their credit scores
+        ltv_total (float): Sum of their loan-to-value ratios
+        dti_total (float): Sum of their debt-to-income ratios
+    """
+    __tablename__ = "mortgage_rollup"
+
+    credit_rating = Column(String(10), primary_key=True)
+    loan_type = Column(String(20), primary_key=True)
+    property_type = Column(String(20), primary_key=True)
+    score_band = Column(String(10), primary_key=True)
+    shard = Column(Integer, primary_key=True, autoincrement=False)
+    mortgage_count = Column(Integer, nullable=False, default=0)
+    loan_amount_total = Column(Double, nullable=False, default=0)
+    property_value_total = Column(Double, nullable=False, default=0)
+    income_total = Column(Double, nullable=False, default=0)
+    debt_amount_total = Column(Double, nullable=False, default=0)
+    credit_score_total = Column(BigInteger, nullable=False, default=0)
+    ltv_total = Column(Double, nullable=False, default=0)
+    dti_total = Column(Double, nullable=False, default=0)
+
+class IdempotencyKey(Base):
+    """
+    SQLAlchemy model for the stored response of an idempotent request.
+    
+    A row is inserted in the same transaction as the mortgage it created,
+    and the primary key on `key` lets only one of several concurrent
+    submissions with the same key commit (see app.idempotency). Retries
+    are answered from this row without touching the mortgages table.
+    
+    Attributes:
+        key (str): The client's Idempotency-Key header
+        request_hash (str): SHA-256 of the canonical request body
+        status_code (int): HTTP status of the stored response
+        response_body (str): JSON body of the stored response
+        mortgage_id (int): Id of the mortgage the request created
+        created_at (datetime): Creation timestamp
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    mortgage_id = Column(Integer, nullable=True)
+    created_at = Column(Timestamp, server_default=func.now())
+
+class MortgageChangeEvent(Base):
+    """
+    SQLAlchemy model for one entry of the mortgage change feed.
+    
+    Every write inserts one row per affected mortgage in the same
+    transaction (a transactional outbox, see app.feed), so `seq` orders the
+    committed writes of all workers and jobs. Workers poll the table to
+    stream the events to subscribed clients.
+    
+    Attributes:
+        seq (int): Feed sequence number, increasing with every event
+        kind (str): created, updated, deleted or archived
+        mortgage_id (int): Id of the affected mortgage
+        created_at (datetime): Creation timestamp
+    """
+    __tablename__ = "mortgage_changes"
+
+    seq = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    kind = Column(String(10), nullable=False)
+    mortgage_id = Column(Integer, nullable=False)
+    created_at = Column(Timestamp, server_default=func.now())
+
+    # Never reuse the seq of a pruned event on SQLite either
+    __table_args__ = {"sqlite_autoincrement": True}
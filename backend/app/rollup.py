@@ -0,0 +1,364 @@
+"""
+Incrementally maintained portfolio rollup behind GET /mortgages/stats.
+
+The `mortgage_rollup` table holds count and sum measures per group of
+(credit_rating, loan_type, property_type, score_band), each group spread
+over ROLLUP_SHARDS rows. Every write adds its contribution to one shard of
+each group it touches, in the same transaction as the mortgage change, so
+the rollup never drifts from the table while concurrent writers rarely
+contend for the same row lock. Reads GROUP BY over at most
+groups x shards rows, which is constant whatever the size of the book.
+"""
+import bisect
+import logging
+import math
+import os
+import random
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .models import Mortgage, MortgageRollup
+
+logger = logging.getLogger(__name__)
+
+# Number of rows each group of the rollup is spread over
+ROLLUP_SHARDS = int(os.getenv("ROLLUP_SHARDS", "4"))
+
+# Credit score bands: (exclusive upper bound, label); the last band is open-ended
+SCORE_BANDS = (
+    (580, "300-579"),
+    (670, "580-669"),
+    (740, "670-739"),
+    (800, "740-799"),
+    (None, "800-850"),
+)
+_BAND_BOUNDS = [bound for bound, _ in SCORE_BANDS[:-1]]
+_BAND_LABELS = [label for _, label in SCORE_BANDS]
+
+GROUP_DIMENSIONS = ("credit_rating", "loan_type", "property_type", "score_band")
+MEASURES = (
+    "mortgage_count",
+    "loan_amount_total",
+    "property_value_total",
+    "income_total",
+    "debt_amount_total",
+    "credit_score_total",
+    "ltv_total",
+    "dti_total",
+)
+_INTEGER_MEASURES = ("mortgage_count", "credit_score_total")
+_CONTRIBUTING_COLUMNS = (
+    "credit_rating", "loan_type", "property_type", "credit_score",
+    "loan_amount", "property_value", "income", "debt_amount",
+)
+
+GroupKey = Tuple[str, str, str, str]
+
+
+def score_band(credit_score: int) -> str:
+    """
+    Get the label of the credit score band a score falls in.
+
+    Args:
+        credit_score (int): Credit score (300-850)
+
+    Returns:
+        str: The band label, e.g. "670-739"
+    """
+    return _BAND_LABELS[bisect.bisect_right(_BAND_BOUNDS, credit_score)]
+
+
+def score_band_expression():
+    """SQL expression computing score_band from Mortgage.credit_score."""
+    return case(
+        *((Mortgage.credit_score < bound, label) for bound, label in SCORE_BANDS[:-1]),
+        else_=SCORE_BANDS[-1][1]
+    )
+
+
+class RollupDeltas:
+    """
+    Accumulates the rollup changes of one transaction, per group.
+
+    Add mortgages as they are after the write and remove them as they were
+    before it; contributions that cancel out (e.g. a rename) write nothing.
+    Accepts ORM objects or dicts of column values.
+    """
+
+    def __init__(self):
+        self._deltas: Dict[GroupKey, List[float]] = defaultdict(lambda: [0] * len(MEASURES))
+
+    def add(self, mortgage, sign: int = 1) -> None:
+        """Add a mortgage's contribution (or subtract it with sign=-1)."""
+        if isinstance(mortgage, dict):
+            values = mortgage
+        else:
+            values = {column: getattr(mortgage, column) for column in _CONTRIBUTING_COLUMNS}
+        key = (
+            values["credit_rating"],
+            values["loan_type"],
+            values["property_type"],
+            score_band(values["credit_score"]),
+        )
+        contribution = (
+            1,
+            values["loan_amount"],
+            values["property_value"],
+            values["income"],
+            values["debt_amount"],
+            values["credit_score"],
+            values["loan_amount"] / values["property_value"],
+            values["debt_amount"] / values["income"],
+        )
+        totals = self._deltas[key]
+        for position, value in enumerate(contribution):
+            totals[position] += sign * value
+
+    def remove(self, mortgage) -> None:
+        """Subtract a mortgage's contribution."""
+        self.add(mortgage, -1)
+
+    def items(self) -> List[Tuple[GroupKey, Dict[str, float]]]:
+        """
+        Non-zero deltas in group order, so concurrent writers lock rows in the same order.
+
+        Returns:
+            List[Tuple[GroupKey, Dict[str, float]]]: Group key and measure deltas
+        """
+        return [
+            (key, dict(zip(MEASURES, totals)))
+            for key, totals in sorted(self._deltas.items())
+            if any(totals)
+        ]
+
+
+def _group_filter(key: GroupKey):
+    return [getattr(MortgageRollup, dimension) == value for dimension, value in zip(GROUP_DIMENSIONS, key)]
+
+
+def _delta_statement(key: GroupKey, shard: int, deltas: Dict[str, float]):
+    return (
+        update(MortgageRollup)
+        .where(*_group_filter(key), MortgageRollup.shard == shard)
+        .values({measure: getattr(MortgageRollup, measure) + delta for measure, delta in deltas.items()})
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _seed_statement(key: GroupKey, shard: int, totals: Dict[str, float] = None):
+    # Idempotent: concurrent seeders of the same row never collide
+    return (
+        insert(MortgageRollup)
+        .values(**dict(zip(GROUP_DIMENSIONS, key)), shard=shard, **(totals or dict.fromkeys(MEASURES, 0)))
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+    )
+
+
+def _pick_shard() -> int:
+    return random.randint(1, ROLLUP_SHARDS)
+
+
+def apply_rollup_deltas(db: Session, deltas: RollupDeltas) -> None:
+    """
+    Apply a write's rollup changes inside the caller's transaction.
+
+    Args:
+        db (Session): Database session
+        deltas (RollupDeltas): The accumulated changes
+    """
+    shard = _pick_shard()
+    for key, measures in deltas.items():
+        if db.execute(_delta_statement(key, shard, measures)).rowcount == 0:
+            # First mortgage of this group on this shard
+            db.execute(_seed_statement(key, shard))
+            db.execute(_delta_statement(key, shard, measures))
+
+
+async def apply_rollup_deltas_async(db: AsyncSession, deltas: RollupDeltas) -> None:
+    """
+    Async counterpart of apply_rollup_deltas for the API's sessions.
+
+    Args:
+        db (AsyncSession): Database session
+        deltas (RollupDeltas): The accumulated changes
+    """
+    shard = _pick_shard()
+    for key, measures in deltas.items():
+        if (await db.execute(_delta_statement(key, shard, measures))).rowcount == 0:
+            # First mortgage of this group on this shard
+            await db.execute(_seed_statement(key, shard))
+            await db.execute(_delta_statement(key, shard, measures))
+
+
+def _rollup_query(group_by: Sequence[str]):
+    dimensions = [getattr(MortgageRollup, dimension) for dimension in group_by]
+    count = func.sum(MortgageRollup.mortgage_count)
+    return (
+        select(*dimensions, *(func.sum(getattr(MortgageRollup, measure)) for measure in MEASURES))
+        .group_by(*dimensions)
+        .having(count > 0)
+        .order_by(*dimensions)
+    )
+
+
+def _recompute_query():
+    band = score_band_expression().label("score_band")
+    return (
+        select(
+            Mortgage.credit_rating,
+            Mortgage.loan_type,
+            Mortgage.property_type,
+            band,
+            func.count(Mortgage.id),
+            func.sum(Mortgage.loan_amount),
+            func.sum(Mortgage.property_value),
+            func.sum(Mortgage.income),
+            func.sum(Mortgage.debt_amount),
+            func.sum(Mortgage.credit_score),
+            func.sum(Mortgage.loan_amount / Mortgage.property_value),
+            func.sum(Mortgage.debt_amount / Mortgage.income),
+        )
+        .group_by(Mortgage.credit_rating, Mortgage.loan_type, Mortgage.property_type, band)
+    )
+
+
+def _totals(row: Sequence, dimensions: int) -> Dict[str, float]:
+    totals = dict(zip(MEASURES, row[dimensions:]))
+    for measure in _INTEGER_MEASURES:
+        totals[measure] = int(totals[measure] or 0)
+    return {measure: value or 0 for measure, value in totals.items()}
+
+
+def summarize_group(totals: Dict[str, float]) -> dict:
+    """
+    Turn summed measures into the exposure and averages reported per group.
+
+    Args:
+        totals (Dict[str, float]): Summed MEASURES of the group
+
+    Returns:
+        dict: Count, exposure and average LTV/DTI/credit score of the group
+    """
+    count = totals["mortgage_count"]
+    return {
+        "mortgage_count": count,
+        "loan_amount_total": totals["loan_amount_total"],
+        "avg_loan_amount": totals["loan_amount_total"] / count,
+        "avg_ltv": totals["ltv_total"] / count,
+        "avg_dti": totals["dti_total"] / count,
+        "avg_credit_score": totals["credit_score_total"] / count,
+        "weighted_ltv": totals["loan_amount_total"] / totals["property_value_total"],
+    }
+
+
+async def read_portfolio_stats_async(db: AsyncSession, group_by: Sequence[str]) -> List[dict]:
+    """
+    Read portfolio aggregates from the rollup, grouped by the given dimensions.
+
+    Args:
+        db (AsyncSession): Database session
+        group_by (Sequence[str]): Dimensions out of GROUP_DIMENSIONS; empty for book totals
+
+    Returns:
+        List[dict]: One entry per non-empty group, with its dimension values and summary
+    """
+    rows = (await db.execute(_rollup_query(group_by))).all()
+    return [
+        {**dict(zip(group_by, row[:len(group_by)])), **summarize_group(_totals(row, len(group_by)))}
+        for row in rows
+    ]
+
+
+def _read_rollup_groups(db: Session) -> Dict[GroupKey, Dict[str, float]]:
+    rows = db.execute(_rollup_query(GROUP_DIMENSIONS)).all()
+    return {tuple(row[:len(GROUP_DIMENSIONS)]): _totals(row, len(GROUP_DIMENSIONS)) for row in rows}
+
+
+def _recompute_groups(db: Session) -> Dict[GroupKey, Dict[str, float]]:
+    rows = db.execute(_recompute_query()).all()
+    return {tuple(row[:len(GROUP_DIMENSIONS)]): _totals(row, len(GROUP_DIMENSIONS)) for row in rows}
+
+
+def _totals_match(stored: Dict[str, float], recomputed: Dict[str, float]) -> bool:
+    # Incrementally summed floats drift by rounding error only
+    return all(
+        stored[measure] == recomputed[measure] if measure in _INTEGER_MEASURES
+        else math.isclose(stored[measure], recomputed[measure], rel_tol=1e-9, abs_tol=1e-6)
+        for measure in MEASURES
+    )
+
+
+def verify_rollup(db: Session) -> dict:
+    """
+    Compare the rollup with a full GROUP BY recompute over the mortgages table.
+
+    Args:
+        db (Session): Database session
+
+    Returns:
+        dict: Whether they agree, the groups checked and every mismatching group
+    """
+    stored = _read_rollup_groups(db)
+    recomputed = _recompute_groups(db)
+    empty = dict.fromkeys(MEASURES, 0)
+    mismatches = [
+        {
+            "group": dict(zip(GROUP_DIMENSIONS, key)),
+            "rollup": stored.get(key, empty),
+            "recomputed": recomputed.get(key, empty),
+        }
+        for key in sorted(set(stored) | set(recomputed))
+        if not _totals_match(stored.get(key, empty), recomputed.get(key, empty))
+    ]
+    if mismatches:
+        logger.warning(f"Portfolio rollup disagrees with the mortgages table in {len(mismatches)} groups")
+    return {
+        "consistent": not mismatches,
+        "groups_checked": len(set(stored) | set(recomputed)),
+        "mortgage_count": sum(totals["mortgage_count"] for totals in recomputed.values()),
+        "mismatches": mismatches,
+    }
+
+
+def rebuild_rollup(db: Session) -> int:
+    """
+    Recompute the rollup from scratch with a full GROUP BY scan.
+
+    Every group is written to shard 1. The caller is responsible for committing.
+
+    Args:
+        db (Session): Database session
+
+    Returns:
+        int: The number of groups written
+    """
+    recomputed = _recompute_groups(db)
+    db.execute(delete(MortgageRollup))
+    for key, totals in recomputed.items():
+        db.execute(_seed_statement(key, 1, totals))
+    logger.info(f"Rebuilt portfolio rollup: {len(recomputed)} groups")
+    return len(recomputed)
+
+
+def seed_rollup(connection) -> None:
+    """
+    Fill an empty rollup from the mortgages table.
+
+    Safe to run concurrently from several workers at startup; does nothing
+    once the rollup has any row.
+
+    Args:
+        connection: SQLAlchemy Connection (or Session) inside a transaction
+    """
+    if connection.execute(select(func.count()).select_from(MortgageRollup)).scalar():
+        return
+    recomputed = _recompute_groups(connection)
+    for key, totals in recomputed.items():
+        connection.execute(_seed_statement(key, 1, totals))
+    if recomputed:
+        logger.info(f"Seeded portfolio rollup: {len(recomputed)} groups")
@@ -0,0 +1,55 @@
+"""
+Database schema preparation at worker startup.
+
+The schema is owned by the Alembic migrations in `migrations/`: run
+`alembic upgrade head` before starting a new version of the API. Workers
+never create or alter tables on their own unless DB_AUTO_CREATE is set,
+which runs `create_all` for throwaway local databases and benchmarks.
+
+Nothing here runs at import time; the API calls prepare_database_async
+from its lifespan hook, so importing the app needs no database.
+"""
+import logging
+import os
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .database import Base
+from .rollup import seed_rollup
+from .stats import seed_credit_score_stats
+
+logger = logging.getLogger(__name__)
+
+# Create missing tables at startup instead of relying on migrations
+DB_AUTO_CREATE = os.getenv("DB_AUTO_CREATE", "false").lower() in ("1", "true", "yes")
+
+
+def prepare_database(connection, create: bool = DB_AUTO_CREATE) -> None:
+    """
+    Make the database ready to serve: optionally create tables, then seed derived tables.
+
+    Seeding fills the credit score stats shards and the portfolio rollup
+    from an existing book on first use; both are a single count query
+    afterwards and safe to run from several workers at once.
+
+    Args:
+        connection: SQLAlchemy Connection inside a transaction
+        create (bool): Whether to create missing tables first
+    """
+    if create:
+        Base.metadata.create_all(bind=connection)
+        logger.info("Database tables created")
+    seed_credit_score_stats(connection)
+    seed_rollup(connection)
+
+
+async def prepare_database_async(engine: AsyncEngine, create: bool = DB_AUTO_CREATE) -> None:
+    """
+    Run prepare_database on a connection of an async engine.
+
+    Args:
+        engine (AsyncEngine): Engine of the primary database
+        create (bool): Whether to create missing tables first
+    """
+    async with engine.begin() as connection:
+        await connection.run_sync(prepare_database, create)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional, Union
 
 class MortgageBase(BaseModel):
     """
@@ -36,13 +36,297 @@ class Mortgage(MortgageBase):
     Additional Attributes:
         id (int): Unique identifier
         credit_rating (str): Calculated credit rating (AAA/BBB/C)
+        rulebook_version (Optional[str]): Version of the rating rulebook that produced credit_rating
         created_at (datetime): Creation timestamp
         updated_at (Optional[datetime]): Last update timestamp
     """
     id: int
     credit_rating: str = Field(..., pattern="^(AAA|BBB|C)$")
+    rulebook_version: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class BulkMortgageResult(BaseModel):
+    """
+    Outcome of a single row in a bulk mortgage submission.
+    
+    Attributes:
+        index (int): Zero-based position of the row in the submitted batch
+        id (Optional[int]): Identifier of the created mortgage, if it was stored
+        credit_rating (Optional[str]): Calculated credit rating, if it was stored
+        error (Optional[str]): Why the row was rejected, if it was not stored
+    """
+    index: int
+    id: Optional[int] = None
+    credit_rating: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkMortgageResponse(BaseModel):
+    """
+    Pydantic model for the result of a bulk mortgage submission.
+    
+    Attributes:
+        created (int): Number of rows stored
+        failed (int): Number of rows rejected
+        truncated (bool): Whether an NDJSON stream was cut off at the row limit
+        results (List[BulkMortgageResult]): Per-row outcome, in submission order
+    """
+    created: int
+    failed: int
+    truncated: bool = False
+    results: List[BulkMortgageResult]
+
+class PortfolioGroup(BaseModel):
+    """
+    Pydantic model for the aggregates of one group of the mortgage book.
+    
+    Attributes:
+        credit_rating (Optional[str]): Credit rating of the group, when grouped by it
+        loan_type (Optional[str]): Loan type of the group, when grouped by it
+        property_type (Optional[str]): Property type of the group, when grouped by it
+        score_band (Optional[str]): Credit score band of the group, when grouped by it
+        mortgage_count (int): Number of mortgages
+        loan_amount_total (float): Total loan amount (exposure)
+        avg_loan_amount (float): Average loan amount
+        avg_ltv (float): Average loan-to-value ratio
+        avg_dti (float): Average debt-to-income ratio
+        avg_credit_score (float): Average credit score
+        weighted_ltv (float): Total loan amount over total property value
+    """
+    credit_rating: Optional[str] = None
+    loan_type: Optional[str] = None
+    property_type: Optional[str] = None
+    score_band: Optional[str] = None
+    mortgage_count: int
+    loan_amount_total: float
+    avg_loan_amount: float
+    avg_ltv: float
+    avg_dti: float
+    avg_credit_score: float
+    weighted_ltv: float
+
+class PortfolioStats(BaseModel):
+    """
+    Pydantic model for portfolio risk aggregates.
+    
+    Attributes:
+        group_by (List[str]): Dimensions the groups are split by
+        total (Optional[PortfolioGroup]): Aggregates over the whole book (None when it is empty)
+        groups (List[PortfolioGroup]): Aggregates per non-empty group
+    """
+    group_by: List[str]
+    total: Optional[PortfolioGroup] = None
+    groups: List[PortfolioGroup]
+
+class RatingBand(BaseModel):
+    """
+    Pydantic model for the band of a rulebook factor a value falls in.
+    
+    Attributes:
+        lower (Optional[float]): Lower bound (None when unbounded)
+        upper (Optional[float]): Upper bound (None when unbounded)
+        ties (str): "lower" when a value equal to a bound belongs to the band below it, "upper" otherwise
+    """
+    lower: Optional[float] = None
+    upper: Optional[float] = None
+    ties: str
+
+class FactorContribution(BaseModel):
+    """
+    Pydantic model for the points one rulebook factor adds to the risk score.
+    
+    Attributes:
+        factor (str): ltv, dti, credit_score, loan_type, property_type or avg_credit_score
+        value (Union[int, float, str]): The factor's input value
+        points (float): Points added to the risk score
+        band (Optional[RatingBand]): The band the value falls in (banded factors only)
+    """
+    factor: str
+    value: Union[int, float, str]
+    points: float
+    band: Optional[RatingBand] = None
+
+class RatingChange(BaseModel):
+    """
+    Pydantic model for the smallest change of one field that moves a rating.
+    
+    Attributes:
+        field (str): The application field to change
+        current (Union[int, float, str]): Its current value
+        required (Union[int, float, str]): The closest value giving the new rating
+        change (Optional[float]): required - current (None for loan and property type)
+        rating (str): The resulting credit rating
+    """
+    field: str
+    current: Union[int, float, str]
+    required: Union[int, float, str]
+    change: Optional[float] = None
+    rating: str
+
+class RatingExplanation(BaseModel):
+    """
+    Pydantic model explaining a credit rating.
+    
+    Attributes:
+        rating (str): The credit rating
+        risk_score (float): Sum of the factor points
+        rulebook_version (str): Version of the rulebook used
+        avg_credit_score (float): Average credit score used for the adjustment
+        factors (List[FactorContribution]): Points per factor
+        rating_thresholds (dict): Risk score cut-offs and their rating labels
+        target_rating (str): Rating the upgrades aim for
+        upgrade (List[RatingChange]): Per field, the smallest change reaching target_rating
+        downgrade (List[RatingChange]): Per field, the smallest change dropping to a worse rating
+    """
+    rating: str
+    risk_score: float
+    rulebook_version: str
+    avg_credit_score: float
+    factors: List[FactorContribution]
+    rating_thresholds: dict
+    target_rating: str
+    upgrade: List[RatingChange]
+    downgrade: List[RatingChange]
+
+class WhatIfRange(BaseModel):
+    """
+    Pydantic model for evenly spaced values of a what-if field.
+    
+    Attributes:
+        start (float): First value
+        stop (float): Last value (inclusive)
+        steps (int): Number of values
+    """
+    start: float
+    stop: float
+    steps: int = Field(..., ge=1, le=10000)
+
+class WhatIfRequest(BaseModel):
+    """
+    Pydantic model for a what-if simulation request.
+    
+    Attributes:
+        mortgage (MortgageCreate): The applicant the scenarios start from
+        vary (Dict[str, Union[List[Union[int, float, str]], WhatIfRange]]): Values to try per field
+            (loan_amount, property_value, income, debt_amount, credit_score, loan_type,
+            property_type, avg_credit_score); every combination is evaluated
+    """
+    mortgage: MortgageCreate
+    vary: Dict[str, Union[List[Union[int, float, str]], WhatIfRange]] = Field(default_factory=dict)
+
+class WhatIfResponse(BaseModel):
+    """
+    Pydantic model for what-if simulation results, one list entry per scenario.
+    
+    Attributes:
+        scenarios (int): Number of scenarios evaluated
+        rulebook_version (str): Version of the rulebook used
+        values (Dict[str, list]): Value of every varied field per scenario
+        risk_score (List[float]): Risk score per scenario
+        rating (List[str]): Credit rating per scenario
+        rating_counts (Dict[str, int]): Number of scenarios per rating
+    """
+    scenarios: int
+    rulebook_version: str
+    values: Dict[str, list]
+    risk_score: List[float]
+    rating: List[str]
+    rating_counts: Dict[str, int]
+
+class MortgageSegment(BaseModel):
+    """
+    Pydantic model selecting the mortgages a bulk update or delete applies to.
+    
+    Every criterion that is set must match; the listing filters mean the
+    same as on GET /mortgages.
+    
+    Attributes:
+        credit_rating (Optional[str]): Only this credit rating
+        loan_type (Optional[str]): Only this loan type
+        property_type (Optional[str]): Only this property type
+        min_credit_score (Optional[int]): Minimum credit score (inclusive)
+        max_credit_score (Optional[int]): Maximum credit score (inclusive)
+        min_ltv (Optional[float]): Minimum loan-to-value ratio (inclusive)
+        max_ltv (Optional[float]): Maximum loan-to-value ratio (inclusive)
+        applicant_name_prefix (Optional[str]): Only applicants whose name starts with this
+        created_after (Optional[datetime]): Only applications created at or after this time
+        created_before (Optional[datetime]): Only applications created before this time
+        rulebook_version (Optional[str]): Only ratings produced by this rulebook version
+    """
+    credit_rating: Optional[str] = Field(None, pattern="^(AAA|BBB|C)$")
+    loan_type: Optional[str] = Field(None, pattern="^(fixed|adjustable)$")
+    property_type: Optional[str] = Field(None, pattern="^(single_family|condo)$")
+    min_credit_score: Optional[int] = Field(None, ge=300, le=850)
+    max_credit_score: Optional[int] = Field(None, ge=300, le=850)
+    min_ltv: Optional[float] = Field(None, ge=0)
+    max_ltv: Optional[float] = Field(None, ge=0)
+    applicant_name_prefix: Optional[str] = Field(None, min_length=1, max_length=100)
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    rulebook_version: Optional[str] = None
+
+class MortgageChanges(BaseModel):
+    """
+    Pydantic model for the values a bulk update writes to every matching mortgage.
+    
+    Fields left out keep each mortgage's own value; the credit rating is
+    recalculated either way.
+    
+    Attributes:
+        income (Optional[float]): Annual income (must be positive)
+        credit_score (Optional[int]): Credit score (300-850)
+        loan_amount (Optional[float]): Requested loan amount (must be positive)
+        property_value (Optional[float]): Value of the property (must be positive)
+        debt_amount (Optional[float]): Existing debt amount (must be non-negative)
+        loan_type (Optional[str]): Type of loan (fixed/adjustable)
+        property_type (Optional[str]): Type of property (single_family/condo)
+    """
+    income: Optional[float] = Field(None, gt=0)
+    credit_score: Optional[int] = Field(None, ge=300, le=850)
+    loan_amount: Optional[float] = Field(None, gt=0)
+    property_value: Optional[float] = Field(None, gt=0)
+    debt_amount: Optional[float] = Field(None, ge=0)
+    loan_type: Optional[str] = Field(None, pattern="^(fixed|adjustable)$")
+    property_type: Optional[str] = Field(None, pattern="^(single_family|condo)$")
+
+class BulkDeleteRequest(BaseModel):
+    """
+    Pydantic model for deleting every mortgage in a segment.
+    
+    Attributes:
+        filter (MortgageSegment): The mortgages to delete
+        dry_run (bool): Only count the matching mortgages
+    """
+    filter: MortgageSegment
+    dry_run: bool = False
+
+class BulkUpdateRequest(BaseModel):
+    """
+    Pydantic model for updating every mortgage in a segment.
+    
+    Attributes:
+        filter (MortgageSegment): The mortgages to update
+        set (MortgageChanges): Values to write; empty to only rescore the segment
+        dry_run (bool): Only count the matching mortgages
+    """
+    filter: MortgageSegment
+    set: MortgageChanges = Field(default_factory=MortgageChanges)
+    dry_run: bool = False
+
+class BulkFilterResult(BaseModel):
+    """
+    Pydantic model for the outcome of a bulk update or delete by filter.
+    
+    Attributes:
+        matched (int): Mortgages that matched the filter
+        affected (int): Mortgages deleted, or updated because a value or their rating changed
+        batches (int): Transactions the work was split into
+        dry_run (bool): Whether nothing was written
+    """
+    matched: int
+    affected: int
+    batches: int
+    dry_run: bool
@@ -0,0 +1,449 @@
+"""
+In-process trigram index of applicant names for GET /mortgages/search.
+
+With SEARCH_INDEX_ENABLED each worker indexes every applicant name by its
+trigrams, the way PostgreSQL's pg_trgm does: the name is case-folded,
+stripped of accents and split into words, each word is padded with two
+spaces in front and one behind, and every three-character window is a
+trigram. A posting list per trigram holds the slots of the names that
+contain it. That supports two searches:
+- prefix: names with a word starting with each query word ("jo smi"
+  finds "John Smith"). The padded leading trigrams pin the word start,
+  so the posting lists are intersected and only longer query words need
+  checking against the stored name.
+- fuzzy: names containing most of the query's trigrams, ranked by the
+  share of them they contain and then by overall similarity, so typos and
+  transpositions still match ("jonh smiht" finds "John Smith").
+Posting lists are counted and intersected with NumPy, so a search costs
+milliseconds at millions of names.
+
+Names are stored case-folded, UTF-8 encoded back to back in one
+bytearray, like in the snapshot (app.snapshot). An id -> slot array
+finds a mortgage's name. An update appends the new name in a new slot
+and leaves the old one dead until the next reload.
+
+The index loads in the background at startup and then follows the change
+feed (app.feed), which carries every committed create, update and delete
+of all workers and jobs, so it needs CHANGE_FEED_ENABLED. Names changed
+outside the API show up after the reload every SEARCH_RELOAD_INTERVAL
+seconds. Until the first load completes, searches query the database.
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from . import changes, metrics
+from .feed import change_feed
+from .models import Mortgage
+from .serialization import MORTGAGE_FIELD_NAMES
+
+logger = logging.getLogger(__name__)
+
+# Keep the in-memory name index and serve GET /mortgages/search from it
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Share of the query's trigrams a name must contain to be a fuzzy match
+SEARCH_FUZZY_THRESHOLD = float(os.getenv("SEARCH_FUZZY_THRESHOLD", "0.4"))
+
+# Seconds between full reloads, which also drop the slots of replaced and deleted names
+SEARCH_RELOAD_INTERVAL = float(os.getenv("SEARCH_RELOAD_INTERVAL", "3600"))
+
+LOAD_BATCH_SIZE = 10000
+INITIAL_CAPACITY = 1024
+UNKNOWN_ID = -1
+
+# Position of applicant_name in the mortgage columns of change feed rows (after seq, kind, id)
+_FEED_NAME_INDEX = 3 + MORTGAGE_FIELD_NAMES.index("applicant_name")
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def name_words(name: str) -> List[str]:
+    """
+    Normalize a name for matching and split it into words.
+
+    Args:
+        name (str): Applicant name or search query
+
+    Returns:
+        List[str]: Case-folded words without accents or punctuation
+    """
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _SEPARATORS.sub(" ", stripped).split()
+
+
+def trigrams(words: Iterable[str], prefix: bool = False) -> Set[str]:
+    """
+    The distinct padded trigrams of some words.
+
+    Args:
+        words (Iterable[str]): Normalized words
+        prefix (bool): Pad only the front of each word, for words that are prefixes
+
+    Returns:
+        Set[str]: The trigrams
+    """
+    grams = set()
+    for word in words:
+        padded = f"  {word}" if prefix else f"  {word} "
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+
+class NameIndex:
+    """
+    Trigram posting lists over the applicant names of the mortgages held.
+
+    Args:
+        capacity (int): Slots to allocate up front
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.postings: Dict[str, array] = {}
+        self.names = bytearray()
+        self.size = 0
+        self.dead_count = 0
+        self.arrays = {
+            "id": np.zeros(capacity, np.int32),
+            "alive": np.zeros(capacity, np.bool_),
+            "trigram_count": np.zeros(capacity, np.uint16),
+            "name_start": np.zeros(capacity, np.int64),
+            "name_length": np.zeros(capacity, np.uint16),
+        }
+        self.slot_by_id = np.full(capacity, UNKNOWN_ID, np.int32)
+
+    def __len__(self) -> int:
+        """Number of names held."""
+        return self.size - self.dead_count
+
+    def nbytes(self) -> int:
+        """Bytes allocated for posting lists, names and slot arrays."""
+        return (
+            sum(posting.itemsize * len(posting) for posting in self.postings.values())
+            + len(self.names)
+            + sum(array.nbytes for array in self.arrays.values())
+            + self.slot_by_id.nbytes
+        )
+
+    def upsert(self, rows: Iterable[Tuple[int, str]]) -> int:
+        """
+        Index new names and replace changed ones.
+
+        Args:
+            rows (Iterable[Tuple[int, str]]): Mortgage ids and applicant names
+
+        Returns:
+            int: Names added or replaced
+        """
+        indexed = 0
+        for mortgage_id, name in rows:
+            words = name_words(name)
+            encoded = " ".join(words).encode()
+            slot = self._slot(mortgage_id)
+            if slot != UNKNOWN_ID:
+                if self._name(slot) == encoded:
+                    continue
+                self._kill(slot)
+            self._append(mortgage_id, words, encoded)
+            indexed += 1
+        return indexed
+
+    def delete(self, ids: Iterable[int]) -> int:
+        """
+        Drop the names of deleted mortgages.
+
+        Args:
+            ids (Iterable[int]): Mortgage ids
+
+        Returns:
+            int: Names dropped
+        """
+        dropped = 0
+        for mortgage_id in ids:
+            slot = self._slot(mortgage_id)
+            if slot != UNKNOWN_ID:
+                self._kill(slot)
+                self.slot_by_id[mortgage_id] = UNKNOWN_ID
+                dropped += 1
+        return dropped
+
+    def prefix(self, query: str, limit: int) -> List[int]:
+        """
+        Find names with a word starting with every word of the query.
+
+        Args:
+            query (str): Search text
+            limit (int): Maximum number of ids to return
+
+        Returns:
+            List[int]: Ids of the matching mortgages, lowest first
+        """
+        words = name_words(query)
+        slots = self._intersect(trigrams(words, prefix=True))
+        if slots is None:
+            return []
+        ids = self.arrays["id"][slots]
+        # Up to two characters a word is pinned by its leading trigrams alone
+        if all(len(word) <= 2 for word in words):
+            if len(ids) > limit:
+                ids = np.partition(ids, limit)[:limit]
+            return np.sort(ids).tolist()
+        found = []
+        for slot in slots[np.argsort(ids, kind="stable")]:
+            name_words_held = self._name(slot).decode().split()
+            if all(any(held.startswith(word) for held in name_words_held) for word in words):
+                found.append(int(self.arrays["id"][slot]))
+                if len(found) == limit:
+                    break
+        return found
+
+    def fuzzy(self, query: str, limit: int, threshold: float = SEARCH_FUZZY_THRESHOLD) -> List[Tuple[int, float]]:
+        """
+        Find the names most similar to the query, tolerating typos.
+
+        A name's score is the share of the query's trigrams it contains;
+        ties go to the name with the fewest other trigrams, then the lowest id.
+
+        Args:
+            query (str): Search text
+            limit (int): Maximum number of matches to return
+            threshold (float): Minimum score of a match
+
+        Returns:
+            List[Tuple[int, float]]: Ids of the matching mortgages and their scores, best first
+        """
+        grams = trigrams(name_words(query))
+        postings = [self._posting(gram) for gram in grams if gram in self.postings]
+        if not postings:
+            return []
+        shared = np.bincount(np.concatenate(postings), minlength=self.size)
+        slots = np.flatnonzero(shared >= max(1, threshold * len(grams)))
+        slots = slots[self.arrays["alive"][slots]]
+        common = shared[slots]
+        score = common / len(grams)
+        similarity = common / (len(grams) + self.arrays["trigram_count"][slots] - common)
+        ids = self.arrays["id"][slots]
+        order = np.lexsort((ids, -similarity, -score))[:limit]
+        return [(int(ids[index]), round(float(score[index]), 3)) for index in order]
+
+    def _intersect(self, grams: Set[str]) -> Optional[np.ndarray]:
+        """Live slots in every posting list of `grams`, or None if some trigram is unknown."""
+        if not grams or any(gram not in self.postings for gram in grams):
+            return None
+        postings = sorted((self._posting(gram) for gram in grams), key=len)
+        slots = postings[0]
+        for posting in postings[1:]:
+            slots = np.intersect1d(slots, posting, assume_unique=True)
+        return slots[self.arrays["alive"][slots]]
+
+    def _posting(self, gram: str) -> np.ndarray:
+        # A copy: a view would stop the array from growing while it is alive
+        return np.frombuffer(self.postings[gram], np.int32).copy()
+
+    def _slot(self, mortgage_id: int) -> int:
+        if mortgage_id >= len(self.slot_by_id):
+            return UNKNOWN_ID
+        return int(self.slot_by_id[mortgage_id])
+
+    def _name(self, slot: int) -> bytes:
+        start = int(self.arrays["name_start"][slot])
+        return bytes(self.names[start:start + int(self.arrays["name_length"][slot])])
+
+    def _kill(self, slot: int) -> None:
+        self.arrays["alive"][slot] = False
+        self.dead_count += 1
+
+    def _append(self, mortgage_id: int, words: List[str], encoded: bytes) -> None:
+        self._reserve(self.size + 1)
+        self._reserve_ids(mortgage_id)
+        slot = self.size
+        grams = trigrams(words)
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array("i")
+            posting.append(slot)
+        self.arrays["id"][slot] = mortgage_id
+        self.arrays["alive"][slot] = True
+        self.arrays["trigram_count"][slot] = len(grams)
+        self.arrays["name_start"][slot] = len(self.names)
+        self.arrays["name_length"][slot] = len(encoded)
+        self.names += encoded
+        self.slot_by_id[mortgage_id] = slot
+        self.size += 1
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self.arrays["id"])
+        if size <= capacity:
+            return
+        capacity = max(size, capacity + capacity // 4, INITIAL_CAPACITY)
+        for name, values in self.arrays.items():
+            grown = np.zeros(capacity, values.dtype)
+            grown[:self.size] = values[:self.size]
+            self.arrays[name] = grown
+
+    def _reserve_ids(self, max_id: int) -> None:
+        if max_id < len(self.slot_by_id):
+            return
+        capacity = len(self.slot_by_id)
+        grown = np.full(max(max_id + 1, capacity + capacity // 4, INITIAL_CAPACITY), UNKNOWN_ID, np.int32)
+        grown[:capacity] = self.slot_by_id
+        self.slot_by_id = grown
+
+
+class NameSearch:
+    """
+    This worker's name index and the task keeping it current.
+
+    Args:
+        reload_interval (float): Seconds between full reloads
+    """
+
+    def __init__(self, reload_interval: float = SEARCH_RELOAD_INTERVAL):
+        self.reload_interval = reload_interval
+        self.index = NameIndex()
+        self.engine: Optional[AsyncEngine] = None
+        self.ready = False
+        self._loading = False
+        # Change feed rows that arrived while the table was being read
+        self._pending: List[Sequence] = []
+        self._loaded_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        change_feed.consume(self.apply_rows)
+
+    @property
+    def serving(self) -> bool:
+        """Whether searches may be answered from the index."""
+        return self.ready and change_feed.running
+
+    def snapshot(self) -> dict:
+        """
+        Describe the index for monitoring.
+
+        Returns:
+            dict: Readiness, names, dead slots, trigrams, bytes and load age
+        """
+        return {
+            "ready": self.ready,
+            "serving": self.serving,
+            "names": len(self.index),
+            "dead_slots": self.index.dead_count,
+            "trigrams": len(self.index.postings),
+            "bytes": self.index.nbytes(),
+            "seconds_since_load": round(time.monotonic() - self._loaded_at, 3) if self.ready else None,
+        }
+
+    async def start(self, engine: AsyncEngine) -> None:
+        """
+        Start loading the index in the background, then keep it current.
+
+        Args:
+            engine (AsyncEngine): Engine of the primary database
+        """
+        if not change_feed.running:
+            logger.warning("The name search index follows the change feed; set CHANGE_FEED_ENABLED=true to use it")
+            return
+        self.engine = engine
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop following changes and drop the index."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.engine = None
+        self.ready = False
+        self.index = NameIndex()
+        self._pending.clear()
+
+    async def reload(self) -> int:
+        """
+        Replace the index with a fresh full read of the table.
+
+        Change feed rows received while the table is being read are applied
+        to the new index before it starts serving.
+
+        Returns:
+            int: Names loaded
+        """
+        started = time.perf_counter()
+        self._loading = True
+        self._pending.clear()
+        try:
+            index = NameIndex()
+            statement = (
+                select(Mortgage.id, Mortgage.applicant_name)
+                .order_by(Mortgage.id)
+                .execution_options(stream_results=True, yield_per=LOAD_BATCH_SIZE)
+            )
+            async with self.engine.connect() as connection:
+                result = await connection.stream(statement)
+                async for partition in result.partitions():
+                    index.upsert(partition)
+            self._apply(index, self._pending)
+        finally:
+            self._loading = False
+            self._pending.clear()
+        self.index = index
+        self.ready = True
+        self._loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(index)} applicant names into the search index in {time.perf_counter() - started:.2f}s")
+        return len(index)
+
+    def apply_rows(self, rows: List[Sequence]) -> None:
+        """
+        Apply a batch of change feed rows; the change feed calls this.
+
+        Args:
+            rows (List[Sequence]): Joined change feed rows, in seq order
+        """
+        if self._loading:
+            self._pending.extend(rows)
+        if self.ready:
+            self._apply(self.index, rows)
+
+    def prefix(self, query: str, limit: int) -> List[int]:
+        """Prefix search; see NameIndex.prefix."""
+        return self.index.prefix(query, limit)
+
+    def fuzzy(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        """Fuzzy search; see NameIndex.fuzzy."""
+        return self.index.fuzzy(query, limit)
+
+    @staticmethod
+    def _apply(index: NameIndex, rows: List[Sequence]) -> None:
+        for row in rows:
+            name = row[_FEED_NAME_INDEX]
+            if row[1] == changes.DELETED or name is None:
+                index.delete([row[2]])
+            else:
+                index.upsert([(row[2], name)])
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(f"Failed to load the name search index: {str(e)}")
+                await asyncio.sleep(5)
+                continue
+            await asyncio.sleep(self.reload_interval)
+
+
+name_search = NameSearch()
+metrics.search_index_size.set_function(lambda: len(name_search.index), "names")
+metrics.search_index_size.set_function(lambda: name_search.index.nbytes(), "bytes")
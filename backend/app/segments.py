@@ -0,0 +1,177 @@
+"""
+Set-based updates and deletes of every mortgage matching a filter.
+
+A segment (e.g. every adjustable-rate condo, or the applications a test
+run created) is written in batches of BULK_FILTER_BATCH_SIZE rows in id
+order, each in its own short transaction, so a large segment never holds
+its locks for the whole run and other writers interleave between batches.
+
+Per batch the matching rows are locked and read as column tuples (never
+ORM objects), then written back with one statement per batch: a single
+DELETE over the batch's id range and the filter, or one UPDATE per
+resulting credit rating. Ratings are recalculated with the vectorized
+engine for the whole batch at once, and only rows whose values or rating
+actually change are written. Each batch applies its credit score and
+rollup deltas and records its change feed events in the same transaction,
+as the single-row endpoints do.
+"""
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import changes
+from .feed import record_changes_async
+from .jobs.rescore import UPDATE_BATCH_SIZE
+from .models import Mortgage
+from .rollup import RollupDeltas, apply_rollup_deltas_async
+from .stats import apply_credit_score_delta_async, credit_score_stats
+from .utils.credit_rating import RATING_COLUMNS, calculate_credit_ratings
+from .utils.rulebook import rulebook_loader
+
+# Rows per transaction of a bulk update or delete by filter
+BULK_FILTER_BATCH_SIZE = int(os.getenv("BULK_FILTER_BATCH_SIZE", "5000"))
+
+# Columns read per row: everything the rating and the portfolio rollup depend on
+_ROW_COLUMNS = (
+    Mortgage.id,
+    Mortgage.credit_rating,
+    Mortgage.rulebook_version,
+    *(getattr(Mortgage, column) for column in RATING_COLUMNS),
+)
+
+
+async def count_segment(db: AsyncSession, clauses: List) -> int:
+    """Count the mortgages matching `clauses`."""
+    return await db.scalar(select(func.count()).select_from(Mortgage).where(*clauses))
+
+
+async def _lock_batch(db: AsyncSession, clauses: List, after_id: int, batch_size: int) -> list:
+    """
+    Lock and read the next matching rows after `after_id`, in id order.
+
+    The rows are locked (SELECT ... FOR UPDATE where supported), so a
+    concurrent API write either commits first, and is read here, or waits
+    for the batch to commit.
+    """
+    return (await db.execute(
+        select(*_ROW_COLUMNS)
+        .where(Mortgage.id > after_id, *clauses)
+        .order_by(Mortgage.id)
+        .limit(batch_size)
+        .with_for_update()
+    )).all()
+
+
+async def delete_segment(db: AsyncSession, clauses: List, batch_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Delete every mortgage matching `clauses`, one transaction per batch.
+
+    Args:
+        db (AsyncSession): Database session; each batch is committed on it
+        clauses (List): SQL criteria selecting the mortgages
+        batch_size (Optional[int]): Most rows per transaction (default: BULK_FILTER_BATCH_SIZE)
+
+    Returns:
+        Dict[str, int]: Rows matched, rows deleted and batches committed
+    """
+    batch_size = batch_size or BULK_FILTER_BATCH_SIZE
+    matched = deleted = batches = 0
+    after_id = 0
+    while True:
+        rows = await _lock_batch(db, clauses, after_id, batch_size)
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+        result = await db.execute(
+            delete(Mortgage.__table__).where(Mortgage.id.between(ids[0], ids[-1]), *clauses)
+        )
+        rollup = RollupDeltas()
+        for row in rows:
+            rollup.remove(row._asdict())
+        score_delta = -sum(row.credit_score for row in rows)
+        await apply_rollup_deltas_async(db, rollup)
+        await apply_credit_score_delta_async(db, -len(rows), score_delta)
+        await record_changes_async(db, changes.DELETED, ids)
+        await db.commit()
+        credit_score_stats.apply(-len(rows), score_delta)
+        await changes.publish(changes.DELETED, ids)
+        matched += len(rows)
+        deleted += result.rowcount
+        batches += 1
+        after_id = ids[-1]
+    return {"matched": matched, "affected": deleted, "batches": batches}
+
+
+async def update_segment(
+    db: AsyncSession,
+    clauses: List,
+    values: dict,
+    batch_size: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Write `values` to every mortgage matching `clauses` and rescore it, one transaction per batch.
+
+    Every row is rated with its new values against the active rulebook and
+    the average credit score as of the start of the run. Rows whose values,
+    rating and rulebook version are all unchanged are not written.
+
+    Args:
+        db (AsyncSession): Database session; each batch is committed on it
+        clauses (List): SQL criteria selecting the mortgages
+        values (dict): Column values to write; empty to only rescore
+        batch_size (Optional[int]): Most rows per transaction (default: BULK_FILTER_BATCH_SIZE)
+
+    Returns:
+        Dict[str, int]: Rows matched, rows updated and batches committed
+    """
+    batch_size = batch_size or BULK_FILTER_BATCH_SIZE
+    rulebook = rulebook_loader.current()
+    avg_credit_score = await credit_score_stats.average_async(db)
+    matched = updated = batches = 0
+    after_id = 0
+    while True:
+        rows = await _lock_batch(db, clauses, after_id, batch_size)
+        if not rows:
+            break
+        columns = dict(zip(RATING_COLUMNS, (np.asarray(column) for column in list(zip(*rows))[3:])))
+        for column, value in values.items():
+            columns[column] = np.full(len(rows), value)
+        ratings = calculate_credit_ratings(columns, avg_credit_score, rulebook)
+
+        ids_by_rating = defaultdict(list)
+        rollup = RollupDeltas()
+        score_delta = 0
+        for row, rating in zip(rows, ratings.tolist()):
+            before = row._asdict()
+            after = {**before, **values, "credit_rating": rating, "rulebook_version": rulebook.version}
+            if after == before:
+                continue
+            ids_by_rating[rating].append(row.id)
+            rollup.remove(before)
+            rollup.add(after)
+            score_delta += after["credit_score"] - before["credit_score"]
+        changed_ids = sorted(mortgage_id for rating_ids in ids_by_rating.values() for mortgage_id in rating_ids)
+        for rating, rating_ids in ids_by_rating.items():
+            for offset in range(0, len(rating_ids), UPDATE_BATCH_SIZE):
+                await db.execute(
+                    update(Mortgage.__table__)
+                    .where(Mortgage.__table__.c.id.in_(rating_ids[offset:offset + UPDATE_BATCH_SIZE]))
+                    .values(**values, credit_rating=rating, rulebook_version=rulebook.version)
+                )
+        if changed_ids:
+            await apply_rollup_deltas_async(db, rollup)
+            await apply_credit_score_delta_async(db, 0, score_delta)
+            await record_changes_async(db, changes.UPDATED, changed_ids)
+        await db.commit()
+        if changed_ids:
+            credit_score_stats.apply(0, score_delta)
+            await changes.publish(changes.UPDATED, changed_ids)
+        matched += len(rows)
+        updated += len(changed_ids)
+        batches += 1
+        after_id = rows[-1].id
+    return {"matched": matched, "affected": updated, "batches": batches}
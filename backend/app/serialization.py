@@ -0,0 +1,61 @@
+"""
+Zero-ORM JSON encoding of mortgage rows.
+
+Read paths select plain column tuples with Core `select()` and encode them
+straight to JSON bytes. Rows come from our own table, already validated on
+the way in, so they are not re-validated against `schemas.Mortgage`; the
+column list mirrors its fields, in order, so the output is the same JSON
+the response model would produce. orjson is used when installed (it
+encodes datetimes natively); otherwise the standard library encoder is.
+"""
+import json
+from datetime import datetime
+from typing import Iterable, Sequence
+
+from . import schemas
+from .models import Mortgage, MortgageArchive
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# Columns of a listed mortgage, in schemas.Mortgage field order
+MORTGAGE_COLUMNS = tuple(getattr(Mortgage, name) for name in schemas.Mortgage.model_fields)
+MORTGAGE_FIELD_NAMES = tuple(column.key for column in MORTGAGE_COLUMNS)
+# The same columns of the archive table, for reads that fall through to it
+ARCHIVED_MORTGAGE_COLUMNS = tuple(getattr(MortgageArchive, name) for name in MORTGAGE_FIELD_NAMES)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def dumps(value) -> bytes:
+    """
+    Encode a value to compact JSON bytes with the fastest available encoder.
+
+    Args:
+        value: JSON-compatible data; datetimes are written in ISO 8601
+
+    Returns:
+        bytes: The UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_json_default, separators=(",", ":")).encode()
+
+
+def encode_mortgage_rows(rows: Iterable[Sequence]) -> bytes:
+    """
+    Encode mortgage rows selected as MORTGAGE_COLUMNS as a JSON array of objects.
+
+    Args:
+        rows (Iterable[Sequence]): Column tuples in MORTGAGE_COLUMNS order
+
+    Returns:
+        bytes: The JSON array
+    """
+    return dumps([dict(zip(MORTGAGE_FIELD_NAMES, row)) for row in rows])
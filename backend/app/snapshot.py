@@ -0,0 +1,673 @@
+"""
+In-process columnar snapshot of the mortgages table for read serving.
+
+With SNAPSHOT_ENABLED each worker holds the whole table in memory as
+column arrays instead of ORM objects or row tuples:
+- numeric fields in typed NumPy arrays (credit_score as int16, amounts as float64)
+- loan_type, property_type and credit_rating as uint8 codes, and the
+  rulebook version as a code into a small pool of version strings
+- applicant names UTF-8 encoded back to back in one bytearray, addressed
+  by start offset and length
+- timestamps as int64 microseconds
+An id -> slot array indexes the rows, and slots are kept in (created_at, id)
+order, so a listing page is a binary search plus a vectorized filter over
+the slots that follow, and a lookup by id is one array read.
+
+The snapshot is loaded in the background at startup and kept current by
+the change notifications of this worker's writes (see app.changes) and by
+a delta sync every SNAPSHOT_SYNC_INTERVAL seconds, which re-reads the rows
+created or updated since the last sync and so picks up writes of other
+workers and of jobs such as the rescore. Rows other workers delete, or
+the archive job moves out, are dropped as the change feed delivers their
+events; deletes made directly in SQL are only seen by the full reload
+every SNAPSHOT_RELOAD_INTERVAL seconds. Until
+the first load completes, or when syncing keeps failing, reads fall back
+to the database.
+"""
+import asyncio
+import logging
+import os
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from . import changes, metrics
+from .feed import change_feed
+from .filters import MortgageFilters
+from .models import Mortgage
+from .serialization import MORTGAGE_COLUMNS, MORTGAGE_FIELD_NAMES
+
+logger = logging.getLogger(__name__)
+
+# Serve GET /mortgages and GET /mortgages/{id} from the in-memory snapshot
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Seconds between delta syncs of rows created or updated elsewhere
+SNAPSHOT_SYNC_INTERVAL = float(os.getenv("SNAPSHOT_SYNC_INTERVAL", "5"))
+
+# Seconds between full reloads, which also pick up deletes made outside the API
+SNAPSHOT_RELOAD_INTERVAL = float(os.getenv("SNAPSHOT_RELOAD_INTERVAL", "3600"))
+
+# A delta sync re-reads rows this far behind the newest timestamp seen, so
+# rows whose transaction committed after a later-stamped one are not missed
+SYNC_OVERLAP_SECONDS = 5.0
+
+# Missed syncs after which reads fall back to the database
+MAX_MISSED_SYNCS = 3
+
+LOAD_BATCH_SIZE = 10000
+FETCH_BATCH_SIZE = 1000
+INITIAL_CAPACITY = 1024
+
+LOAN_TYPES = ("fixed", "adjustable")
+PROPERTY_TYPES = ("single_family", "condo")
+CREDIT_RATINGS = ("AAA", "BBB", "C")
+CODED_FIELDS = {"loan_type": LOAN_TYPES, "property_type": PROPERTY_TYPES, "credit_rating": CREDIT_RATINGS}
+NUMERIC_FIELDS = ("income", "credit_score", "loan_amount", "property_value", "debt_amount")
+TIMESTAMP_FIELDS = ("created_at", "updated_at")
+
+# One array per column; `live` marks slots whose row has not been deleted since the last compaction
+COLUMN_DTYPES = {
+    "id": np.int32,
+    "income": np.float64,
+    "credit_score": np.int16,
+    "loan_amount": np.float64,
+    "property_value": np.float64,
+    "debt_amount": np.float64,
+    "loan_type": np.uint8,
+    "property_type": np.uint8,
+    "credit_rating": np.uint8,
+    "rulebook_version": np.uint16,
+    "created_at": np.int64,
+    "updated_at": np.int64,
+    "name_start": np.int64,
+    "name_length": np.uint16,
+    "live": np.bool_,
+}
+
+# Entries of the id -> slot index that are not slots
+UNKNOWN_ID = -1
+DELETED_ID = -2
+
+NULL_TIMESTAMP = np.iinfo(np.int64).min
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_micros(value: Optional[datetime]) -> int:
+    """Convert a timestamp (naive UTC, as stored) to microseconds since the epoch."""
+    if value is None:
+        return NULL_TIMESTAMP
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(value: int) -> Optional[datetime]:
+    """Convert microseconds since the epoch back to a naive UTC timestamp."""
+    if value == NULL_TIMESTAMP:
+        return None
+    return _EPOCH + timedelta(microseconds=value)
+
+
+class MortgageColumns:
+    """
+    Column-oriented store of mortgage rows.
+
+    Rows are added with upsert() as tuples in MORTGAGE_COLUMNS order and read
+    back as dicts in the same field order, i.e. the JSON the listing
+    endpoint produces. Deletes only clear a slot's `live` flag; compaction
+    drops dead slots and restores (created_at, id) order after
+    out-of-order inserts.
+
+    Deleted ids stay marked in the id index, so a stale row read by a sync
+    that raced with the delete is not brought back (ids are never reused).
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.size = 0
+        self.live_count = 0
+        self.arrays: Dict[str, np.ndarray] = {
+            name: np.zeros(capacity, dtype) for name, dtype in COLUMN_DTYPES.items()
+        }
+        self.names = bytearray()
+        self.versions: List[Optional[str]] = [None]
+        self._version_codes: Dict[Optional[str], int] = {None: 0}
+        self.slot_by_id = np.full(0, UNKNOWN_ID, np.int32)
+        self.sorted = True
+
+    def __len__(self) -> int:
+        return self.live_count
+
+    @property
+    def dead_count(self) -> int:
+        return self.size - self.live_count
+
+    def nbytes(self) -> int:
+        """
+        Bytes held by the store: allocated column capacity, name pool and id index.
+
+        Returns:
+            int: Memory footprint in bytes
+        """
+        return (
+            sum(array.nbytes for array in self.arrays.values())
+            + len(self.names)
+            + self.slot_by_id.nbytes
+        )
+
+    def get(self, mortgage_id: int) -> Optional[dict]:
+        """
+        Look up one live row by id.
+
+        Args:
+            mortgage_id (int): ID of the mortgage
+
+        Returns:
+            Optional[dict]: The row, or None if it is not held
+        """
+        if not 0 <= mortgage_id < len(self.slot_by_id):
+            return None
+        slot = int(self.slot_by_id[mortgage_id])
+        if slot < 0:
+            return None
+        return self.rows(np.array([slot]))[0]
+
+    def upsert(self, rows: Sequence[Sequence]) -> int:
+        """
+        Add new rows and overwrite held ones with the values read from the database.
+
+        A row whose updated_at is older than the held one is ignored, as is a
+        row that was deleted, so results of reads that raced with newer
+        changes cannot roll them back.
+
+        Args:
+            rows (Sequence[Sequence]): Rows in MORTGAGE_COLUMNS order, unique by id
+
+        Returns:
+            int: Number of rows added or changed
+        """
+        if not rows:
+            return 0
+        columns = dict(zip(MORTGAGE_FIELD_NAMES, zip(*rows)))
+        ids = np.asarray(columns["id"], dtype=np.int64)
+        self._reserve_ids(int(ids.max()))
+        slots = self.slot_by_id[ids]
+        changed = 0
+        for index in np.flatnonzero(slots >= 0).tolist():
+            changed += self._update(int(slots[index]), {name: values[index] for name, values in columns.items()})
+        new = np.flatnonzero(slots == UNKNOWN_ID)
+        if len(new) == len(rows):
+            self._append(columns, ids)
+        elif len(new):
+            positions = new.tolist()
+            self._append({name: [values[i] for i in positions] for name, values in columns.items()}, ids[new])
+        return changed + len(new)
+
+    def delete(self, ids: Iterable[int]) -> int:
+        """
+        Drop rows by id and remember the ids as deleted.
+
+        Args:
+            ids (Iterable[int]): IDs of deleted mortgages
+
+        Returns:
+            int: Number of held rows removed
+        """
+        ids = np.fromiter(ids, dtype=np.int64)
+        if not len(ids):
+            return 0
+        self._reserve_ids(int(ids.max()))
+        slots = self.slot_by_id[ids]
+        held = slots[slots >= 0]
+        self.arrays["live"][held] = False
+        self.live_count -= len(held)
+        self.slot_by_id[ids] = DELETED_ID
+        return len(held)
+
+    def page(
+        self,
+        filters: MortgageFilters,
+        after: Optional[Tuple[datetime, int]] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Tuple[List[dict], bool]:
+        """
+        Read one listing page in (created_at, id) order.
+
+        Args:
+            filters (MortgageFilters): Filters of the listing request
+            after (Optional[Tuple[datetime, int]]): Cursor position to continue after
+            skip (int): Matching rows to skip
+            limit (int): Maximum rows to return
+
+        Returns:
+            Tuple[List[dict], bool]: The rows, and whether more rows follow
+        """
+        if not self.sorted:
+            self.compact()
+        start = 0 if after is None else self._position_after(*after)
+        wanted = skip + limit + 1
+        found: List[np.ndarray] = []
+        count = 0
+        chunk = max(wanted * 2, 4096)
+        while start < self.size and count < wanted:
+            stop = min(self.size, start + chunk)
+            matches = np.flatnonzero(self._mask(filters, start, stop)) + start
+            found.append(matches)
+            count += len(matches)
+            start = stop
+            chunk *= 2
+        slots = np.concatenate(found)[skip:wanted] if found else np.zeros(0, np.int64)
+        return self.rows(slots[:limit]), len(slots) > limit
+
+    def rows(self, slots: np.ndarray) -> List[dict]:
+        """
+        Materialize rows as dicts in MORTGAGE_FIELD_NAMES order.
+
+        Args:
+            slots (np.ndarray): Slots to read
+
+        Returns:
+            List[dict]: One dict per slot
+        """
+        arrays = self.arrays
+        values = {}
+        for name in NUMERIC_FIELDS + ("id",):
+            values[name] = arrays[name][slots].tolist()
+        for name, labels in CODED_FIELDS.items():
+            values[name] = [labels[code] for code in arrays[name][slots].tolist()]
+        values["rulebook_version"] = [self.versions[code] for code in arrays["rulebook_version"][slots].tolist()]
+        for name in TIMESTAMP_FIELDS:
+            values[name] = [_from_micros(value) for value in arrays[name][slots].tolist()]
+        names = self.names
+        values["applicant_name"] = [
+            names[start:start + length].decode()
+            for start, length in zip(arrays["name_start"][slots].tolist(), arrays["name_length"][slots].tolist())
+        ]
+        return [
+            dict(zip(MORTGAGE_FIELD_NAMES, row))
+            for row in zip(*(values[name] for name in MORTGAGE_FIELD_NAMES))
+        ]
+
+    def compact(self) -> None:
+        """Drop dead slots and unused name bytes, and put the slots back in (created_at, id) order."""
+        arrays = self.arrays
+        keep = np.flatnonzero(arrays["live"][:self.size])
+        order = keep[np.lexsort((arrays["id"][keep], arrays["created_at"][keep]))]
+        lengths = arrays["name_length"][order].astype(np.int64)
+        new_starts = np.cumsum(lengths) - lengths
+        gather = np.repeat(arrays["name_start"][order] - new_starts, lengths) + np.arange(int(lengths.sum()))
+        self.names = bytearray(np.frombuffer(bytes(self.names), np.uint8)[gather].tobytes())
+        for name, array in arrays.items():
+            array[:len(order)] = array[order]
+        arrays["name_start"][:len(order)] = new_starts
+        self.size = len(order)
+        self.slot_by_id[self.slot_by_id >= 0] = UNKNOWN_ID
+        self.slot_by_id[arrays["id"][:self.size]] = np.arange(self.size, dtype=np.int32)
+        self.sorted = True
+
+    def trim(self) -> None:
+        """Release the spare capacity left by growing the arrays."""
+        for name, array in self.arrays.items():
+            self.arrays[name] = array[:max(self.size, 1)].copy()
+
+    def latest_timestamp(self) -> Optional[datetime]:
+        """Newest created_at or updated_at held, the watermark of the next delta sync."""
+        if not self.size:
+            return None
+        latest = max(int(self.arrays[name][:self.size].max()) for name in TIMESTAMP_FIELDS)
+        return _from_micros(latest)
+
+    def _mask(self, filters: MortgageFilters, start: int, stop: int) -> np.ndarray:
+        """Evaluate the live flag and the listing filters over a range of slots."""
+        arrays = self.arrays
+        mask = arrays["live"][start:stop].copy()
+        for name, labels in CODED_FIELDS.items():
+            value = getattr(filters, name)
+            if value is not None:
+                mask &= arrays[name][start:stop] == labels.index(value)
+        credit_score = arrays["credit_score"][start:stop]
+        if filters.min_credit_score is not None:
+            mask &= credit_score >= filters.min_credit_score
+        if filters.max_credit_score is not None:
+            mask &= credit_score <= filters.max_credit_score
+        loan_amount = arrays["loan_amount"][start:stop]
+        property_value = arrays["property_value"][start:stop]
+        if filters.min_ltv is not None:
+            mask &= loan_amount >= filters.min_ltv * property_value
+        if filters.max_ltv is not None:
+            mask &= loan_amount <= filters.max_ltv * property_value
+        return mask
+
+    def _position_after(self, created_at: datetime, mortgage_id: int) -> int:
+        """First slot whose (created_at, id) is greater than the cursor."""
+        created = self.arrays["created_at"][:self.size]
+        micros = _to_micros(created_at)
+        low = int(np.searchsorted(created, micros, "left"))
+        high = int(np.searchsorted(created, micros, "right"))
+        return low + int(np.searchsorted(self.arrays["id"][low:high], mortgage_id, "right"))
+
+    def _append(self, columns: Dict[str, Sequence], ids: np.ndarray) -> None:
+        start = self.size
+        stop = start + len(ids)
+        self._reserve(stop)
+        arrays = self.arrays
+        arrays["id"][start:stop] = ids
+        for name in NUMERIC_FIELDS:
+            arrays[name][start:stop] = columns[name]
+        for name, labels in CODED_FIELDS.items():
+            arrays[name][start:stop] = [labels.index(value) for value in columns[name]]
+        arrays["rulebook_version"][start:stop] = [self._version_code(value) for value in columns["rulebook_version"]]
+        for name in TIMESTAMP_FIELDS:
+            arrays[name][start:stop] = [_to_micros(value) for value in columns[name]]
+        encoded = [name.encode() for name in columns["applicant_name"]]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        arrays["name_start"][start:stop] = len(self.names) + np.cumsum(lengths) - lengths
+        arrays["name_length"][start:stop] = lengths
+        self.names += b"".join(encoded)
+        arrays["live"][start:stop] = True
+        self.slot_by_id[ids] = np.arange(start, stop, dtype=np.int32)
+        self.size = stop
+        self.live_count += len(ids)
+        if self.sorted:
+            # Still ordered if the keys from the last held slot onwards keep increasing
+            first = max(start - 1, 0)
+            created = arrays["created_at"][first:stop]
+            row_ids = arrays["id"][first:stop]
+            self.sorted = bool(np.all(
+                (created[1:] > created[:-1]) | ((created[1:] == created[:-1]) & (row_ids[1:] > row_ids[:-1]))
+            ))
+
+    def _update(self, slot: int, row: dict) -> int:
+        arrays = self.arrays
+        updated_at = _to_micros(row["updated_at"])
+        held_updated_at = int(arrays["updated_at"][slot])
+        if updated_at < held_updated_at:
+            return 0
+        values = {name: row[name] for name in NUMERIC_FIELDS}
+        values.update({name: labels.index(row[name]) for name, labels in CODED_FIELDS.items()})
+        values["rulebook_version"] = self._version_code(row["rulebook_version"])
+        values["created_at"] = _to_micros(row["created_at"])
+        values["updated_at"] = updated_at
+        held = {name: arrays[name][slot].item() for name in values}
+        start, length = int(arrays["name_start"][slot]), int(arrays["name_length"][slot])
+        name = row["applicant_name"].encode()
+        if held == values and self.names[start:start + length] == name:
+            return 0
+        for key, value in values.items():
+            arrays[key][slot] = value
+        if self.names[start:start + length] != name:
+            arrays["name_start"][slot] = len(self.names)
+            arrays["name_length"][slot] = len(name)
+            self.names += name
+        if values["created_at"] != held["created_at"]:
+            self.sorted = False
+        return 1
+
+    def _version_code(self, version: Optional[str]) -> int:
+        code = self._version_codes.get(version)
+        if code is None:
+            code = self._version_codes[version] = len(self.versions)
+            self.versions.append(version)
+        return code
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self.arrays["id"])
+        if size <= capacity:
+            return
+        capacity = max(size, capacity + capacity // 4, INITIAL_CAPACITY)
+        for name, array in self.arrays.items():
+            grown = np.zeros(capacity, array.dtype)
+            grown[:self.size] = array[:self.size]
+            self.arrays[name] = grown
+
+    def _reserve_ids(self, max_id: int) -> None:
+        if max_id < len(self.slot_by_id):
+            return
+        capacity = len(self.slot_by_id)
+        grown = np.full(max(max_id + 1, capacity + capacity // 4, INITIAL_CAPACITY), UNKNOWN_ID, np.int32)
+        grown[:len(self.slot_by_id)] = self.slot_by_id
+        self.slot_by_id = grown
+
+
+class MortgageSnapshot:
+    """
+    This worker's snapshot of the mortgages table and the task keeping it current.
+
+    Args:
+        sync_interval (float): Seconds between delta syncs
+        reload_interval (float): Seconds between full reloads
+    """
+
+    def __init__(self, sync_interval: float = SNAPSHOT_SYNC_INTERVAL, reload_interval: float = SNAPSHOT_RELOAD_INTERVAL):
+        self.sync_interval = sync_interval
+        self.reload_interval = reload_interval
+        self.columns = MortgageColumns()
+        self.engine: Optional[AsyncEngine] = None
+        self.ready = False
+        self.version = 0
+        # Distinguishes this worker's versions in ETags from those of other workers
+        self.token = secrets.token_hex(4)
+        self._watermark: Optional[datetime] = None
+        self._synced_at = 0.0
+        self._reloaded_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._reloading = False
+        self._changed_during_reload: set = set()
+        self._deleted_during_reload: set = set()
+        change_feed.consume(self.apply_rows)
+
+    @property
+    def serving(self) -> bool:
+        """Whether reads may be answered from the snapshot: loaded and synced recently."""
+        return self.ready and time.monotonic() - self._synced_at <= self.sync_interval * MAX_MISSED_SYNCS
+
+    def etag(self, digest: str) -> str:
+        """
+        Build the ETag of a response computed from the current snapshot version.
+
+        Args:
+            digest (str): Digest of the request parameters
+
+        Returns:
+            str: Weak ETag, private to this worker's snapshot
+        """
+        return f'W/"snapshot-{self.token}-{self.version}-{digest}"'
+
+    def get(self, mortgage_id: int) -> Optional[dict]:
+        """Look up one mortgage by id; see MortgageColumns.get."""
+        return self.columns.get(mortgage_id)
+
+    def page(self, filters: MortgageFilters, after=None, skip: int = 0, limit: int = 100) -> Tuple[List[dict], bool]:
+        """Read one listing page; see MortgageColumns.page."""
+        return self.columns.page(filters, after, skip, limit)
+
+    def snapshot(self) -> dict:
+        """
+        Describe the snapshot for monitoring.
+
+        Returns:
+            dict: Readiness, rows, dead slots, bytes, version and sync age
+        """
+        return {
+            "ready": self.ready,
+            "serving": self.serving,
+            "rows": len(self.columns),
+            "dead_slots": self.columns.dead_count,
+            "bytes": self.columns.nbytes(),
+            "version": self.version,
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+            "seconds_since_sync": round(time.monotonic() - self._synced_at, 3) if self.ready else None,
+        }
+
+    async def start(self, engine: AsyncEngine) -> None:
+        """
+        Start loading the snapshot in the background, then keep it current.
+
+        Args:
+            engine (AsyncEngine): Engine of the primary database
+        """
+        self.engine = engine
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop syncing and drop the snapshot."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.engine = None
+        self.ready = False
+        self.columns = MortgageColumns()
+        self._watermark = None
+
+    async def reload(self) -> int:
+        """
+        Replace the snapshot with a fresh full read of the table.
+
+        Changes this worker publishes while the table is being read are
+        replayed on the new snapshot before it starts serving.
+
+        Returns:
+            int: Rows loaded
+        """
+        started = time.perf_counter()
+        self._reloading = True
+        self._changed_during_reload.clear()
+        self._deleted_during_reload.clear()
+        try:
+            columns = MortgageColumns()
+            statement = (
+                select(*MORTGAGE_COLUMNS)
+                .order_by(Mortgage.created_at, Mortgage.id)
+                .execution_options(stream_results=True, yield_per=LOAD_BATCH_SIZE)
+            )
+            async with self.engine.connect() as connection:
+                result = await connection.stream(statement)
+                async for partition in result.partitions():
+                    columns.upsert(partition)
+            columns.delete(self._deleted_during_reload)
+            changed = self._changed_during_reload - self._deleted_during_reload
+            if changed:
+                columns.upsert(await self._fetch(changed))
+            columns.trim()
+        finally:
+            self._reloading = False
+        self.columns = columns
+        self._watermark = columns.latest_timestamp()
+        self.version += 1
+        self.ready = True
+        self._synced_at = self._reloaded_at = time.monotonic()
+        logger.info(
+            f"Loaded mortgage snapshot: {len(columns)} rows, {columns.nbytes() / 2**20:.1f} MiB "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return len(columns)
+
+    async def sync(self) -> int:
+        """
+        Apply rows created or updated since the last sync.
+
+        Returns:
+            int: Rows added or changed
+        """
+        if self._watermark is None:
+            return await self.reload()
+        since = self._watermark - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        statement = select(*MORTGAGE_COLUMNS).where(
+            or_(Mortgage.created_at >= since, Mortgage.updated_at >= since)
+        )
+        async with self.engine.connect() as connection:
+            rows = (await connection.execute(statement)).all()
+        changed = self.columns.upsert(rows)
+        for row in rows:
+            for value in (row.created_at, row.updated_at):
+                if value is not None and value > self._watermark:
+                    self._watermark = value
+        if changed:
+            self.version += 1
+        if self.columns.dead_count > len(self.columns) // 4:
+            self.columns.compact()
+        self._synced_at = time.monotonic()
+        return changed
+
+    async def apply_change(self, change: changes.MortgageChange) -> None:
+        """
+        Apply a change this worker committed: drop deleted rows, re-read created and updated ones.
+
+        Args:
+            change (MortgageChange): The committed change
+        """
+        if self.engine is None:
+            return
+        if change.kind == changes.DELETED:
+            if self._reloading:
+                self._deleted_during_reload.update(change.ids)
+            self.columns.delete(change.ids)
+        else:
+            if self._reloading:
+                self._changed_during_reload.update(change.ids)
+            self.columns.upsert(await self._fetch(change.ids))
+        self.version += 1
+
+    def apply_rows(self, rows: List[Sequence]) -> None:
+        """
+        Drop the rows of delete and archive events; the change feed calls this.
+
+        Creates and updates are left to the delta sync, which reads whole
+        rows. Events of this worker's own deletes find the row already gone.
+
+        Args:
+            rows (List[Sequence]): Joined change feed rows, in seq order
+        """
+        if self.engine is None:
+            return
+        ids = [row[2] for row in rows if row[1] in (changes.DELETED, changes.ARCHIVED)]
+        if not ids:
+            return
+        if self._reloading:
+            self._deleted_during_reload.update(ids)
+        if self.columns.delete(ids):
+            self.version += 1
+
+    async def _fetch(self, ids: Iterable[int]) -> List[Sequence]:
+        """Read rows by id from the primary."""
+        ids = sorted(ids)
+        rows = []
+        async with self.engine.connect() as connection:
+            for offset in range(0, len(ids), FETCH_BATCH_SIZE):
+                batch = ids[offset:offset + FETCH_BATCH_SIZE]
+                rows.extend((await connection.execute(
+                    select(*MORTGAGE_COLUMNS).where(Mortgage.id.in_(batch))
+                )).all())
+        return rows
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if not self.ready or time.monotonic() - self._reloaded_at >= self.reload_interval:
+                    await self.reload()
+                else:
+                    await self.sync()
+            except Exception as e:
+                logger.error(f"Failed to sync mortgage snapshot: {str(e)}")
+            await asyncio.sleep(self.sync_interval)
+
+
+mortgage_snapshot = MortgageSnapshot()
+metrics.snapshot_size.set_function(lambda: len(mortgage_snapshot.columns), "rows")
+metrics.snapshot_size.set_function(lambda: mortgage_snapshot.columns.nbytes(), "bytes")
+
+
+@changes.subscribe
+async def _apply_change(change: changes.MortgageChange) -> None:
+    await mortgage_snapshot.apply_change(change)
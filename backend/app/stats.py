@@ -0,0 +1,286 @@
+"""
+Running credit score aggregate feeding the average credit score adjustment.
+
+The aggregate is split over STATS_SHARDS rows of `mortgage_stats`. Every
+write applies its count/sum delta to one randomly chosen shard in the same
+transaction as the mortgage change, so the aggregate never drifts from the
+table while concurrent writers rarely contend for the same row lock. Reads
+sum the shards and go through an in-process cache that re-reads them once
+it is older than the configured staleness bound.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from typing import Tuple
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .models import Mortgage, MortgageStats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AVG_CREDIT_SCORE = 700.0
+
+# Number of counter rows the aggregate is spread over
+STATS_SHARDS = int(os.getenv("STATS_SHARDS", "16"))
+
+# Maximum age, in seconds, of the cached aggregate before it is re-read
+AVG_CREDIT_SCORE_MAX_STALENESS = float(os.getenv("AVG_CREDIT_SCORE_MAX_STALENESS", "5.0"))
+
+
+def average_credit_score(mortgage_count: int, credit_score_total: int) -> float:
+    """
+    Compute the average credit score from the running aggregate.
+
+    Args:
+        mortgage_count (int): Number of stored mortgages
+        credit_score_total (int): Sum of their credit scores
+
+    Returns:
+        float: The average, or DEFAULT_AVG_CREDIT_SCORE while there are no mortgages
+    """
+    if mortgage_count <= 0:
+        return DEFAULT_AVG_CREDIT_SCORE
+    return credit_score_total / mortgage_count
+
+
+def _seed_statement(shard_id: int, mortgage_count: int = 0, credit_score_total: int = 0):
+    # Idempotent: concurrent seeders of the same shard never collide
+    return (
+        insert(MortgageStats)
+        .values(id=shard_id, mortgage_count=mortgage_count, credit_score_total=credit_score_total)
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+    )
+
+
+def _totals_query():
+    return select(
+        func.coalesce(func.sum(MortgageStats.mortgage_count), 0),
+        func.coalesce(func.sum(MortgageStats.credit_score_total), 0)
+    )
+
+
+def _delta_statement(shard_id: int, count_delta: int, total_delta: int):
+    return (
+        update(MortgageStats)
+        .where(MortgageStats.id == shard_id)
+        .values(
+            mortgage_count=MortgageStats.mortgage_count + count_delta,
+            credit_score_total=MortgageStats.credit_score_total + total_delta
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _pick_shard() -> int:
+    return random.randint(1, STATS_SHARDS)
+
+
+def seed_credit_score_stats(connection) -> None:
+    """
+    Create the stats shards if they do not exist yet.
+
+    Safe to run concurrently from several workers at startup. When no shard
+    exists, shard 1 is seeded with a full scan of the mortgages table so an
+    existing book starts with a correct aggregate; otherwise nothing changes.
+
+    Args:
+        connection: SQLAlchemy Connection (or Session) inside a transaction
+    """
+    if connection.execute(select(func.count()).select_from(MortgageStats)).scalar():
+        return
+    mortgage_count, credit_score_total = connection.execute(
+        select(func.count(Mortgage.id), func.coalesce(func.sum(Mortgage.credit_score), 0))
+    ).one()
+    connection.execute(_seed_statement(1, int(mortgage_count), int(credit_score_total)))
+    for shard_id in range(2, STATS_SHARDS + 1):
+        connection.execute(_seed_statement(shard_id))
+    logger.info(f"Seeded {STATS_SHARDS} credit score stats shards: {mortgage_count} mortgages")
+
+
+def read_credit_score_stats(db: Session) -> Tuple[int, int]:
+    """
+    Read the running aggregate by summing the stats shards.
+
+    Args:
+        db (Session): Database session
+
+    Returns:
+        Tuple[int, int]: The mortgage count and credit score total
+    """
+    mortgage_count, credit_score_total = db.execute(_totals_query()).one()
+    return int(mortgage_count), int(credit_score_total)
+
+
+async def read_credit_score_stats_async(db: AsyncSession) -> Tuple[int, int]:
+    """
+    Read the running aggregate by summing the stats shards, without blocking the event loop.
+
+    Args:
+        db (AsyncSession): Database session
+
+    Returns:
+        Tuple[int, int]: The mortgage count and credit score total
+    """
+    mortgage_count, credit_score_total = (await db.execute(_totals_query())).one()
+    return int(mortgage_count), int(credit_score_total)
+
+
+def rebuild_credit_score_stats(db: Session) -> Tuple[int, int]:
+    """
+    Recompute the running aggregate from scratch with a full scan.
+
+    The full totals are written to shard 1 and every other shard is reset.
+    The caller is responsible for committing.
+
+    Args:
+        db (Session): Database session
+
+    Returns:
+        Tuple[int, int]: The recomputed mortgage count and credit score total
+    """
+    mortgage_count, credit_score_total = db.execute(
+        select(func.count(Mortgage.id), func.coalesce(func.sum(Mortgage.credit_score), 0))
+    ).one()
+    for shard_id in range(1, STATS_SHARDS + 1):
+        db.execute(_seed_statement(shard_id))
+    db.execute(
+        update(MortgageStats)
+        .values(mortgage_count=0, credit_score_total=0)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(_delta_statement(1, int(mortgage_count), int(credit_score_total)))
+    logger.info(f"Rebuilt credit score stats: {mortgage_count} mortgages")
+    return int(mortgage_count), int(credit_score_total)
+
+
+def apply_credit_score_delta(db: Session, count_delta: int, total_delta: int) -> None:
+    """
+    Apply a write's effect to one stats shard inside the caller's transaction.
+
+    Args:
+        db (Session): Database session
+        count_delta (int): Change in the number of mortgages
+        total_delta (int): Change in the sum of credit scores
+    """
+    if count_delta == 0 and total_delta == 0:
+        return
+    shard_id = _pick_shard()
+    if db.execute(_delta_statement(shard_id, count_delta, total_delta)).rowcount == 0:
+        # Shard missing (e.g. the table was emptied); create it and retry
+        db.execute(_seed_statement(shard_id))
+        db.execute(_delta_statement(shard_id, count_delta, total_delta))
+
+
+async def apply_credit_score_delta_async(db: AsyncSession, count_delta: int, total_delta: int) -> None:
+    """
+    Async counterpart of apply_credit_score_delta for the API's sessions.
+
+    Args:
+        db (AsyncSession): Database session
+        count_delta (int): Change in the number of mortgages
+        total_delta (int): Change in the sum of credit scores
+    """
+    if count_delta == 0 and total_delta == 0:
+        return
+    shard_id = _pick_shard()
+    if (await db.execute(_delta_statement(shard_id, count_delta, total_delta))).rowcount == 0:
+        # Shard missing (e.g. the table was emptied); create it and retry
+        await db.execute(_seed_statement(shard_id))
+        await db.execute(_delta_statement(shard_id, count_delta, total_delta))
+
+
+class CreditScoreStatsCache:
+    """
+    In-process cache of the running aggregate with a staleness bound.
+
+    Reads within `max_staleness` seconds of the last load are served from
+    memory; older reads re-read the stats shards. Writes made by this process
+    are folded in immediately via `apply`, so only other workers' writes are
+    subject to the staleness bound.
+    """
+
+    def __init__(self, max_staleness: float = AVG_CREDIT_SCORE_MAX_STALENESS):
+        self.max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._mortgage_count = 0
+        self._credit_score_total = 0
+        self._loaded_at = None
+
+    def average(self, db: Session) -> float:
+        """
+        Get the average credit score, re-reading the stats shards if the cache is stale.
+
+        Args:
+            db (Session): Database session used when the cache must be refreshed
+
+        Returns:
+            float: The average credit score
+        """
+        cached = self.cached_average()
+        if cached is not None:
+            return cached
+        mortgage_count, credit_score_total = read_credit_score_stats(db)
+        self.set(mortgage_count, credit_score_total)
+        return average_credit_score(mortgage_count, credit_score_total)
+
+    async def average_async(self, db: AsyncSession) -> float:
+        """
+        Get the average credit score from an async session, re-reading the stats shards if stale.
+
+        Args:
+            db (AsyncSession): Database session used when the cache must be refreshed
+
+        Returns:
+            float: The average credit score
+        """
+        cached = self.cached_average()
+        if cached is not None:
+            return cached
+        mortgage_count, credit_score_total = await read_credit_score_stats_async(db)
+        self.set(mortgage_count, credit_score_total)
+        return average_credit_score(mortgage_count, credit_score_total)
+
+    def cached_average(self):
+        """Return the cached average, or None if it is older than the staleness bound."""
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at <= self.max_staleness:
+                return average_credit_score(self._mortgage_count, self._credit_score_total)
+        return None
+
+    def set(self, mortgage_count: int, credit_score_total: int) -> None:
+        """Replace the cached aggregate, e.g. after a read or a rebuild."""
+        with self._lock:
+            self._mortgage_count = mortgage_count
+            self._credit_score_total = credit_score_total
+            self._loaded_at = time.monotonic()
+
+    def apply(self, count_delta: int, total_delta: int) -> None:
+        """Fold a committed write from this process into the cached aggregate."""
+        with self._lock:
+            self._mortgage_count += count_delta
+            self._credit_score_total += total_delta
+
+    def invalidate(self) -> None:
+        """Force the next read to go to the database."""
+        with self._lock:
+            self._loaded_at = None
+
+    def snapshot(self) -> dict:
+        """Describe the cached aggregate and its age."""
+        with self._lock:
+            return {
+                "mortgage_count": self._mortgage_count,
+                "credit_score_total": self._credit_score_total,
+                "avg_credit_score": average_credit_score(self._mortgage_count, self._credit_score_total),
+                "age_seconds": None if self._loaded_at is None else time.monotonic() - self._loaded_at,
+                "max_staleness_seconds": self.max_staleness,
+            }
+
+
+credit_score_stats = CreditScoreStatsCache()
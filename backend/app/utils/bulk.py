@@ -0,0 +1,178 @@
+"""
+Helpers for bulk mortgage ingestion: body parsing, batched validation and multi-row inserts.
+"""
+import json
+import logging
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import schemas
+from ..models import Mortgage
+from .credit_rating import calculate_credit_ratings, to_rating_arrays
+from .rulebook import CompiledRulebook
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def is_ndjson(content_type: str) -> bool:
+    """
+    Check whether a Content-Type header denotes a newline-delimited JSON body.
+
+    Args:
+        content_type (str): The request Content-Type header
+
+    Returns:
+        bool: True for NDJSON bodies, False otherwise
+    """
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type in NDJSON_MEDIA_TYPES
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[object, str]]:
+    """
+    Parse a streamed NDJSON body one line at a time.
+
+    Blank lines are skipped. Lines that are not valid JSON are yielded with
+    an error message instead of aborting the stream.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The raw request body stream
+
+    Yields:
+        Tuple[object, str]: The decoded item and None, or None and the parse error
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _decode_line(line)
+    if buffer.strip():
+        yield _decode_line(buffer)
+
+
+def _decode_line(line: bytes) -> Tuple[object, str]:
+    try:
+        return json.loads(line), None
+    except ValueError as e:
+        return None, f"Invalid JSON: {str(e)}"
+
+
+def format_validation_error(error: ValidationError) -> str:
+    """
+    Flatten a pydantic ValidationError into a single readable message.
+
+    Args:
+        error (ValidationError): The validation error
+
+    Returns:
+        str: One "field: message" entry per problem, separated by semicolons
+    """
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'body'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+def validate_chunk(
+    chunk: List[Tuple[int, object, str]]
+) -> Tuple[List[Tuple[int, schemas.MortgageCreate]], List[schemas.BulkMortgageResult]]:
+    """
+    Validate one chunk of submitted rows.
+
+    Args:
+        chunk (List[Tuple[int, object, str]]): (index, raw item, parse error) triples
+
+    Returns:
+        Tuple: The valid (index, MortgageCreate) pairs and the results of rejected rows
+    """
+    valid = []
+    rejected = []
+    for index, item, parse_error in chunk:
+        if parse_error is not None:
+            rejected.append(schemas.BulkMortgageResult(index=index, error=parse_error))
+            continue
+        try:
+            valid.append((index, schemas.MortgageCreate.model_validate(item)))
+        except ValidationError as e:
+            rejected.append(schemas.BulkMortgageResult(index=index, error=format_validation_error(e)))
+    return valid, rejected
+
+
+def score_chunk(
+    mortgages: List[schemas.MortgageCreate],
+    avg_credit_score: float = 700.0,
+    rulebook: Optional[CompiledRulebook] = None
+) -> List[str]:
+    """
+    Score a chunk of validated mortgages in one vectorized pass.
+
+    Args:
+        mortgages (List[MortgageCreate]): The validated applications
+        avg_credit_score (float): The average credit score for adjustment
+        rulebook (Optional[CompiledRulebook]): Rulebook to score with; the active one by default
+
+    Returns:
+        List[str]: The credit rating of each application
+    """
+    if not mortgages:
+        return []
+    return calculate_credit_ratings(to_rating_arrays(mortgages), avg_credit_score, rulebook).tolist()
+
+
+# Cached @@innodb_autoinc_lock_mode of the MySQL server, read on first use
+_autoinc_lock_mode: Optional[int] = None
+
+
+async def insert_mortgages(db: AsyncSession, rows: List[dict]) -> List[int]:
+    """
+    Insert mortgage rows with a single multi-row INSERT.
+
+    Dialects that support RETURNING with executemany (SQLite, MariaDB,
+    PostgreSQL) return the generated ids directly. MySQL cannot, so it gets
+    one INSERT ... VALUES (...), (...) statement and the ids are recovered
+    as LAST_INSERT_ID() plus the row offset. That is only valid while
+    InnoDB hands a statement consecutive ids (innodb_autoinc_lock_mode 0
+    or 1); under interleaved mode 2 rows are flushed through the ORM
+    instead, one INSERT per row, still inside the caller's transaction.
+
+    Args:
+        db (AsyncSession): Database session; the caller commits or rolls back
+        rows (List[dict]): Column values for each new mortgage
+
+    Returns:
+        List[int]: The generated ids, in the same order as `rows`
+    """
+    dialect = db.get_bind().dialect
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        result = await db.execute(
+            insert(Mortgage).returning(Mortgage.id, sort_by_parameter_order=True),
+            rows
+        )
+        return list(result.scalars())
+    if dialect.name == "mysql" and await _mysql_ids_are_consecutive(db):
+        result = await db.execute(insert(Mortgage.__table__).values(rows))
+        first_id = result.lastrowid
+        return list(range(first_id, first_id + len(rows)))
+    db_mortgages = [Mortgage(**row) for row in rows]
+    db.add_all(db_mortgages)
+    await db.flush()
+    return [db_mortgage.id for db_mortgage in db_mortgages]
+
+
+async def _mysql_ids_are_consecutive(db: AsyncSession) -> bool:
+    """Check whether InnoDB assigns consecutive auto-increment ids within one INSERT."""
+    global _autoinc_lock_mode
+    if _autoinc_lock_mode is None:
+        _autoinc_lock_mode = int((await db.execute(text("SELECT @@innodb_autoinc_lock_mode"))).scalar())
+        if _autoinc_lock_mode > 1:
+            logger.warning(
+                f"innodb_autoinc_lock_mode={_autoinc_lock_mode}: bulk inserts fall back to one INSERT per row"
+            )
+    return _autoinc_lock_mode <= 1
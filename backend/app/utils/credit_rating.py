@@ -1,74 +1,175 @@
+from typing import Iterable, Mapping, Optional
+
+import numpy as np
+
 from .. import schemas
+from .rulebook import CompiledRulebook, rulebook_loader
 
 VALID_CREDIT_RATINGS = ["AAA", "BBB", "C"]
 
-def calculate_credit_rating(mortgage: schemas.MortgageCreate, avg_credit_score: float = 700.0) -> str:
+# Columns required by the batch scoring engine
+RATING_COLUMNS = (
+    "loan_amount",
+    "property_value",
+    "income",
+    "debt_amount",
+    "credit_score",
+    "loan_type",
+    "property_type",
+)
+
+def calculate_credit_rating(
+    mortgage: schemas.MortgageCreate,
+    avg_credit_score: float = 700.0,
+    rulebook: Optional[CompiledRulebook] = None
+) -> str:
     """
-    Calculate credit rating based on the specified algorithm.
+    Calculate credit rating based on the active rulebook.
+    
+    The rulebook scores:
+    - Loan-to-Value (LTV) Ratio
+    - Debt-to-Income (DTI) Ratio
+    - Credit Score
+    - Loan Type
+    - Property Type
+    - Average Credit Score Adjustment
     
     Args:
         mortgage (MortgageCreate): The mortgage application data
         avg_credit_score (float): The average credit score for adjustment
+        rulebook (Optional[CompiledRulebook]): Rulebook to score with; the active one by default
         
     Returns:
         str: The calculated credit rating (AAA, BBB, or C)
     """
-    # Input validation
-    if mortgage.loan_amount <= 0 or mortgage.property_value <= 0:
+    if rulebook is None:
+        rulebook = rulebook_loader.current()
+    # The compiled evaluator validates the inputs (same checks and messages as the batch path)
+    return rulebook.rate_mortgage(mortgage, avg_credit_score)
+
+
+def to_rating_arrays(mortgages: Iterable[schemas.MortgageCreate]) -> dict:
+    """
+    Convert mortgage applications into a struct-of-arrays for batch scoring.
+    
+    Args:
+        mortgages (Iterable[MortgageCreate]): The mortgage applications
+        
+    Returns:
+        dict: One NumPy array per column in RATING_COLUMNS
+    """
+    mortgages = list(mortgages)
+    return {
+        "loan_amount": np.fromiter((m.loan_amount for m in mortgages), dtype=np.float64, count=len(mortgages)),
+        "property_value": np.fromiter((m.property_value for m in mortgages), dtype=np.float64, count=len(mortgages)),
+        "income": np.fromiter((m.income for m in mortgages), dtype=np.float64, count=len(mortgages)),
+        "debt_amount": np.fromiter((m.debt_amount for m in mortgages), dtype=np.float64, count=len(mortgages)),
+        "credit_score": np.fromiter((m.credit_score for m in mortgages), dtype=np.int64, count=len(mortgages)),
+        "loan_type": np.array([m.loan_type for m in mortgages], dtype=object),
+        "property_type": np.array([m.property_type for m in mortgages], dtype=object),
+    }
+
+def _validated_columns(arrays: Mapping[str, Iterable], avg_credit_score) -> tuple:
+    """
+    Convert and validate a struct-of-arrays for batch scoring.
+    
+    Returns:
+        tuple: LTV ratio, DTI ratio, credit score, loan type, property type and
+            average credit score arrays, as taken by CompiledRulebook.rate_arrays
+    """
+    missing = [column for column in RATING_COLUMNS if column not in arrays]
+    if missing:
+        raise ValueError(f"Missing columns for credit rating: {', '.join(missing)}")
+
+    loan_amount = np.asarray(arrays["loan_amount"], dtype=np.float64)
+    property_value = np.asarray(arrays["property_value"], dtype=np.float64)
+    income = np.asarray(arrays["income"], dtype=np.float64)
+    debt_amount = np.asarray(arrays["debt_amount"], dtype=np.float64)
+    credit_score = np.asarray(arrays["credit_score"])
+    loan_type = np.asarray(arrays["loan_type"])
+    property_type = np.asarray(arrays["property_type"])
+    avg_credit_score = np.asarray(avg_credit_score, dtype=np.float64)
+
+    size = loan_amount.shape[0]
+    columns = (property_value, income, debt_amount, credit_score, loan_type, property_type)
+    if any(column.shape != (size,) for column in (loan_amount,) + columns):
+        raise ValueError("All credit rating columns must be one-dimensional and of equal length")
+
+    # Input validation (same checks and messages as the scalar path)
+    if np.any(loan_amount <= 0) or np.any(property_value <= 0):
         raise ValueError("Loan amount and property value must be positive")
-    if mortgage.income <= 0:
+    if np.any(income <= 0):
         raise ValueError("Income must be positive")
-    if mortgage.debt_amount < 0:
+    if np.any(debt_amount < 0):
         raise ValueError("Debt amount cannot be negative")
-    if mortgage.credit_score < 300 or mortgage.credit_score > 850:
+    if np.any((credit_score < 300) | (credit_score > 850)):
         raise ValueError("Credit score must be between 300 and 850")
-    if mortgage.loan_type not in ["fixed", "adjustable"]:
+    if not np.all((loan_type == "fixed") | (loan_type == "adjustable")):
         raise ValueError("Loan type must be either 'fixed' or 'adjustable'")
-    if mortgage.property_type not in ["single_family", "condo"]:
+    if not np.all((property_type == "condo") | (property_type == "single_family")):
         raise ValueError("Property type must be either 'single_family' or 'condo'")
 
-    risk_score = 0
-    
-    # 1. Loan-to-Value (LTV) Ratio
-    ltv_ratio = mortgage.loan_amount / mortgage.property_value
-    if ltv_ratio > 0.9:  # LTV > 90%
-        risk_score += 2
-    elif ltv_ratio > 0.8:  # LTV > 80%
-        risk_score += 1
-    
-    # 2. Debt-to-Income (DTI) Ratio
-    dti_ratio = mortgage.debt_amount / mortgage.income
-    if dti_ratio > 0.5:  # DTI > 50%
-        risk_score += 2
-    elif dti_ratio > 0.4:  # DTI > 40%
-        risk_score += 1
-    
-    # 3. Credit Score
-    if mortgage.credit_score >= 700:
-        risk_score -= 1
-    elif mortgage.credit_score < 650:
-        risk_score += 1
-    
-    # 4. Loan Type
-    if mortgage.loan_type == "fixed":
-        risk_score -= 1
-    elif mortgage.loan_type == "adjustable":
-        risk_score += 1
+    return (
+        loan_amount / property_value,
+        debt_amount / income,
+        credit_score,
+        loan_type,
+        property_type,
+        avg_credit_score
+    )
+
+def calculate_credit_ratings(
+    arrays: Mapping[str, Iterable],
+    avg_credit_score=700.0,
+    rulebook: Optional[CompiledRulebook] = None
+) -> np.ndarray:
+    """
+    Calculate credit ratings for a batch of mortgages using vectorized operations.
     
-    # 5. Property Type
-    if mortgage.property_type == "condo":
-        risk_score += 1
+    Applies exactly the same rules as calculate_credit_rating, column-wise,
+    so the nightly rescoring of the whole book runs at NumPy speed instead
+    of one interpreter-level branch chain per loan.
     
-    # 6. Average Credit Score Adjustment
-    if avg_credit_score >= 700:
-        risk_score -= 1
-    elif avg_credit_score < 650:
-        risk_score += 1
+    Args:
+        arrays (Mapping[str, Iterable]): Struct-of-arrays with one equally sized
+            column per name in RATING_COLUMNS
+        avg_credit_score (float or array): The average credit score for adjustment,
+            either a scalar or one value per row
+        rulebook (Optional[CompiledRulebook]): Rulebook to score with; the active one by default
+        
+    Returns:
+        np.ndarray: The calculated credit ratings (AAA, BBB, or C), one per row
+        
+    Raises:
+        ValueError: If a column is missing, the columns differ in length or any row is invalid
+    """
+    columns = _validated_columns(arrays, avg_credit_score)
+    if rulebook is None:
+        rulebook = rulebook_loader.current()
+    return rulebook.rate_arrays(*columns)
+
+def calculate_risk_scores(
+    arrays: Mapping[str, Iterable],
+    avg_credit_score=700.0,
+    rulebook: Optional[CompiledRulebook] = None
+) -> np.ndarray:
+    """
+    Calculate the risk scores behind the credit ratings of a batch of mortgages.
     
-    # Final Credit Rating
-    if risk_score <= 1:
-        return "AAA"  # Highly secure
-    elif 2 <= risk_score <= 4:
-        return "BBB"  # Medium risk
-    else:
-        return "C"    # Highly speculative or distressed 
\ No newline at end of file
+    Args:
+        arrays (Mapping[str, Iterable]): Struct-of-arrays with one equally sized
+            column per name in RATING_COLUMNS
+        avg_credit_score (float or array): The average credit score for adjustment,
+            either a scalar or one value per row
+        rulebook (Optional[CompiledRulebook]): Rulebook to score with; the active one by default
+        
+    Returns:
+        np.ndarray: The risk scores, one per row; `rulebook.ratings.lookup_array` maps them to ratings
+        
+    Raises:
+        ValueError: If a column is missing, the columns differ in length or any row is invalid
+    """
+    columns = _validated_columns(arrays, avg_credit_score)
+    if rulebook is None:
+        rulebook = rulebook_loader.current()
+    return rulebook.risk_score_arrays(*columns)
@@ -0,0 +1,371 @@
+"""
+Rating explanations and what-if simulation for underwriters.
+
+`explain_rating` breaks a rating down into the points of every factor of
+the rulebook and solves, per applicant field, for the smallest change that
+crosses a rating boundary. `what_if_grid` evaluates the cartesian product
+of perturbed field values for one applicant in a single vectorized pass.
+
+Every factor is a piecewise-constant function of one input, so the solver
+works band by band: for each band of the factor whose points would give
+the wanted rating, it maps the band's bounds back to the applicant field
+(e.g. an LTV band to a loan amount range) and keeps the closest value.
+Each answer is confirmed with the rulebook's own evaluator.
+"""
+import math
+from typing import Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from .. import schemas
+from .credit_rating import RATING_COLUMNS, calculate_risk_scores
+from .rulebook import RATING_LABELS, Band, CompiledRulebook, rulebook_loader
+
+# Upper bound on the scenarios of one what-if grid
+MAX_WHAT_IF_SCENARIOS = 100_000
+
+WHAT_IF_FIELDS = RATING_COLUMNS + ("avg_credit_score",)
+CATEGORY_FIELDS = {
+    "loan_type": ("fixed", "adjustable"),
+    "property_type": ("single_family", "condo"),
+}
+
+# Smallest step of each numeric field the solver proposes: cents, or whole points
+MONEY_RESOLUTION = 0.01
+
+# Valid (inclusive) range of each numeric field the solver may propose
+FIELD_DOMAINS = {
+    "loan_amount": (MONEY_RESOLUTION, math.inf),
+    "property_value": (MONEY_RESOLUTION, math.inf),
+    "income": (MONEY_RESOLUTION, math.inf),
+    "debt_amount": (0.0, math.inf),
+    "credit_score": (300, 850),
+}
+
+
+def _band_points(band: Band, value) -> float:
+    return band.points[band.lookup(value)]
+
+
+def explain_factors(mortgage, avg_credit_score: float, rulebook: CompiledRulebook) -> List[dict]:
+    """
+    Compute the points every rulebook factor contributes for one validated mortgage.
+
+    Args:
+        mortgage: Mortgage application (any object with the MortgageCreate fields)
+        avg_credit_score (float): The average credit score for adjustment
+        rulebook (CompiledRulebook): Rulebook to score with
+
+    Returns:
+        List[dict]: Factor name, input value, points and band bounds, in rulebook order
+    """
+    values = {
+        "ltv": mortgage.loan_amount / mortgage.property_value,
+        "dti": mortgage.debt_amount / mortgage.income,
+        "credit_score": mortgage.credit_score,
+        "avg_credit_score": avg_credit_score,
+    }
+    factors = []
+    for name in ("ltv", "dti", "credit_score"):
+        factors.append(_band_factor(rulebook.bands[name], values[name]))
+    for name in ("loan_type", "property_type"):
+        value = getattr(mortgage, name)
+        factors.append({"factor": name, "value": value, "points": rulebook.categories[name][value]})
+    factors.append(_band_factor(rulebook.bands["avg_credit_score"], avg_credit_score))
+    return factors
+
+
+def _band_factor(band: Band, value) -> dict:
+    lower, upper = band.interval(band.lookup(value))
+    return {
+        "factor": band.name,
+        "value": value,
+        "points": _band_points(band, value),
+        "band": {"lower": lower, "upper": upper, "ties": band.ties},
+    }
+
+
+def _rank(rating: str) -> int:
+    return RATING_LABELS.index(rating)
+
+
+def explain_rating(
+    mortgage: schemas.MortgageCreate,
+    avg_credit_score: float = 700.0,
+    rulebook: Optional[CompiledRulebook] = None,
+    target_rating: Optional[str] = None
+) -> dict:
+    """
+    Explain a credit rating and the smallest changes that would move it.
+
+    Args:
+        mortgage (MortgageCreate): The mortgage application data
+        avg_credit_score (float): The average credit score for adjustment
+        rulebook (Optional[CompiledRulebook]): Rulebook to score with; the active one by default
+        target_rating (Optional[str]): Rating to solve upgrades for; the next better one by default
+
+    Returns:
+        dict: Rating, risk score, per-factor points, the rating cut-offs, and
+            the minimal change per field to reach `target_rating` (upgrade)
+            or to drop to a worse rating (downgrade)
+
+    Raises:
+        ValueError: If the application is invalid
+    """
+    if rulebook is None:
+        rulebook = rulebook_loader.current()
+    rating = rulebook.rate_mortgage(mortgage, avg_credit_score)
+    factors = explain_factors(mortgage, avg_credit_score, rulebook)
+    rank = _rank(rating)
+    if target_rating is None:
+        target_rank = max(rank - 1, 0)
+    else:
+        target_rank = _rank(target_rating)
+    upgrade = []
+    if target_rank < rank:
+        upgrade = minimal_changes(mortgage, avg_credit_score, rulebook, lambda r: _rank(r) <= target_rank)
+    downgrade = []
+    if rank < len(RATING_LABELS) - 1:
+        downgrade = minimal_changes(mortgage, avg_credit_score, rulebook, lambda r: _rank(r) > rank)
+    return {
+        "rating": rating,
+        "risk_score": sum(factor["points"] for factor in factors),
+        "rulebook_version": rulebook.version,
+        "avg_credit_score": avg_credit_score,
+        "factors": factors,
+        "rating_thresholds": rulebook.ratings.to_dict(points_key="labels"),
+        "target_rating": RATING_LABELS[target_rank],
+        "upgrade": upgrade,
+        "downgrade": downgrade,
+    }
+
+
+def _field_mappings(values: Mapping[str, float]) -> Dict[str, tuple]:
+    """
+    Per numeric field: the band it drives and the map from a band value back to the field.
+
+    `increasing` says whether the band value grows with the field; fields
+    that cannot move their band (income without debt) are left out.
+    """
+    mappings = {
+        "loan_amount": ("ltv", True, lambda v: v * values["property_value"]),
+        "property_value": ("ltv", False, lambda v: values["loan_amount"] / v),
+        "debt_amount": ("dti", True, lambda v: v * values["income"]),
+        "credit_score": ("credit_score", True, lambda v: v),
+    }
+    if values["debt_amount"] > 0:
+        mappings["income"] = ("dti", False, lambda v: values["debt_amount"] / v)
+    return mappings
+
+
+def _field_interval(band: Band, index: int, increasing: bool, to_field: Callable) -> tuple:
+    """
+    Map band `index` to a range of the field as (low, low_inclusive, high, high_inclusive).
+
+    None stands for an unbounded side. Decreasing maps (field = c / value)
+    swap the ends; a band value of 0 or less is out of their reach.
+    """
+    lower, upper = band.interval(index)
+    lower_inclusive = band.ties == "upper"
+    upper_inclusive = band.ties == "lower"
+    if increasing:
+        low = None if lower is None else to_field(lower)
+        high = None if upper is None else to_field(upper)
+        return low, lower_inclusive, high, upper_inclusive
+    if upper is not None and upper <= 0:
+        return None
+    low = None if upper is None else to_field(upper)
+    high = None if lower is None or lower <= 0 else to_field(lower)
+    return low, upper_inclusive, high, lower_inclusive
+
+
+def _closest_in(interval: tuple, current: float, resolution: float, minimum: float, maximum: float):
+    """
+    Find the grid step closest to `current` inside the interval and the field's domain.
+
+    Returns:
+        The (closest, lowest, highest) steps in units of `resolution`, or None if there is none
+    """
+    low, low_inclusive, high, high_inclusive = interval
+    if low is None or low < minimum:
+        low, low_inclusive = minimum, True
+    if high is None or high > maximum:
+        high, high_inclusive = maximum, True
+    low_step = math.ceil(low / resolution - 1e-9)
+    if not low_inclusive and math.isclose(low_step * resolution, low, rel_tol=0, abs_tol=resolution * 1e-6):
+        low_step += 1
+    if math.isinf(high):
+        high_step = math.inf
+    else:
+        high_step = math.floor(high / resolution + 1e-9)
+        if not high_inclusive and math.isclose(high_step * resolution, high, rel_tol=0, abs_tol=resolution * 1e-6):
+            high_step -= 1
+    if low_step > high_step:
+        return None
+    step = min(max(round(current / resolution), low_step), high_step)
+    return step, low_step, high_step
+
+
+def minimal_changes(
+    mortgage: schemas.MortgageCreate,
+    avg_credit_score: float,
+    rulebook: CompiledRulebook,
+    accept: Callable[[str], bool]
+) -> List[dict]:
+    """
+    Solve, field by field with the others held fixed, for the smallest change giving an accepted rating.
+
+    Args:
+        mortgage (MortgageCreate): The validated mortgage application
+        avg_credit_score (float): The average credit score for adjustment
+        rulebook (CompiledRulebook): Rulebook to score with
+        accept (Callable[[str], bool]): Whether a resulting rating is wanted
+
+    Returns:
+        List[dict]: Per reachable field: current and required value, the change and the new rating
+    """
+    values = mortgage.model_dump()
+    factors = {factor["factor"]: factor["points"] for factor in explain_factors(mortgage, avg_credit_score, rulebook)}
+    risk_score = sum(factors.values())
+    changes = []
+
+    for field, (band_name, increasing, to_field) in _field_mappings(values).items():
+        band = rulebook.bands[band_name]
+        other_points = risk_score - factors[band_name]
+        resolution = 1 if field == "credit_score" else MONEY_RESOLUTION
+        minimum, maximum = FIELD_DOMAINS[field]
+        current = values[field]
+        best = None
+        for index, points in enumerate(band.points):
+            if not accept(rulebook.ratings.points[rulebook.ratings.lookup(other_points + points)]):
+                continue
+            interval = _field_interval(band, index, increasing, to_field)
+            if interval is None:
+                continue
+            found = _closest_in(interval, current, resolution, minimum, maximum)
+            if found is None:
+                continue
+            step, low_step, high_step = found
+            to_value = (lambda n: n) if resolution == 1 else (lambda n: round(n * resolution, 2))
+
+            def rate_at(n):
+                return rulebook.rate_mortgage(
+                    schemas.MortgageCreate.model_construct(**{**values, field: to_value(n)}), avg_credit_score
+                )
+
+            # The evaluator compares floats, so right at a boundary the candidate can
+            # be one step off either way: step inward until accepted, then back
+            # towards the current value while still accepted
+            accepted = next((n for n in _inward_steps(step, low_step, high_step) if accept(rate_at(n))), None)
+            if accepted is None:
+                continue
+            toward = 1 if accepted < current / resolution else -1
+            for _ in range(2):
+                if not accept(rate_at(accepted + toward)):
+                    break
+                accepted += toward
+            candidate = to_value(accepted)
+            if best is None or abs(candidate - current) < abs(best["required"] - current):
+                change = candidate - current if resolution == 1 else round(candidate - current, 2)
+                best = {"field": field, "current": current, "required": candidate,
+                        "change": change, "rating": rate_at(accepted)}
+        if best is not None:
+            changes.append(best)
+
+    for field, options in CATEGORY_FIELDS.items():
+        for option in options:
+            if option == values[field]:
+                continue
+            rating = rulebook.rate_mortgage(
+                schemas.MortgageCreate.model_construct(**{**values, field: option}), avg_credit_score
+            )
+            if accept(rating):
+                changes.append({"field": field, "current": values[field], "required": option,
+                                "change": None, "rating": rating})
+    return changes
+
+
+def _inward_steps(step: int, low_step: int, high_step: int, attempts: int = 3):
+    yield step
+    direction = 1 if step == low_step and step != high_step else -1
+    for offset in range(1, attempts):
+        nudged = step + direction * offset
+        if low_step <= nudged <= high_step:
+            yield nudged
+
+
+def _grid_values(field: str, values) -> np.ndarray:
+    """Convert the requested values of one what-if field to a typed array."""
+    if isinstance(values, Mapping):
+        values = np.linspace(values["start"], values["stop"], values["steps"])
+        if field == "credit_score":
+            values = np.unique(np.rint(values))
+    if field in CATEGORY_FIELDS:
+        if not all(isinstance(value, str) for value in values):
+            raise ValueError(f"{field}: values must be strings")
+        return np.asarray(values, dtype=object)
+    if any(isinstance(value, str) for value in values):
+        raise ValueError(f"{field}: values must be numbers")
+    array = np.asarray(values, dtype=np.float64)
+    if field == "credit_score":
+        if not np.all(array == np.rint(array)):
+            raise ValueError("credit_score: values must be whole numbers")
+        array = array.astype(np.int64)
+    return array
+
+
+def what_if_grid(
+    mortgage: schemas.MortgageCreate,
+    vary: Mapping[str, Sequence],
+    avg_credit_score: float = 700.0,
+    rulebook: Optional[CompiledRulebook] = None,
+    max_scenarios: int = MAX_WHAT_IF_SCENARIOS
+) -> dict:
+    """
+    Rate every combination of perturbed field values for one applicant in one vectorized pass.
+
+    Args:
+        mortgage (MortgageCreate): The applicant the scenarios start from
+        vary (Mapping[str, Sequence]): Values to try per field of WHAT_IF_FIELDS, either a
+            list or a {"start", "stop", "steps"} range; unlisted fields keep the applicant's value
+        avg_credit_score (float): The average credit score for adjustment
+        rulebook (Optional[CompiledRulebook]): Rulebook to score with; the active one by default
+        max_scenarios (int): Largest grid accepted
+
+    Returns:
+        dict: Scenario count, the varied values per scenario (columnar), risk
+            scores, ratings and the number of scenarios per rating
+
+    Raises:
+        ValueError: If a field is unknown, a value invalid or the grid too large
+    """
+    if rulebook is None:
+        rulebook = rulebook_loader.current()
+    unknown = [field for field in vary if field not in WHAT_IF_FIELDS]
+    if unknown:
+        raise ValueError(f"Cannot vary {', '.join(unknown)}; choose from {', '.join(WHAT_IF_FIELDS)}")
+    grids = {field: _grid_values(field, values) for field, values in vary.items()}
+    if any(grid.size == 0 for grid in grids.values()):
+        raise ValueError("Every varied field needs at least one value")
+    scenarios = math.prod(grid.size for grid in grids.values())
+    if scenarios > max_scenarios:
+        raise ValueError(f"{scenarios} scenarios requested; the limit is {max_scenarios}")
+
+    positions = np.indices([grid.size for grid in grids.values()]).reshape(len(grids), scenarios)
+    varied = {field: grid[position] for (field, grid), position in zip(grids.items(), positions)}
+    base = {**mortgage.model_dump(), "avg_credit_score": avg_credit_score}
+    columns = {
+        field: varied[field] if field in varied else np.full(scenarios, base[field], dtype=object if field in CATEGORY_FIELDS else None)
+        for field in WHAT_IF_FIELDS
+    }
+    risk_scores = calculate_risk_scores(columns, columns["avg_credit_score"], rulebook)
+    ratings = rulebook.ratings.lookup_array(risk_scores)
+    labels, counts = np.unique(ratings, return_counts=True)
+    return {
+        "scenarios": scenarios,
+        "rulebook_version": rulebook.version,
+        "values": {field: column.tolist() for field, column in varied.items()},
+        "risk_score": risk_scores.tolist(),
+        "rating": ratings.tolist(),
+        "rating_counts": dict(zip(labels.tolist(), counts.tolist())),
+    }
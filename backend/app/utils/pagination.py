@@ -0,0 +1,43 @@
+"""
+Opaque cursor tokens for keyset pagination.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, mortgage_id: int) -> str:
+    """
+    Encode the (created_at, id) position of the last row of a page.
+
+    Args:
+        created_at (datetime): Creation timestamp of the last row
+        mortgage_id (int): Identifier of the last row
+
+    Returns:
+        str: URL-safe opaque cursor token
+    """
+    payload = json.dumps([created_at.isoformat(), mortgage_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor token produced by encode_cursor.
+
+    Args:
+        token (str): The cursor token
+
+    Returns:
+        Tuple[datetime, int]: The (created_at, id) position to continue after
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, mortgage_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(mortgage_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
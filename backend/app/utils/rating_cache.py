@@ -0,0 +1,95 @@
+"""
+Bounded LRU cache of credit ratings keyed on the quantized scoring inputs.
+
+A rating only depends on which band each factor falls into (see
+CompiledRulebook.band_key) and on the rulebook version, so the key space is
+tiny and repeated or lightly edited applications are rated with one dict
+lookup instead of a full evaluation.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from .. import schemas
+from .credit_rating import calculate_credit_rating
+from .rulebook import CompiledRulebook, rulebook_loader
+
+# Maximum number of distinct (rulebook version, band key) entries kept
+RATING_CACHE_SIZE = int(os.getenv("RATING_CACHE_SIZE", "1024"))
+
+
+class RatingCache:
+    """
+    Thread-safe LRU cache of ratings with hit, miss and eviction counters.
+    """
+
+    def __init__(self, maxsize: int = RATING_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def rating(
+        self,
+        mortgage: schemas.MortgageCreate,
+        avg_credit_score: float = 700.0,
+        rulebook: Optional[CompiledRulebook] = None
+    ) -> str:
+        """
+        Get the credit rating of a schema-validated application, scoring it on a miss.
+
+        Args:
+            mortgage (MortgageCreate): The mortgage application data
+            avg_credit_score (float): The average credit score for adjustment
+            rulebook (Optional[CompiledRulebook]): Rulebook to score with; the active one by default
+
+        Returns:
+            str: The credit rating (AAA, BBB, or C)
+        """
+        if rulebook is None:
+            rulebook = rulebook_loader.current()
+        try:
+            key = (rulebook.version, rulebook.band_key(mortgage, avg_credit_score))
+        except ZeroDivisionError:
+            # Not a valid application; let the evaluator raise its ValueError
+            return calculate_credit_rating(mortgage, avg_credit_score, rulebook)
+        with self._lock:
+            rating = self._entries.get(key)
+            if rating is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return rating
+            self.misses += 1
+        rating = calculate_credit_rating(mortgage, avg_credit_score, rulebook)
+        with self._lock:
+            self._entries[key] = rating
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return rating
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def snapshot(self) -> dict:
+        """Describe the cache size and hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
+
+
+rating_cache = RatingCache()
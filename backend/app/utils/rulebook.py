@@ -0,0 +1,463 @@
+"""
+Versioned credit rating rulebook, compiled into threshold and weight tables.
+
+A rulebook is a JSON (or, with PyYAML installed, YAML) document holding
+the banded factors (LTV, DTI, credit score and the book-wide average credit
+score), the per-category weights (loan and property type) and the risk
+score cut-offs of each rating. Compiling it turns every band into a sorted
+threshold table and every category into a weight table. Single mortgages
+are rated by a function generated from those tables (unrolled comparisons,
+or `bisect` for long bands); batches use `np.searchsorted` over them.
+
+The active rulebook is loaded from RULEBOOK_PATH on first use and re-read
+whenever the file changes, checked at most every RULEBOOK_CHECK_INTERVAL
+seconds, so each worker picks up a new policy without a restart.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bound once: the active-rulebook check runs on every scoring call
+_monotonic = time.monotonic
+
+DEFAULT_RULEBOOK_PATH = Path(__file__).resolve().parent.parent / "rulebooks" / "default.json"
+RULEBOOK_PATH = Path(os.getenv("RULEBOOK_PATH", str(DEFAULT_RULEBOOK_PATH)))
+
+# Minimum time, in seconds, between checks of the rulebook file for changes
+RULEBOOK_CHECK_INTERVAL = float(os.getenv("RULEBOOK_CHECK_INTERVAL", "5.0"))
+
+BAND_FACTORS = ("ltv", "dti", "credit_score", "avg_credit_score")
+
+# Every value the API accepts must have a weight (see schemas.MortgageBase)
+CATEGORY_VALUES = {
+    "loan_type": ("fixed", "adjustable"),
+    "property_type": ("single_family", "condo"),
+}
+
+# Ratings allowed by the credit_rating check constraint
+RATING_LABELS = ("AAA", "BBB", "C")
+
+
+class RulebookError(ValueError):
+    """Raised when a rulebook cannot be read or is not valid."""
+
+
+class Band:
+    """
+    Piecewise-constant mapping from a value to points, compiled for bisect lookups.
+
+    `thresholds` split the value range into len(thresholds) + 1 bands,
+    each worth the matching entry of `points`. A value equal to a
+    threshold falls into the band below it when `ties` is "lower" (the
+    "> threshold" rules) and into the band above it when `ties` is "upper"
+    (the ">= threshold" rules).
+    """
+
+    def __init__(self, name: str, thresholds: Sequence[float], points: Sequence, ties: str = "lower"):
+        if ties not in ("lower", "upper"):
+            raise RulebookError(f"{name}: ties must be 'lower' or 'upper'")
+        if not all(isinstance(value, (int, float)) for value in thresholds):
+            raise RulebookError(f"{name}: thresholds must be numbers")
+        if any(low >= high for low, high in zip(thresholds, thresholds[1:])):
+            raise RulebookError(f"{name}: thresholds must be strictly increasing")
+        if len(points) != len(thresholds) + 1:
+            raise RulebookError(f"{name}: expected {len(thresholds) + 1} points for {len(thresholds)} thresholds")
+        self.name = name
+        self.thresholds = tuple(thresholds)
+        self.points = tuple(points)
+        self.ties = ties
+        # bisect_left counts thresholds strictly below the value, bisect_right those at or below it
+        self.bisect = bisect_left if ties == "lower" else bisect_right
+        self._threshold_array = np.asarray(self.thresholds, dtype=np.float64)
+        self._point_array = np.asarray(self.points)
+
+    @classmethod
+    def from_dict(cls, name: str, spec: Mapping, points_key: str = "points") -> "Band":
+        if not isinstance(spec, Mapping):
+            raise RulebookError(f"{name}: expected an object")
+        try:
+            return cls(name, list(spec["thresholds"]), list(spec[points_key]), spec.get("ties", "lower"))
+        except (KeyError, TypeError) as e:
+            raise RulebookError(f"{name}: missing or malformed {e}")
+
+    def lookup_array(self, values: np.ndarray) -> np.ndarray:
+        """Return the points of the band of every element of `values`."""
+        side = "left" if self.ties == "lower" else "right"
+        return self._point_array[np.searchsorted(self._threshold_array, values, side=side)]
+
+    def lookup(self, value) -> int:
+        """Return the position of the band `value` falls in."""
+        return self.bisect(self.thresholds, value)
+
+    def interval(self, index: int) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Return the (lower, upper) bounds of band `index`; None for an unbounded side.
+
+        The lower bound is exclusive with "lower" ties and inclusive with "upper"
+        ties; the upper bound the other way round.
+        """
+        lower = self.thresholds[index - 1] if index > 0 else None
+        upper = self.thresholds[index] if index < len(self.thresholds) else None
+        return lower, upper
+
+    def to_dict(self, points_key: str = "points") -> dict:
+        return {"thresholds": list(self.thresholds), points_key: list(self.points), "ties": self.ties}
+
+
+class CompiledRulebook:
+    """
+    A validated rulebook ready for scalar and vectorized scoring.
+
+    Attributes:
+        version (str): Version recorded on every mortgage scored with this rulebook
+        description (str): Free-form description of the policy
+        bands (dict): Band per name in BAND_FACTORS
+        categories (dict): Weight table per name in CATEGORY_VALUES
+        ratings (Band): Risk score cut-offs, mapping to rating labels
+    """
+
+    def __init__(self, version: str, bands: Mapping[str, Band], categories: Mapping[str, Mapping[str, int]],
+                 ratings: Band, description: str = ""):
+        self.version = version
+        self.description = description
+        self.bands = dict(bands)
+        self.categories = {name: dict(weights) for name, weights in categories.items()}
+        self.ratings = ratings
+        self.rate_mortgage, self.band_key = self._compile_evaluators()
+
+    @classmethod
+    def from_dict(cls, spec: Mapping) -> "CompiledRulebook":
+        """
+        Validate and compile a parsed rulebook document.
+
+        Args:
+            spec (Mapping): The parsed document
+
+        Returns:
+            CompiledRulebook: The compiled rulebook
+
+        Raises:
+            RulebookError: If the document is incomplete or inconsistent
+        """
+        if not isinstance(spec, Mapping):
+            raise RulebookError("Rulebook must be an object")
+        version = spec.get("version")
+        if not isinstance(version, str) or not 0 < len(version) <= 64:
+            raise RulebookError("Rulebook version must be a string of 1 to 64 characters")
+
+        band_specs = spec.get("bands") or {}
+        missing = [name for name in BAND_FACTORS if name not in band_specs]
+        if missing:
+            raise RulebookError(f"Rulebook is missing bands: {', '.join(missing)}")
+        bands = {name: Band.from_dict(name, band_specs[name]) for name in BAND_FACTORS}
+        for band in bands.values():
+            if not all(isinstance(points, (int, float)) for points in band.points):
+                raise RulebookError(f"{band.name}: points must be numbers")
+
+        category_specs = spec.get("categories") or {}
+        categories = {}
+        for name, values in CATEGORY_VALUES.items():
+            weights = category_specs.get(name)
+            if not isinstance(weights, Mapping):
+                raise RulebookError(f"Rulebook is missing category weights: {name}")
+            missing = [value for value in values if value not in weights]
+            if missing:
+                raise RulebookError(f"{name}: missing weights for {', '.join(missing)}")
+            unknown = [str(value) for value in weights if value not in values]
+            if unknown:
+                raise RulebookError(f"{name}: unknown values {', '.join(unknown)}")
+            if not all(isinstance(weight, (int, float)) for weight in weights.values()):
+                raise RulebookError(f"{name}: weights must be numbers")
+            categories[name] = weights
+
+        ratings = Band.from_dict("ratings", spec.get("ratings"), points_key="labels")
+        unknown = [label for label in ratings.points if label not in RATING_LABELS]
+        if unknown:
+            raise RulebookError(f"ratings: unknown labels {', '.join(map(str, unknown))}")
+
+        return cls(version, bands, categories, ratings, description=str(spec.get("description", "")))
+
+    def _compile_evaluators(self):
+        """
+        Generate the scalar evaluators for this rulebook.
+
+        `rate_mortgage(mortgage, avg_credit_score)` validates and rates one
+        mortgage; `band_key(mortgage, avg_credit_score)` quantizes a
+        validated one to the bands and categories that decide its rating,
+        so equal keys always mean equal ratings under this rulebook.
+
+        Short bands (the common case) are unrolled into chained comparisons
+        against constant thresholds, which beat a bisect call on a handful
+        of cut-offs; longer bands fall back to a bisect over their
+        threshold tuple. Category validation doubles as the weight lookup.
+        Both functions are generated once per rulebook version.
+        """
+        namespace = {
+            "loan_type_weights": self.categories["loan_type"],
+            "property_type_weights": self.categories["property_type"],
+        }
+        terms = " + ".join([
+            _band_expression(self.bands["ltv"], "ltv_ratio", namespace),
+            _band_expression(self.bands["dti"], "dti_ratio", namespace),
+            _band_expression(self.bands["credit_score"], "credit_score", namespace),
+            "loan_type_weight",
+            "property_type_weight",
+            _band_expression(self.bands["avg_credit_score"], "avg_credit_score", namespace),
+        ])
+        source = RATE_MORTGAGE_TEMPLATE.format(
+            terms=terms,
+            rating=_band_expression(self.ratings, "risk_score", namespace)
+        ) + BAND_KEY_TEMPLATE.format(**{
+            name: _band_expression(self.bands[name], variable, namespace, indices=True)
+            for name, variable in zip(BAND_FACTORS, ("ltv_ratio", "dti_ratio", "credit_score", "avg_credit_score"))
+        })
+        exec(compile(source, f"<rulebook {self.version}>", "exec"), namespace)
+        return namespace["rate_mortgage"], namespace["band_key"]
+
+    def risk_score_arrays(self, ltv_ratio: np.ndarray, dti_ratio: np.ndarray, credit_score: np.ndarray,
+                          loan_type: np.ndarray, property_type: np.ndarray, avg_credit_score) -> np.ndarray:
+        """
+        Compute the risk scores of a batch of validated mortgages column-wise.
+
+        Returns:
+            np.ndarray: The risk scores, one per row
+        """
+        return (
+            self.bands["ltv"].lookup_array(ltv_ratio)
+            + self.bands["dti"].lookup_array(dti_ratio)
+            + self.bands["credit_score"].lookup_array(credit_score)
+            + self._category_weights(self.categories["loan_type"], loan_type)
+            + self._category_weights(self.categories["property_type"], property_type)
+            + self.bands["avg_credit_score"].lookup_array(avg_credit_score)
+        )
+
+    def rate_arrays(self, ltv_ratio: np.ndarray, dti_ratio: np.ndarray, credit_score: np.ndarray,
+                    loan_type: np.ndarray, property_type: np.ndarray, avg_credit_score) -> np.ndarray:
+        """
+        Rate a batch of validated mortgages column-wise.
+
+        Returns:
+            np.ndarray: The credit ratings, one per row
+        """
+        return self.ratings.lookup_array(
+            self.risk_score_arrays(ltv_ratio, dti_ratio, credit_score, loan_type, property_type, avg_credit_score)
+        )
+
+    @staticmethod
+    def _category_weights(weights: Mapping[str, int], values: np.ndarray) -> np.ndarray:
+        result = np.zeros(values.shape, dtype=np.float64)
+        for value, weight in weights.items():
+            if weight:
+                result[values == value] = weight
+        return result
+
+    def to_dict(self) -> dict:
+        """Serialize the rulebook back to its document form."""
+        return {
+            "version": self.version,
+            "description": self.description,
+            "bands": {name: band.to_dict() for name, band in self.bands.items()},
+            "categories": self.categories,
+            "ratings": self.ratings.to_dict(points_key="labels"),
+        }
+
+
+# Scalar evaluator generated per rulebook; the validation matches calculate_credit_ratings
+RATE_MORTGAGE_TEMPLATE = '''
+def rate_mortgage(mortgage, avg_credit_score):
+    """Validate and rate one mortgage, returning AAA, BBB or C."""
+    loan_amount = mortgage.loan_amount
+    property_value = mortgage.property_value
+    income = mortgage.income
+    debt_amount = mortgage.debt_amount
+    credit_score = mortgage.credit_score
+    if loan_amount <= 0 or property_value <= 0:
+        raise ValueError("Loan amount and property value must be positive")
+    if income <= 0:
+        raise ValueError("Income must be positive")
+    if debt_amount < 0:
+        raise ValueError("Debt amount cannot be negative")
+    if not 300 <= credit_score <= 850:
+        raise ValueError("Credit score must be between 300 and 850")
+    loan_type_weight = loan_type_weights.get(mortgage.loan_type)
+    if loan_type_weight is None:
+        raise ValueError("Loan type must be either 'fixed' or 'adjustable'")
+    property_type_weight = property_type_weights.get(mortgage.property_type)
+    if property_type_weight is None:
+        raise ValueError("Property type must be either 'single_family' or 'condo'")
+    ltv_ratio = loan_amount / property_value
+    dti_ratio = debt_amount / income
+    risk_score = {terms}
+    return {rating}
+'''
+
+BAND_KEY_TEMPLATE = '''
+def band_key(mortgage, avg_credit_score):
+    """Quantize one validated mortgage to (LTV, DTI, credit score, loan type, property type, average score) bands."""
+    ltv_ratio = mortgage.loan_amount / mortgage.property_value
+    dti_ratio = mortgage.debt_amount / mortgage.income
+    credit_score = mortgage.credit_score
+    return ({ltv}, {dti}, {credit_score}, mortgage.loan_type, mortgage.property_type, {avg_credit_score})
+'''
+
+# Bands with more thresholds than this are evaluated with bisect instead of unrolled comparisons
+UNROLL_MAX_THRESHOLDS = 4
+
+
+def _band_expression(band: Band, value: str, namespace: dict, indices: bool = False) -> str:
+    """
+    Render the Python expression evaluating `band` for the variable `value`.
+
+    With `indices`, the expression yields the band's position instead of its points.
+    """
+    if len(band.thresholds) > UNROLL_MAX_THRESHOLDS:
+        prefix = f"_{band.name}"
+        namespace[f"{prefix}_thresholds"] = band.thresholds
+        namespace[f"{prefix}_points"] = band.points
+        namespace[f"{prefix}_bisect"] = band.bisect
+        lookup = f"{prefix}_bisect({prefix}_thresholds, {value})"
+        return lookup if indices else f"{prefix}_points[{lookup}]"
+    points = range(len(band.points)) if indices else band.points
+    if not band.thresholds:
+        return repr(points[0])
+    operator = ">" if band.ties == "lower" else ">="
+    expression = repr(points[0])
+    for threshold, above in zip(band.thresholds, points[1:]):
+        expression = f"{above!r} if {value} {operator} {threshold!r} else {expression}"
+    return f"({expression})"
+
+
+def load_rulebook(path: Path) -> CompiledRulebook:
+    """
+    Read and compile a rulebook file.
+
+    Args:
+        path (Path): A .json, .yaml or .yml rulebook
+
+    Returns:
+        CompiledRulebook: The compiled rulebook
+
+    Raises:
+        RulebookError: If the file cannot be read, parsed or compiled
+    """
+    try:
+        text = Path(path).read_text()
+    except OSError as e:
+        raise RulebookError(f"Cannot read rulebook {path}: {e}")
+    if Path(path).suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise RulebookError("YAML rulebooks require the PyYAML package")
+        try:
+            spec = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise RulebookError(f"Invalid YAML in rulebook {path}: {e}")
+    else:
+        try:
+            spec = json.loads(text)
+        except ValueError as e:
+            raise RulebookError(f"Invalid JSON in rulebook {path}: {e}")
+    return CompiledRulebook.from_dict(spec)
+
+
+class RulebookLoader:
+    """
+    Holds the active rulebook and reloads it when its file changes.
+
+    A rulebook that fails to load never replaces the active one; the error
+    is logged (or raised, from `reload`) and scoring carries on with the
+    previous version.
+    """
+
+    def __init__(self, path: Path = RULEBOOK_PATH, check_interval: float = RULEBOOK_CHECK_INTERVAL):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._rulebook: Optional[CompiledRulebook] = None
+        self._mtime = None
+        self._next_check = 0.0
+        self._loaded_at = None
+
+    def current(self) -> CompiledRulebook:
+        """
+        Get the active rulebook, re-reading the file if it changed since the last check.
+
+        Returns:
+            CompiledRulebook: The active rulebook
+
+        Raises:
+            RulebookError: If no rulebook has been loaded yet and the file is invalid
+        """
+        rulebook = self._rulebook
+        if rulebook is not None and _monotonic() < self._next_check:
+            return rulebook
+        with self._lock:
+            self._next_check = _monotonic() + self.check_interval
+            try:
+                mtime = self.path.stat().st_mtime_ns
+            except OSError as e:
+                if self._rulebook is None:
+                    raise RulebookError(f"Cannot read rulebook {self.path}: {e}")
+                return self._rulebook
+            if self._rulebook is None or mtime != self._mtime:
+                # Remember the mtime even on failure so a broken file is reported once
+                self._mtime = mtime
+                try:
+                    self._install(load_rulebook(self.path))
+                except RulebookError as e:
+                    if self._rulebook is None:
+                        raise
+                    logger.error(f"Keeping rulebook {self._rulebook.version}: {str(e)}")
+            return self._rulebook
+
+    def reload(self) -> CompiledRulebook:
+        """
+        Re-read the rulebook file now, regardless of its modification time.
+
+        Returns:
+            CompiledRulebook: The newly active rulebook
+
+        Raises:
+            RulebookError: If the file is invalid; the active rulebook is kept
+        """
+        with self._lock:
+            try:
+                self._mtime = self.path.stat().st_mtime_ns
+            except OSError:
+                pass
+            self._next_check = _monotonic() + self.check_interval
+            self._install(load_rulebook(self.path))
+            return self._rulebook
+
+    def _install(self, rulebook: CompiledRulebook) -> None:
+        previous = self._rulebook
+        self._rulebook = rulebook
+        self._loaded_at = time.time()
+        if previous is None:
+            logger.info(f"Loaded credit rating rulebook {rulebook.version} from {self.path}")
+        else:
+            logger.info(f"Reloaded credit rating rulebook: {previous.version} -> {rulebook.version}")
+
+    def snapshot(self) -> dict:
+        """Describe the active rulebook and where it was loaded from."""
+        rulebook = self.current()
+        return {
+            "version": rulebook.version,
+            "path": str(self.path),
+            "loaded_at": self._loaded_at,
+            "check_interval_seconds": self.check_interval,
+            "rulebook": rulebook.to_dict(),
+        }
+
+
+rulebook_loader = RulebookLoader()
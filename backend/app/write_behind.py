@@ -0,0 +1,183 @@
+"""
+Opt-in write-behind group commit for single mortgage submissions.
+
+With WRITE_BEHIND_ENABLED, POST /mortgages validates and scores the
+application as usual but, instead of its own INSERT/COMMIT/refresh,
+hands the row to a queue. A background flusher takes whatever has queued
+up, at most WRITE_BEHIND_MAX_BATCH rows or whatever arrived within
+WRITE_BEHIND_MAX_DELAY_MS of the first one, and writes it with one
+multi-row INSERT, one id/created_at read-back and one commit. That is one
+fsync per batch instead of per request.
+
+WRITE_BEHIND_DURABILITY decides when the caller is answered:
+- "commit" (default): once its batch has committed, with the assigned id
+  and created_at. Same guarantees as the per-request path; the latency
+  cost is at most the batching delay.
+- "enqueue": as soon as the row is queued (202 Accepted, no id yet).
+  Rows still queued or in a failed batch are lost if the process dies;
+  a graceful shutdown drains the queue first.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+
+from . import changes, metrics
+from .database import AsyncSessionLocal
+from .feed import record_changes_async
+from .models import Mortgage
+from .rollup import RollupDeltas, apply_rollup_deltas_async
+from .stats import apply_credit_score_delta_async, credit_score_stats
+from .utils.bulk import insert_mortgages
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_COMMIT = "commit"
+DURABILITY_ENQUEUE = "enqueue"
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "200"))
+WRITE_BEHIND_MAX_DELAY_MS = float(os.getenv("WRITE_BEHIND_MAX_DELAY_MS", "5"))
+WRITE_BEHIND_DURABILITY = os.getenv("WRITE_BEHIND_DURABILITY", DURABILITY_COMMIT).lower()
+# Queued rows beyond which submitters wait for the flusher (backpressure)
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "10000"))
+
+if WRITE_BEHIND_DURABILITY not in (DURABILITY_COMMIT, DURABILITY_ENQUEUE):
+    raise ValueError(
+        f"WRITE_BEHIND_DURABILITY must be {DURABILITY_COMMIT!r} or {DURABILITY_ENQUEUE!r}, "
+        f"not {WRITE_BEHIND_DURABILITY!r}"
+    )
+
+
+class _Pending(NamedTuple):
+    row: dict
+    future: Optional[asyncio.Future]
+
+
+class WriteBehindQueue:
+    """
+    Queue of scored mortgage rows with a background flusher writing them in batches.
+
+    The queue and flusher belong to the event loop of the first submit and
+    are started lazily; close() drains and stops them.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = WRITE_BEHIND_MAX_BATCH,
+        max_delay_ms: float = WRITE_BEHIND_MAX_DELAY_MS,
+        durability: str = WRITE_BEHIND_DURABILITY,
+        max_queue: int = WRITE_BEHIND_MAX_QUEUE,
+        session_factory=AsyncSessionLocal
+    ):
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.durability = durability
+        self.max_queue = max_queue
+        self.session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def submit(self, row: dict) -> Optional[Tuple[int, datetime]]:
+        """
+        Queue a scored mortgage row for the next batch.
+
+        Args:
+            row (dict): Column values of the new mortgage, as for insert_mortgages
+
+        Returns:
+            Optional[Tuple[int, datetime]]: The id and created_at once the
+            batch has committed, or None right away under "enqueue" durability
+
+        Raises:
+            Exception: Whatever made the batch fail, under "commit" durability
+        """
+        if self._flusher is None or self._flusher.done():
+            self._queue = asyncio.Queue(self.max_queue)
+            self._flusher = asyncio.create_task(self._run())
+        if self.durability == DURABILITY_ENQUEUE:
+            await self._queue.put(_Pending(row, None))
+            return None
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Pending(row, future))
+        return await future
+
+    async def close(self) -> None:
+        """Write everything still queued, then stop the flusher."""
+        if self._flusher is None:
+            return
+        if not self._flusher.done():
+            await self._queue.join()
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+        self._flusher = None
+        self._queue = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, batch: List[_Pending]) -> None:
+        """Insert one batch in a single transaction and answer its submitters."""
+        rows = [pending.row for pending in batch]
+        credit_score_total = sum(row["credit_score"] for row in rows)
+        rollup = RollupDeltas()
+        for row in rows:
+            rollup.add(row)
+        metrics.write_behind_batch_size.observe(len(rows))
+        try:
+            async with self.session_factory() as db:
+                try:
+                    with metrics.stage("write_behind", "db_insert"):
+                        ids = await insert_mortgages(db, rows)
+                        created_at = dict((await db.execute(
+                            select(Mortgage.id, Mortgage.created_at).where(Mortgage.id.in_(ids))
+                        )).all())
+                        await apply_credit_score_delta_async(db, len(rows), credit_score_total)
+                        await apply_rollup_deltas_async(db, rollup)
+                        await record_changes_async(db, changes.CREATED, ids)
+                    with metrics.stage("write_behind", "db_commit"):
+                        await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+        except Exception as e:
+            logger.error(f"Failed to write batch of {len(rows)} queued mortgages: {str(e)}")
+            for pending in batch:
+                if pending.future is not None and not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+        credit_score_stats.apply(len(rows), credit_score_total)
+        await changes.publish(changes.CREATED, ids)
+        for pending, mortgage_id in zip(batch, ids):
+            if pending.future is not None and not pending.future.done():
+                pending.future.set_result((mortgage_id, created_at[mortgage_id]))
+
+
+write_behind = WriteBehindQueue()
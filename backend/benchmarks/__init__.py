@@ -0,0 +1,5 @@
+"""
+Benchmark scripts for the mortgage system.
+
+Run from the backend directory, e.g. ``python -m benchmarks.bench_credit_rating``.
+"""
@@ -0,0 +1,125 @@
+"""
+Show goodput and tail latency past saturation, with and without admission control.
+
+Fills a local SQLite stand-in with --rows mortgages, then for each client
+count in --clients runs the app in-process (through its lifespan) twice:
+with admission control off, and on. Each closed-loop client issues a mix
+of list pages, single reads and creates; a client that is shed with 503
+waits as its Retry-After header asks before the next request.
+
+Per run it reports:
+- goodput: successful responses per second that met the --slo-ms deadline
+- p50 / p99 ms of successful responses
+- shed: the share of requests answered 503
+- the read limit admission control ended on, after adapting to latency
+
+Past saturation, without admission control every request queues on the
+event loop and the connection pool, so latency grows with the number of
+clients until nearly nothing meets the deadline. With it, the excess is
+shed at once and admitted requests keep their latency.
+
+Usage:
+    python -m benchmarks.bench_admission --clients 8 32 128 512 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+# The app must see the stand-in database before app.database is imported
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-admission-'), 'bench.db')}"
+)
+
+import httpx  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.admission import READ, admission  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.models import Mortgage  # noqa: E402
+from benchmarks.datagen import generate_payloads  # noqa: E402
+from benchmarks.load_test import percentile  # noqa: E402
+from benchmarks.suite import seed_book  # noqa: E402
+
+# (share of requests, request)
+MIX = [
+    (70, lambda client, rng, ids, payloads: client.get("/mortgages", params={"limit": 50})),
+    (25, lambda client, rng, ids, payloads: client.get(f"/mortgages/{rng.choice(ids)}")),
+    (5, lambda client, rng, ids, payloads: client.post("/mortgages", json=rng.choice(payloads))),
+]
+
+
+async def run_client(client, deadline: float, rng: random.Random, ids: list, payloads: list,
+                     samples: list, outcomes: dict) -> None:
+    """Issue requests from MIX until `deadline`, recording ms of successes and counting outcomes."""
+    weights = [weight for weight, _ in MIX]
+    requests = [request for _, request in MIX]
+    while time.perf_counter() < deadline:
+        request = rng.choices(requests, weights)[0]
+        start = time.perf_counter()
+        response = await request(client, rng, ids, payloads)
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code == 503:
+            outcomes["shed"] += 1
+            await asyncio.sleep(int(response.headers["Retry-After"]))
+        elif response.status_code >= 400:
+            outcomes["errors"] += 1
+        else:
+            samples.append(elapsed)
+
+
+async def run(clients: int, duration: float, enabled: bool, ids: list, payloads: list, seed: int) -> dict:
+    """Drive the app from `clients` clients for `duration` seconds; return the successes and outcomes."""
+    from app.main import app
+
+    admission.enabled = enabled
+    admission.latency.reset()
+    for limiter in admission.limiters.values():
+        limiter.limit = limiter.max_limit
+    samples, outcomes = [], {"shed": 0, "errors": 0}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            deadline = time.perf_counter() + duration
+            await asyncio.gather(*(
+                run_client(client, deadline, random.Random(seed + i), ids, payloads, samples, outcomes)
+                for i in range(clients)
+            ))
+    return {"samples": samples, **outcomes, "read_limit": admission.limiters[READ].limit}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[8, 32, 128, 512])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--slo-ms", type=float, default=250, help="deadline a response must meet to count as goodput")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    seed_book(args.rows, args.seed, "realistic")
+    with engine.connect() as connection:
+        ids = connection.scalars(select(Mortgage.id).limit(10_000)).all()
+    payloads = generate_payloads(1000, args.seed + 1, "realistic")
+
+    print(f"{'clients':>7} {'admission':>9} {'goodput/s':>10} {'ok/s':>8} {'p50 ms':>9} {'p99 ms':>9} "
+          f"{'shed':>6} {'read limit':>10}")
+    for clients in args.clients:
+        for enabled in (False, True):
+            result = asyncio.run(run(
+                clients, args.duration, enabled, list(ids), payloads, args.seed
+            ))
+            samples = result["samples"]
+            total = len(samples) + result["shed"] + result["errors"]
+            goodput = sum(sample <= args.slo_ms for sample in samples) / args.duration
+            print(f"{clients:>7} {'on' if enabled else 'off':>9} {goodput:>10.1f} "
+                  f"{len(samples) / args.duration:>8.1f} {percentile(samples, 0.5):>9.1f} "
+                  f"{percentile(samples, 0.99):>9.1f} {result['shed'] / max(total, 1):>6.1%} "
+                  f"{result['read_limit'] if enabled else '-':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Measure the live mortgages table and listing latency before and after archiving.
+
+Fills a local SQLite stand-in with --rows mortgages created evenly over
+the last --years years, then reports, before and after running the
+archive job with --after-days:
+- rows and bytes (table and indexes, from SQLite's dbstat) of `mortgages`
+  and `mortgages_archive`
+- median latency of GET /mortgages: the first page, the last page by
+  offset (a walk over the whole live list) and a page with a sparse filter
+  that no index serves, so it scans the live table
+- median latency of GET /mortgages/{id} for the newest row and for the
+  oldest, which the run archives
+and the archive job's throughput.
+
+Usage:
+    python -m benchmarks.bench_archive --rows 1000000 --years 5 --after-days 365
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+
+# The API must see the stand-in database before app.database is imported
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-archive-'), 'bench.db')}"
+)
+# Repeated requests would otherwise be answered by the response cache
+os.environ.setdefault("RESPONSE_CACHE_URL", "none")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import func, select, text  # noqa: E402
+
+from app.database import engine  # noqa: E402
+from app.jobs.archive import run_archive  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Mortgage  # noqa: E402
+from app.schema import prepare_database  # noqa: E402
+from benchmarks.datagen import CREATED_AT_START, generate_mortgage_rows  # noqa: E402
+
+CHUNK_ROWS = 50_000
+PAGE_SIZE = 50
+
+
+def table_size(table: str) -> tuple:
+    """Rows and bytes (table plus its indexes) of one table."""
+    with engine.connect() as connection:
+        rows = connection.scalar(text(f"SELECT COUNT(*) FROM {table}"))
+        size = connection.scalar(text(
+            "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat "
+            "WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name = :table)"
+        ), {"table": table})
+    return rows, size
+
+
+def median_ms(client: TestClient, path: str, params: dict, repeat: int) -> float:
+    """Median latency in milliseconds of GET `path`."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path, params=params)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text
+    return statistics.median(samples)
+
+
+def measure(client: TestClient, recent_id: int, old_id: int, repeat: int) -> dict:
+    """Sizes and latencies of the current state."""
+    live_rows, live_bytes = table_size("mortgages")
+    archived_rows, archived_bytes = table_size("mortgages_archive")
+    return {
+        "live rows": live_rows,
+        "live MiB": live_bytes / 2**20,
+        "archive rows": archived_rows,
+        "archive MiB": archived_bytes / 2**20,
+        "first page ms": median_ms(client, "/mortgages", {"limit": PAGE_SIZE}, repeat),
+        "last page (offset) ms": median_ms(
+            client, "/mortgages", {"limit": PAGE_SIZE, "skip": max(live_rows - PAGE_SIZE, 0)}, repeat
+        ),
+        "sparse filter ms": median_ms(
+            client, "/mortgages", {"limit": PAGE_SIZE, "min_ltv": 0.99, "max_credit_score": 320}, repeat
+        ),
+        "get recent row ms": median_ms(client, f"/mortgages/{recent_id}", {}, repeat),
+        "get old row ms": median_ms(client, f"/mortgages/{old_id}", {}, repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--after-days", type=float, default=365)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    interval = args.years * 365 * 86400 / args.rows
+    with engine.begin() as connection:
+        prepare_database(connection, create=True)
+        for offset in range(0, args.rows, CHUNK_ROWS):
+            connection.execute(Mortgage.__table__.insert(), generate_mortgage_rows(
+                min(CHUNK_ROWS, args.rows - offset), args.seed + offset, interval, "realistic", offset
+            ))
+        first_id, last_id = connection.execute(select(func.min(Mortgage.id), func.max(Mortgage.id))).one()
+    now = CREATED_AT_START + timedelta(seconds=args.rows * interval)
+
+    client = TestClient(app)
+    before = measure(client, last_id, first_id, args.repeat)
+    started = time.perf_counter()
+    summary = run_archive(args.after_days, args.batch_size, os.path.join(tempfile.mkdtemp(), "checkpoint.json"),
+                          now=now)
+    elapsed = time.perf_counter() - started
+    after = measure(client, last_id, first_id, args.repeat)
+
+    print(f"rows: {args.rows:,} over {args.years:g} years; archived {summary['rows']:,} unchanged for "
+          f"{args.after_days:g} days in {elapsed:.1f}s ({summary['rows'] / elapsed:,.0f} rows/s)")
+    print(f"\n{'':<24} {'before':>12} {'after':>12}")
+    for key in before:
+        print(f"{key:<24} {before[key]:>12,.2f} {after[key]:>12,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measure the per-request cost of obtaining the average credit score.
+
+Compares a full AVG(credit_score) scan, the maintained stats shards (a sum
+over STATS_SHARDS rows) and the in-process cache against a local SQLite
+stand-in.
+
+Usage:
+    python -m benchmarks.bench_avg_credit_score --rows 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Mortgage
+from app.stats import CreditScoreStatsCache, read_credit_score_stats, rebuild_credit_score_stats
+from benchmarks.datagen import generate_mortgage_rows
+
+
+def seed(session_factory, rows: int, seed_value: int) -> None:
+    """Insert `rows` synthetic mortgages and build the stats shards."""
+    db = session_factory()
+    try:
+        db.execute(Mortgage.__table__.insert(), generate_mortgage_rows(rows, seed_value))
+        rebuild_credit_score_stats(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+def time_per_call(fn, iterations: int) -> float:
+    """Return the mean seconds per call of `fn` over `iterations` calls."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-avg-"), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    seed(session_factory, args.rows, args.seed)
+
+    db = session_factory()
+    cache = CreditScoreStatsCache(max_staleness=5.0)
+    try:
+        scan = time_per_call(
+            lambda: db.execute(select(func.avg(Mortgage.credit_score))).scalar(),
+            max(1, args.iterations // 10)
+        )
+        stats_row = time_per_call(lambda: read_credit_score_stats(db), args.iterations)
+        cached = time_per_call(lambda: cache.average(db), args.iterations * 100)
+    finally:
+        db.close()
+
+    print(f"rows: {args.rows:,}")
+    print(f"AVG() scan:      {scan * 1e6:12.1f} us/request")
+    print(f"stats shard sum: {stats_row * 1e6:12.1f} us/request")
+    print(f"cached average:  {cached * 1e6:12.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Compare updating and deleting a segment by filter with a loop over its ids.
+
+Fills a local SQLite stand-in with --rows mortgages, then for two segments:
+- the adjustable-rate condos are switched to fixed rate: the first
+  --loop-rows of them with one PUT /mortgages/{id} each (the rows are read
+  up front, untimed), the rest with one POST /mortgages/bulk-update
+- the adjustable-rate single-family loans are deleted: the first
+  --loop-rows with one DELETE /mortgages/{id} each, the rest with one
+  POST /mortgages/bulk-delete
+
+and reports rows, seconds and rows/s of both, and the mean time of one
+bulk batch, i.e. how long each transaction holds its row locks.
+
+Usage:
+    python -m benchmarks.bench_bulk_filter --rows 1000000 --loop-rows 2000 --batch-size 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+# The API must see the stand-in database before app.database is imported
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-bulk-filter-'), 'bench.db')}"
+)
+# Repeated requests would otherwise be answered by the response cache
+os.environ.setdefault("RESPONSE_CACHE_URL", "none")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app import schemas, segments  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Mortgage  # noqa: E402
+from benchmarks.suite import seed_book  # noqa: E402
+
+UPDATE_FILTER = {"loan_type": "adjustable", "property_type": "condo"}
+UPDATE_VALUES = {"loan_type": "fixed"}
+DELETE_FILTER = {"loan_type": "adjustable", "property_type": "single_family"}
+
+
+def segment_rows(segment: dict, limit: int) -> list:
+    """The first `limit` mortgages of a segment, as PUT bodies keyed by id."""
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(Mortgage.id, *(getattr(Mortgage, field) for field in schemas.MortgageCreate.model_fields))
+            .filter_by(**segment)
+            .order_by(Mortgage.id)
+            .limit(limit)
+        ).all()
+    return [row._asdict() for row in rows]
+
+
+def timed(action) -> tuple:
+    """Run `action`; return its result and the seconds it took."""
+    started = time.perf_counter()
+    result = action()
+    return result, time.perf_counter() - started
+
+
+def report(name: str, loop_rows: int, loop_seconds: float, bulk: dict, bulk_seconds: float) -> None:
+    loop_rate = loop_rows / loop_seconds
+    bulk_rate = bulk["affected"] / bulk_seconds
+    print(f"{name:<8} {'per-id':<8} {loop_rows:>10,} {loop_seconds:>9.2f} {loop_rate:>12,.0f} {'':>14}")
+    print(f"{'':<8} {'bulk':<8} {bulk['affected']:>10,} {bulk_seconds:>9.2f} {bulk_rate:>12,.0f} "
+          f"{bulk_seconds * 1000 / max(bulk['batches'], 1):>14.1f}   ({bulk_rate / loop_rate:.0f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--loop-rows", type=int, default=2000, help="rows written one request at a time")
+    parser.add_argument("--batch-size", type=int, default=segments.BULK_FILTER_BATCH_SIZE,
+                        help="rows per bulk transaction")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    seed_book(args.rows, args.seed, "realistic")
+    segments.BULK_FILTER_BATCH_SIZE = args.batch_size
+    client = TestClient(app)
+
+    def put_each(rows):
+        for row in rows:
+            mortgage_id = row.pop("id")
+            response = client.put(f"/mortgages/{mortgage_id}", json={**row, **UPDATE_VALUES})
+            assert response.status_code == 200, response.text
+
+    def delete_each(rows):
+        for row in rows:
+            response = client.delete(f"/mortgages/{row['id']}")
+            assert response.status_code == 204, response.text
+
+    def bulk(path, body):
+        response = client.post(path, json=body)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    print(f"rows: {args.rows:,}  bulk batch size: {args.batch_size:,}")
+    print(f"\n{'':<8} {'':<8} {'rows':>10} {'seconds':>9} {'rows/s':>12} {'ms per batch':>14}")
+    rows = segment_rows(UPDATE_FILTER, args.loop_rows)
+    _, loop_seconds = timed(lambda: put_each(rows))
+    result, bulk_seconds = timed(lambda: bulk("/mortgages/bulk-update", {"filter": UPDATE_FILTER, "set": UPDATE_VALUES}))
+    report("update", len(rows), loop_seconds, result, bulk_seconds)
+
+    rows = segment_rows(DELETE_FILTER, args.loop_rows)
+    _, loop_seconds = timed(lambda: delete_each(rows))
+    result, bulk_seconds = timed(lambda: bulk("/mortgages/bulk-delete", {"filter": DELETE_FILTER}))
+    report("delete", len(rows), loop_seconds, result, bulk_seconds)
+
+
+if __name__ == "__main__":
+    main()
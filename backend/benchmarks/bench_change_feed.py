@@ -0,0 +1,158 @@
+"""
+Measure change feed fan-out against refetching the list after every write.
+
+Connects --subscribers in-process SSE streams to one worker's ChangeFeed,
+then commits --writes updates, one transaction each with its outbox event,
+as another worker would (the poller is only woken by its interval). Reports
+the delivery latency from commit to each subscriber, deliveries per
+second, the memory each idle subscriber holds and the database queries
+the feed issued.
+
+For comparison it times the refetch the frontend used to do instead: one
+GET /mortgages query and encoding per client per write, which the feed
+replaces with one poll per worker.
+
+Usage:
+    python -m benchmarks.bench_change_feed --subscribers 2000 --writes 200
+"""
+import argparse
+import asyncio
+import gc
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+# The app must see the stand-in database before app.database is imported
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-change-feed-'), 'bench.db')}"
+)
+
+from sqlalchemy import event, select, update  # noqa: E402
+
+from app import changes  # noqa: E402
+from app.database import async_engine, engine  # noqa: E402
+from app.feed import ChangeFeed, record_changes  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.models import Mortgage  # noqa: E402
+from app.schema import prepare_database  # noqa: E402
+from app.serialization import MORTGAGE_COLUMNS, encode_mortgage_rows  # noqa: E402
+from benchmarks.datagen import generate_mortgage_rows  # noqa: E402
+from benchmarks.load_test import percentile  # noqa: E402
+
+queries = 0
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    global queries
+    queries += 1
+
+
+async def subscribe(feed: ChangeFeed, received: list, ready: asyncio.Event, expected: int) -> None:
+    """Read one stream, recording when each change event arrives."""
+    stream = feed.stream()
+    await stream.__anext__()
+    ready.set()
+    count = 0
+    async for message in stream:
+        if message.startswith(b"id: "):
+            received.append(time.perf_counter())
+            count += 1
+            if count == expected:
+                break
+    await stream.aclose()
+
+
+def write(mortgage_id: int, committed: list) -> None:
+    """Update one mortgage and record its event in one transaction, as the API does."""
+    db = SessionLocal()
+    try:
+        db.execute(update(Mortgage).where(Mortgage.id == mortgage_id).values(applicant_name=f"Renamed {mortgage_id}"))
+        record_changes(db, changes.UPDATED, [mortgage_id])
+        db.commit()
+        committed.append(time.perf_counter())
+    finally:
+        db.close()
+
+
+async def run(subscribers: int, writes: int, poll_interval: float) -> dict:
+    global queries
+    feed = ChangeFeed(poll_interval=poll_interval, queue_size=writes + 1)
+    await feed.start(async_engine)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    received = [[] for _ in range(subscribers)]
+    tasks = []
+    for index in range(subscribers):
+        ready = asyncio.Event()
+        tasks.append(asyncio.create_task(subscribe(feed, received[index], ready, writes)))
+        await ready.wait()
+    gc.collect()
+    per_subscriber = (tracemalloc.get_traced_memory()[0] - before) / subscribers
+    tracemalloc.stop()
+
+    committed = []
+    queries = 0
+    started = time.perf_counter()
+    for mortgage_id in range(1, writes + 1):
+        await asyncio.to_thread(write, mortgage_id, committed)
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    seconds = time.perf_counter() - started
+    feed_queries = queries
+    await feed.close()
+
+    latencies = [
+        (arrival - commit) * 1000
+        for arrivals in received
+        for arrival, commit in zip(arrivals, committed)
+    ]
+    return {
+        "latencies": latencies,
+        "deliveries_per_second": len(latencies) / seconds,
+        "per_subscriber": per_subscriber,
+        "feed_queries": feed_queries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=2000)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=10_000, help="mortgages in the table")
+    parser.add_argument("--page", type=int, default=100, help="rows one GET /mortgages refetch returns")
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        prepare_database(connection, create=True)
+        connection.execute(Mortgage.__table__.insert(), generate_mortgage_rows(args.rows, 42))
+
+    result = asyncio.run(run(args.subscribers, args.writes, args.poll_interval))
+    latencies = result["latencies"]
+    print(f"subscribers: {args.subscribers:,}  writes: {args.writes:,}  poll interval: {args.poll_interval}s")
+    print(f"delivery latency ms: p50 {percentile(latencies, 0.5):.1f}  p99 {percentile(latencies, 0.99):.1f}  "
+          f"max {max(latencies):.1f}")
+    print(f"deliveries: {len(latencies):,} ({result['deliveries_per_second']:,.0f}/s)")
+    print(f"memory per idle subscriber: {result['per_subscriber'] / 1024:.1f} KiB")
+    print(f"feed queries: {result['feed_queries']:,} ({result['feed_queries'] / args.writes:.1f} per write)")
+
+    page = select(*MORTGAGE_COLUMNS).order_by(Mortgage.created_at, Mortgage.id).limit(args.page)
+    timings = []
+    with engine.connect() as connection:
+        for _ in range(200):
+            start = time.perf_counter()
+            encode_mortgage_rows(connection.execute(page).all())
+            timings.append((time.perf_counter() - start) * 1000)
+    refetch_ms = statistics.median(timings)
+    print(f"\nrefetch instead: {args.subscribers:,} queries per write, "
+          f"{refetch_ms:.2f} ms each = {refetch_ms * args.subscribers / 1000:.2f} s of database time per write")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Measure export throughput and peak Python memory at increasing table sizes.
+
+Drives the same streaming pipeline as GET /mortgages/export against a local
+SQLite stand-in; peak memory should stay flat as the table grows.
+
+Usage:
+    python -m benchmarks.bench_export --rows 500000 --format csv
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+# The app must see the stand-in database before app.database is imported
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-export-'), 'bench.db')}"
+)
+
+from app import export  # noqa: E402
+from app.database import Base, async_engine, engine  # noqa: E402
+from app.filters import MortgageFilters  # noqa: E402
+from app.models import Mortgage  # noqa: E402
+from benchmarks.datagen import generate_mortgage_rows  # noqa: E402
+
+NO_FILTERS = dict(
+    credit_rating=None, loan_type=None, property_type=None,
+    min_credit_score=None, max_credit_score=None, min_ltv=None, max_ltv=None
+)
+
+
+async def run_export(format: str) -> int:
+    """Consume one full export, discarding the bytes, and return its size."""
+    size = 0
+    async for chunk in export.ENCODERS[format](export.stream_rows(async_engine, MortgageFilters(**NO_FILTERS))):
+        size += len(chunk)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000, help="largest table size")
+    parser.add_argument("--steps", type=int, default=4, help="table sizes measured, up to --rows")
+    parser.add_argument("--format", choices=sorted(export.ENCODERS), default="ndjson")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    print(f"format: {args.format}  batch size: {export.EXPORT_BATCH_SIZE:,}")
+    print(f"{'rows':>10} {'seconds':>9} {'rows/s':>12} {'MB out':>9} {'peak MB':>9}")
+    loaded = 0
+    for step in range(1, args.steps + 1):
+        target = args.rows * step // args.steps
+        rows = generate_mortgage_rows(target - loaded, args.seed + step)
+        with engine.begin() as connection:
+            connection.execute(Mortgage.__table__.insert(), rows)
+        loaded = target
+        del rows
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        size = asyncio.run(run_export(args.format))
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{loaded:>10,} {elapsed:>9.2f} {loaded / elapsed:>12,.0f} {size / 1e6:>9.1f} {peak / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Measure what a broker retry storm costs POST /mortgages with and without Idempotency-Key.
+
+Each of --submissions applications is sent --retries extra times: half of
+the copies concurrently with the original (retries fired on a timeout
+while it is still running) and half after it has answered. Submissions
+run one after another, since SQLite serializes writers. Reports rows
+created, failed requests, SQL statements executed and wall time for each
+mode.
+
+Runs the API in-process against a local SQLite stand-in.
+
+Usage:
+    python -m benchmarks.bench_idempotency --submissions 200 --retries 8
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+# The API must see the stand-in database before app.database is imported
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-idempotency-'), 'bench.db')}"
+)
+
+import httpx  # noqa: E402
+from sqlalchemy import event, func, select  # noqa: E402
+
+from app.database import SessionLocal, async_engine, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Mortgage  # noqa: E402
+from app.schema import prepare_database  # noqa: E402
+from benchmarks.load_test import SAMPLE_MORTGAGE  # noqa: E402
+
+statements = 0
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+async def submit(client: httpx.AsyncClient, index: int, retries: int, keyed: bool) -> int:
+    """Send one application plus its retries, concurrent ones first, then late ones; return the failures."""
+    payload = {**SAMPLE_MORTGAGE, "applicant_name": f"Applicant {index}"}
+    headers = {"Idempotency-Key": f"submission-{index}"} if keyed else None
+    concurrent = retries // 2
+    responses = await asyncio.gather(*(
+        client.post("/mortgages", json=payload, headers=headers) for _ in range(1 + concurrent)
+    ))
+    for _ in range(retries - concurrent):
+        responses.append(await client.post("/mortgages", json=payload, headers=headers))
+    return sum(response.status_code != 201 for response in responses)
+
+
+async def storm(submissions: int, retries: int, keyed: bool) -> tuple:
+    """Run every submission with its retries; return the failures and the wall time in seconds."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        # The engine's one-time connect setup must not run concurrently
+        await client.get("/mortgages/stats")
+        failures = 0
+        start = time.perf_counter()
+        for index in range(submissions):
+            failures += await submit(client, index, retries, keyed)
+        return failures, time.perf_counter() - start
+
+
+def main():
+    global statements
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=200)
+    parser.add_argument("--retries", type=int, default=8)
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        prepare_database(connection, create=True)
+
+    requests = args.submissions * (1 + args.retries)
+    print(f"submissions: {args.submissions}  copies of each: {1 + args.retries}  requests: {requests:,}")
+    print(f"{'mode':<18} {'rows':>8} {'failed':>8} {'statements':>11} {'per request':>12} {'wall s':>8}")
+    for keyed in (False, True):
+        with SessionLocal() as db:
+            rows_before = db.scalar(select(func.count()).select_from(Mortgage))
+        statements = 0
+        failures, elapsed = asyncio.run(storm(args.submissions, args.retries, keyed))
+        with SessionLocal() as db:
+            rows = db.scalar(select(func.count()).select_from(Mortgage)) - rows_before
+        mode = "Idempotency-Key" if keyed else "no key"
+        print(f"{mode:<18} {rows:>8,} {failures:>8,} {statements:>11,} {statements / requests:>12.1f} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Compare GET /mortgages page latency at increasing depth: offset vs keyset cursor.
+
+Runs the API in-process against a local SQLite stand-in.
+
+Usage:
+    python -m benchmarks.bench_pagination --rows 200000 --limit 100
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# The API must see the stand-in database before app.database is imported
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-pagination-'), 'bench.db')}"
+)
+# Repeated requests would otherwise be answered by the response cache
+os.environ.setdefault("RESPONSE_CACHE_URL", "none")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Mortgage  # noqa: E402
+from app.schema import prepare_database  # noqa: E402
+from app.utils.pagination import encode_cursor  # noqa: E402
+from benchmarks.datagen import generate_mortgage_rows  # noqa: E402
+
+DEPTHS = (0.0, 0.25, 0.5, 0.75, 0.99)
+
+
+def median_ms(client: TestClient, params: dict, repeat: int) -> float:
+    """Median latency in milliseconds of GET /mortgages with `params`."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get("/mortgages", params=params)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        prepare_database(connection, create=True)
+        connection.execute(Mortgage.__table__.insert(), generate_mortgage_rows(args.rows, args.seed))
+
+    db = SessionLocal()
+    client = TestClient(app)
+    print(f"rows: {args.rows:,}  page size: {args.limit}")
+    print(f"{'depth':>8} {'offset ms':>12} {'cursor ms':>12}")
+    try:
+        for depth in DEPTHS:
+            skip = int(args.rows * depth)
+            # The cursor for a page at this depth is the position of the row just before it
+            anchor = db.execute(
+                select(Mortgage.created_at, Mortgage.id)
+                .order_by(Mortgage.created_at, Mortgage.id)
+                .offset(max(skip - 1, 0))
+                .limit(1)
+            ).one()
+            offset_ms = median_ms(client, {"skip": skip, "limit": args.limit}, args.repeat)
+            cursor_params = {"limit": args.limit}
+            if skip:
+                cursor_params["cursor"] = encode_cursor(anchor.created_at, anchor.id)
+            cursor_ms = median_ms(client, cursor_params, args.repeat)
+            print(f"{depth:>8.0%} {offset_ms:>12.2f} {cursor_ms:>12.2f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
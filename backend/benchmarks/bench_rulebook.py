@@ -0,0 +1,96 @@
+"""
+Compare the compiled rulebook evaluator with the hardcoded rules it replaced.
+
+`legacy_calculate_credit_rating` is the pre-rulebook implementation, kept
+here as the baseline; both paths must agree on every generated mortgage.
+
+Usage:
+    python -m benchmarks.bench_rulebook --rows 500000
+"""
+import argparse
+import time
+
+from app.utils.credit_rating import calculate_credit_rating
+from app.utils.rulebook import rulebook_loader
+from benchmarks.datagen import generate_mortgages
+
+
+def legacy_calculate_credit_rating(mortgage, avg_credit_score: float = 700.0) -> str:
+    """The hardcoded rating rules, as they were before the rulebook."""
+    if mortgage.loan_amount <= 0 or mortgage.property_value <= 0:
+        raise ValueError("Loan amount and property value must be positive")
+    if mortgage.income <= 0:
+        raise ValueError("Income must be positive")
+    if mortgage.debt_amount < 0:
+        raise ValueError("Debt amount cannot be negative")
+    if mortgage.credit_score < 300 or mortgage.credit_score > 850:
+        raise ValueError("Credit score must be between 300 and 850")
+    if mortgage.loan_type not in ["fixed", "adjustable"]:
+        raise ValueError("Loan type must be either 'fixed' or 'adjustable'")
+    if mortgage.property_type not in ["single_family", "condo"]:
+        raise ValueError("Property type must be either 'single_family' or 'condo'")
+
+    risk_score = 0
+    ltv_ratio = mortgage.loan_amount / mortgage.property_value
+    if ltv_ratio > 0.9:
+        risk_score += 2
+    elif ltv_ratio > 0.8:
+        risk_score += 1
+    dti_ratio = mortgage.debt_amount / mortgage.income
+    if dti_ratio > 0.5:
+        risk_score += 2
+    elif dti_ratio > 0.4:
+        risk_score += 1
+    if mortgage.credit_score >= 700:
+        risk_score -= 1
+    elif mortgage.credit_score < 650:
+        risk_score += 1
+    if mortgage.loan_type == "fixed":
+        risk_score -= 1
+    elif mortgage.loan_type == "adjustable":
+        risk_score += 1
+    if mortgage.property_type == "condo":
+        risk_score += 1
+    if avg_credit_score >= 700:
+        risk_score -= 1
+    elif avg_credit_score < 650:
+        risk_score += 1
+    if risk_score <= 1:
+        return "AAA"
+    elif 2 <= risk_score <= 4:
+        return "BBB"
+    else:
+        return "C"
+
+
+def best_of(function, mortgages: list, avg_credit_score: float, repeat: int) -> tuple:
+    """Score every mortgage with `function`, returning (ratings, best seconds)."""
+    best = float("inf")
+    ratings = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ratings = [function(m, avg_credit_score) for m in mortgages]
+        best = min(best, time.perf_counter() - start)
+    return ratings, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    mortgages = generate_mortgages(args.rows, args.seed)
+    print(f"rulebook: {rulebook_loader.current().version}  rows: {args.rows:,}")
+    print(f"{'avg score':>10} {'legacy rows/s':>15} {'compiled rows/s':>17} {'ratio':>7}")
+    for avg_credit_score in (600.0, 680.0, 720.0):
+        legacy, legacy_seconds = best_of(legacy_calculate_credit_rating, mortgages, avg_credit_score, args.repeat)
+        compiled, compiled_seconds = best_of(calculate_credit_rating, mortgages, avg_credit_score, args.repeat)
+        assert compiled == legacy, "compiled rulebook ratings differ from the hardcoded rules"
+        print(f"{avg_credit_score:>10.0f} {args.rows / legacy_seconds:>15,.0f} "
+              f"{args.rows / compiled_seconds:>17,.0f} {legacy_seconds / compiled_seconds:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
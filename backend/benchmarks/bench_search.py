@@ -0,0 +1,123 @@
+"""
+Compare applicant-name search through the trigram index with LIKE scans.
+
+Fills a local SQLite stand-in with --rows mortgages with realistic names,
+builds the in-memory name index (reporting build time and bytes per
+name), then times, per query:
+- index prefix: NameIndex.prefix on the start of a first name and surname
+- index fuzzy: NameIndex.fuzzy on a full name with two letters swapped,
+  and how often the misspelt name is among the results
+- LIKE 'x%': the database fallback of prefix mode, which matches the
+  start of the whole name, on the first name and the start of the
+  surname; it uses the name index where the collation allows (not on
+  SQLite, whose LIKE ignores case)
+- LIKE '%x%': the substring scan on the full (correctly spelt) name that
+  finding a borrower by surname would otherwise need; with few matches it
+  reads the whole table
+
+Usage:
+    python -m benchmarks.bench_search --rows 3000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# The app must see the stand-in database before app.database is imported
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-search-'), 'bench.db')}"
+)
+
+from sqlalchemy import select  # noqa: E402
+
+from app.database import engine  # noqa: E402
+from app.models import Mortgage  # noqa: E402
+from app.schema import prepare_database  # noqa: E402
+from app.search import NameIndex  # noqa: E402
+from benchmarks.datagen import iter_mortgage_rows  # noqa: E402
+from benchmarks.load_test import percentile  # noqa: E402
+
+LIMIT = 20
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    """Swap two adjacent letters of the surname."""
+    first, surname = name.split(" ", 1)
+    position = rng.randrange(1, len(surname) - 1)
+    return f"{first} {surname[:position]}{surname[position + 1]}{surname[position]}{surname[position + 2:]}"
+
+
+def timed(function, queries: list) -> tuple:
+    """Run `function` on every query; return the results and per-query milliseconds."""
+    results, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(function(query))
+        timings.append((time.perf_counter() - start) * 1000)
+    return results, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--scan-queries", type=int, default=10, help="queries for the (slow) LIKE '%%x%%' scan")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        prepare_database(connection, create=True)
+        for chunk in iter_mortgage_rows(args.rows, args.seed, profile="realistic"):
+            connection.execute(Mortgage.__table__.insert(), chunk)
+    with engine.connect() as connection:
+        names = dict(connection.execute(select(Mortgage.id, Mortgage.applicant_name)).all())
+
+    index = NameIndex()
+    start = time.perf_counter()
+    index.upsert(names.items())
+    build_seconds = time.perf_counter() - start
+    print(f"names: {len(index):,}  index build: {build_seconds:.1f}s  "
+          f"{index.nbytes() / len(index):.0f} bytes/name  trigrams: {len(index.postings):,}")
+
+    rng = random.Random(args.seed)
+    sample = [names[mortgage_id] for mortgage_id in rng.sample(sorted(names), args.queries)]
+    prefixes = [f"{name.split()[0][:2]} {name.split()[1][:4]}" for name in sample]
+    typos = [misspell(name, rng) for name in sample]
+
+    prefix_results, prefix_ms = timed(lambda query: index.prefix(query, LIMIT), prefixes)
+    fuzzy_results, fuzzy_ms = timed(lambda query: index.fuzzy(query, LIMIT), typos)
+    found = sum(
+        any(names[mortgage_id] == name for mortgage_id, _ in matches)
+        for name, matches in zip(sample, fuzzy_results)
+    )
+    rows = [
+        ("index prefix", prefix_ms, sum(map(len, prefix_results)) / len(prefixes)),
+        ("index fuzzy", fuzzy_ms, sum(map(len, fuzzy_results)) / len(typos)),
+    ]
+    with engine.connect() as connection:
+        for label, operator, queries in (
+            ("LIKE 'x%'", lambda query: Mortgage.applicant_name.startswith(query), [
+                f"{name.split()[0]} {name.split()[1][:4]}" for name in sample
+            ]),
+            ("LIKE '%x%'", lambda query: Mortgage.applicant_name.contains(query), sample[:args.scan_queries]),
+        ):
+            results, timings = timed(
+                lambda query: connection.execute(
+                    select(Mortgage.id).where(operator(query)).order_by(Mortgage.id).limit(LIMIT)
+                ).all(),
+                queries
+            )
+            rows.append((label, timings, sum(map(len, results)) / len(queries)))
+
+    print(f"\n{'search':<14} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'results':>8}")
+    for label, timings, result_count in rows:
+        print(f"{label:<14} {percentile(timings, 0.5):>9.3f} {percentile(timings, 0.99):>9.3f} "
+              f"{statistics.mean(timings):>9.3f} {result_count:>8.1f}")
+    print(f"\nfuzzy recall: the misspelt name was among the top {LIMIT} for {found / len(sample):.0%} of queries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compare the per-page cost of building a GET /mortgages response body.
+
+Paths, each reading the same page from a local SQLite stand-in:
+- response_model: ORM instances re-validated against schemas.Mortgage and
+  encoded by FastAPI's jsonable_encoder + json.dumps (the original path)
+- orm + TypeAdapter: ORM instances validated and dumped by pydantic-core
+- core + encoder: Core column tuples encoded directly (the current path)
+
+Query and encoding time are reported separately so the serialization
+share is visible.
+
+Usage:
+    python -m benchmarks.bench_serialization --rows 20000 --limit 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+# The app must see the stand-in database before app.database is imported
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-serialization-'), 'bench.db')}"
+)
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app import schemas, serialization  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models import Mortgage  # noqa: E402
+from benchmarks.datagen import generate_mortgage_rows  # noqa: E402
+
+LIST_ADAPTER = TypeAdapter(List[schemas.Mortgage])
+
+
+def encode_response_model(mortgages) -> bytes:
+    models = [schemas.Mortgage.model_validate(mortgage) for mortgage in mortgages]
+    return json.dumps(jsonable_encoder(models)).encode()
+
+
+def encode_type_adapter(mortgages) -> bytes:
+    return LIST_ADAPTER.dump_json(LIST_ADAPTER.validate_python(mortgages, from_attributes=True))
+
+
+def measure(db, statement, fetch, encode, repeat: int):
+    """Median query and encode milliseconds over `repeat` runs."""
+    query_ms, encode_ms = [], []
+    for _ in range(repeat):
+        db.expunge_all()
+        start = time.perf_counter()
+        rows = fetch(db.execute(statement))
+        fetched = time.perf_counter()
+        encode(rows)
+        query_ms.append((fetched - start) * 1000)
+        encode_ms.append((time.perf_counter() - fetched) * 1000)
+    return statistics.median(query_ms), statistics.median(encode_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000, help="rows in the table")
+    parser.add_argument("--limit", type=int, default=1000, help="page size")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(Mortgage.__table__.insert(), generate_mortgage_rows(args.rows, args.seed))
+
+    orm_page = select(Mortgage).order_by(Mortgage.created_at, Mortgage.id).limit(args.limit)
+    core_page = select(*serialization.MORTGAGE_COLUMNS).order_by(Mortgage.created_at, Mortgage.id).limit(args.limit)
+    paths = [
+        ("response_model", orm_page, lambda result: result.scalars().all(), encode_response_model),
+        ("orm + TypeAdapter", orm_page, lambda result: result.scalars().all(), encode_type_adapter),
+        ("core + encoder", core_page, lambda result: result.all(), serialization.encode_mortgage_rows),
+    ]
+    encoder = "orjson" if serialization.orjson is not None else "json (install orjson for the fast encoder)"
+    print(f"rows: {args.rows:,}  page size: {args.limit}  encoder: {encoder}")
+    print(f"{'path':<20} {'query ms':>9} {'encode ms':>10} {'total ms':>9} {'speedup':>8}")
+    baseline = None
+    with SessionLocal() as db:
+        for name, statement, fetch, encode in paths:
+            query_ms, encode_ms = measure(db, statement, fetch, encode, args.repeat)
+            total = query_ms + encode_ms
+            baseline = baseline or total
+            print(f"{name:<20} {query_ms:>9.2f} {encode_ms:>10.2f} {total:>9.2f} {baseline / total:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Measure the memory footprint and read latency of the in-memory mortgage snapshot.
+
+Loads --rows rows from a local SQLite stand-in three ways and reports the
+Python heap each holds (tracemalloc), scaled to bytes per row and MiB per
+million rows:
+- orm objects: `session.query(Mortgage).all()`, identity map included
+- row tuples: Core `select(*MORTGAGE_COLUMNS)` results
+- snapshot: the column store GET /mortgages is served from with SNAPSHOT_ENABLED
+
+Then compares the latency of a lookup by id and of a filtered listing page
+served from the snapshot with the same reads through the database.
+
+Usage:
+    python -m benchmarks.bench_snapshot --rows 200000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+# The app must see the stand-in database before app.database is imported
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-snapshot-'), 'bench.db')}"
+)
+
+from sqlalchemy import select  # noqa: E402
+
+from app.database import SessionLocal, async_engine, engine  # noqa: E402
+from app.filters import MortgageFilters  # noqa: E402
+from app.models import Mortgage  # noqa: E402
+from app.schema import prepare_database  # noqa: E402
+from app.serialization import MORTGAGE_COLUMNS, dumps, encode_mortgage_rows  # noqa: E402
+from app.snapshot import MortgageSnapshot  # noqa: E402
+from benchmarks.datagen import generate_mortgage_rows  # noqa: E402
+
+INSERT_BATCH_SIZE = 50_000
+PAGE_FILTERS = dict(
+    credit_rating="AAA", loan_type=None, property_type="condo",
+    min_credit_score=650, max_credit_score=None, min_ltv=None, max_ltv=0.8
+)
+
+
+def held_bytes(load) -> tuple:
+    """Run `load` and return what it returned plus the heap it still holds."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = load()
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return value, held
+
+
+def median_ms(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        prepare_database(connection, create=True)
+        for offset in range(0, args.rows, INSERT_BATCH_SIZE):
+            batch = generate_mortgage_rows(min(INSERT_BATCH_SIZE, args.rows - offset), args.seed + offset)
+            connection.execute(Mortgage.__table__.insert(), batch)
+
+    def load_orm():
+        db = SessionLocal()
+        return db, db.query(Mortgage).all()
+
+    def load_tuples():
+        with engine.connect() as connection:
+            return connection.execute(select(*MORTGAGE_COLUMNS)).all()
+
+    snapshot = MortgageSnapshot()
+    snapshot.engine = async_engine
+
+    def load_snapshot():
+        asyncio.run(snapshot.reload())
+        return snapshot
+
+    (session, mortgages), orm_bytes = held_bytes(load_orm)
+    session.close()
+    del session, mortgages
+    tuples, tuple_bytes = held_bytes(load_tuples)
+    del tuples
+    snapshot, snapshot_bytes = held_bytes(load_snapshot)
+    started = time.perf_counter()
+    asyncio.run(snapshot.reload())
+    load_seconds = time.perf_counter() - started
+
+    print(f"rows: {args.rows:,}  snapshot load: {load_seconds:.2f}s")
+    print(f"{'held as':<14} {'bytes/row':>10} {'MiB per 1M rows':>16} {'vs orm':>8}")
+    for name, held in (("orm objects", orm_bytes), ("row tuples", tuple_bytes), ("snapshot", snapshot_bytes)):
+        per_row = held / args.rows
+        print(f"{name:<14} {per_row:>10.1f} {per_row * 1_000_000 / 2**20:>16.1f} {orm_bytes / held:>7.1f}x")
+    print(f"snapshot arrays: {snapshot.columns.nbytes() / args.rows:.1f} bytes/row allocated, "
+          f"{len(snapshot.columns.names) / args.rows:.1f} of them names")
+
+    filters = MortgageFilters(**PAGE_FILTERS)
+    page = filters.apply(select(*MORTGAGE_COLUMNS)).order_by(Mortgage.created_at, Mortgage.id).limit(101)
+    middle_id = args.rows // 2
+    with engine.connect() as connection:
+        lookups = (
+            ("by id", lambda: connection.execute(select(*MORTGAGE_COLUMNS).where(Mortgage.id == middle_id)).first(),
+             lambda: snapshot.get(middle_id)),
+            ("filtered page", lambda: encode_mortgage_rows(connection.execute(page).all()),
+             lambda: dumps(snapshot.page(filters, limit=100)[0])),
+        )
+        print(f"\n{'read':<14} {'database ms':>12} {'snapshot ms':>12} {'speedup':>8}")
+        for name, from_database, from_snapshot in lookups:
+            database_ms = median_ms(from_database, args.repeat)
+            snapshot_ms = median_ms(from_snapshot, args.repeat)
+            print(f"{name:<14} {database_ms:>12.3f} {snapshot_ms:>12.3f} {database_ms / snapshot_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
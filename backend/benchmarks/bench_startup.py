@@ -0,0 +1,104 @@
+"""
+Measure worker cold start: process launch to first request served.
+
+Starts --runs fresh Python processes the way a uvicorn worker would load
+the app, against a local SQLite stand-in migrated once up front, and
+reports the median time of each phase:
+- import: `import app.main` (no database work happens here)
+- startup: the lifespan hook (rulebook compile, first connection, seeding)
+- first request: GET /health through the ASGI app
+- total: process launch to first response, including interpreter start
+
+Runs the app with DB_AUTO_CREATE off (schema from migrations) and on.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = ("import", "startup", "first_request")
+
+
+def worker() -> None:
+    """Load the app as a worker would and print the duration of each phase as JSON."""
+    import httpx  # the benchmark's client, not part of the worker's own start
+
+    started = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    async def serve_first_request():
+        async with app.router.lifespan_context(app):
+            ready = time.perf_counter()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+                response = await client.get("/health")
+            assert response.status_code == 200, response.text
+            return ready, time.perf_counter()
+
+    ready, served = asyncio.run(serve_first_request())
+    print(json.dumps({
+        "import": imported - started,
+        "startup": ready - imported,
+        "first_request": served - ready,
+    }))
+
+
+def run_worker(environment: dict) -> dict:
+    """Run one worker process and return its phase timings plus the total wall time."""
+    launched = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--worker"],
+        cwd=BACKEND_DIR,
+        env=environment,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    total = time.perf_counter() - launched
+    return {**json.loads(result.stdout.strip().splitlines()[-1]), "total": total}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker()
+        return
+
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-startup-'), 'bench.db')}"
+    environment = {key: value for key, value in os.environ.items() if key != "ASYNC_DATABASE_URL"}
+    environment["DATABASE_URL"] = database_url
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=BACKEND_DIR,
+        env=environment,
+        capture_output=True,
+        check=True
+    )
+
+    print(f"runs: {args.runs}  (median ms per phase)")
+    print(f"{'DB_AUTO_CREATE':<16} {'import':>9} {'startup':>9} {'1st req':>9} {'total':>9}")
+    for auto_create in ("false", "true"):
+        runs = [run_worker({**environment, "DB_AUTO_CREATE": auto_create}) for _ in range(args.runs)]
+        medians = {
+            phase: statistics.median(timings[phase] for timings in runs) * 1000
+            for phase in (*PHASES, "total")
+        }
+        print(f"{auto_create:<16} {medians['import']:>9.1f} {medians['startup']:>9.1f} "
+              f"{medians['first_request']:>9.1f} {medians['total']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Measure what-if grid evaluation and rating explanation latency.
+
+Grids vary loan amount and debt amount (square grids of increasing size)
+around generated applicants; the interactive target is a few thousand
+scenarios well under 10 ms.
+
+Usage:
+    python -m benchmarks.bench_whatif --sizes 1000 5000 10000 100000
+"""
+import argparse
+import math
+import statistics
+import time
+
+from app.utils.explain import explain_rating, what_if_grid
+from app.utils.rulebook import rulebook_loader
+from benchmarks.datagen import generate_mortgages
+
+
+def median_ms(function, repeat: int) -> float:
+    """Median wall time of `function()` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000, 100000], help="scenarios per grid")
+    parser.add_argument("--applicants", type=int, default=200, help="applicants explained")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rulebook = rulebook_loader.current()
+    mortgages = generate_mortgages(args.applicants, args.seed)
+    applicant = mortgages[0]
+
+    print(f"{'scenarios':>10} {'median ms':>10} {'scenarios/ms':>13}")
+    for size in args.sizes:
+        side = math.isqrt(size)
+        grid = {
+            "loan_amount": {"start": applicant.loan_amount * 0.5, "stop": applicant.loan_amount * 1.5, "steps": side},
+            "debt_amount": {"start": 0, "stop": applicant.income, "steps": side},
+        }
+        elapsed = median_ms(lambda: what_if_grid(applicant, grid, 700.0, rulebook), args.repeat)
+        print(f"{side * side:>10,} {elapsed:>10.2f} {side * side / elapsed:>13,.0f}")
+
+    start = time.perf_counter()
+    for mortgage in mortgages:
+        explain_rating(mortgage, 700.0, rulebook)
+    elapsed = (time.perf_counter() - start) * 1000 / len(mortgages)
+    print(f"explain_rating (factors + minimal changes): {elapsed:.3f} ms per applicant")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Compare POST /mortgages throughput: one commit per request vs write-behind group commit.
+
+--clients concurrent clients create --requests mortgages in total, once
+per mode: the per-request path, the write-behind queue answering after
+its batch commits ("commit" durability), and answering on enqueue. Reports
+throughput, latency percentiles, failed requests, commits issued and the
+mean batch size. On SQLite, concurrent per-request writers contend for
+the database lock and some give up with "database is locked"; the
+write-behind flusher is a single writer.
+
+Runs the API in-process against a local SQLite stand-in.
+
+Usage:
+    python -m benchmarks.bench_write_behind --clients 50 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+# The API must see the stand-in database before app.database is imported
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-write-behind-'), 'bench.db')}"
+)
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import app.main as main_module  # noqa: E402
+from app.database import async_engine, engine  # noqa: E402
+from app.schema import prepare_database  # noqa: E402
+from app.write_behind import DURABILITY_COMMIT, DURABILITY_ENQUEUE, WriteBehindQueue  # noqa: E402
+from benchmarks.load_test import SAMPLE_MORTGAGE, percentile  # noqa: E402
+
+commits = 0
+
+
+@event.listens_for(async_engine.sync_engine, "commit")
+def _count_commit(conn):
+    global commits
+    commits += 1
+
+
+async def run_client(client: httpx.AsyncClient, count: int, latencies: list, failures: list) -> None:
+    """Create `count` mortgages one after another, recording latency in ms and failed statuses."""
+    for _ in range(count):
+        start = time.perf_counter()
+        response = await client.post("/mortgages", json=SAMPLE_MORTGAGE)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code not in (201, 202):
+            failures.append(response.status_code)
+
+
+async def run(clients: int, requests: int) -> tuple:
+    """Run one mode; return the latencies, failures and seconds until every row was written."""
+    latencies = []
+    failures = []
+    transport = httpx.ASGITransport(app=main_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        # The engine's one-time connect setup must not run concurrently
+        await client.get("/mortgages/stats")
+        start = time.perf_counter()
+        await asyncio.gather(*(run_client(client, requests // clients, latencies, failures) for _ in range(clients)))
+        await main_module.write_behind.close()
+        return latencies, failures, time.perf_counter() - start
+
+
+def main():
+    global commits
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--max-batch", type=int, default=200)
+    parser.add_argument("--max-delay-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        prepare_database(connection, create=True)
+
+    modes = (
+        ("per-request", None),
+        ("group commit", DURABILITY_COMMIT),
+        ("group, enqueue ack", DURABILITY_ENQUEUE),
+    )
+    print(f"clients: {args.clients}  requests: {args.requests:,}  "
+          f"batch: {args.max_batch} rows / {args.max_delay_ms:g} ms")
+    print(f"{'mode':<20} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'failed':>7} {'commits':>8} {'rows/commit':>12}")
+    for name, durability in modes:
+        main_module.WRITE_BEHIND_ENABLED = durability is not None
+        main_module.write_behind = WriteBehindQueue(
+            max_batch=args.max_batch,
+            max_delay_ms=args.max_delay_ms,
+            durability=durability or DURABILITY_COMMIT
+        )
+        commits = 0
+        latencies, failures, elapsed = asyncio.run(run(args.clients, args.requests))
+        print(f"{name:<20} {len(latencies) / elapsed:>8,.0f} {statistics.median(latencies):>8.1f} "
+              f"{percentile(latencies, 0.99):>8.1f} {len(failures):>7,} {commits:>8,} {len(latencies) / max(commits, 1):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
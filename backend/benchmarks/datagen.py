@@ -0,0 +1,223 @@
+"""
+Seeded synthetic mortgage data for benchmarks.
+
+Two profiles are available. `uniform` spreads every field evenly over its
+valid range, which exercises every branch of the rating rules equally.
+`realistic` follows the shape of a retail mortgage book: log-normal
+incomes and property values, credit scores clustered around 715, most
+loans at 70-90% LTV, about three quarters fixed-rate and single-family,
+and applicant names drawn from common first names and thousands of
+generated surnames (the uniform profile names applicants
+"Applicant <n>").
+"""
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+import numpy as np
+
+from app.schemas import MortgageCreate
+from app.utils.credit_rating import calculate_credit_ratings
+
+LOAN_TYPES = np.array(["fixed", "adjustable"], dtype=object)
+PROPERTY_TYPES = np.array(["single_family", "condo"], dtype=object)
+CREATED_AT_START = datetime(2024, 1, 1)
+PROFILES = ("uniform", "realistic")
+FIRST_NAMES = np.array([
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth",
+    "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+    "Daniel", "Nancy", "Matthew", "Lisa", "Anthony", "Betty", "Mark", "Margaret", "Donald", "Sandra",
+    "Steven", "Ashley", "Paul", "Emily", "Andrew", "Donna", "Joshua", "Michelle", "Kenneth", "Carol",
+    "Kevin", "Amanda", "Brian", "Melissa", "George", "Deborah", "Timothy", "Stephanie", "Ronald", "Rebecca",
+    "José", "María", "Luis", "Ana", "Wei", "Mei", "Hiroshi", "Yuki", "Ahmed", "Fatima",
+], dtype=object)
+# Surnames are a stem, a joint and an ending: 28 x 10 x 20 combinations
+SURNAME_PARTS = (
+    ("Ander", "Bar", "Cal", "Dun", "El", "Fair", "Gar", "Har", "Ing", "Jen", "Kel", "Lang", "Mar", "Nor",
+     "Os", "Pem", "Quin", "Ros", "Stan", "Thom", "Ul", "Van", "Wil", "York", "Zell", "Brad", "Crom", "Fitz"),
+    ("", "a", "e", "i", "o", "er", "in", "ing", "ow", "ley"),
+    ("son", "ton", "field", "man", "well", "wood", "by", "ford", "berg", "ez", "ski", "ridge", "more",
+     "worth", "ham", "stein", "ard", "ett", "ins", "ley"),
+)
+
+
+def _realistic_arrays(rng: np.random.Generator, rows: int) -> dict:
+    income = np.clip(rng.lognormal(np.log(85_000), 0.55, rows), 15_000, 2_000_000).round(2)
+    property_value = np.clip(rng.lognormal(np.log(380_000), 0.5, rows), 60_000, 5_000_000).round(2)
+    ltv = 0.3 + 0.67 * rng.beta(8, 3, rows)
+    return {
+        "loan_amount": (property_value * ltv).round(2),
+        "property_value": property_value,
+        "income": income,
+        "debt_amount": (income * rng.beta(2, 6, rows)).round(2),
+        "credit_score": np.clip(rng.normal(715, 60, rows), 300, 850).astype(np.int64),
+        "loan_type": LOAN_TYPES[(rng.random(rows) < 0.25).astype(np.int64)],
+        "property_type": PROPERTY_TYPES[(rng.random(rows) < 0.3).astype(np.int64)],
+    }
+
+
+def generate_rating_arrays(rows: int, seed: int = 42, profile: str = "uniform") -> dict:
+    """
+    Generate a struct-of-arrays of random but valid mortgage applications.
+    
+    Args:
+        rows (int): Number of applications to generate
+        seed (int): Random seed, so runs are reproducible
+        profile (str): "uniform" or "realistic" field distributions
+        
+    Returns:
+        dict: One NumPy array per scoring column
+        
+    Raises:
+        ValueError: If the profile is unknown
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile {profile!r}; expected one of {', '.join(PROFILES)}")
+    rng = np.random.default_rng(seed)
+    if profile == "realistic":
+        return _realistic_arrays(rng, rows)
+    property_value = rng.uniform(100_000, 1_500_000, rows).round(2)
+    income = rng.uniform(25_000, 400_000, rows).round(2)
+    return {
+        "loan_amount": (property_value * rng.uniform(0.3, 1.0, rows)).round(2),
+        "property_value": property_value,
+        "income": income,
+        "debt_amount": (income * rng.uniform(0.0, 0.7, rows)).round(2),
+        "credit_score": rng.integers(300, 851, rows),
+        "loan_type": LOAN_TYPES[rng.integers(0, 2, rows)],
+        "property_type": PROPERTY_TYPES[rng.integers(0, 2, rows)],
+    }
+
+
+def generate_names(rows: int, seed: int = 42) -> List[str]:
+    """
+    Generate applicant names: a common first name and one of 5,600 surnames.
+    
+    Args:
+        rows (int): Number of names to generate
+        seed (int): Random seed, so runs are reproducible
+        
+    Returns:
+        list[str]: The names
+    """
+    rng = np.random.default_rng(seed)
+    first = FIRST_NAMES[rng.integers(0, len(FIRST_NAMES), rows)]
+    parts = [np.array(part, dtype=object)[rng.integers(0, len(part), rows)] for part in SURNAME_PARTS]
+    return (first + " " + parts[0] + parts[1] + parts[2]).tolist()
+
+
+def _names(rows: int, seed: int, profile: str, first_index: int = 0) -> List[str]:
+    if profile == "realistic":
+        return generate_names(rows, seed + 1)
+    return [f"Applicant {first_index + i}" for i in range(rows)]
+
+
+def generate_payloads(rows: int, seed: int = 42, profile: str = "uniform") -> List[dict]:
+    """
+    Generate random but valid POST /mortgages request bodies.
+    
+    Args:
+        rows (int): Number of applications to generate
+        seed (int): Random seed, so runs are reproducible
+        profile (str): "uniform" or "realistic" field distributions
+        
+    Returns:
+        list[dict]: One JSON-ready MortgageCreate body per application
+    """
+    arrays = generate_rating_arrays(rows, seed, profile)
+    columns = {name: values.tolist() for name, values in arrays.items()}
+    names = _names(rows, seed, profile)
+    return [
+        {
+            "applicant_name": names[i],
+            **{name: values[i] for name, values in columns.items()},
+        }
+        for i in range(rows)
+    ]
+
+
+def generate_mortgages(rows: int, seed: int = 42, profile: str = "uniform") -> list:
+    """
+    Generate random but valid MortgageCreate instances.
+    
+    Instances are built with ``model_construct`` so benchmark setup does not
+    pay for pydantic validation.
+    
+    Args:
+        rows (int): Number of applications to generate
+        seed (int): Random seed, so runs are reproducible
+        profile (str): "uniform" or "realistic" field distributions
+        
+    Returns:
+        list[MortgageCreate]: The generated applications
+    """
+    return [MortgageCreate.model_construct(**payload) for payload in generate_payloads(rows, seed, profile)]
+
+
+def generate_mortgage_rows(
+    rows: int,
+    seed: int = 42,
+    interval_seconds: float = 0.2,
+    profile: str = "uniform",
+    first_index: int = 0
+) -> list:
+    """
+    Generate insert-ready column dicts for the mortgages table, already scored.
+    
+    Rows get increasing created_at timestamps `interval_seconds` apart, so
+    several rows share a second as they would under real ingestion.
+    
+    Args:
+        rows (int): Number of rows to generate
+        seed (int): Random seed, so runs are reproducible
+        interval_seconds (float): Spacing between consecutive created_at values
+        profile (str): "uniform" or "realistic" field distributions
+        first_index (int): Position of the first row in a larger book, for names and timestamps
+        
+    Returns:
+        list[dict]: Column values for each row, including credit_rating
+    """
+    arrays = generate_rating_arrays(rows, seed, profile)
+    ratings = calculate_credit_ratings(arrays)
+    columns = {name: values.tolist() for name, values in arrays.items()}
+    names = _names(rows, seed, profile, first_index)
+    return [
+        {
+            "applicant_name": names[i],
+            "income": columns["income"][i],
+            "credit_score": columns["credit_score"][i],
+            "loan_amount": columns["loan_amount"][i],
+            "property_value": columns["property_value"][i],
+            "debt_amount": columns["debt_amount"][i],
+            "loan_type": columns["loan_type"][i],
+            "property_type": columns["property_type"][i],
+            "credit_rating": str(ratings[i]),
+            "created_at": CREATED_AT_START + timedelta(seconds=(first_index + i) * interval_seconds),
+        }
+        for i in range(rows)
+    ]
+
+
+def iter_mortgage_rows(
+    rows: int,
+    seed: int = 42,
+    chunk_size: int = 50_000,
+    profile: str = "uniform"
+) -> Iterator[List[dict]]:
+    """
+    Generate a book of any size (10^7 rows and up) in insert-ready chunks.
+    
+    Each chunk is seeded from `seed` and its offset, so a seed and chunk
+    size always produce the same book, without holding it all in memory.
+    
+    Args:
+        rows (int): Number of rows to generate
+        seed (int): Random seed, so runs are reproducible
+        chunk_size (int): Rows per yielded chunk
+        profile (str): "uniform" or "realistic" field distributions
+        
+    Yields:
+        list[dict]: Column values for up to chunk_size rows
+    """
+    for offset in range(0, rows, chunk_size):
+        count = min(chunk_size, rows - offset)
+        yield generate_mortgage_rows(count, seed + offset, profile=profile, first_index=offset)
@@ -0,0 +1,123 @@
+"""
+Concurrent-client load test for the mortgage API, reporting latency percentiles.
+
+Each client loops over a mixed workload (list, plus a configurable share of
+creates and updates) for a fixed duration. By default the app runs
+in-process against a local SQLite stand-in; pass --url to drive a running server (e.g. uvicorn against MySQL).
+Run it on two checkouts to compare before/after a change.
+
+Usage:
+    python -m benchmarks.load_test --clients 50 --duration 10
+    python -m benchmarks.load_test --url http://localhost:8000 --clients 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+SAMPLE_MORTGAGE = {
+    "applicant_name": "Load Test",
+    "income": 100000.0,
+    "credit_score": 720,
+    "loan_amount": 300000.0,
+    "property_value": 400000.0,
+    "debt_amount": 20000.0,
+    "loan_type": "fixed",
+    "property_type": "single_family",
+}
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """Return the `fraction` percentile of `samples` (nearest rank)."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_client(client: httpx.AsyncClient, deadline: float, latencies: dict, ids: list,
+                     rng: random.Random, write_fraction: float):
+    """Issue requests until `deadline`, recording latency in ms per route."""
+    while time.perf_counter() < deadline:
+        roll = rng.random()
+        start = time.perf_counter()
+        if roll >= write_fraction or not ids:
+            route = "GET /mortgages"
+            response = await client.get("/mortgages", params={"limit": 50})
+        elif roll < write_fraction * 0.6:
+            route = "POST /mortgages"
+            response = await client.post("/mortgages", json=SAMPLE_MORTGAGE)
+            if response.status_code == 201:
+                ids.append(response.json()["id"])
+        else:
+            route = "PUT /mortgages/{id}"
+            payload = {**SAMPLE_MORTGAGE, "credit_score": rng.randint(300, 850)}
+            response = await client.put(f"/mortgages/{rng.choice(ids)}", json=payload)
+        elapsed = (time.perf_counter() - start) * 1000
+        latencies[route if response.status_code < 500 else f"{route} (error)"].append(elapsed)
+
+
+async def run(args) -> dict:
+    """Run the load test and return latency samples per route."""
+    if args.url:
+        transport = None
+        base_url = args.url
+    else:
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://loadtest"
+
+    latencies = defaultdict(list)
+    ids = []
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+        # Seed a few rows so updates have targets from the start
+        for _ in range(20):
+            response = await client.post("/mortgages", json=SAMPLE_MORTGAGE)
+            ids.append(response.json()["id"])
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(
+            run_client(client, deadline, latencies, ids, random.Random(args.seed + i), args.write_fraction)
+            for i in range(args.clients)
+        ))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server; in-process when omitted")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--write-fraction", type=float, default=0.1,
+                        help="share of creates/updates; SQLite serializes writers, so keep it low there")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if not args.url:
+        # The in-process app must see the stand-in database before app.database is imported
+        os.environ.setdefault(
+            "DATABASE_URL",
+            f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='load-test-'), 'load.db')}"
+        )
+        from app.database import engine
+        from app.schema import prepare_database
+
+        with engine.begin() as connection:
+            prepare_database(connection, create=True)
+
+    latencies = asyncio.run(run(args))
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"clients: {args.clients}  duration: {args.duration:.0f}s  requests: {total:,}  "
+          f"throughput: {total / args.duration:,.0f} req/s")
+    print(f"{'route':<28} {'count':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for route, samples in sorted(latencies.items()):
+        print(f"{route:<28} {len(samples):>8} {statistics.median(samples):>9.1f} "
+              f"{percentile(samples, 0.95):>9.1f} {percentile(samples, 0.99):>9.1f} {max(samples):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
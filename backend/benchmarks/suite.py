@@ -0,0 +1,418 @@
+"""
+End-to-end benchmark suite with machine-readable results and regression thresholds.
+
+Runs, with seeded data from benchmarks.datagen:
+- micro: `calculate_credit_rating` one application at a time and
+  `calculate_credit_ratings` on a batch, MortgageCreate validation and
+  encoding a GET /mortgages page
+- load: concurrent in-process clients driving every route of app.main
+  (the change feed stream and the profiler excepted) through the app's
+  lifespan against a local SQLite stand-in of --rows mortgages, or the
+  database in DATABASE_URL (e.g. a MySQL instance)
+
+Every benchmark reports its throughput (rows/s or requests/s) and p99
+latency in ms. The results are written as JSON to --output. With
+--baseline, each one is compared with the same benchmark in an earlier
+results file, and the suite exits with status 1 if throughput dropped by
+more than --max-throughput-drop or p99 latency grew by more than
+--max-p99-increase. Compare runs from the same machine and arguments.
+
+Usage:
+    python -m benchmarks.suite --output baseline.json
+    python -m benchmarks.suite --baseline baseline.json --output results.json
+    python -m benchmarks.suite --rows 10000000 --profile realistic --only load
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+# The app must see the stand-in database before app.database is imported
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-suite-'), 'bench.db')}"
+)
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+import sqlalchemy  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from app.database import engine  # noqa: E402
+from app.models import Mortgage  # noqa: E402
+from app.schema import prepare_database  # noqa: E402
+from app.schemas import MortgageCreate  # noqa: E402
+from app.serialization import MORTGAGE_COLUMNS, encode_mortgage_rows  # noqa: E402
+from app.utils.credit_rating import calculate_credit_rating, calculate_credit_ratings  # noqa: E402
+from benchmarks.datagen import PROFILES, generate_payloads, generate_rating_arrays, iter_mortgage_rows  # noqa: E402
+from benchmarks.load_test import percentile  # noqa: E402
+
+RESULTS_VERSION = 1
+BATCH_ROWS = 1000
+VECTOR_BATCH_ROWS = 10_000
+PAGE_ROWS = 100
+
+# Benchmarks timed fewer times than this in either run are too noisy to compare
+MIN_COMPARED_SAMPLES = 10
+
+# Routes the load driver does not call: an endless stream and a multi-second sampler
+EXCLUDED_ROUTES = {"GET /mortgages/changes", "POST /admin/profile"}
+
+
+def summarize(samples: List[float], units: float, unit: str) -> dict:
+    """
+    Build one benchmark result from per-operation latencies.
+
+    Args:
+        samples (List[float]): Milliseconds per timed operation
+        units (float): Rows or requests the operations processed in total
+        unit (str): Throughput unit, e.g. "rows/s"
+
+    Returns:
+        dict: Throughput, unit, operation count and latency percentiles in ms
+    """
+    return {
+        "throughput": units / (sum(samples) / 1000),
+        "unit": unit,
+        "count": len(samples),
+        "p50_ms": percentile(samples, 0.5),
+        "p99_ms": percentile(samples, 0.99),
+    }
+
+
+def time_batches(function: Callable, batches: list) -> List[float]:
+    """Call `function` on each batch and return the milliseconds each call took."""
+    timings = []
+    for batch in batches:
+        start = time.perf_counter()
+        function(batch)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def run_micro(rows: int, seed: int, profile: str) -> Dict[str, dict]:
+    """
+    Time the scorer and the request/response schemas on `rows` generated applications.
+
+    The scalar scorer and validation are timed per batch of BATCH_ROWS
+    applications, the vectorized scorer per batch of VECTOR_BATCH_ROWS and
+    encoding per page of PAGE_ROWS rows.
+    """
+    payloads = generate_payloads(rows, seed, profile)
+    applications = [MortgageCreate.model_construct(**payload) for payload in payloads]
+    batches = [applications[offset:offset + BATCH_ROWS] for offset in range(0, rows, BATCH_ROWS)]
+    payload_batches = [payloads[offset:offset + BATCH_ROWS] for offset in range(0, rows, BATCH_ROWS)]
+    arrays = generate_rating_arrays(rows, seed, profile)
+    array_batches = [
+        {name: values[offset:offset + VECTOR_BATCH_ROWS] for name, values in arrays.items()}
+        for offset in range(0, rows, VECTOR_BATCH_ROWS)
+    ]
+    ratings = calculate_credit_ratings(arrays)
+    now = datetime(2024, 1, 1)
+    # Rows in MORTGAGE_COLUMNS order, as the listing query returns them
+    stored = [
+        tuple(
+            {**payload, "id": index + 1, "credit_rating": str(ratings[index]), "rulebook_version": "v1",
+             "created_at": now, "updated_at": None}[column.key]
+            for column in MORTGAGE_COLUMNS
+        )
+        for index, payload in enumerate(payloads)
+    ]
+    pages = [stored[offset:offset + PAGE_ROWS] for offset in range(0, rows, PAGE_ROWS)]
+
+    return {
+        "micro.credit_rating.scalar": summarize(
+            time_batches(lambda batch: [calculate_credit_rating(mortgage) for mortgage in batch], batches),
+            rows, "rows/s"
+        ),
+        "micro.credit_rating.vectorized": summarize(
+            time_batches(calculate_credit_ratings, array_batches), rows, "rows/s"
+        ),
+        "micro.schema.validate": summarize(
+            time_batches(lambda batch: [MortgageCreate.model_validate(payload) for payload in batch], payload_batches),
+            rows, "rows/s"
+        ),
+        "micro.schema.encode": summarize(time_batches(encode_mortgage_rows, pages), rows, "rows/s"),
+    }
+
+
+def seed_book(rows: int, seed: int, profile: str) -> None:
+    """Create the schema and fill the mortgages table with `rows` generated rows."""
+    with engine.begin() as connection:
+        prepare_database(connection, create=True)
+        if connection.scalar(select(func.count()).select_from(Mortgage)):
+            return
+        for chunk in iter_mortgage_rows(rows, seed, profile=profile):
+            connection.execute(Mortgage.__table__.insert(), chunk)
+
+
+class LoadState:
+    """Shared inputs of the load clients: payloads to send and ids that exist."""
+
+    def __init__(self, payloads: List[dict], ids: List[int]):
+        self.payloads = payloads
+        self.ids = ids
+        # Ids created during the run, which DELETE consumes so the book keeps its size
+        self.created: List[int] = []
+
+    def payload(self, rng: random.Random) -> dict:
+        return rng.choice(self.payloads)
+
+    def existing_id(self, rng: random.Random) -> int:
+        return rng.choice(self.ids)
+
+
+async def _create(client, rng, state):
+    response = await client.post("/mortgages", json=state.payload(rng))
+    if response.status_code == 201:
+        state.created.append(response.json()["id"])
+    return response
+
+
+async def _delete(client, rng, state):
+    # Creates outnumber deletes, so this only happens before the first create returns
+    if not state.created:
+        return await _create(client, rng, state)
+    return await client.delete(f"/mortgages/{state.created.pop()}")
+
+
+def _rescore_segment(client, rng, state):
+    # A small segment: the adjustable-rate condos with one credit score
+    score = rng.randint(300, 850)
+    return client.post("/mortgages/bulk-update", json={"filter": {
+        "min_credit_score": score, "max_credit_score": score, "loan_type": "adjustable", "property_type": "condo",
+    }})
+
+
+# (route, share of requests, request); SQLite serializes writers, so writes stay a small share
+ROUTE_MIX = [
+    ("GET /mortgages", 30, lambda client, rng, state: client.get("/mortgages", params={"limit": 50})),
+    ("GET /mortgages/{mortgage_id}", 20,
+     lambda client, rng, state: client.get(f"/mortgages/{state.existing_id(rng)}")),
+    ("GET /mortgages/search", 5, lambda client, rng, state: client.get("/mortgages/search", params={
+        "q": state.payload(rng)["applicant_name"][:rng.randint(2, 6)], "mode": rng.choice(("prefix", "fuzzy")),
+    })),
+    ("GET /mortgages/stats", 5,
+     lambda client, rng, state: client.get("/mortgages/stats", params={"group_by": ["credit_rating", "loan_type"]})),
+    ("GET /mortgages/export", 1,
+     lambda client, rng, state: client.get("/mortgages/export", params={"credit_rating": "C"})),
+    ("POST /mortgages/explain", 5, lambda client, rng, state: client.post("/mortgages/explain", json=state.payload(rng))),
+    ("GET /mortgages/{mortgage_id}/explain", 5,
+     lambda client, rng, state: client.get(f"/mortgages/{state.existing_id(rng)}/explain")),
+    ("POST /mortgages/what-if", 3, lambda client, rng, state: client.post("/mortgages/what-if", json={
+        "mortgage": state.payload(rng),
+        "vary": {"credit_score": {"start": 550, "stop": 850, "steps": 31}, "loan_type": ["fixed", "adjustable"]},
+    })),
+    ("POST /mortgages", 6, _create),
+    ("POST /mortgages/bulk", 1,
+     lambda client, rng, state: client.post("/mortgages/bulk", json=[state.payload(rng) for _ in range(20)])),
+    ("POST /mortgages/bulk-update", 0.5, _rescore_segment),
+    ("POST /mortgages/bulk-delete", 0.5, lambda client, rng, state: client.post("/mortgages/bulk-delete", json={
+        "filter": {"credit_rating": "C", "max_credit_score": rng.randint(300, 850)}, "dry_run": True,
+    })),
+    ("PUT /mortgages/{mortgage_id}", 4,
+     lambda client, rng, state: client.put(f"/mortgages/{state.existing_id(rng)}", json=state.payload(rng))),
+    ("DELETE /mortgages/{mortgage_id}", 2, _delete),
+    ("GET /admin/credit-score-stats", 2, lambda client, rng, state: client.get("/admin/credit-score-stats")),
+    ("POST /admin/credit-score-stats/rebuild", 0.2,
+     lambda client, rng, state: client.post("/admin/credit-score-stats/rebuild")),
+    ("GET /admin/portfolio-rollup/verify", 0.2, lambda client, rng, state: client.get("/admin/portfolio-rollup/verify")),
+    ("POST /admin/portfolio-rollup/rebuild", 0.2,
+     lambda client, rng, state: client.post("/admin/portfolio-rollup/rebuild")),
+    ("GET /admin/rulebook", 2, lambda client, rng, state: client.get("/admin/rulebook")),
+    ("POST /admin/rulebook/reload", 0.5, lambda client, rng, state: client.post("/admin/rulebook/reload")),
+    ("GET /admin/snapshot", 1, lambda client, rng, state: client.get("/admin/snapshot")),
+    ("GET /admin/search-index", 1, lambda client, rng, state: client.get("/admin/search-index")),
+    ("GET /admin/admission", 1, lambda client, rng, state: client.get("/admin/admission")),
+    ("GET /admin/rating-cache", 1, lambda client, rng, state: client.get("/admin/rating-cache")),
+    ("GET /metrics", 1, lambda client, rng, state: client.get("/metrics")),
+    ("GET /health", 2, lambda client, rng, state: client.get("/health")),
+]
+
+
+def uncovered_routes(app) -> List[str]:
+    """Routes of the app that neither ROUTE_MIX nor EXCLUDED_ROUTES mentions."""
+    covered = {route for route, _, _ in ROUTE_MIX} | EXCLUDED_ROUTES
+    documented = {
+        f"{method} {route.path}"
+        for route in app.routes
+        if route.include_in_schema and hasattr(route, "methods")
+        for method in route.methods
+    }
+    return sorted(documented - covered)
+
+
+async def run_client(client: httpx.AsyncClient, deadline: float, state: LoadState, rng: random.Random,
+                     latencies: dict, errors: dict) -> None:
+    """Issue requests from ROUTE_MIX until `deadline`, recording ms per route and 5xx responses."""
+    routes = [route for route, _, _ in ROUTE_MIX]
+    weights = [weight for _, weight, _ in ROUTE_MIX]
+    requests = {route: request for route, _, request in ROUTE_MIX}
+    while time.perf_counter() < deadline:
+        route = rng.choices(routes, weights)[0]
+        start = time.perf_counter()
+        response = await requests[route](client, rng, state)
+        latencies[route].append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 500:
+            errors[route] += 1
+
+
+async def run_load(clients: int, duration: float, seed: int, profile: str) -> Dict[str, dict]:
+    """
+    Drive every route from `clients` concurrent clients for `duration` seconds.
+
+    Returns:
+        Dict[str, dict]: One result per route plus `load.total`
+    """
+    from app.main import app
+
+    with engine.connect() as connection:
+        ids = connection.scalars(select(Mortgage.id).limit(10_000)).all()
+    state = LoadState(generate_payloads(1000, seed + 1, profile), list(ids))
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            deadline = time.perf_counter() + duration
+            await asyncio.gather(*(
+                run_client(client, deadline, state, random.Random(seed + i), latencies, errors)
+                for i in range(clients)
+            ))
+
+    results = {}
+    for route, samples in sorted(latencies.items()):
+        results[f"load.{route}"] = {
+            **summarize(samples, len(samples), "req/s"),
+            # Wall-clock rate: the clients share one event loop, so latencies overlap
+            "throughput": len(samples) / duration,
+            "errors": errors[route],
+        }
+    every = [sample for samples in latencies.values() for sample in samples]
+    results["load.total"] = {
+        **summarize(every, len(every), "req/s"),
+        "throughput": len(every) / duration,
+        "errors": sum(errors.values()),
+    }
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], max_throughput_drop: float,
+            max_p99_increase: float) -> List[str]:
+    """
+    List the benchmarks that got slower than a baseline allows.
+
+    Benchmarks missing from either side, or timed fewer than
+    MIN_COMPARED_SAMPLES times in either run, are not compared.
+
+    Args:
+        results (Dict[str, dict]): This run's results by benchmark name
+        baseline (Dict[str, dict]): An earlier run's results by benchmark name
+        max_throughput_drop (float): Allowed relative throughput drop, e.g. 0.1 for 10%
+        max_p99_increase (float): Allowed relative p99 latency increase, e.g. 0.25 for 25%
+
+    Returns:
+        List[str]: One message per regression (empty when none)
+    """
+    regressions = []
+    for name in sorted(results.keys() & baseline.keys()):
+        current, before = results[name], baseline[name]
+        if min(current["count"], before["count"]) < MIN_COMPARED_SAMPLES:
+            continue
+        if current["throughput"] < before["throughput"] * (1 - max_throughput_drop):
+            regressions.append(
+                f"{name}: throughput {current['throughput']:,.1f} {current['unit']} is "
+                f"{1 - current['throughput'] / before['throughput']:.0%} below {before['throughput']:,.1f}"
+            )
+        if current["p99_ms"] > before["p99_ms"] * (1 + max_p99_increase):
+            regressions.append(
+                f"{name}: p99 {current['p99_ms']:.3f} ms is "
+                f"{current['p99_ms'] / before['p99_ms'] - 1:.0%} above {before['p99_ms']:.3f} ms"
+            )
+    return regressions
+
+
+def environment() -> dict:
+    """Describe where the results came from, so only like runs get compared."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "sqlalchemy": sqlalchemy.__version__,
+        "database": engine.dialect.name,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=("micro", "load"), help="run one part of the suite")
+    parser.add_argument("--micro-rows", type=int, default=100_000, help="applications per microbenchmark")
+    parser.add_argument("--rows", type=int, default=10_000, help="mortgages in the table for the load run")
+    parser.add_argument("--profile", choices=PROFILES, default="realistic", help="generated data distributions")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmark-results.json", help="where to write the results")
+    parser.add_argument("--baseline", help="results file to check for regressions against")
+    parser.add_argument("--max-throughput-drop", type=float, default=0.10)
+    parser.add_argument("--max-p99-increase", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = {}
+    if args.only in (None, "micro"):
+        results.update(run_micro(args.micro_rows, args.seed, args.profile))
+    if args.only in (None, "load"):
+        from app.main import app
+
+        missing = uncovered_routes(app)
+        if missing:
+            print(f"warning: routes without load traffic: {', '.join(missing)}")
+        seed_book(args.rows, args.seed, args.profile)
+        results.update(asyncio.run(run_load(args.clients, args.duration, args.seed, args.profile)))
+
+    print(f"{'benchmark':<46} {'throughput':>16} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, result in results.items():
+        print(f"{name:<46} {result['throughput']:>10,.0f} {result['unit']:<5} {result['p50_ms']:>9.3f} "
+              f"{result['p99_ms']:>9.3f} {result.get('errors', ''):>7}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.max_throughput_drop, args.max_p99_increase)
+    with open(args.output, "w") as f:
+        json.dump({
+            "version": RESULTS_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "environment": environment(),
+            "config": vars(args),
+            "results": results,
+            "regressions": regressions,
+        }, f, indent=2)
+    print(f"\nresults written to {args.output}")
+    if args.baseline:
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        print(f"{len(regressions)} regressions against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""initial schema
+
+The schema the API used to create with create_all at import time:
+mortgages with its listing indexes, the credit score stats shards, the
+portfolio rollup and the idempotency key table. Databases created that
+way already match it; mark them with `alembic stamp 0001` before upgrading.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 01:17:12.517573
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'mortgages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('applicant_name', sa.String(length=100), nullable=False),
+        sa.Column('income', sa.Float(), nullable=False),
+        sa.Column('credit_score', sa.Integer(), nullable=False),
+        sa.Column('loan_amount', sa.Float(), nullable=False),
+        sa.Column('property_value', sa.Float(), nullable=False),
+        sa.Column('debt_amount', sa.Float(), nullable=False),
+        sa.Column('loan_type', sa.String(length=20), nullable=False),
+        sa.Column('property_type', sa.String(length=20), nullable=False),
+        sa.Column('credit_rating', sa.String(length=10), nullable=False),
+        sa.Column('rulebook_version', sa.String(length=64), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.CheckConstraint('income > 0', name='check_income_positive'),
+        sa.CheckConstraint('credit_score >= 300 AND credit_score <= 850', name='check_credit_score_range'),
+        sa.CheckConstraint('loan_amount > 0', name='check_loan_amount_positive'),
+        sa.CheckConstraint('property_value > 0', name='check_property_value_positive'),
+        sa.CheckConstraint('debt_amount >= 0', name='check_debt_amount_non_negative'),
+        sa.CheckConstraint("loan_type IN ('fixed', 'adjustable')", name='check_loan_type'),
+        sa.CheckConstraint("property_type IN ('single_family', 'condo')", name='check_property_type'),
+        sa.CheckConstraint("credit_rating IN ('AAA', 'BBB', 'C')", name='check_credit_rating'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_mortgages_id', 'mortgages', ['id'])
+    op.create_index('ix_mortgages_created_at_id', 'mortgages', ['created_at', 'id'])
+    op.create_index('ix_mortgages_credit_rating_created_at_id', 'mortgages', ['credit_rating', 'created_at', 'id'])
+    op.create_index(
+        'ix_mortgages_loan_property_type_created_at_id',
+        'mortgages',
+        ['loan_type', 'property_type', 'created_at', 'id']
+    )
+    op.create_index('ix_mortgages_credit_score_created_at_id', 'mortgages', ['credit_score', 'created_at', 'id'])
+
+    op.create_table(
+        'mortgage_stats',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('mortgage_count', sa.Integer(), nullable=False),
+        sa.Column('credit_score_total', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+    op.create_table(
+        'mortgage_rollup',
+        sa.Column('credit_rating', sa.String(length=10), nullable=False),
+        sa.Column('loan_type', sa.String(length=20), nullable=False),
+        sa.Column('property_type', sa.String(length=20), nullable=False),
+        sa.Column('score_band', sa.String(length=10), nullable=False),
+        sa.Column('shard', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('mortgage_count', sa.Integer(), nullable=False),
+        sa.Column('loan_amount_total', sa.Double(), nullable=False),
+        sa.Column('property_value_total', sa.Double(), nullable=False),
+        sa.Column('income_total', sa.Double(), nullable=False),
+        sa.Column('debt_amount_total', sa.Double(), nullable=False),
+        sa.Column('credit_score_total', sa.BigInteger(), nullable=False),
+        sa.Column('ltv_total', sa.Double(), nullable=False),
+        sa.Column('dti_total', sa.Double(), nullable=False),
+        sa.PrimaryKeyConstraint('credit_rating', 'loan_type', 'property_type', 'score_band', 'shard'),
+    )
+
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('request_hash', sa.String(length=64), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=False),
+        sa.Column('response_body', sa.Text(), nullable=False),
+        sa.Column('mortgage_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('key'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('idempotency_keys')
+    op.drop_table('mortgage_rollup')
+    op.drop_table('mortgage_stats')
+    op.drop_index('ix_mortgages_credit_score_created_at_id', table_name='mortgages')
+    op.drop_index('ix_mortgages_loan_property_type_created_at_id', table_name='mortgages')
+    op.drop_index('ix_mortgages_credit_rating_created_at_id', table_name='mortgages')
+    op.drop_index('ix_mortgages_created_at_id', table_name='mortgages')
+    op.drop_index('ix_mortgages_id', table_name='mortgages')
+    op.drop_table('mortgages')
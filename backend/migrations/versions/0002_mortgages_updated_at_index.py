@@ -0,0 +1,27 @@
+"""index mortgages.updated_at
+
+The in-memory snapshot's delta sync reads the rows created or updated
+since its last sync; this index makes the updated_at half of that a range
+scan instead of a full table scan.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:41:03.218734
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_mortgages_updated_at', 'mortgages', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_mortgages_updated_at', table_name='mortgages')
@@ -0,0 +1,34 @@
+"""mortgage change feed
+
+Adds `mortgage_changes`, the outbox every write appends its events to and
+GET /mortgages/changes streams from.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:06:27.904512
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'mortgage_changes',
+        sa.Column('seq', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('mortgage_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('seq'),
+        sqlite_autoincrement=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('mortgage_changes')
@@ -0,0 +1,27 @@
+"""index mortgages.applicant_name
+
+Serves name lookups, and the prefix queries GET /mortgages/search falls
+back to while a worker's name index is loading, as an index range scan
+where the collation allows it (MySQL's default case-insensitive ones do).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 14:22:51.604117
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_mortgages_applicant_name', 'mortgages', ['applicant_name'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_mortgages_applicant_name', table_name='mortgages')
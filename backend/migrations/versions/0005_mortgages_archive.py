@@ -0,0 +1,46 @@
+"""mortgages archive
+
+Adds `mortgages_archive`, the cold table `python -m app.jobs.archive`
+moves settled applications to. On MySQL it stores compressed pages.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 16:40:12.318270
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'mortgages_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('applicant_name', sa.String(length=100), nullable=False),
+        sa.Column('income', sa.Float(), nullable=False),
+        sa.Column('credit_score', sa.Integer(), nullable=False),
+        sa.Column('loan_amount', sa.Float(), nullable=False),
+        sa.Column('property_value', sa.Float(), nullable=False),
+        sa.Column('debt_amount', sa.Float(), nullable=False),
+        sa.Column('loan_type', sa.String(length=20), nullable=False),
+        sa.Column('property_type', sa.String(length=20), nullable=False),
+        sa.Column('credit_rating', sa.String(length=10), nullable=False),
+        sa.Column('rulebook_version', sa.String(length=64), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        mysql_row_format='COMPRESSED',
+    )
+    op.create_index('ix_mortgages_archive_created_at_id', 'mortgages_archive', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_mortgages_archive_created_at_id', table_name='mortgages_archive')
+    op.drop_table('mortgages_archive')
@@ -1,5 +1,23 @@
+import os
+import tempfile
+
 import pytest
-from app.schemas import MortgageCreate
+
+# Point the API at a throwaway SQLite database before app.database is imported
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='mortgage-tests-'), 'mortgages.db')}"
+)
+
+# Build the test schema the way deployments do, through the Alembic migrations
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+
+ALEMBIC_CONFIG = Config(os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini"))
+ALEMBIC_CONFIG.attributes["configure_logger"] = False
+command.upgrade(ALEMBIC_CONFIG, "head")
+
+from app.schemas import MortgageCreate  # noqa: E402
 
 @pytest.fixture
 def valid_mortgage_data():
@@ -46,4 +64,27 @@ def low_risk_mortgage():
         debt_amount=50000.0,
         loan_type="fixed",
         property_type="single_family"
-    ) 
\ No newline at end of file
+    ) 
+
+@pytest.fixture
+def client():
+    """Fixture providing a TestClient for the API, emptying the database afterwards."""
+    import asyncio
+
+    from fastapi.testclient import TestClient
+    from app.cache import response_cache
+    from app.database import engine
+    from app.idempotency import idempotent_requests
+    from app.main import app
+    from app.models import Base
+    from app.stats import credit_score_stats
+
+    credit_score_stats.invalidate()
+    with TestClient(app) as test_client:
+        yield test_client
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+    # The tables were emptied behind the API's back; retire its cached pages and replies
+    asyncio.run(response_cache.bump())
+    idempotent_requests.clear()
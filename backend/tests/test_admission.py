@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+import app.admission as admission_module
+from app.admission import (
+    EXPORT, READ, WRITE, AdmissionMiddleware, LatencyTracker, Limiter, admission, route_class,
+)
+
+def test_route_classes():
+    """Test that requests are sorted into read, write and export classes, and probes are exempt."""
+    assert route_class("GET", "/mortgages") == READ
+    assert route_class("POST", "/mortgages/what-if") == READ
+    assert route_class("POST", "/mortgages") == WRITE
+    assert route_class("DELETE", "/mortgages/1") == WRITE
+    assert route_class("POST", "/admin/rulebook/reload") == WRITE
+    assert route_class("GET", "/mortgages/export") == EXPORT
+    for method, path in (("GET", "/health"), ("GET", "/metrics"), ("GET", "/mortgages/changes"),
+                         ("OPTIONS", "/mortgages")):
+        assert route_class(method, path) is None
+
+def test_limiter_queues_then_sheds():
+    """Test that excess requests wait in FIFO order, and are shed when the queue is full or the wait runs out."""
+    async def scenario():
+        limiter = Limiter("test", max_limit=1, queue_size=1, queue_timeout=0.2)
+        assert await limiter.acquire()
+
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        assert not await limiter.acquire()  # queue full: shed at once
+
+        limiter.release(0.05)
+        assert await waiting and limiter.in_flight == 1
+
+        assert not await limiter.acquire()  # waited 0.2 s for a slot that never freed
+        assert limiter.queued == 0 and limiter.in_flight == 1
+        assert limiter.retry_after() == 1
+
+        cancelled = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        limiter.release(None)
+        assert limiter.queued == 0 and limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+def test_limit_adapts_to_database_latency():
+    """Test that a saturated class's limit is cut while latency is high and regrows once it recovers."""
+    latency = LatencyTracker()
+    for _ in range(50):
+        latency.observe(0.001)
+    assert not latency.degraded()
+    for _ in range(50):
+        latency.observe(0.02)
+    assert latency.degraded()
+
+    limiter = Limiter("test", max_limit=8)
+    limiter.in_flight = 8
+    limiter._saturated = True
+    limiter.adjust(latency.degraded())
+    assert limiter.limit == 7
+    limiter.adjust(latency.degraded())
+    assert limiter.limit == 6
+
+    limiter.in_flight = 2
+    limiter._saturated = False
+    limiter.adjust(latency.degraded())
+    assert limiter.limit == 6  # not using its limit: left alone
+
+    latency.reset()
+    latency.observe(0.02)
+    limiter.in_flight = 6
+    limiter._saturated = True
+    limiter.adjust(latency.degraded())
+    assert limiter.limit == 7
+
+def test_busy_class_answers_503_with_retry_after(client, monkeypatch):
+    """Test that a full class is shed with 503 and Retry-After while other classes and probes still answer."""
+    limiter = admission.limiters[WRITE]
+    monkeypatch.setattr(admission_module, "ADJUST_INTERVAL", float("inf"))
+    monkeypatch.setattr(limiter, "limit", 0)
+    monkeypatch.setattr(limiter, "queue_size", 0)
+
+    response = client.post("/mortgages/bulk", json=[])
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.headers["Cache-Control"] == "no-store"
+    assert "busy" in response.json()["detail"]
+
+    assert client.get("/mortgages").status_code == 200
+    assert client.get("/health").status_code == 200
+    status = client.get("/admin/admission").json()
+    assert status["classes"][WRITE]["limit"] == 0
+    assert 'mortgage_api_admission_total{route_class="write",outcome="queue_full"}' in client.get("/metrics").text
+
+    monkeypatch.setattr(admission, "enabled", False)
+    assert client.post("/mortgages/bulk", json=[]).status_code != 503
+
+def test_middleware_releases_slot_when_app_fails():
+    """Test that a slot is returned even when the app raises."""
+    async def failing_app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    async def scenario():
+        middleware = AdmissionMiddleware(failing_app)
+        with pytest.raises(RuntimeError):
+            await middleware({"type": "http", "method": "GET", "path": "/mortgages"}, None, None)
+        assert admission.limiters[READ].in_flight == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,79 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app import changes
+from app.database import SessionLocal, engine
+from app.jobs.archive import run_archive
+from app.jobs.rescore import CheckpointMismatchError
+from app.models import Mortgage, MortgageArchive, MortgageChangeEvent
+from app.rollup import verify_rollup
+from app.stats import read_credit_score_stats
+
+NOW = datetime(2026, 6, 1)
+
+def _age(ids, created_days_ago, updated_days_ago=None):
+    updated_at = None if updated_days_ago is None else NOW - timedelta(days=updated_days_ago)
+    with engine.begin() as connection:
+        connection.execute(
+            update(Mortgage)
+            .where(Mortgage.id.in_(ids))
+            .values(created_at=NOW - timedelta(days=created_days_ago), updated_at=updated_at)
+        )
+
+def test_settled_mortgages_move_to_archive(client, valid_mortgage_data, tmp_path):
+    """Test that old, unchanged rows leave the live set but stay readable by id, and are read-only."""
+    ids = [
+        client.post("/mortgages", json={**valid_mortgage_data, "credit_score": 600 + i * 50}).json()["id"]
+        for i in range(4)
+    ]
+    old, old_too, recently_updated, fresh = ids
+    _age([old, old_too], created_days_ago=400)
+    _age([recently_updated], created_days_ago=400, updated_days_ago=10)
+    before = client.get(f"/mortgages/{old}").json()
+
+    summary = run_archive(after_days=365, batch_size=1, checkpoint_path=tmp_path / "checkpoint.json", now=NOW)
+    assert summary["rows"] == 2 and summary["batches"] == 2 and summary["complete"]
+    assert not (tmp_path / "checkpoint.json").exists()
+
+    assert [m["id"] for m in client.get("/mortgages").json()] == [recently_updated, fresh]
+    assert client.get(f"/mortgages/{old}").json() == before
+    assert client.get(f"/mortgages/{old}/explain").status_code == 200
+    with SessionLocal() as db:
+        assert db.scalars(select(MortgageArchive.id).order_by(MortgageArchive.id)).all() == [old, old_too]
+        assert read_credit_score_stats(db) == (2, 700 + 750)
+        assert verify_rollup(db)["consistent"]
+        kinds = db.execute(
+            select(MortgageChangeEvent.mortgage_id).where(MortgageChangeEvent.kind == changes.ARCHIVED)
+        ).scalars().all()
+    assert kinds == [old, old_too]
+
+    response = client.put(f"/mortgages/{old}", json=valid_mortgage_data)
+    assert response.status_code == 409
+    assert client.delete(f"/mortgages/{old}").status_code == 204
+    assert client.get(f"/mortgages/{old}").status_code == 404
+    assert client.delete(f"/mortgages/{old}").status_code == 404
+
+    assert run_archive(after_days=365, checkpoint_path=tmp_path / "checkpoint.json", now=NOW)["rows"] == 0
+
+def test_archive_resumes_from_checkpoint(client, valid_mortgage_data, tmp_path):
+    """Test that a bounded run leaves a checkpoint the next run resumes from with the same cutoff."""
+    ids = [client.post("/mortgages", json=valid_mortgage_data).json()["id"] for _ in range(3)]
+    _age(ids, created_days_ago=100)
+    checkpoint = tmp_path / "checkpoint.json"
+
+    first = run_archive(after_days=30, batch_size=2, checkpoint_path=checkpoint, max_batches=1, now=NOW)
+    assert first["rows"] == 2 and not first["complete"]
+    assert json.loads(checkpoint.read_text())["last_id"] == ids[1]
+
+    with pytest.raises(CheckpointMismatchError):
+        run_archive(after_days=60, batch_size=2, checkpoint_path=checkpoint)
+
+    # Resuming keeps the checkpoint's cutoff rather than computing one from today
+    second = run_archive(after_days=30, batch_size=2, checkpoint_path=checkpoint)
+    assert second["cutoff"] == first["cutoff"]
+    assert second["rows"] == 1 and second["complete"]
+    assert not checkpoint.exists()
+    assert client.get("/mortgages").json() == []
@@ -0,0 +1,43 @@
+from app.main import app
+from app.schemas import MortgageCreate
+from benchmarks.datagen import generate_payloads, iter_mortgage_rows
+from benchmarks.suite import compare, uncovered_routes
+
+def _result(throughput, p99_ms, count=100):
+    return {"throughput": throughput, "unit": "req/s", "count": count, "p50_ms": p99_ms / 2, "p99_ms": p99_ms}
+
+def test_generated_data_is_valid_and_reproducible():
+    """Test that both profiles produce valid applications and chunked books repeat exactly."""
+    for profile in ("uniform", "realistic"):
+        for payload in generate_payloads(2000, seed=7, profile=profile):
+            MortgageCreate.model_validate(payload)
+    first = [row for chunk in iter_mortgage_rows(2500, seed=7, chunk_size=1000, profile="realistic") for row in chunk]
+    again = [row for chunk in iter_mortgage_rows(2500, seed=7, chunk_size=1000, profile="realistic") for row in chunk]
+    assert first == again and len(first) == 2500
+    assert first[1000]["created_at"] > first[999]["created_at"]
+    uniform = next(iter_mortgage_rows(2500, seed=7, chunk_size=1000, profile="uniform"))
+    assert uniform[999]["applicant_name"] == "Applicant 999"
+
+def test_compare_flags_only_regressions_beyond_thresholds():
+    """Test that slower throughput or p99 beyond the allowed margin is reported, noise is not."""
+    baseline = {
+        "steady": _result(100, 10),
+        "slower": _result(100, 10),
+        "spikier": _result(100, 10),
+        "rare": _result(100, 10, count=2),
+        "removed": _result(100, 10),
+    }
+    results = {
+        "steady": _result(95, 11),
+        "slower": _result(80, 10),
+        "spikier": _result(100, 14),
+        "rare": _result(10, 100, count=2),
+        "added": _result(1, 1000),
+    }
+    regressions = compare(results, baseline, max_throughput_drop=0.1, max_p99_increase=0.25)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("slower: throughput") and regressions[1].startswith("spikier: p99")
+
+def test_load_mix_covers_every_route():
+    """Test that the load driver sends traffic to every documented route of the API."""
+    assert uncovered_routes(app) == []
@@ -0,0 +1,162 @@
+import json
+
+def test_bulk_create_json_array(client, valid_mortgage_data):
+    """Test bulk creation from a JSON array, with per-row ids and errors."""
+    invalid = {**valid_mortgage_data, "credit_score": 100}
+    response = client.post("/mortgages/bulk", json=[valid_mortgage_data, invalid, valid_mortgage_data])
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 2
+    assert body["failed"] == 1
+    assert [result["index"] for result in body["results"]] == [0, 1, 2]
+    assert body["results"][0]["id"] is not None
+    assert body["results"][0]["credit_rating"] in ["AAA", "BBB", "C"]
+    assert "credit_score" in body["results"][1]["error"]
+    assert body["results"][1]["id"] is None
+
+    listed = client.get("/mortgages").json()
+    assert sorted(m["id"] for m in listed) == sorted([body["results"][0]["id"], body["results"][2]["id"]])
+
+def test_bulk_create_ndjson(client, valid_mortgage_data, high_risk_mortgage):
+    """Test bulk creation from an NDJSON body, including malformed lines."""
+    lines = [
+        json.dumps(valid_mortgage_data),
+        "{not json",
+        "",
+        high_risk_mortgage.model_dump_json(),
+    ]
+    response = client.post(
+        "/mortgages/bulk",
+        content="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 2
+    assert body["failed"] == 1
+    assert body["results"][1]["error"].startswith("Invalid JSON")
+    assert body["results"][2]["credit_rating"] == "C"
+
+def test_bulk_create_spans_chunks(client, valid_mortgage_data, monkeypatch):
+    """Test that batches larger than one chunk keep their submission order."""
+    from app import main
+
+    monkeypatch.setattr(main, "BULK_CHUNK_SIZE", 3)
+    rows = [{**valid_mortgage_data, "applicant_name": f"Applicant {i}"} for i in range(7)]
+    body = client.post("/mortgages/bulk", json=rows).json()
+    assert body["created"] == 7
+    ids = [result["id"] for result in body["results"]]
+    assert ids == sorted(ids)
+
+def test_bulk_create_rejects_non_array(client, valid_mortgage_data):
+    """Test that a JSON object body is rejected."""
+    response = client.post("/mortgages/bulk", json=valid_mortgage_data)
+    assert response.status_code == 400
+
+def test_bulk_ndjson_stops_at_row_limit(client, valid_mortgage_data, monkeypatch):
+    """Test that an NDJSON stream is not read past MAX_BULK_ROWS."""
+    from app import main
+
+    monkeypatch.setattr(main, "MAX_BULK_ROWS", 3)
+    body = "\n".join(json.dumps(valid_mortgage_data) for _ in range(5))
+    response = client.post("/mortgages/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    result = response.json()
+    assert result["truncated"] is True
+    assert result["created"] == 3
+    assert len(result["results"]) == 3
+
+def test_mysql_multi_row_insert_uses_last_insert_id(monkeypatch):
+    """Test that MySQL gets one multi-row INSERT and ids derived from LAST_INSERT_ID()."""
+    import asyncio
+    from types import SimpleNamespace
+
+    from app.utils import bulk
+
+    statements = []
+
+    class FakeMySQLSession:
+        def get_bind(self):
+            dialect = SimpleNamespace(name="mysql", insert_executemany_returning_sort_by_parameter_order=False)
+            return SimpleNamespace(dialect=dialect)
+
+        async def execute(self, statement):
+            statements.append(str(statement))
+            if "innodb_autoinc_lock_mode" in str(statement):
+                return SimpleNamespace(scalar=lambda: 1)
+            return SimpleNamespace(lastrowid=41)
+
+    monkeypatch.setattr(bulk, "_autoinc_lock_mode", None)
+    rows = [{"applicant_name": f"Applicant {i}"} for i in range(3)]
+    ids = asyncio.run(bulk.insert_mortgages(FakeMySQLSession(), rows))
+    assert ids == [41, 42, 43]
+    inserts = [statement for statement in statements if statement.startswith("INSERT")]
+    assert len(inserts) == 1
+
+def test_bulk_delete_by_filter(client, valid_mortgage_data, monkeypatch):
+    """Test that a filtered delete counts in dry-run mode, then deletes the segment in batches."""
+    from sqlalchemy import select
+
+    from app import changes, segments
+    from app.database import SessionLocal
+    from app.models import MortgageChangeEvent
+    from app.rollup import verify_rollup
+    from app.stats import read_credit_score_stats
+
+    monkeypatch.setattr(segments, "BULK_FILTER_BATCH_SIZE", 2)
+    kept = client.post("/mortgages", json=valid_mortgage_data).json()["id"]
+    test_ids = [
+        client.post("/mortgages", json={**valid_mortgage_data, "applicant_name": f"Load Test {i}"}).json()["id"]
+        for i in range(3)
+    ]
+    request = {"filter": {"applicant_name_prefix": "Load Test"}}
+
+    response = client.post("/mortgages/bulk-delete", json={**request, "dry_run": True})
+    assert response.json() == {"matched": 3, "affected": 0, "batches": 0, "dry_run": True}
+    assert len(client.get("/mortgages").json()) == 4
+
+    response = client.post("/mortgages/bulk-delete", json=request)
+    assert response.json() == {"matched": 3, "affected": 3, "batches": 2, "dry_run": False}
+    assert [m["id"] for m in client.get("/mortgages").json()] == [kept]
+    with SessionLocal() as db:
+        assert read_credit_score_stats(db) == (1, valid_mortgage_data["credit_score"])
+        assert verify_rollup(db)["consistent"]
+        deleted = db.scalars(
+            select(MortgageChangeEvent.mortgage_id).where(MortgageChangeEvent.kind == changes.DELETED)
+        ).all()
+    assert deleted == test_ids
+
+def test_bulk_update_by_filter_rescores(client, valid_mortgage_data, high_risk_mortgage):
+    """Test that a filtered update writes the values and the rating a single-row update would give."""
+    from app.database import SessionLocal
+    from app.rollup import verify_rollup
+
+    condos = [client.post("/mortgages", json=high_risk_mortgage.model_dump()).json()["id"] for _ in range(2)]
+    other = client.post("/mortgages", json=valid_mortgage_data).json()
+    twin = client.post("/mortgages", json=valid_mortgage_data).json()["id"]
+    changes = {"loan_type": "fixed", "credit_score": 820, "debt_amount": 0.0}
+    request = {"filter": {"loan_type": "adjustable", "property_type": "condo"}, "set": changes}
+
+    response = client.post("/mortgages/bulk-update", json=request)
+    assert response.json() == {"matched": 2, "affected": 2, "batches": 1, "dry_run": False}
+    expected = client.put(f"/mortgages/{twin}", json={**high_risk_mortgage.model_dump(), **changes}).json()
+    for mortgage_id in condos:
+        updated = client.get(f"/mortgages/{mortgage_id}").json()
+        assert {field: updated[field] for field in changes} == changes
+        assert updated["credit_rating"] == expected["credit_rating"]
+        assert updated["updated_at"] is not None
+    assert client.get(f"/mortgages/{other['id']}").json() == other
+
+    # Nothing matches any more; rescoring the fixed-rate condos again changes nothing
+    assert client.post("/mortgages/bulk-update", json=request).json()["matched"] == 0
+    request = {"filter": {"loan_type": "fixed", "property_type": "condo"}}
+    assert client.post("/mortgages/bulk-update", json=request).json()["affected"] == 0
+    with SessionLocal() as db:
+        assert verify_rollup(db)["consistent"]
+
+def test_bulk_write_by_filter_requires_a_criterion(client):
+    """Test that an empty filter is refused rather than matching the whole book, and bad values are rejected."""
+    assert client.post("/mortgages/bulk-delete", json={"filter": {}}).status_code == 400
+    assert client.post("/mortgages/bulk-update", json={"filter": {}, "set": {"loan_type": "fixed"}}).status_code == 400
+    response = client.post("/mortgages/bulk-update", json={"filter": {"loan_type": "fixed"}, "set": {"credit_score": 10}})
+    assert response.status_code == 422
@@ -1,5 +1,8 @@
+import itertools
+
+import numpy as np
 import pytest
-from app.utils.credit_rating import calculate_credit_rating
+from app.utils.credit_rating import calculate_credit_rating, calculate_credit_ratings, to_rating_arrays
 from app.schemas import MortgageCreate
 from pydantic import ValidationError
 
@@ -166,4 +169,57 @@ def test_invalid_property_type():
             loan_type="fixed",
             property_type="invalid_type"  # Invalid property type
         )
-    assert "String should match pattern '^(single_family|condo)$'" in str(exc_info.value) 
\ No newline at end of file
+    assert "String should match pattern '^(single_family|condo)$'" in str(exc_info.value) 
+
+def test_batch_ratings_match_scalar_on_boundaries():
+    """Test the vectorized engine against the scalar path on every threshold boundary."""
+    mortgages = [
+        MortgageCreate.model_construct(
+            applicant_name="Test User",
+            income=100000.0,
+            credit_score=credit_score,
+            loan_amount=ltv * 400000.0,
+            property_value=400000.0,
+            debt_amount=dti * 100000.0,
+            loan_type=loan_type,
+            property_type=property_type
+        )
+        for ltv, dti, credit_score, loan_type, property_type in itertools.product(
+            [0.5, 0.8, 0.85, 0.9, 0.95],
+            [0.1, 0.4, 0.45, 0.5, 0.6],
+            [300, 649, 650, 699, 700, 850],
+            ["fixed", "adjustable"],
+            ["single_family", "condo"],
+        )
+    ]
+    arrays = to_rating_arrays(mortgages)
+    for avg_credit_score in [600.0, 650.0, 700.0]:
+        expected = [calculate_credit_rating(m, avg_credit_score) for m in mortgages]
+        assert calculate_credit_ratings(arrays, avg_credit_score).tolist() == expected
+
+def test_batch_ratings_accept_per_row_average():
+    """Test that the average credit score can be supplied per row."""
+    arrays = to_rating_arrays([
+        MortgageCreate(
+            applicant_name="Test User",
+            income=100000.0,
+            credit_score=680,
+            loan_amount=340000.0,
+            property_value=400000.0,
+            debt_amount=45000.0,
+            loan_type="fixed",
+            property_type="condo"
+        )
+    ] * 2)
+    ratings = calculate_credit_ratings(arrays, np.array([720.0, 600.0]))
+    assert ratings.tolist() == ["AAA", "BBB"]
+
+def test_batch_ratings_reject_invalid_rows(valid_mortgage):
+    """Test that the vectorized engine validates like the scalar path."""
+    arrays = to_rating_arrays([valid_mortgage])
+    arrays["loan_type"] = np.array(["balloon"], dtype=object)
+    with pytest.raises(ValueError, match="Loan type"):
+        calculate_credit_ratings(arrays)
+    del arrays["loan_type"]
+    with pytest.raises(ValueError, match="Missing columns"):
+        calculate_credit_ratings(arrays)
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from app import schemas
+from app.utils.credit_rating import calculate_credit_rating
+from app.utils.explain import explain_rating, what_if_grid
+from benchmarks.datagen import generate_mortgages
+
+def test_factor_points_sum_to_rating(valid_mortgage, high_risk_mortgage, low_risk_mortgage):
+    """Test that the factor contributions add up to the risk score behind the rating."""
+    for mortgage in (valid_mortgage, high_risk_mortgage, low_risk_mortgage):
+        explanation = explain_rating(mortgage, 680.0)
+        assert explanation["rating"] == calculate_credit_rating(mortgage, 680.0)
+        assert [factor["factor"] for factor in explanation["factors"]] == [
+            "ltv", "dti", "credit_score", "loan_type", "property_type", "avg_credit_score"
+        ]
+        assert explanation["risk_score"] == sum(factor["points"] for factor in explanation["factors"])
+
+def test_minimal_changes_cross_the_boundary_exactly():
+    """Test that every proposed change reaches its rating and one step less does not."""
+    for mortgage in generate_mortgages(150, seed=11):
+        explanation = explain_rating(mortgage, 700.0)
+        for change in explanation["upgrade"] + explanation["downgrade"]:
+            moved = mortgage.model_copy(update={change["field"]: change["required"]})
+            assert calculate_credit_rating(moved, 700.0) == change["rating"]
+            if change["change"] is None:
+                continue
+            step = 1 if change["field"] == "credit_score" else 0.01
+            short = round(change["required"] - step * (1 if change["change"] > 0 else -1), 2)
+            short_rating = calculate_credit_rating(mortgage.model_copy(update={change["field"]: short}), 700.0)
+            assert short_rating != change["rating"] or short == mortgage.model_dump()[change["field"]]
+
+def test_loan_amount_to_reach_ltv_band(valid_mortgage_data):
+    """Test the underwriter question: how much lower must the loan be to get LTV under 80%."""
+    mortgage = schemas.MortgageCreate(**{**valid_mortgage_data, "loan_amount": 340000.0, "credit_score": 680, "loan_type": "adjustable", "property_type": "condo"})
+    explanation = explain_rating(mortgage, 700.0, target_rating="AAA")
+    assert explanation["rating"] == "BBB"
+    by_field = {change["field"]: change for change in explanation["upgrade"]}
+    assert by_field["loan_amount"]["required"] == 320000.0
+    assert by_field["loan_amount"]["rating"] == "AAA"
+
+def test_what_if_grid_matches_scalar_ratings(valid_mortgage):
+    """Test that every grid scenario is rated as the scalar evaluator would."""
+    result = what_if_grid(valid_mortgage, {
+        "loan_amount": [250000.0, 330000.0, 380000.0],
+        "credit_score": {"start": 600, "stop": 760, "steps": 5},
+        "loan_type": ["fixed", "adjustable"],
+    }, 690.0)
+    assert result["scenarios"] == 3 * 5 * 2
+    for index, rating in enumerate(result["rating"]):
+        scenario = valid_mortgage.model_copy(update={field: values[index] for field, values in result["values"].items()})
+        assert calculate_credit_rating(scenario, 690.0) == rating
+    assert sum(result["rating_counts"].values()) == 30
+
+def test_what_if_grid_is_interactive(valid_mortgage):
+    """Test that a 10,000 scenario grid evaluates in well under interactive latency."""
+    grid = {
+        "loan_amount": {"start": 200000, "stop": 400000, "steps": 100},
+        "debt_amount": {"start": 0, "stop": 80000, "steps": 100},
+    }
+    what_if_grid(valid_mortgage, grid)
+    started = time.perf_counter()
+    assert what_if_grid(valid_mortgage, grid)["scenarios"] == 10000
+    assert time.perf_counter() - started < 0.1
+
+@pytest.mark.parametrize("vary", [{"region": ["north"]}, {"credit_score": [700.5]}, {"income": [-1.0]}])
+def test_what_if_rejects_invalid_grids(client, valid_mortgage_data, vary):
+    """Test that unknown fields and invalid values get a 400."""
+    response = client.post("/mortgages/what-if", json={"mortgage": valid_mortgage_data, "vary": vary})
+    assert response.status_code == 400
+
+def test_explain_endpoints(client, valid_mortgage_data):
+    """Test explaining a submitted and a stored application."""
+    created = client.post("/mortgages", json=valid_mortgage_data).json()
+    stored = client.get(f"/mortgages/{created['id']}/explain").json()
+    submitted = client.post("/mortgages/explain", json=valid_mortgage_data).json()
+    assert stored == submitted
+    assert stored["rating"] == created["credit_rating"]
+    assert client.get("/mortgages/0/explain").status_code == 404
+
+    response = client.post("/mortgages/what-if", json={
+        "mortgage": valid_mortgage_data, "vary": {"credit_score": [600, 700, 800]}
+    }).json()
+    assert response["values"] == {"credit_score": [600, 700, 800]}
+    assert len(response["rating"]) == 3
@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+
+import pytest
+
+def _seed(client, valid_mortgage_data, high_risk_mortgage):
+    return client.post("/mortgages/bulk", json=[
+        valid_mortgage_data,
+        high_risk_mortgage.model_dump(),
+        {**valid_mortgage_data, "applicant_name": "Jane, \"JJ\" Doe"},
+    ]).json()
+
+def test_export_ndjson(client, valid_mortgage_data, high_risk_mortgage, monkeypatch):
+    """Test NDJSON export across several cursor batches."""
+    from app import export
+
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+    _seed(client, valid_mortgage_data, high_risk_mortgage)
+    response = client.get("/mortgages/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["applicant_name"] for row in rows] == ["John Doe", "High Risk Applicant", "Jane, \"JJ\" Doe"]
+    assert rows[1]["credit_rating"] == "C"
+    assert rows[0]["created_at"] is not None
+
+def test_export_csv_with_filters(client, valid_mortgage_data, high_risk_mortgage):
+    """Test CSV export honours the listing filters and quotes values."""
+    _seed(client, valid_mortgage_data, high_risk_mortgage)
+    response = client.get("/mortgages/export", params={"format": "csv", "loan_type": "fixed"})
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["applicant_name"] for row in rows] == ["John Doe", "Jane, \"JJ\" Doe"]
+    assert rows[0]["credit_score"] == "750"
+
+def test_export_parquet(client, valid_mortgage_data, high_risk_mortgage):
+    """Test Parquet export produces a readable file."""
+    pq = pytest.importorskip("pyarrow.parquet")
+    _seed(client, valid_mortgage_data, high_risk_mortgage)
+    response = client.get("/mortgages/export", params={"format": "parquet"})
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 3
+    assert table.column("credit_rating").to_pylist()[1] == "C"
+
+def test_export_rejects_unknown_format(client):
+    """Test that unsupported formats are rejected."""
+    assert client.get("/mortgages/export", params={"format": "xml"}).status_code == 422
@@ -0,0 +1,91 @@
+import asyncio
+
+import orjson
+from sqlalchemy import delete, select
+
+import app.feed as feed_module
+from app.database import engine
+from app.feed import ChangeFeed, change_feed
+from app.models import MortgageChangeEvent
+
+def _events(messages):
+    """Decode the `change` events of a list of SSE messages."""
+    return [
+        orjson.loads(message.split(b"data: ", 1)[1])
+        for message in messages
+        if message.startswith(b"id: ")
+    ]
+
+async def _read(stream, count):
+    """Read `count` messages after the retry line from an SSE stream, then close it."""
+    messages = []
+    try:
+        assert (await stream.__anext__()).startswith(b"retry: ")
+        while len(messages) < count:
+            messages.append(await asyncio.wait_for(stream.__anext__(), 5))
+    finally:
+        await stream.aclose()
+    return messages
+
+def test_writes_are_recorded_and_replayed_in_order(client, valid_mortgage_data):
+    """Test that creates, updates and deletes reach the outbox and the stream in commit order."""
+    first = client.post("/mortgages", json=valid_mortgage_data).json()["id"]
+    second = client.post("/mortgages", json=valid_mortgage_data).json()["id"]
+    client.put(f"/mortgages/{first}", json={**valid_mortgage_data, "applicant_name": "Updated"})
+    client.delete(f"/mortgages/{second}")
+
+    with engine.connect() as connection:
+        recorded = connection.execute(
+            select(MortgageChangeEvent.seq, MortgageChangeEvent.kind, MortgageChangeEvent.mortgage_id)
+            .order_by(MortgageChangeEvent.seq)
+        ).all()
+    assert [(kind, mortgage_id) for _, kind, mortgage_id in recorded] == [
+        ("created", first), ("created", second), ("updated", first), ("deleted", second)
+    ]
+    since = recorded[0].seq - 1
+
+    client.portal.call(change_feed.poll)
+    events = _events(client.portal.call(_read, change_feed.stream(since), 4))
+    assert [event["seq"] for event in events] == [row.seq for row in recorded]
+    assert events[2]["mortgage"]["applicant_name"] == "Updated"
+    assert events[3]["mortgage"] is None
+
+    # Resuming from the middle replays only what came after
+    events = _events(client.portal.call(_read, change_feed.stream(recorded[1].seq), 2))
+    assert [event["kind"] for event in events] == ["updated", "deleted"]
+
+    # Further back than memory and the table reach: the client must reload
+    change_feed._buffer.clear()
+    with engine.begin() as connection:
+        connection.execute(delete(MortgageChangeEvent).where(MortgageChangeEvent.seq == recorded[0].seq))
+    assert client.portal.call(_read, change_feed.stream(since), 1) == [feed_module.RESET_MESSAGE]
+
+def test_last_event_id_must_be_a_seq(client):
+    """Test that a malformed Last-Event-ID is rejected before the stream opens."""
+    response = client.get("/mortgages/changes", headers={"Last-Event-ID": "abc"})
+    assert response.status_code == 400
+
+def test_fan_out_drops_slow_subscribers_and_waits_for_gaps(monkeypatch):
+    """Test that a subscriber that stops reading is disconnected and that gaps hold back later events."""
+    async def scenario():
+        feed = ChangeFeed(queue_size=1)
+        reader, stalled = feed.stream(), feed.stream()
+        await reader.__anext__()
+        await stalled.__anext__()
+        assert feed.subscriber_count == 2
+
+        feed.publish([(1, b"one")])
+        assert await reader.__anext__() == b"one"
+        feed.publish([(2, b"two")])
+        assert feed.subscriber_count == 1
+        assert await reader.__anext__() == b"two"
+        # The stalled subscriber's backlog is discarded and its stream ends
+        assert [message async for message in stalled] == []
+        await reader.aclose()
+
+        # Seq 4 is assigned but not committed yet: 5 must wait for it
+        assert feed._contiguous([(3, b""), (5, b"")]) == [(3, b"")]
+        monkeypatch.setattr(feed_module, "FEED_GAP_TIMEOUT", 0.0)
+        assert feed._contiguous([(3, b""), (5, b"")]) == [(3, b""), (5, b"")]
+
+    asyncio.run(scenario())
@@ -0,0 +1,112 @@
+import asyncio
+
+import httpx
+from sqlalchemy import func, select
+
+from app import metrics
+from app.database import AsyncSessionLocal, SessionLocal, async_engine
+from app.idempotency import IdempotentRequests, StoredResponse, add_stored_response, idempotent_requests
+from app.models import IdempotencyKey, Mortgage
+
+def _mortgage_count():
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(Mortgage))
+
+def _query_count():
+    return sum(metrics.db_query_duration.count("async", kind) for kind in ("select", "insert", "update"))
+
+def test_retry_replays_stored_response(client, valid_mortgage_data):
+    """Test that a retried key returns the first response without another insert or any query."""
+    headers = {"Idempotency-Key": "order-1"}
+    first = client.post("/mortgages", json=valid_mortgage_data, headers=headers)
+    assert first.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+
+    queries = _query_count()
+    retry = client.post("/mortgages", json=valid_mortgage_data, headers=headers)
+    assert _query_count() == queries
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.content == first.content
+    assert first.json()["created_at"] is not None
+    assert _mortgage_count() == 1
+
+    # Without a key, submissions are independent
+    client.post("/mortgages", json=valid_mortgage_data)
+    assert _mortgage_count() == 2
+
+def test_stored_response_survives_restart(client, valid_mortgage_data):
+    """Test that a key is answered from the table once the in-process copy is gone."""
+    headers = {"Idempotency-Key": "order-2"}
+    first = client.post("/mortgages", json=valid_mortgage_data, headers=headers).json()
+    idempotent_requests.clear()
+
+    db_hits = metrics.idempotency_lookups.value("db_hit")
+    retry = client.post("/mortgages", json=valid_mortgage_data, headers=headers)
+    assert retry.json() == first
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert metrics.idempotency_lookups.value("db_hit") == db_hits + 1
+    assert _mortgage_count() == 1
+
+def test_key_reused_with_different_body_is_rejected(client, valid_mortgage_data):
+    """Test that a key cannot be replayed for a different application."""
+    headers = {"Idempotency-Key": "order-3"}
+    client.post("/mortgages", json=valid_mortgage_data, headers=headers)
+    response = client.post("/mortgages", json={**valid_mortgage_data, "income": 1.0}, headers=headers)
+    assert response.status_code == 422
+    assert _mortgage_count() == 1
+
+    assert client.post("/mortgages", json=valid_mortgage_data, headers={"Idempotency-Key": ""}).status_code == 422
+
+def test_concurrent_duplicates_collapse(client, valid_mortgage_data):
+    """Test that simultaneous submissions with one key create a single mortgage."""
+    from app.main import app
+
+    async def submit_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            return await asyncio.gather(*(
+                async_client.post("/mortgages", json=valid_mortgage_data, headers={"Idempotency-Key": "order-4"})
+                for _ in range(10)
+            ))
+
+    collapsed = metrics.idempotency_lookups.value("collapsed")
+    responses = asyncio.run(submit_all())
+    assert {response.status_code for response in responses} == {201}
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert sum("Idempotent-Replayed" in response.headers for response in responses) == 9
+    assert metrics.idempotency_lookups.value("collapsed") >= 9
+    assert _mortgage_count() == 1
+
+def test_workers_racing_on_one_key_keep_one_row(client, valid_mortgage_data):
+    """Test that the key table lets only one of two workers' transactions commit."""
+    started = []
+    both_started = asyncio.Event()
+
+    async def worker(registry):
+        # A registry per call, as in separate worker processes
+        async with AsyncSessionLocal() as db:
+            async def handler():
+                started.append(registry)
+                if len(started) == 2:
+                    both_started.set()
+                await both_started.wait()
+                db.add(Mortgage(**valid_mortgage_data, credit_rating="AAA"))
+                stored = StoredResponse("hash", 201, b"{}")
+                add_stored_response(db, "order-5", stored)
+                await db.commit()
+                return stored
+
+            return await registry.execute(db, "order-5", "hash", handler)
+
+    async def race():
+        # Connect once first: the engine's one-time connect setup is not safe to run concurrently
+        async with async_engine.connect():
+            pass
+        return await asyncio.gather(worker(IdempotentRequests()), worker(IdempotentRequests()))
+
+    results = asyncio.run(race())
+    assert sorted(replayed for _, replayed in results) == [False, True]
+    assert _mortgage_count() == 1
+    with SessionLocal() as db:
+        assert db.scalar(select(func.count()).select_from(IdempotencyKey)) == 1
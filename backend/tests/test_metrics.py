@@ -0,0 +1,66 @@
+import asyncio
+
+from sqlalchemy import text
+
+from app import metrics
+from app.database import engine
+from app.profiler import profile_event_loop
+
+def test_histogram_renders_cumulative_buckets():
+    """Test the Prometheus rendering of a labelled histogram."""
+    histogram = metrics.Histogram("test_seconds", "Test histogram", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, '/a"b')
+    histogram.observe(0.5, '/a"b')
+    histogram.observe(5.0, '/a"b')
+    assert histogram.samples() == [
+        'test_seconds_bucket{route="/a\\"b",le="0.1"} 1',
+        'test_seconds_bucket{route="/a\\"b",le="1.0"} 2',
+        'test_seconds_bucket{route="/a\\"b",le="+Inf"} 3',
+        'test_seconds_sum{route="/a\\"b"} 5.55',
+        'test_seconds_count{route="/a\\"b"} 3',
+    ]
+
+def test_metrics_endpoint_reports_requests_stages_and_queries(client, valid_mortgage_data):
+    """Test that a create shows up in request, stage, query and pool metrics."""
+    stages_before = metrics.stage_duration.count("create_mortgage", "db_commit")
+    waits_before = metrics.db_pool_checkout_wait.count("sync")
+    client.post("/mortgages", json=valid_mortgage_data)
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    for stage in ("parse_validate", "score", "db_flush", "db_refresh"):
+        assert metrics.stage_duration.count("create_mortgage", stage) >= 1
+    assert metrics.stage_duration.count("create_mortgage", "db_commit") == stages_before + 1
+    assert metrics.db_pool_checkout_wait.count("sync") == waits_before + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'mortgage_api_request_duration_seconds_count{method="POST",handler="create_mortgage",status="201"}' in body
+    assert 'mortgage_db_query_duration_seconds_count{engine="async",statement="insert"}' in body
+    assert 'mortgage_db_pool_connections{engine="sync",state="capacity"} 15.0' in body
+
+def test_profiler_is_opt_in(client):
+    """Test that the profiling endpoint is disabled by default."""
+    assert client.post("/admin/profile", params={"seconds": 0.01}).status_code == 404
+
+def test_profiler_samples_event_loop():
+    """Test that the sampler collects folded stacks of the event loop thread."""
+    def busy():
+        total = 0
+        for i in range(100000):
+            total += i
+        return total
+
+    async def workload():
+        task = asyncio.create_task(profile_event_loop(0.2, interval=0.001))
+        while not task.done():
+            busy()
+            await asyncio.sleep(0)
+        return await task
+
+    folded = asyncio.run(workload())
+    assert "busy (test_metrics.py" in folded
+    stack, count = folded.splitlines()[0].rsplit(" ", 1)
+    assert int(count) >= 1
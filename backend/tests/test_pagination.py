@@ -0,0 +1,79 @@
+import pytest
+
+from app.utils.pagination import decode_cursor, encode_cursor
+
+def _fetch_all_pages(client, **params):
+    pages = []
+    cursor = None
+    while True:
+        query = dict(params)
+        if cursor is not None:
+            query["cursor"] = cursor
+        response = client.get("/mortgages", params=query)
+        assert response.status_code == 200
+        pages.append([m["id"] for m in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+
+def test_cursor_round_trip():
+    """Test that cursor tokens decode to the position they encode."""
+    from datetime import datetime
+
+    created_at = datetime(2024, 5, 1, 12, 30, 15)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+def test_keyset_pages_cover_every_row_once(client, valid_mortgage_data):
+    """Test that cursor pages are ordered, disjoint and complete, even within one second."""
+    rows = [{**valid_mortgage_data, "applicant_name": f"Applicant {i}"} for i in range(7)]
+    ids = [result["id"] for result in client.post("/mortgages/bulk", json=rows).json()["results"]]
+    pages = _fetch_all_pages(client, limit=3)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [mortgage_id for page in pages for mortgage_id in page] == ids
+
+def test_offset_pagination_still_supported(client, valid_mortgage_data):
+    """Test that skip/limit keeps working, now in (created_at, id) order."""
+    ids = [r["id"] for r in client.post("/mortgages/bulk", json=[valid_mortgage_data] * 5).json()["results"]]
+    page = client.get("/mortgages", params={"skip": 2, "limit": 2}).json()
+    assert [m["id"] for m in page] == ids[2:4]
+
+def test_cursor_is_stable_under_concurrent_inserts(client, valid_mortgage_data):
+    """Test that rows inserted mid-scan do not shift or repeat already returned rows."""
+    first_ids = [r["id"] for r in client.post("/mortgages/bulk", json=[valid_mortgage_data] * 4).json()["results"]]
+    response = client.get("/mortgages", params={"limit": 2})
+    assert [m["id"] for m in response.json()] == first_ids[:2]
+    new_id = client.post("/mortgages", json=valid_mortgage_data).json()["id"]
+    rest = client.get("/mortgages", params={"limit": 10, "cursor": response.headers["X-Next-Cursor"]}).json()
+    assert [m["id"] for m in rest] == first_ids[2:] + [new_id]
+
+def test_filters(client, valid_mortgage_data, high_risk_mortgage, low_risk_mortgage):
+    """Test server-side filters on rating, type and credit-score/LTV ranges."""
+    client.post("/mortgages/bulk", json=[
+        valid_mortgage_data,
+        high_risk_mortgage.model_dump(),
+        low_risk_mortgage.model_dump(),
+    ])
+    def names(**params):
+        return sorted(m["applicant_name"] for m in client.get("/mortgages", params=params).json())
+
+    assert names(credit_rating="C") == ["High Risk Applicant"]
+    assert names(loan_type="fixed", property_type="single_family") == ["John Doe", "Low Risk Applicant"]
+    assert names(min_credit_score=760) == ["Low Risk Applicant"]
+    assert names(max_credit_score=750, min_credit_score=700) == ["John Doe"]
+    assert names(min_ltv=0.8) == ["High Risk Applicant"]
+    assert names(max_ltv=0.75) == ["John Doe", "Low Risk Applicant"]
+
+def test_invalid_cursor_and_filter(client):
+    """Test that malformed cursors and filter values are rejected."""
+    assert client.get("/mortgages", params={"cursor": "garbage"}).status_code == 400
+    assert client.get("/mortgages", params={"credit_rating": "AA"}).status_code == 422
+
+def test_invalid_page_bounds(client, valid_mortgage_data):
+    """Test that non-positive limits and negative skips are rejected instead of failing."""
+    client.post("/mortgages", json=valid_mortgage_data)
+    assert client.get("/mortgages", params={"limit": 0}).status_code == 422
+    assert client.get("/mortgages", params={"limit": -3}).status_code == 422
+    assert client.get("/mortgages", params={"skip": -1}).status_code == 422
+    assert len(client.get("/mortgages", params={"limit": 1}).json()) == 1
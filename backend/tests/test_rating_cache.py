@@ -0,0 +1,45 @@
+from app.utils.credit_rating import calculate_credit_rating
+from app.utils.rating_cache import RatingCache
+from benchmarks.datagen import generate_mortgages
+
+def test_cached_ratings_match_evaluator():
+    """Test that cached ratings equal a fresh evaluation across random applications."""
+    cache = RatingCache()
+    mortgages = generate_mortgages(2000, seed=7)
+    for avg_credit_score in [640.0, 680.0, 720.0]:
+        assert [cache.rating(m, avg_credit_score) for m in mortgages] == [
+            calculate_credit_rating(m, avg_credit_score) for m in mortgages
+        ]
+    stats = cache.snapshot()
+    assert stats["misses"] == stats["size"] <= 3 * 3 * 3 * 2 * 2 * 3
+    assert stats["hit_rate"] > 0.9
+
+def test_cache_is_bounded_lru(valid_mortgage):
+    """Test that the least recently used entries are evicted at capacity."""
+    cache = RatingCache(maxsize=2)
+    cache.rating(valid_mortgage, 600.0)
+    cache.rating(valid_mortgage, 680.0)
+    cache.rating(valid_mortgage, 600.0)
+    cache.rating(valid_mortgage, 720.0)
+    cache.rating(valid_mortgage, 600.0)
+    assert cache.snapshot() | {"hit_rate": None} == {
+        "size": 2, "maxsize": 2, "hits": 2, "misses": 3, "evictions": 1, "hit_rate": None
+    }
+
+def test_update_writes_only_changed_columns(client, valid_mortgage_data):
+    """Test that a no-op PUT issues no UPDATE and a name-only PUT keeps the rating."""
+    created = client.post("/mortgages", json=valid_mortgage_data).json()
+
+    unchanged = client.put(f"/mortgages/{created['id']}", json=valid_mortgage_data).json()
+    assert unchanged["updated_at"] is None
+
+    renamed = client.put(
+        f"/mortgages/{created['id']}",
+        json={**valid_mortgage_data, "applicant_name": "Johnny Doe"}
+    ).json()
+    assert renamed["applicant_name"] == "Johnny Doe"
+    assert renamed["updated_at"] is not None
+    assert renamed["credit_rating"] == created["credit_rating"]
+
+    stats = client.get("/admin/rating-cache").json()
+    assert stats["hits"] >= 2
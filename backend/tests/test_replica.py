@@ -0,0 +1,81 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+import app.main as main_module
+from app import database, metrics
+from app.database import READ_PRIMARY_COOKIE, async_pool_options, configure_replica
+from app.models import Base, Mortgage
+
+@pytest.fixture
+def replica(valid_mortgage_data):
+    """Configure a second SQLite database as the read replica, holding one row the primary lacks."""
+    path = os.path.join(tempfile.mkdtemp(prefix="mortgage-replica-"), "replica.db")
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    with sync_engine.begin() as connection:
+        connection.execute(Mortgage.__table__.insert(), [
+            {**valid_mortgage_data, "applicant_name": "Replica Only", "credit_rating": "AAA"}
+        ])
+    sync_engine.dispose()
+    replica_engine = configure_replica(f"sqlite+aiosqlite:///{path}")
+    yield replica_engine
+    configure_replica(None)
+    asyncio.run(replica_engine.dispose())
+
+def _names(response):
+    return [mortgage["applicant_name"] for mortgage in response.json()]
+
+def test_reads_follow_replica_until_own_write(client, replica, valid_mortgage_data):
+    """Test that reads go to the replica, and to the primary right after the client's own write."""
+    assert _names(client.get("/mortgages")) == ["Replica Only"]
+    assert client.get("/mortgages/stats").json()["total"] is None
+
+    created = client.post("/mortgages", json=valid_mortgage_data)
+    assert READ_PRIMARY_COOKIE in created.headers["set-cookie"]
+    assert _names(client.get("/mortgages")) == ["John Doe"]
+    assert client.get(f"/mortgages/{created.json()['id']}/explain").status_code == 200
+
+    # Another client, without the cookie, still reads the replica
+    other = TestClient(main_module.app)
+    assert _names(other.get("/mortgages", params={"limit": 5})) == ["Replica Only"]
+
+def test_replica_pages_are_cached_once_generation_settles(client, replica, monkeypatch):
+    """Test that a replica read is only cached when the generation is older than the allowed lag."""
+    def misses():
+        return metrics.response_cache_lookups.value("get_mortgages", "miss")
+
+    before = misses()
+    client.get("/mortgages")
+    client.get("/mortgages")
+    assert misses() == before + 2
+
+    monkeypatch.setattr(main_module, "REPLICA_MAX_LAG_SECONDS", 0.0)
+    client.get("/mortgages")
+    client.get("/mortgages")
+    assert misses() == before + 3
+
+def test_health_reports_each_database(client, replica):
+    """Test that /health probes the primary and the replica."""
+    body = client.get("/health").json()
+    assert body["status"] == "ok"
+    assert set(body["databases"]) == {"primary", "replica"}
+    assert body["databases"]["replica"]["status"] == "ok"
+
+    configure_replica("sqlite+aiosqlite:////nonexistent-directory/replica.db")
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "degraded"
+    assert response.json()["databases"]["replica"]["status"] == "unavailable"
+
+def test_pooled_engines_are_sized_from_settings():
+    """Test that server databases get the configured, pre-pinged pool and SQLite keeps NullPool."""
+    options = async_pool_options("mysql+aiomysql://user:password@db/mortgage_db")
+    assert options["pool_size"] == database.DB_POOL_SIZE
+    assert options["max_overflow"] == database.DB_MAX_OVERFLOW
+    assert options["pool_pre_ping"] is True
+    assert async_pool_options("sqlite+aiosqlite:///mortgages.db") == {}
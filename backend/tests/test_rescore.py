@@ -0,0 +1,66 @@
+import json
+
+from sqlalchemy import select
+
+from app.database import SessionLocal, engine
+from app.jobs.rescore import plan_chunks, run_rescore, save_checkpoint
+from app.models import Mortgage
+from app.rollup import rebuild_rollup, verify_rollup
+from app.utils.credit_rating import calculate_credit_rating
+from benchmarks.datagen import generate_mortgage_rows, generate_mortgages
+
+def _seed_stale_book(rows: int):
+    data = generate_mortgage_rows(rows, seed=3)
+    for row in data:
+        row["credit_rating"] = "C"
+    with engine.begin() as connection:
+        connection.execute(Mortgage.__table__.insert(), data)
+    with SessionLocal() as db:
+        rebuild_rollup(db)
+        db.commit()
+
+def _stored_ratings():
+    db = SessionLocal()
+    try:
+        return db.execute(select(Mortgage.id, Mortgage.credit_rating, Mortgage.rulebook_version).order_by(Mortgage.id)).all()
+    finally:
+        db.close()
+
+def test_plan_chunks_covers_id_range():
+    """Test that chunks are half-open and cover every id exactly once."""
+    assert plan_chunks(3, 12, 4) == [(3, 7), (7, 11), (11, 13)]
+
+def test_rescore_writes_only_changed_ratings(client, tmp_path):
+    """Test a parallel rescore fixes stale ratings and is a no-op when rerun."""
+    _seed_stale_book(300)
+    summary = run_rescore(workers=2, chunk_size=64, checkpoint_path=tmp_path / "checkpoint.json", avg_credit_score=700.0)
+    assert summary["rows"] == 300
+    assert summary["chunks"] == 5
+    assert sum(worker["rows"] for worker in summary["workers"]) == 300
+    assert not (tmp_path / "checkpoint.json").exists()
+
+    expected = [calculate_credit_rating(m, 700.0) for m in generate_mortgages(300, seed=3)]
+    stored = _stored_ratings()
+    assert [row.credit_rating for row in stored] == expected
+    assert {row.rulebook_version for row in stored} == {"2024.1"}
+    assert summary["changed"] == 300
+    with SessionLocal() as db:
+        assert verify_rollup(db)["consistent"]
+
+    assert run_rescore(workers=2, chunk_size=64, checkpoint_path=tmp_path / "checkpoint.json",
+                       avg_credit_score=700.0)["changed"] == 0
+
+def test_rescore_resumes_from_checkpoint(client, tmp_path):
+    """Test that chunks recorded in the checkpoint are skipped on resume."""
+    _seed_stale_book(100)
+    first_id = _stored_ratings()[0].id
+    checkpoint = tmp_path / "checkpoint.json"
+    run = {"rulebook_version": "2024.1", "avg_credit_score": 650.0, "chunk_size": 50}
+    save_checkpoint(checkpoint, run, {first_id})
+    assert json.loads(checkpoint.read_text())["done"] == [first_id]
+
+    summary = run_rescore(workers=1, chunk_size=50, checkpoint_path=checkpoint)
+    assert summary["avg_credit_score"] == 650.0
+    assert summary["rows"] == 50
+    ratings = [row.credit_rating for row in _stored_ratings()]
+    assert ratings[:50] == ["C"] * 50
@@ -0,0 +1,93 @@
+import asyncio
+
+from app import metrics
+from app.cache import MemoryCacheBackend, RedisCacheBackend, ResponseCache, etag_matches
+
+class LocalKeyValueStore:
+    """In-memory stand-in for the async Redis client used by RedisCacheBackend."""
+
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def incr(self, key):
+        self.values[key] = str(int(self.values.get(key, 0)) + 1).encode()
+        return int(self.values[key])
+
+def _query_count():
+    return metrics.db_query_duration.count("async", "select")
+
+def test_unchanged_list_revalidates_without_database(client, valid_mortgage_data):
+    """Test that a matching If-None-Match gets 304 and a repeat read is served from the cache."""
+    client.post("/mortgages", json=valid_mortgage_data)
+    first = client.get("/mortgages", params={"limit": 10})
+    etag = first.headers["ETag"]
+
+    queries = _query_count()
+    assert client.get("/mortgages", params={"limit": 10}, headers={"If-None-Match": etag}).status_code == 304
+    repeat = client.get("/mortgages", params={"limit": 10})
+    assert _query_count() == queries
+    assert repeat.content == first.content
+    assert repeat.headers["ETag"] == etag
+
+    other_page = client.get("/mortgages", params={"limit": 5})
+    assert other_page.headers["ETag"] != etag
+
+def test_writes_invalidate_cached_pages(client, valid_mortgage_data):
+    """Test that create, update and delete each retire the cached listing."""
+    created = client.post("/mortgages", json=valid_mortgage_data).json()
+    etag = client.get("/mortgages").headers["ETag"]
+
+    client.put(f"/mortgages/{created['id']}", json={**valid_mortgage_data, "applicant_name": "Jane Doe"})
+    response = client.get("/mortgages", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["applicant_name"] == "Jane Doe"
+
+    etag = response.headers["ETag"]
+    client.put(f"/mortgages/{created['id']}", json={**valid_mortgage_data, "applicant_name": "Jane Doe"})
+    assert client.get("/mortgages", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/mortgages/bulk", json=[valid_mortgage_data])
+    response = client.get("/mortgages", headers={"If-None-Match": etag})
+    assert len(response.json()) == 2
+
+    client.delete(f"/mortgages/{created['id']}")
+    assert len(client.get("/mortgages").json()) == 1
+
+def test_cached_page_keeps_next_cursor(client, valid_mortgage_data):
+    """Test that a cached page still carries its X-Next-Cursor header."""
+    client.post("/mortgages/bulk", json=[valid_mortgage_data] * 3)
+    fresh = client.get("/mortgages", params={"limit": 2})
+    cached = client.get("/mortgages", params={"limit": 2})
+    assert cached.headers["X-Next-Cursor"] == fresh.headers["X-Next-Cursor"]
+    assert len(client.get("/mortgages", params={"cursor": cached.headers["X-Next-Cursor"]}).json()) == 1
+
+def test_backends_expire_evict_and_share_generations():
+    """Test the TTL/LRU memory backend and a stand-in external store behind the same cache."""
+    async def scenario():
+        memory = ResponseCache(MemoryCacheBackend(max_entries=2), ttl=60)
+        for digest in ["a", "b", "c"]:
+            await memory.set("ns", 0, digest, b"[]", {})
+        assert await memory.get("ns", 0, "a") is None
+        assert await memory.get("ns", 0, "c") == (b"[]", {})
+
+        expired = ResponseCache(MemoryCacheBackend(), ttl=0)
+        await expired.set("ns", 0, "a", b"[]", {})
+        assert await expired.get("ns", 0, "a") is None
+
+        store = LocalKeyValueStore()
+        worker_a = ResponseCache(RedisCacheBackend(store))
+        worker_b = ResponseCache(RedisCacheBackend(store))
+        await worker_a.set("ns", 0, "a", b"[1]", {"X-Next-Cursor": "abc"})
+        assert await worker_b.get("ns", await worker_b.generation(), "a") == (b"[1]", {"X-Next-Cursor": "abc"})
+        await worker_a.bump()
+        assert await worker_b.generation() == 1
+
+    asyncio.run(scenario())
+    assert etag_matches('W/"1-abc", "2-def"', '"2-def"')
+    assert not etag_matches('"1-abc"', '"2-def"')
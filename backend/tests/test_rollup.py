@@ -0,0 +1,75 @@
+import pytest
+
+from app.database import SessionLocal
+from app.rollup import RollupDeltas, score_band, verify_rollup
+
+def _verify():
+    with SessionLocal() as db:
+        return verify_rollup(db)
+
+def test_score_bands():
+    """Test the credit score band boundaries."""
+    assert [score_band(score) for score in (300, 579, 580, 669, 670, 739, 740, 799, 800, 850)] == [
+        "300-579", "300-579", "580-669", "580-669", "670-739", "670-739", "740-799", "740-799", "800-850", "800-850"
+    ]
+
+def test_cancelling_changes_write_nothing(valid_mortgage_data):
+    """Test that a write leaving a mortgage's group and measures unchanged yields no deltas."""
+    deltas = RollupDeltas()
+    deltas.remove({**valid_mortgage_data, "credit_rating": "AAA"})
+    deltas.add({**valid_mortgage_data, "applicant_name": "Renamed", "credit_rating": "AAA"})
+    assert deltas.items() == []
+
+def test_writes_keep_rollup_consistent(client, valid_mortgage_data):
+    """Test that create, bulk, update and delete keep the rollup equal to a full recompute."""
+    created = client.post("/mortgages", json=valid_mortgage_data).json()
+    client.post("/mortgages/bulk", json=[
+        {**valid_mortgage_data, "credit_score": 600, "loan_type": "adjustable"},
+        {**valid_mortgage_data, "credit_score": 820, "property_type": "condo"},
+        {**valid_mortgage_data, "loan_amount": 390000.0},
+    ])
+    client.put(f"/mortgages/{created['id']}", json={**valid_mortgage_data, "credit_score": 640, "debt_amount": 60000.0})
+    doomed = client.post("/mortgages", json=valid_mortgage_data).json()
+    client.delete(f"/mortgages/{doomed['id']}")
+
+    check = client.get("/admin/portfolio-rollup/verify").json()
+    assert check["consistent"], check["mismatches"]
+    assert check["mortgage_count"] == 4
+
+    listed = client.get("/mortgages").json()
+    stats = client.get("/mortgages/stats", params={"group_by": ["loan_type"]}).json()
+    assert stats["total"]["mortgage_count"] == 4
+    assert stats["total"]["loan_amount_total"] == pytest.approx(sum(m["loan_amount"] for m in listed))
+    by_loan_type = {group["loan_type"]: group for group in stats["groups"]}
+    fixed = [m for m in listed if m["loan_type"] == "fixed"]
+    assert by_loan_type["fixed"]["mortgage_count"] == len(fixed) == 3
+    assert by_loan_type["fixed"]["avg_ltv"] == pytest.approx(
+        sum(m["loan_amount"] / m["property_value"] for m in fixed) / len(fixed)
+    )
+    assert by_loan_type["fixed"]["avg_dti"] == pytest.approx(
+        sum(m["debt_amount"] / m["income"] for m in fixed) / len(fixed)
+    )
+
+    bands = client.get("/mortgages/stats", params={"group_by": ["score_band", "credit_rating"]}).json()
+    assert sum(group["mortgage_count"] for group in bands["groups"]) == 4
+    assert {group["score_band"] for group in bands["groups"]} == {"580-669", "740-799", "800-850"}
+
+def test_verify_detects_and_rebuild_repairs_drift(client, valid_mortgage_data):
+    """Test that a rollup out of step with the table is reported and fixed by a rebuild."""
+    from sqlalchemy import update
+    from app.models import MortgageRollup
+
+    client.post("/mortgages", json=valid_mortgage_data)
+    with SessionLocal() as db:
+        db.execute(update(MortgageRollup).values(mortgage_count=MortgageRollup.mortgage_count + 1))
+        db.commit()
+    assert not _verify()["consistent"]
+
+    assert client.post("/admin/portfolio-rollup/rebuild").json() == {"groups": 1}
+    assert _verify()["consistent"]
+    assert client.get("/mortgages/stats").json()["total"]["mortgage_count"] == 1
+
+def test_stats_of_empty_book(client):
+    """Test that an empty book reports no total and no groups."""
+    assert client.get("/mortgages/stats").json() == {"group_by": ["credit_rating"], "total": None, "groups": []}
+    assert client.get("/mortgages/stats", params={"group_by": ["region"]}).status_code == 422
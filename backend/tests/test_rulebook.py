@@ -0,0 +1,121 @@
+import copy
+import itertools
+import json
+import os
+
+import pytest
+
+from app.schemas import MortgageCreate
+from app.utils.credit_rating import calculate_credit_rating, calculate_credit_ratings, to_rating_arrays
+from app.utils.rulebook import (
+    DEFAULT_RULEBOOK_PATH,
+    CompiledRulebook,
+    RulebookError,
+    RulebookLoader,
+    load_rulebook,
+)
+from benchmarks.bench_rulebook import legacy_calculate_credit_rating
+
+DEFAULT_SPEC = json.loads(DEFAULT_RULEBOOK_PATH.read_text())
+
+def _boundary_mortgages():
+    return [
+        MortgageCreate.model_construct(
+            applicant_name="Test User",
+            income=100000.0,
+            credit_score=credit_score,
+            loan_amount=ltv * 400000.0,
+            property_value=400000.0,
+            debt_amount=dti * 100000.0,
+            loan_type=loan_type,
+            property_type=property_type
+        )
+        for ltv, dti, credit_score, loan_type, property_type in itertools.product(
+            [0.5, 0.8, 0.85, 0.9, 0.95],
+            [0.1, 0.4, 0.45, 0.5, 0.6],
+            [300, 649, 650, 699, 700, 850],
+            ["fixed", "adjustable"],
+            ["single_family", "condo"],
+        )
+    ]
+
+def _write_rulebook(path, spec):
+    path.write_text(json.dumps(spec))
+    # Make each rewrite visible to the mtime check even on coarse filesystem clocks
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+def test_default_rulebook_matches_hardcoded_rules():
+    """Test that the shipped rulebook reproduces the original hardcoded thresholds exactly."""
+    rulebook = load_rulebook(DEFAULT_RULEBOOK_PATH)
+    mortgages = _boundary_mortgages()
+    for avg_credit_score in [600.0, 649.0, 650.0, 699.0, 700.0]:
+        expected = [legacy_calculate_credit_rating(m, avg_credit_score) for m in mortgages]
+        assert [calculate_credit_rating(m, avg_credit_score, rulebook) for m in mortgages] == expected
+
+def test_custom_rulebook_scalar_and_batch_agree():
+    """Test a stricter policy, including a long band evaluated by bisect, on both paths."""
+    spec = copy.deepcopy(DEFAULT_SPEC)
+    spec["version"] = "strict"
+    spec["bands"]["ltv"] = {"thresholds": [0.5, 0.6, 0.7, 0.8, 0.9], "points": [0, 1, 1, 2, 2, 3]}
+    spec["bands"]["credit_score"]["thresholds"] = [680, 750]
+    rulebook = CompiledRulebook.from_dict(spec)
+    mortgages = _boundary_mortgages()
+    expected = [calculate_credit_rating(m, 700.0, rulebook) for m in mortgages]
+    assert calculate_credit_ratings(to_rating_arrays(mortgages), 700.0, rulebook).tolist() == expected
+    assert expected != [calculate_credit_rating(m, 700.0) for m in mortgages]
+
+@pytest.mark.parametrize("change, message", [
+    (lambda spec: spec["bands"]["dti"].update(thresholds=[0.5, 0.4]), "strictly increasing"),
+    (lambda spec: spec["bands"]["ltv"].update(points=[0, 1]), "expected 3 points"),
+    (lambda spec: spec["bands"].pop("avg_credit_score"), "missing bands"),
+    (lambda spec: spec["categories"]["loan_type"].pop("fixed"), "missing weights"),
+    (lambda spec: spec["categories"]["loan_type"].update(balloon=2), "unknown values"),
+    (lambda spec: spec["ratings"].update(labels=["AAA", "BB", "C"]), "unknown labels"),
+])
+def test_invalid_rulebooks_are_rejected(change, message):
+    """Test that inconsistent rulebooks fail to compile."""
+    spec = copy.deepcopy(DEFAULT_SPEC)
+    change(spec)
+    with pytest.raises(RulebookError, match=message):
+        CompiledRulebook.from_dict(spec)
+
+def test_loader_hot_reloads_and_keeps_last_good_rulebook(tmp_path):
+    """Test that file changes are picked up and broken files never replace the active rulebook."""
+    path = tmp_path / "rulebook.json"
+    _write_rulebook(path, DEFAULT_SPEC)
+    loader = RulebookLoader(path, check_interval=0)
+    assert loader.current().version == "2024.1"
+
+    _write_rulebook(path, {**DEFAULT_SPEC, "version": "2024.2"})
+    assert loader.current().version == "2024.2"
+
+    path.write_text("{not json")
+    assert loader.current().version == "2024.2"
+    with pytest.raises(RulebookError, match="Invalid JSON"):
+        loader.reload()
+    assert loader.current().version == "2024.2"
+
+def test_api_records_rulebook_version(client, valid_mortgage_data, tmp_path, monkeypatch):
+    """Test that writes record the active version and the reload endpoint switches it."""
+    from app.utils.rulebook import rulebook_loader
+
+    created = client.post("/mortgages", json=valid_mortgage_data).json()
+    assert created["rulebook_version"] == "2024.1"
+    assert client.get("/admin/rulebook").json()["version"] == "2024.1"
+
+    try:
+        path = tmp_path / "rulebook.json"
+        _write_rulebook(path, {**DEFAULT_SPEC, "version": "2024.2"})
+        monkeypatch.setattr(rulebook_loader, "path", path)
+        assert client.post("/admin/rulebook/reload").json()["version"] == "2024.2"
+        updated = client.put(f"/mortgages/{created['id']}", json=valid_mortgage_data).json()
+        assert updated["rulebook_version"] == "2024.2"
+
+        path.write_text("{not json")
+        response = client.post("/admin/rulebook/reload")
+        assert response.status_code == 400
+        assert client.get("/admin/rulebook").json()["version"] == "2024.2"
+    finally:
+        monkeypatch.undo()
+        rulebook_loader.reload()
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+import app.main as main_module
+from app.feed import change_feed
+from app.search import NameIndex, name_search
+
+NAMES = {
+    1: "John Smith",
+    2: "Joan Smart",
+    3: "José Álvarez",
+    4: "Johnny Smithers",
+    5: "Mary-Jo O'Neil",
+}
+
+@pytest.fixture
+def search_client(request, monkeypatch):
+    """API client whose lifespan starts the name search index; waits until it serves."""
+    monkeypatch.setattr(main_module, "SEARCH_INDEX_ENABLED", True)
+    test_client = request.getfixturevalue("client")
+    deadline = time.monotonic() + 10
+    while not name_search.serving:
+        assert time.monotonic() < deadline, "search index did not load"
+        time.sleep(0.01)
+    return test_client
+
+def test_index_prefix_and_fuzzy_matching():
+    """Test word-prefix and typo-tolerant matching, accents, renames and deletes."""
+    index = NameIndex(capacity=2)
+    index.upsert(NAMES.items())
+
+    assert index.prefix("jo", 10) == [1, 2, 3, 4, 5]
+    assert index.prefix("jo smi", 10) == [1, 4]
+    assert index.prefix("SMITH", 10) == [1, 4]
+    assert index.prefix("alv jose", 10) == [3]
+    assert index.prefix("o'neil", 10) == [5]
+    assert index.prefix("jo", 2) == [1, 2]
+    assert index.prefix("xavier", 10) == [] and index.prefix("!!", 10) == []
+
+    matches = index.fuzzy("jonh smiht", 10)
+    assert matches[0][0] == 1
+    assert 2 not in [mortgage_id for mortgage_id, _ in matches]
+    assert index.fuzzy("alvarez", 1)[0][0] == 3
+
+    index.upsert([(1, "Jon Smyth"), (3, "José Álvarez")])
+    index.delete([4])
+    assert index.prefix("smi", 10) == []
+    assert index.prefix("smy", 10) == [1]
+    assert len(index) == 4 and index.dead_count == 2
+
+def test_search_endpoint_follows_writes(search_client, valid_mortgage_data, monkeypatch):
+    """Test that searches see creates, renames and deletes, and fall back to the database."""
+    ids = {
+        name: search_client.post("/mortgages", json={**valid_mortgage_data, "applicant_name": name}).json()["id"]
+        for name in ("Grace Hopper", "Grace Kelly", "Alan Turing")
+    }
+    search_client.portal.call(change_feed.poll)
+
+    found = search_client.get("/mortgages/search", params={"q": "gra"}).json()
+    assert [row["id"] for row in found] == [ids["Grace Hopper"], ids["Grace Kelly"]]
+    assert found[0]["applicant_name"] == "Grace Hopper" and found[0]["credit_rating"]
+    found = search_client.get("/mortgages/search", params={"q": "grace hoper", "mode": "fuzzy", "limit": 1}).json()
+    assert [row["id"] for row in found] == [ids["Grace Hopper"]]
+
+    search_client.put(
+        f"/mortgages/{ids['Grace Kelly']}", json={**valid_mortgage_data, "applicant_name": "Grace Murray"}
+    )
+    search_client.delete(f"/mortgages/{ids['Alan Turing']}")
+    search_client.portal.call(change_feed.poll)
+    assert [row["id"] for row in search_client.get("/mortgages/search", params={"q": "mur"}).json()] == [
+        ids["Grace Kelly"]
+    ]
+    assert search_client.get("/mortgages/search", params={"q": "turing"}).json() == []
+    assert search_client.get("/admin/search-index").json()["names"] == 2
+
+    # While the index is not serving, the database answers
+    monkeypatch.setattr(name_search, "ready", False)
+    found = search_client.get("/mortgages/search", params={"q": "Grace M"}).json()
+    assert [row["id"] for row in found] == [ids["Grace Kelly"]]
+    found = search_client.get("/mortgages/search", params={"q": "opp", "mode": "fuzzy"}).json()
+    assert [row["id"] for row in found] == [ids["Grace Hopper"]]
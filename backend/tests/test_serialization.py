@@ -0,0 +1,24 @@
+import json
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+from app import schemas, serialization
+
+@pytest.mark.parametrize("encoder", ["orjson", "json"])
+def test_listing_matches_response_model(client, valid_mortgage_data, monkeypatch, encoder):
+    """Test that the zero-ORM listing encodes the same objects as schemas.Mortgage would."""
+    if encoder == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    created = client.post("/mortgages", json=valid_mortgage_data).json()
+    client.put(f"/mortgages/{created['id']}", json={**valid_mortgage_data, "credit_score": 640})
+
+    response = client.get("/mortgages")
+    listed = response.json()
+    expected = TypeAdapter(List[schemas.Mortgage]).validate_python(listed)
+    assert list(listed[0]) == list(schemas.Mortgage.model_fields)
+    assert json.loads(TypeAdapter(List[schemas.Mortgage]).dump_json(expected)) == listed
+    assert listed[0]["updated_at"] is not None
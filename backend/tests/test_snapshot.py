@@ -0,0 +1,115 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+import app.main as main_module
+from app.database import engine
+from app.filters import MortgageFilters
+from app.models import Mortgage
+from app.serialization import MORTGAGE_COLUMNS
+from app.snapshot import MortgageColumns, mortgage_snapshot
+
+START = datetime(2024, 1, 1)
+
+def _row(mortgage_id, created_at, credit_rating="AAA", loan_type="fixed", name=None, updated_at=None):
+    """Build a row tuple in MORTGAGE_COLUMNS order."""
+    values = {
+        "applicant_name": name or f"Applicant {mortgage_id}",
+        "income": 100000.0,
+        "credit_score": 700,
+        "loan_amount": 300000.0,
+        "property_value": 400000.0,
+        "debt_amount": 20000.0,
+        "loan_type": loan_type,
+        "property_type": "condo",
+        "id": mortgage_id,
+        "credit_rating": credit_rating,
+        "rulebook_version": "v1",
+        "created_at": created_at,
+        "updated_at": updated_at,
+    }
+    return tuple(values[column.key] for column in MORTGAGE_COLUMNS)
+
+def _filters(**values):
+    filters = MortgageFilters(*[None] * 7)
+    for name, value in values.items():
+        setattr(filters, name, value)
+    return filters
+
+@pytest.fixture
+def snapshot_client(request, monkeypatch):
+    """API client whose lifespan starts the in-memory snapshot; waits until it serves."""
+    monkeypatch.setattr(main_module, "SNAPSHOT_ENABLED", True)
+    test_client = request.getfixturevalue("client")
+    deadline = time.monotonic() + 10
+    while not mortgage_snapshot.serving:
+        assert time.monotonic() < deadline, "snapshot did not load"
+        time.sleep(0.01)
+    return test_client
+
+def test_columns_page_filters_and_cursor():
+    """Test keyset pages, filters, deletes and out-of-order inserts of the column store."""
+    columns = MortgageColumns(capacity=2)
+    columns.upsert([
+        _row(i, START + timedelta(seconds=i // 2), credit_rating="AAA" if i % 3 else "C", name=f"Ünïcode {i}")
+        for i in range(1, 11)
+    ])
+    # Arrives late with an earlier timestamp: must be listed first
+    columns.upsert([_row(11, START - timedelta(days=1))])
+    columns.delete([4])
+
+    rows, more = columns.page(_filters(), limit=3)
+    assert [row["id"] for row in rows] == [11, 1, 2] and more
+    assert rows[1]["applicant_name"] == "Ünïcode 1" and rows[1]["created_at"] == START
+    rows, more = columns.page(_filters(), after=(rows[-1]["created_at"], rows[-1]["id"]), limit=100)
+    assert [row["id"] for row in rows] == [3, 5, 6, 7, 8, 9, 10] and not more
+    rows, _ = columns.page(_filters(credit_rating="C"), skip=1, limit=100)
+    assert [row["id"] for row in rows] == [6, 9]
+
+    # A stale read of a deleted row does not bring it back; a newer update applies
+    columns.upsert([_row(4, START), _row(5, START, name="Renamed", updated_at=START + timedelta(hours=1))])
+    assert columns.get(4) is None
+    assert columns.get(5)["applicant_name"] == "Renamed"
+    columns.compact()
+    assert len(columns) == 10 and columns.dead_count == 0
+    assert columns.get(5)["applicant_name"] == "Renamed"
+
+def test_snapshot_serves_same_json_as_database(snapshot_client, valid_mortgage_data, monkeypatch):
+    """Test that snapshot pages and lookups match the database path, and follow writes."""
+    ids = [
+        snapshot_client.post("/mortgages", json={**valid_mortgage_data, "credit_score": 600 + i * 20}).json()["id"]
+        for i in range(5)
+    ]
+    params = {"limit": 2, "min_credit_score": 620}
+    from_snapshot = snapshot_client.get("/mortgages", params=params)
+    assert from_snapshot.headers["etag"].startswith('W/"snapshot-')
+    assert snapshot_client.get(f"/mortgages/{ids[0]}").json()["id"] == ids[0]
+
+    snapshot_client.put(f"/mortgages/{ids[1]}", json={**valid_mortgage_data, "applicant_name": "Updated"})
+    snapshot_client.delete(f"/mortgages/{ids[2]}")
+    assert snapshot_client.get(f"/mortgages/{ids[1]}").json()["applicant_name"] == "Updated"
+    assert snapshot_client.get(f"/mortgages/{ids[2]}").status_code == 404
+    first = snapshot_client.get("/mortgages", params=params)
+    second = snapshot_client.get("/mortgages", params={**params, "cursor": first.headers["x-next-cursor"]})
+
+    monkeypatch.setattr(mortgage_snapshot, "ready", False)
+    assert snapshot_client.get("/mortgages", params=params).content == first.content
+    assert snapshot_client.get(
+        "/mortgages", params={**params, "cursor": first.headers["x-next-cursor"]}
+    ).content == second.content
+
+def test_delta_sync_picks_up_writes_made_elsewhere(snapshot_client, valid_mortgage_data):
+    """Test that rows inserted and updated outside this worker appear after a sync."""
+    with engine.begin() as connection:
+        connection.execute(Mortgage.__table__.insert(), [{**valid_mortgage_data, "credit_rating": "BBB"}])
+        mortgage_id = connection.scalar(select(Mortgage.id))
+    assert mortgage_snapshot.get(mortgage_id) is None
+    assert snapshot_client.portal.call(mortgage_snapshot.sync) == 1
+    assert snapshot_client.get(f"/mortgages/{mortgage_id}").json()["credit_rating"] == "BBB"
+
+    with engine.begin() as connection:
+        connection.execute(Mortgage.__table__.update().values(credit_rating="C"))
+    snapshot_client.portal.call(mortgage_snapshot.sync)
+    assert mortgage_snapshot.get(mortgage_id)["credit_rating"] == "C"
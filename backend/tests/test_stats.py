@@ -0,0 +1,110 @@
+from app.database import SessionLocal
+from app.stats import (
+    DEFAULT_AVG_CREDIT_SCORE,
+    CreditScoreStatsCache,
+    average_credit_score,
+    read_credit_score_stats,
+)
+
+def _stored_stats():
+    db = SessionLocal()
+    try:
+        return read_credit_score_stats(db)
+    finally:
+        db.close()
+
+def test_average_defaults_without_mortgages():
+    """Test that the adjustment falls back to the default average on an empty book."""
+    assert average_credit_score(0, 0) == DEFAULT_AVG_CREDIT_SCORE
+    assert average_credit_score(2, 1300) == 650.0
+
+def test_writes_maintain_running_aggregate(client, valid_mortgage_data):
+    """Test that create, bulk create, update and delete keep count and sum in step."""
+    created = client.post("/mortgages", json=valid_mortgage_data).json()
+    client.post("/mortgages/bulk", json=[
+        {**valid_mortgage_data, "credit_score": 600},
+        {**valid_mortgage_data, "credit_score": 650},
+    ])
+    assert _stored_stats() == (3, 750 + 600 + 650)
+
+    client.put(f"/mortgages/{created['id']}", json={**valid_mortgage_data, "credit_score": 800})
+    assert _stored_stats() == (3, 800 + 600 + 650)
+
+    client.delete(f"/mortgages/{created['id']}")
+    assert _stored_stats() == (2, 600 + 650)
+
+    stats = client.get("/admin/credit-score-stats").json()
+    assert stats["mortgage_count"] == 2
+    assert stats["avg_credit_score"] == 625.0
+
+def test_rebuild_matches_incremental_aggregate(client, valid_mortgage_data):
+    """Test that a full rebuild agrees with the incrementally maintained aggregate."""
+    for score in (610, 720, 845):
+        client.post("/mortgages", json={**valid_mortgage_data, "credit_score": score})
+    incremental = _stored_stats()
+    rebuilt = client.post("/admin/credit-score-stats/rebuild").json()
+    assert (rebuilt["mortgage_count"], rebuilt["credit_score_total"]) == incremental == (3, 2175)
+
+def test_low_average_feeds_rating(client, valid_mortgage_data):
+    """Test that the stored average credit score now affects new ratings."""
+    borderline = {
+        **valid_mortgage_data,
+        "credit_score": 680,
+        "loan_amount": 340000.0,
+        "debt_amount": 45000.0,
+        "property_type": "condo",
+    }
+    assert client.post("/mortgages", json=borderline).json()["credit_rating"] == "AAA"
+    client.post("/mortgages/bulk", json=[{**valid_mortgage_data, "credit_score": 300}] * 5)
+    client.post("/admin/credit-score-stats/rebuild")
+    assert client.post("/mortgages", json=borderline).json()["credit_rating"] == "BBB"
+
+def test_cache_respects_staleness_bound(client, valid_mortgage_data):
+    """Test that the cache serves from memory within the bound and re-reads after it."""
+    cache = CreditScoreStatsCache(max_staleness=3600)
+    db = SessionLocal()
+    try:
+        assert cache.average(db) == DEFAULT_AVG_CREDIT_SCORE
+        client.post("/mortgages", json={**valid_mortgage_data, "credit_score": 600})
+        assert cache.average(db) == DEFAULT_AVG_CREDIT_SCORE
+        cache.invalidate()
+        assert cache.average(db) == 600.0
+    finally:
+        db.close()
+
+def test_seed_is_idempotent_and_counts_existing_rows(client, valid_mortgage_data):
+    """Test that seeding an empty stats table picks up existing mortgages and can run twice."""
+    from app.database import engine
+    from app.models import MortgageStats
+    from app.stats import STATS_SHARDS, seed_credit_score_stats
+
+    client.post("/mortgages", json={**valid_mortgage_data, "credit_score": 640})
+    with engine.begin() as connection:
+        connection.execute(MortgageStats.__table__.delete())
+        seed_credit_score_stats(connection)
+        seed_credit_score_stats(connection)
+    db = SessionLocal()
+    try:
+        assert db.query(MortgageStats).count() == STATS_SHARDS
+    finally:
+        db.close()
+    assert _stored_stats() == (1, 640)
+
+def test_deltas_spread_over_shards(client, valid_mortgage_data, monkeypatch):
+    """Test that writes land on different shards but always sum to the table totals."""
+    from itertools import cycle
+
+    from app import stats
+    from app.models import MortgageStats
+
+    shards = cycle([1, 2, 3])
+    monkeypatch.setattr(stats, "_pick_shard", lambda: next(shards))
+    for score in (600, 700, 800):
+        client.post("/mortgages", json={**valid_mortgage_data, "credit_score": score})
+    db = SessionLocal()
+    try:
+        counts = {row.id: row.mortgage_count for row in db.query(MortgageStats) if row.mortgage_count}
+    finally:
+        db.close()
+    assert counts == {1: 1, 2: 1, 3: 1}
+    assert _stored_stats() == (3, 2100)
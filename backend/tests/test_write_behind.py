@@ -0,0 +1,82 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+import app.main as main_module
+from app import metrics
+from app.database import SessionLocal
+from app.models import Mortgage
+from app.write_behind import DURABILITY_ENQUEUE, WriteBehindQueue
+
+def _mortgage_count():
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(Mortgage))
+
+async def _post_all(payloads):
+    transport = httpx.ASGITransport(app=main_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+        # Connect once first: the engine's one-time connect setup is not safe to run concurrently
+        await async_client.get("/mortgages/stats")
+        responses = await asyncio.gather(*(async_client.post("/mortgages", json=payload) for payload in payloads))
+        await main_module.write_behind.close()
+        return responses
+
+@pytest.fixture
+def write_behind(monkeypatch):
+    """Route POST /mortgages through a fresh write-behind queue."""
+    def enable(**options):
+        queue = WriteBehindQueue(**options)
+        monkeypatch.setattr(main_module, "WRITE_BEHIND_ENABLED", True)
+        monkeypatch.setattr(main_module, "write_behind", queue)
+        return queue
+    return enable
+
+def test_concurrent_submissions_share_a_commit(client, write_behind, valid_mortgage_data):
+    """Test that queued rows are written in batches and every caller gets its own id."""
+    write_behind(max_batch=50, max_delay_ms=50)
+    batches = metrics.write_behind_batch_size.count()
+    payloads = [{**valid_mortgage_data, "applicant_name": f"Applicant {i}"} for i in range(20)]
+
+    responses = asyncio.run(_post_all(payloads))
+    assert {response.status_code for response in responses} == {201}
+    bodies = [response.json() for response in responses]
+    assert [body["applicant_name"] for body in bodies] == [payload["applicant_name"] for payload in payloads]
+    assert len({body["id"] for body in bodies}) == 20
+    assert all(body["created_at"] and body["credit_rating"] for body in bodies)
+    assert metrics.write_behind_batch_size.count() - batches < 20
+
+    assert _mortgage_count() == 20
+    stored = client.get(f"/mortgages/{bodies[0]['id']}/explain").json()
+    assert stored["rating"] == bodies[0]["credit_rating"]
+    assert client.get("/admin/portfolio-rollup/verify").json()["consistent"]
+    assert client.get("/admin/credit-score-stats").json()["mortgage_count"] == 20
+
+def test_enqueue_durability_answers_before_the_write(client, write_behind, valid_mortgage_data):
+    """Test that enqueue durability returns 202 at once and close() drains the queue."""
+    write_behind(durability=DURABILITY_ENQUEUE, max_delay_ms=50)
+    responses = asyncio.run(_post_all([valid_mortgage_data] * 3))
+    assert {response.status_code for response in responses} == {202}
+    body = responses[0].json()
+    assert body["status"] == "queued"
+    assert body["credit_rating"] in ("AAA", "BBB", "C")
+    assert "id" not in body
+    assert _mortgage_count() == 3
+
+def test_failed_batch_fails_its_callers(client, valid_mortgage_data):
+    """Test that every caller in a batch sees the error when its transaction fails."""
+    queue = WriteBehindQueue(max_batch=10, max_delay_ms=50)
+
+    async def submit_batch():
+        good = {**valid_mortgage_data, "credit_rating": "AAA", "rulebook_version": "test"}
+        bad = {**good, "credit_rating": "ZZZ"}
+        try:
+            return await asyncio.gather(queue.submit(good), queue.submit(bad), return_exceptions=True)
+        finally:
+            await queue.close()
+
+    results = asyncio.run(submit_batch())
+    assert all(isinstance(result, IntegrityError) for result in results)
+    assert _mortgage_count() == 0
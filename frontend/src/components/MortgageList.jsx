@@ -25,7 +25,14 @@ import {
   DialogActions,
   Button,
 } from '@mui/material';
-import { fetchMortgages, updateMortgage, deleteMortgage, hideSnackbar } from '../store/mortgageSlice';
+import {
+  fetchMortgages,
+  updateMortgage,
+  deleteMortgage,
+  hideSnackbar,
+  mortgageChangesReceived,
+} from '../store/mortgageSlice';
+import { subscribeToMortgageChanges } from '../services/changeFeed';
 import TrendingUpIcon from '@mui/icons-material/TrendingUp';
 import TrendingDownIcon from '@mui/icons-material/TrendingDown';
 import TrendingFlatIcon from '@mui/icons-material/TrendingFlat';
@@ -44,7 +51,13 @@ function MortgageList() {
   const [mortgageToDelete, setMortgageToDelete] = useState(null);
 
   useEffect(() => {
+    // Subscribe first so no change made during the initial fetch is missed
+    const unsubscribe = subscribeToMortgageChanges({
+      onChanges: (events) => dispatch(mortgageChangesReceived(events)),
+      onReset: () => dispatch(fetchMortgages()),
+    });
     dispatch(fetchMortgages());
+    return unsubscribe;
   }, [dispatch]);
 
   const getRatingColor = (rating) => {
@@ -86,7 +99,6 @@ function MortgageList() {
   const handleEditSave = async (updatedMortgage) => {
     try {
       await dispatch(updateMortgage(updatedMortgage)).unwrap();
-      dispatch(fetchMortgages());
     } catch (error) {
       console.error('Failed to update mortgage:', error);
     }
@@ -104,7 +116,6 @@ function MortgageList() {
   const handleDeleteConfirm = async () => {
     try {
       await dispatch(deleteMortgage(mortgageToDelete.id)).unwrap();
-      dispatch(fetchMortgages());
     } catch (error) {
       console.error('Failed to delete mortgage:', error);
     } finally {
@@ -0,0 +1,44 @@
+const API_URL = 'http://localhost:8000'
+
+// Events arriving within this many milliseconds are applied as one batch
+const BATCH_WINDOW_MS = 50
+
+/**
+ * Subscribe to the server's mortgage change feed (Server-Sent Events).
+ *
+ * EventSource reconnects by itself and resumes from the last event it
+ * received, so no change is lost across short disconnects. Events are
+ * handed over in batches so a burst of writes causes one render.
+ *
+ * @param {object} handlers
+ * @param {function} handlers.onChanges Called with an array of change events in seq order
+ * @param {function} handlers.onReset Called when events were missed and the list must be reloaded
+ * @returns {function} Closes the subscription
+ */
+export const subscribeToMortgageChanges = ({ onChanges, onReset }) => {
+  const source = new EventSource(`${API_URL}/mortgages/changes`)
+  let pending = []
+  let timer = null
+
+  const flush = () => {
+    timer = null
+    const batch = pending
+    pending = []
+    onChanges(batch)
+  }
+
+  source.addEventListener('change', (event) => {
+    pending.push(JSON.parse(event.data))
+    if (timer === null) {
+      timer = setTimeout(flush, BATCH_WINDOW_MS)
+    }
+  })
+  source.addEventListener('reset', () => onReset())
+
+  return () => {
+    clearTimeout(timer)
+    source.close()
+  }
+}
+
+export default subscribeToMortgageChanges
@@ -53,6 +53,11 @@ const initialState = {
   loading: false,
   error: null,
   currentMortgage: null,
+  // Seq of the newest change feed event applied to `mortgages`
+  feedSeq: null,
+  // Change feed events received while the list is being fetched
+  fetching: false,
+  pendingChanges: [],
   snackbar: {
     open: false,
     message: '',
@@ -60,6 +65,26 @@ const initialState = {
   },
 }
 
+// Apply change feed events in seq order, skipping ones already applied
+const applyChanges = (state, events) => {
+  for (const event of events) {
+    if (state.feedSeq !== null && event.seq <= state.feedSeq) {
+      continue
+    }
+    const index = state.mortgages.findIndex((m) => m.id === event.id)
+    if (event.kind === 'deleted' || event.mortgage === null) {
+      if (index !== -1) {
+        state.mortgages.splice(index, 1)
+      }
+    } else if (index !== -1) {
+      state.mortgages[index] = event.mortgage
+    } else {
+      state.mortgages.push(event.mortgage)
+    }
+    state.feedSeq = event.seq
+  }
+}
+
 const mortgageSlice = createSlice({
   name: 'mortgage',
   initialState,
@@ -80,6 +105,14 @@ const mortgageSlice = createSlice({
     hideSnackbar: (state) => {
       state.snackbar.open = false
     },
+    mortgageChangesReceived: (state, action) => {
+      // Changes racing the fetch may or may not be in its result: hold them until it lands
+      if (state.fetching) {
+        state.pendingChanges.push(...action.payload)
+      } else {
+        applyChanges(state, action.payload)
+      }
+    },
   },
   extraReducers: (builder) => {
     builder
@@ -87,13 +120,22 @@ const mortgageSlice = createSlice({
       .addCase(fetchMortgages.pending, (state) => {
         state.loading = true
         state.error = null
+        state.fetching = true
+        state.pendingChanges = []
       })
       .addCase(fetchMortgages.fulfilled, (state, action) => {
         state.loading = false
+        state.fetching = false
         state.mortgages = action.payload
+        // Replaying an upsert or delete the fetch already reflects is harmless
+        state.feedSeq = null
+        applyChanges(state, state.pendingChanges)
+        state.pendingChanges = []
       })
       .addCase(fetchMortgages.rejected, (state, action) => {
         state.loading = false
+        state.fetching = false
+        state.pendingChanges = []
         state.error = action.error.message
       })
       // Create mortgage
@@ -103,7 +145,10 @@ const mortgageSlice = createSlice({
       })
       .addCase(createMortgage.fulfilled, (state, action) => {
         state.loading = false
-        state.mortgages.push(action.payload)
+        // The change feed may have delivered it already
+        if (!state.mortgages.some((m) => m.id === action.payload.id)) {
+          state.mortgages.push(action.payload)
+        }
         state.currentMortgage = action.payload
         state.snackbar = {
           open: true,
@@ -192,5 +237,11 @@ const mortgageSlice = createSlice({
   },
 })
 
-export const { setCurrentMortgage, clearError, showSnackbar, hideSnackbar } = mortgageSlice.actions
+export const {
+  setCurrentMortgage,
+  clearError,
+  showSnackbar,
+  hideSnackbar,
+  mortgageChangesReceived,
+} = mortgageSlice.actions
 export default mortgageSlice.reducer 
\ No newline at end of file